@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List, Dict
+from typing import List, Dict, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -8,7 +8,8 @@ logger = logging.getLogger(__name__)
 from app.models.database import get_db, ProjectModel, DesignCaseModel
 from app.schemas.project import MountainPosition
 from app.services.mountain_calculator import calculate_mountain_positions
-from app.services.structural_energy import compute_structural_energy
+from app.services.structural_energy import compute_structural_energy, compute_structural_energy_batch
+from app.services.matrix_utils import analyze_network_structures_batch
 from app.services.tradeoff_calculator import TradeoffCalculator
 from app.services.tradeoff_debug import debug_tradeoff_calculation
 from app.services.structural_tradeoff import (
@@ -85,20 +86,25 @@ def calculate_project_energy(project_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Project not found")
 
     try:
+        # ネットワークを持つ設計案の総効果行列をプロジェクト単位で一括計算
+        energy_inputs = []
+        for case in project.design_cases:
+            network = case.network
+            if network and 'nodes' in network and 'edges' in network:
+                energy_inputs.append({
+                    'network': network,
+                    'performance_weights': case.performance_weights or {},
+                    'weight_mode': getattr(case, 'weight_mode', 'discrete_7') or 'discrete_7',
+                    'performance_deltas': case.performance_deltas or {},
+                })
+        energy_results = iter(compute_structural_energy_batch(energy_inputs))
+
         results = []
         for case in project.design_cases:
             network = case.network
-            perf_weights = case.performance_weights or {}
-            perf_deltas = case.performance_deltas or {}
-            weight_mode = getattr(case, 'weight_mode', 'discrete_7') or 'discrete_7'
 
             if network and 'nodes' in network and 'edges' in network:
-                energy_result = compute_structural_energy(
-                    network=network,
-                    performance_weights=perf_weights,
-                    weight_mode=weight_mode,
-                    performance_deltas=perf_deltas
-                )
+                energy_result = next(energy_results)
 
                 # 性能ごとの部分エネルギーを集計（正規化済み）
                 partial_energies = {}
@@ -405,15 +411,25 @@ def get_project_structural_tradeoff_summary(
         cases_results = []
         all_tradeoff_pairs = []  # 全ケースのトレードオフペアを収集
 
-        for design_case in project.design_cases:
-            # 設計案のweight_modeを取得
-            weight_mode = getattr(design_case, 'weight_mode', 'discrete_7') or 'discrete_7'
+        # 全設計案の総効果行列を一括計算
+        weight_modes = [
+            getattr(dc, 'weight_mode', 'discrete_7') or 'discrete_7'
+            for dc in project.design_cases
+        ]
+        raw_analyses = analyze_network_structures_batch(
+            [dc.network for dc in project.design_cases],
+            weight_modes
+        )
 
+        for design_case, weight_mode, raw_analysis in zip(
+            project.design_cases, weight_modes, raw_analyses
+        ):
             # 構造的分析
             calculator = StructuralTradeoffCalculator(
                 design_case.network,
                 performances_data,
-                weight_mode
+                weight_mode,
+                raw_analysis=raw_analysis
             )
             analysis = calculator.analyze()
             summary = calculator.get_tradeoff_summary()
@@ -784,6 +800,7 @@ def analyze_scc_for_case(
         }
     """
     from app.services.scc_analyzer import analyze_scc, scc_result_to_dict
+    from app.services.analysis_cache import get_cached_result
     from app.models.database import DesignCaseModel
 
     # 設計案を取得
@@ -807,8 +824,8 @@ def analyze_scc_for_case(
                 "message": "No network data available"
             }
 
-        # SCC分解を実行
-        result = analyze_scc(network)
+        # SCC分解を実行（分析キャッシュを共有）
+        result = get_cached_result('scc', network, 'discrete_7', lambda: analyze_scc(network))
         return scc_result_to_dict(result)
 
     except Exception as e:
@@ -880,6 +897,7 @@ def analyze_scc_summary(
         }
     """
     from app.services.scc_analyzer import analyze_scc
+    from app.services.analysis_cache import get_cached_result
 
     project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
     if not project:
@@ -902,7 +920,9 @@ def analyze_scc_summary(
                 })
                 continue
 
-            result = analyze_scc(network)
+            result = get_cached_result(
+                'scc', network, 'discrete_7', lambda: analyze_scc(network)
+            )
 
             if result.has_loops:
                 cases_with_loops += 1
@@ -954,7 +974,7 @@ def compute_shapley_for_pair(
         case_id: 設計案ID
         perf_i_id: 性能iのID
         perf_j_id: 性能jのID
-        method: 'exact', 'monte_carlo', 'auto'
+        method: 'analytic', 'exact'（列挙による検証）, 'monte_carlo', 'auto'（= analytic）
 
     Returns:
         {
@@ -971,8 +991,8 @@ def compute_shapley_for_pair(
             'computation': {'method': str, 'n_properties': int, 'time_ms': float}
         }
     """
-    from app.models.database import DesignCaseModel, PerformanceModel
-    from app.services.matrix_utils import build_adjacency_matrices, compute_total_effect_matrix
+    from app.models.database import DesignCaseModel
+    from app.services.analysis_cache import get_network_analysis
     from app.services.shapley_calculator import (
         compute_shapley_for_performance_pair,
         shapley_result_to_dict,
@@ -993,14 +1013,15 @@ def compute_shapley_for_pair(
         if not network or not network.get('nodes'):
             raise HTTPException(status_code=400, detail="No network data available")
 
-        # 隣接行列を構築（ネットワークノードIDベース）
-        matrices = build_adjacency_matrices(network)
+        # 設計案のweight_modeを取得（デフォルトは'discrete_7'）
+        weight_mode = getattr(design_case, 'weight_mode', 'discrete_7') or 'discrete_7'
+
+        # 隣接行列・総効果行列（ネットワークノードIDベース、分析キャッシュを共有）
+        analysis = get_network_analysis(network, weight_mode)
+        matrices = analysis['matrices']
         if matrices is None or 'B_PA' not in matrices:
             raise HTTPException(status_code=400, detail="Failed to build adjacency matrices")
 
-        B_PA = matrices['B_PA']
-        B_AA = matrices['B_AA']
-        B_AV = matrices['B_AV']
         perf_node_ids = matrices['node_ids']['P']  # ネットワークノードID (perf-xxx)
         perf_labels = matrices['node_labels']['P']
         var_ids = matrices['node_ids']['V']
@@ -1027,12 +1048,11 @@ def compute_shapley_for_pair(
         if perf_i_idx is None or perf_j_idx is None:
             raise HTTPException(status_code=404, detail=f"Performance not found: i={perf_i_id}, j={perf_j_id}")
 
-        T_result = compute_total_effect_matrix(B_PA, B_AA, B_AV)
-        T = T_result['T']
+        T = analysis['total_effect']['T']
 
         # 計算コスト見積もり
         cost = estimate_computation_cost(T.shape[1])
-        if cost['warning'] == 'high' and method == 'auto':
+        if cost['warning'] == 'high' and method == 'exact':
             logger.warning(f"High computation cost for Shapley: {cost['message']}")
 
         # Shapley値を計算
@@ -1056,6 +1076,7 @@ def compute_all_shapley(
     case_id: str,
     method: str = "auto",
     only_tradeoffs: bool = True,
+    time_budget_ms: Optional[float] = None,
     db: Session = Depends(get_db)
 ):
     """
@@ -1064,20 +1085,26 @@ def compute_all_shapley(
     Args:
         project_id: プロジェクトID
         case_id: 設計案ID
-        method: 'exact', 'monte_carlo', 'auto'
+        method: 'analytic', 'exact'（列挙による検証）, 'monte_carlo', 'auto'（= analytic）
         only_tradeoffs: Trueの場合、トレードオフ関係のみ
+        time_budget_ms: 'analytic' 以外の計算期限（ミリ秒）。超えた場合は完了したペアだけを返す
 
     Returns:
         {
             'case_id': str,
             'case_name': str,
             'n_pairs': int,
-            'pairs': [...]
+            'pairs': [...],
+            'schedule': {'n_pairs', 'n_completed', 'n_workers', 'n_chunks', 'timed_out', 'elapsed_ms'}
         }
     """
-    from app.models.database import DesignCaseModel, PerformanceModel
-    from app.services.matrix_utils import build_adjacency_matrices, compute_total_effect_matrix
+    from app.models.database import DesignCaseModel
+    from app.services.analysis_cache import get_network_analysis
     from app.services.shapley_calculator import compute_all_pairwise_shapley
+    from app.services.shapley_parallel import PairScheduleStats
+
+    if time_budget_ms is not None and time_budget_ms < 0:
+        raise HTTPException(status_code=400, detail="time_budget_ms must be non-negative")
 
     # 設計案を取得
     design_case = db.query(DesignCaseModel).filter(
@@ -1088,15 +1115,6 @@ def compute_all_shapley(
     if not design_case:
         raise HTTPException(status_code=404, detail="Design case not found")
 
-    # 性能情報を取得
-    performances = db.query(PerformanceModel).filter(
-        PerformanceModel.project_id == project_id,
-        PerformanceModel.is_leaf == True
-    ).all()
-
-    perf_id_to_idx = {p.id: idx for idx, p in enumerate(performances)}
-    perf_names = [p.name for p in performances]
-
     try:
         network = design_case.network
         if not network or not network.get('nodes'):
@@ -1108,9 +1126,13 @@ def compute_all_shapley(
                 "message": "No network data available"
             }
 
-        # 総効果行列を計算
-        matrices = build_adjacency_matrices(network, perf_id_to_idx)
-        if matrices is None:
+        # 設計案のweight_modeを取得（デフォルトは'discrete_7'）
+        weight_mode = getattr(design_case, 'weight_mode', 'discrete_7') or 'discrete_7'
+
+        # 隣接行列・総効果行列（分析キャッシュを共有）
+        analysis = get_network_analysis(network, weight_mode)
+        matrices = analysis['matrices']
+        if matrices is None or 'B_PA' not in matrices:
             return {
                 "case_id": case_id,
                 "case_name": design_case.name,
@@ -1119,32 +1141,27 @@ def compute_all_shapley(
                 "message": "Failed to build adjacency matrices"
             }
 
-        B_PA, B_AA, B_AV, var_ids, attr_ids = matrices
-        T_result = compute_total_effect_matrix(B_PA, B_AA, B_AV)
-        T = T_result['T']
-
-        # 属性名を取得
-        nodes = network.get('nodes', [])
-        property_names = []
-        for var_id in var_ids:
-            node = next((n for n in nodes if n['id'] == var_id), None)
-            if node:
-                property_names.append(node.get('label', var_id))
-            else:
-                property_names.append(var_id)
+        T = analysis['total_effect']['T']
+        perf_names = matrices['node_labels']['P']
+        property_names = matrices['node_labels']['V']
 
-        # 全ペアのShapley値を計算
+        # 全ペアのShapley値を計算（'analytic' 以外はペアを全コアに分散）
+        schedule = PairScheduleStats()
         pairs = compute_all_pairwise_shapley(
             T, perf_names, property_names,
             method=method,
-            only_tradeoffs=only_tradeoffs
+            only_tradeoffs=only_tradeoffs,
+            n_workers=None,
+            time_budget_ms=time_budget_ms,
+            schedule=schedule
         )
 
         return {
             "case_id": case_id,
             "case_name": design_case.name,
             "n_pairs": len(pairs),
-            "pairs": pairs
+            "pairs": pairs,
+            "schedule": schedule.to_dict()
         }
 
     except Exception as e:
@@ -1187,6 +1204,11 @@ def compute_node_shapley_for_pair(
     perf_i_id: str,
     perf_j_id: str,
     method: str = "auto",
+    tolerance: Optional[float] = None,
+    time_budget_ms: Optional[float] = None,
+    sampling: str = "antithetic",
+    grouping: Optional[str] = None,
+    refresh: bool = False,
     db: Session = Depends(get_db)
 ):
     """
@@ -1195,13 +1217,22 @@ def compute_node_shapley_for_pair(
     トレードオフ C_ij を Variable と Attribute の寄与に分解:
     - プレイヤー = V ∪ A = {V_1, ..., V_m, A_1, ..., A_l}
     - Shapley値の加法性: Σφ_k = C_ij
+    - grouping を指定すると Layer 4 の実体（またはカテゴリ）をグループとする
+      Owen値で計算し、グループごとの寄与も返す
 
     Args:
         project_id: プロジェクトID
         case_id: 設計案ID
         perf_i_id: 性能iのID
         perf_j_id: 性能jのID
-        method: 'exact', 'monte_carlo', 'auto'
+        method: 'path', 'exact', 'monte_carlo', 'adaptive', 'kernel'（KernelSHAP）, 'auto'
+        tolerance: 'adaptive' の標準誤差の許容値（C_ij と同じ単位）
+        time_budget_ms: 'adaptive' の時間予算（ミリ秒）。'adaptive' では tolerance か
+            time_budget_ms の少なくとも一方が必要
+        sampling: 'adaptive' のサンプリング方式（'random' / 'antithetic' / 'stratified'）
+        grouping: 'entity' / 'category'（Owen値、method は 'exact' / 'monte_carlo' / 'auto'、
+            tolerance / time_budget_ms / sampling は指定できない）
+        refresh: True なら保存済みの結果を使わず再計算する
 
     Returns:
         {
@@ -1218,17 +1249,47 @@ def compute_node_shapley_for_pair(
             ],
             'sum_check': float,
             'additivity_error': float,
-            'computation': {'method': str, 'n_nodes': int, 'n_variables': int, 'n_attributes': int, 'time_ms': float}
+            'computation': {'method': str, 'n_nodes': int, 'n_variables': int, 'n_attributes': int, 'time_ms': float,
+                            'n_samples', 'stop_reason', 'max_std_error', 'confidence_level'（adaptive / kernel のみ）,
+                            'pruning': {'n_players', 'n_null_players', 'n_core_players',
+                                        'n_symmetry_classes', 'n_symmetric_players',
+                                        'table_size', 'null_pruning'}（path 以外）}
         }
+        adaptive / kernel の場合、各値に 'std_error', 'ci_lower', 'ci_upper' が付く
+        grouping 指定時は 'groups': [{'group_id', 'label', 'node_ids', 'phi', 'abs_phi'}] と
+        computation.grouping（グループ数・評価提携数など）が付く
+        同じネットワーク・パラメータの結果は shapley_results テーブルに保存し、次回はそれを返す
     """
     from app.models.database import DesignCaseModel
-    from app.services.matrix_utils import build_adjacency_matrices
+    from app.services.analysis_cache import get_network_analysis, network_fingerprint
+    from app.services.shapley_store import get_stored_result, store_result
+    from app.services.matrix_utils import to_dense_matrices
+    from app.services.shapley_subset_table import SAMPLING_SCHEMES
+    from app.services.shapley_owen import OWEN_GROUPINGS, OWEN_METHODS
     from app.services.shapley_calculator import (
         compute_node_shapley_for_performance_pair,
+        compute_node_owen_for_performance_pair,
         node_shapley_result_to_dict,
         extract_node_info
     )
 
+    if sampling not in SAMPLING_SCHEMES:
+        raise HTTPException(status_code=400, detail=f"Invalid sampling: {sampling}")
+    if method == "adaptive" and tolerance is None and time_budget_ms is None:
+        # 停止条件がないと ADAPTIVE_MAX_SAMPLES 個の順列まで回り続ける
+        raise HTTPException(status_code=400, detail="Method adaptive requires tolerance or time_budget_ms")
+    if grouping is not None and grouping not in OWEN_GROUPINGS:
+        raise HTTPException(status_code=400, detail=f"Invalid grouping: {grouping}")
+    if grouping is not None:
+        # Owen値は exact / monte_carlo / auto のみで、adaptive 用の停止条件・サンプリングは使わない
+        if method not in OWEN_METHODS:
+            raise HTTPException(status_code=400, detail=f"Method {method} is not supported with grouping")
+        if tolerance is not None or time_budget_ms is not None or sampling != "antithetic":
+            raise HTTPException(
+                status_code=400,
+                detail="tolerance, time_budget_ms and sampling are not supported with grouping"
+            )
+
     # 設計案を取得
     design_case = db.query(DesignCaseModel).filter(
         DesignCaseModel.id == case_id,
@@ -1246,8 +1307,8 @@ def compute_node_shapley_for_pair(
         # 設計案のweight_modeを取得（デフォルトは'discrete_7'）
         weight_mode = getattr(design_case, 'weight_mode', 'discrete_7') or 'discrete_7'
 
-        # 隣接行列を構築（weight_modeを渡す）
-        matrices = build_adjacency_matrices(network, weight_mode)
+        # 隣接行列を構築（weight_modeを渡す、分析キャッシュを共有）
+        matrices = to_dense_matrices(get_network_analysis(network, weight_mode)['matrices'])
         if matrices is None or 'B_PA' not in matrices:
             raise HTTPException(status_code=400, detail="Failed to build adjacency matrices")
 
@@ -1273,19 +1334,46 @@ def compute_node_shapley_for_pair(
         if perf_i_idx is None or perf_j_idx is None:
             raise HTTPException(status_code=404, detail=f"Performance not found: i={perf_i_id}, j={perf_j_id}")
 
-        # ノードShapley値を計算
-        result = compute_node_shapley_for_performance_pair(
-            network=network,
-            matrices=matrices,
-            perf_i=perf_i_idx,
-            perf_j=perf_j_idx,
-            method=method
-        )
+        # 保存済みの結果（ネットワーク内容・weight_mode・パラメータが同じ場合）
+        network_hash = network_fingerprint(network, weight_mode)
+        store_params = {
+            'perf_i': perf_i_idx, 'perf_j': perf_j_idx, 'method': method,
+            'tolerance': tolerance, 'time_budget_ms': time_budget_ms,
+            'sampling': sampling, 'grouping': grouping,
+        }
+        if not refresh:
+            stored = get_stored_result(db, network_hash, 'node', store_params)
+            if stored is not None:
+                return stored
+
+        # ノードShapley値を計算（grouping 指定時は Owen値）
+        if grouping is not None:
+            result = compute_node_owen_for_performance_pair(
+                network=network,
+                matrices=matrices,
+                perf_i=perf_i_idx,
+                perf_j=perf_j_idx,
+                grouping=grouping,
+                method=method
+            )
+        else:
+            result = compute_node_shapley_for_performance_pair(
+                network=network,
+                matrices=matrices,
+                perf_i=perf_i_idx,
+                perf_j=perf_j_idx,
+                method=method,
+                tolerance=tolerance,
+                time_budget_ms=time_budget_ms,
+                sampling=sampling
+            )
 
         # ノード情報を取得（レスポンス変換用）
         node_infos = extract_node_info(network, matrices)
 
-        return node_shapley_result_to_dict(result, node_infos, perf_labels)
+        response = node_shapley_result_to_dict(result, node_infos, perf_labels)
+        store_result(db, network_hash, 'node', store_params, response, case_id=case_id)
+        return response
 
     except HTTPException:
         raise
@@ -1303,6 +1391,10 @@ def compute_edge_shapley_for_pair(
     perf_i_id: str,
     perf_j_id: str,
     method: str = "auto",
+    tolerance: Optional[float] = None,
+    time_budget_ms: Optional[float] = None,
+    sampling: str = "antithetic",
+    refresh: bool = False,
     db: Session = Depends(get_db)
 ):
     """
@@ -1317,7 +1409,12 @@ def compute_edge_shapley_for_pair(
         case_id: 設計案ID
         perf_i_id: 性能iのID
         perf_j_id: 性能jのID
-        method: 'exact', 'monte_carlo', 'auto'
+        method: 'path', 'exact', 'monte_carlo', 'adaptive', 'kernel'（KernelSHAP）, 'auto'
+        tolerance: 'adaptive' の標準誤差の許容値（C_ij と同じ単位）
+        time_budget_ms: 'adaptive' の時間予算（ミリ秒）。'adaptive' では tolerance か
+            time_budget_ms の少なくとも一方が必要
+        sampling: 'adaptive' のサンプリング方式（'random' / 'antithetic' / 'stratified'）
+        refresh: True なら保存済みの結果を使わず再計算する
 
     Returns:
         {
@@ -1335,17 +1432,32 @@ def compute_edge_shapley_for_pair(
             ],
             'sum_check': float,
             'additivity_error': float,
-            'computation': {'method': str, 'n_edges': int, 'time_ms': float}
+            'computation': {'method': str, 'n_edges': int, 'time_ms': float,
+                            'n_samples', 'stop_reason', 'max_std_error', 'confidence_level'（adaptive / kernel のみ）,
+                            'pruning': {'n_players', 'n_null_players', 'n_core_players',
+                                        'n_symmetry_classes', 'n_symmetric_players',
+                                        'table_size', 'null_pruning'}（path 以外）}
         }
+        adaptive / kernel の場合、各値に 'std_error', 'ci_lower', 'ci_upper' が付く
+        同じネットワーク・パラメータの結果は shapley_results テーブルに保存し、次回はそれを返す
     """
     from app.models.database import DesignCaseModel
-    from app.services.matrix_utils import build_adjacency_matrices
+    from app.services.analysis_cache import get_network_analysis, network_fingerprint
+    from app.services.matrix_utils import to_dense_matrices
+    from app.services.shapley_subset_table import SAMPLING_SCHEMES
+    from app.services.shapley_store import get_stored_result, store_result
     from app.services.shapley_calculator import (
         compute_edge_shapley_for_performance_pair,
         edge_shapley_result_to_dict,
         extract_edge_info
     )
 
+    if sampling not in SAMPLING_SCHEMES:
+        raise HTTPException(status_code=400, detail=f"Invalid sampling: {sampling}")
+    if method == "adaptive" and tolerance is None and time_budget_ms is None:
+        # 停止条件がないと ADAPTIVE_MAX_SAMPLES 個の順列まで回り続ける
+        raise HTTPException(status_code=400, detail="Method adaptive requires tolerance or time_budget_ms")
+
     # 設計案を取得
     design_case = db.query(DesignCaseModel).filter(
         DesignCaseModel.id == case_id,
@@ -1363,8 +1475,8 @@ def compute_edge_shapley_for_pair(
         # 設計案のweight_modeを取得（デフォルトは'discrete_7'）
         weight_mode = getattr(design_case, 'weight_mode', 'discrete_7') or 'discrete_7'
 
-        # 隣接行列を構築（weight_modeを渡す）
-        matrices = build_adjacency_matrices(network, weight_mode)
+        # 隣接行列を構築（weight_modeを渡す、分析キャッシュを共有）
+        matrices = to_dense_matrices(get_network_analysis(network, weight_mode)['matrices'])
         if matrices is None or 'B_PA' not in matrices:
             raise HTTPException(status_code=400, detail="Failed to build adjacency matrices")
 
@@ -1390,8 +1502,16 @@ def compute_edge_shapley_for_pair(
         if perf_i_idx is None or perf_j_idx is None:
             raise HTTPException(status_code=404, detail=f"Performance not found: i={perf_i_id}, j={perf_j_id}")
 
-        # weight_mode を取得
-        weight_mode = getattr(design_case, 'weight_mode', 'discrete_7') or 'discrete_7'
+        # 保存済みの結果（ネットワーク内容・weight_mode・パラメータが同じ場合）
+        network_hash = network_fingerprint(network, weight_mode)
+        store_params = {
+            'perf_i': perf_i_idx, 'perf_j': perf_j_idx, 'method': method,
+            'tolerance': tolerance, 'time_budget_ms': time_budget_ms, 'sampling': sampling,
+        }
+        if not refresh:
+            stored = get_stored_result(db, network_hash, 'edge', store_params)
+            if stored is not None:
+                return stored
 
         # エッジShapley値を計算
         result = compute_edge_shapley_for_performance_pair(
@@ -1400,13 +1520,18 @@ def compute_edge_shapley_for_pair(
             perf_i=perf_i_idx,
             perf_j=perf_j_idx,
             weight_mode=weight_mode,
-            method=method
+            method=method,
+            tolerance=tolerance,
+            time_budget_ms=time_budget_ms,
+            sampling=sampling
         )
 
         # エッジ情報を取得（レスポンス変換用）
         edge_infos = extract_edge_info(network, matrices, weight_mode)
 
-        return edge_shapley_result_to_dict(result, edge_infos, perf_labels)
+        response = edge_shapley_result_to_dict(result, edge_infos, perf_labels)
+        store_result(db, network_hash, 'edge', store_params, response, case_id=case_id)
+        return response
 
     except HTTPException:
         raise
@@ -1415,6 +1540,148 @@ def compute_edge_shapley_for_pair(
         raise HTTPException(status_code=500, detail=f"Edge Shapley calculation error: {str(e)}")
 
 
+# ========== ノードペアのShapley相互作用指数 API ==========
+
+@router.get("/node-interaction/{project_id}/{case_id}/{perf_i_id}/{perf_j_id}")
+def compute_node_interaction_for_pair(
+    project_id: str,
+    case_id: str,
+    perf_i_id: str,
+    perf_j_id: str,
+    method: str = "auto",
+    n_samples: Optional[int] = None,
+    top_k: int = 20,
+    refresh: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    指定した性能ペアに対する全ノードペアのShapley相互作用指数を計算
+
+    I_kl = Σ_{S ⊆ N\\{k,l}} [s!(n-s-2)!/(n-1)!] × [C_ij(S∪{k,l}) - C_ij(S∪{k}) - C_ij(S∪{l}) + C_ij(S)]
+    - 各提携の C_ij を1回ずつ評価し、全ノードペアの I_kl をその同じ評価から求める
+    - I_kl > 0: k と l が揃うと C_ij が増える（補完的）、I_kl < 0: 代替的
+
+    Args:
+        project_id: プロジェクトID
+        case_id: 設計案ID
+        perf_i_id: 性能iのID
+        perf_j_id: 性能jのID
+        method: 'exact', 'sampled', 'auto'（ナルプレイヤー除去後が小規模なら厳密計算）
+        n_samples: 'sampled' で評価する提携数
+        top_k: 絶対値の大きい順に返すノードペア数
+        refresh: True なら保存済みの結果を使わず再計算する
+
+    Returns:
+        {
+            'perf_i': {'idx': int, 'name': str},
+            'perf_j': {'idx': int, 'name': str},
+            'C_ij': float,
+            'cos_theta': float,
+            'relationship': 'tradeoff' | 'synergy' | 'neutral',
+            'nodes': [{'node_id', 'node_label', 'node_type', 'layer'}],
+            'interaction_matrix': [[float]],   # nodes の順、対称で対角は0
+            'top_interactions': [
+                {'node_a': {...}, 'node_b': {...}, 'interaction': float, 'abs_interaction': float,
+                 'sign': 'complementary' | 'substitutive'}
+            ],
+            'computation': {'method', 'n_nodes', 'time_ms', 'n_players', 'n_core_players',
+                            'n_null_players', 'null_pruning', 'n_samples'}
+        }
+        sampled の場合、top_interactions の各値に 'std_error', 'ci_lower', 'ci_upper' が付く
+        同じネットワーク・パラメータの結果は shapley_results テーブルに保存し、次回はそれを返す
+    """
+    from app.models.database import DesignCaseModel
+    from app.services.analysis_cache import get_network_analysis, network_fingerprint
+    from app.services.matrix_utils import to_dense_matrices
+    from app.services.shapley_store import get_stored_result, store_result
+    from app.services.shapley_calculator import (
+        compute_node_interactions_for_performance_pair,
+        node_interaction_result_to_dict,
+        extract_node_info
+    )
+
+    if method not in ("auto", "exact", "sampled"):
+        raise HTTPException(status_code=400, detail=f"Invalid method: {method}")
+    if n_samples is not None and n_samples <= 0:
+        raise HTTPException(status_code=400, detail="n_samples must be positive")
+    if top_k < 0:
+        raise HTTPException(status_code=400, detail="top_k must be non-negative")
+
+    # 設計案を取得
+    design_case = db.query(DesignCaseModel).filter(
+        DesignCaseModel.id == case_id,
+        DesignCaseModel.project_id == project_id
+    ).first()
+
+    if not design_case:
+        raise HTTPException(status_code=404, detail="Design case not found")
+
+    try:
+        network = design_case.network
+        if not network or not network.get('nodes'):
+            raise HTTPException(status_code=400, detail="No network data available")
+
+        weight_mode = getattr(design_case, 'weight_mode', 'discrete_7') or 'discrete_7'
+
+        # 隣接行列を構築（分析キャッシュを共有）
+        matrices = to_dense_matrices(get_network_analysis(network, weight_mode)['matrices'])
+        if matrices is None or 'B_PA' not in matrices:
+            raise HTTPException(status_code=400, detail="Failed to build adjacency matrices")
+
+        perf_node_ids = matrices['node_ids']['P']
+        perf_labels = matrices['node_labels']['P']
+        perf_id_map = matrices.get('performance_id_map', {})
+
+        # IDマッピング
+        perf_i_idx = None
+        perf_j_idx = None
+
+        for idx, node_id in enumerate(perf_node_ids):
+            if node_id == perf_i_id:
+                perf_i_idx = idx
+            if node_id == perf_j_id:
+                perf_j_idx = idx
+            db_id = perf_id_map.get(node_id)
+            if db_id == perf_i_id:
+                perf_i_idx = idx
+            if db_id == perf_j_id:
+                perf_j_idx = idx
+
+        if perf_i_idx is None or perf_j_idx is None:
+            raise HTTPException(status_code=404, detail=f"Performance not found: i={perf_i_id}, j={perf_j_id}")
+
+        # 保存済みの結果（ネットワーク内容・weight_mode・パラメータが同じ場合）
+        network_hash = network_fingerprint(network, weight_mode)
+        store_params = {
+            'perf_i': perf_i_idx, 'perf_j': perf_j_idx, 'method': method,
+            'n_samples': n_samples, 'top_k': top_k,
+        }
+        if not refresh:
+            stored = get_stored_result(db, network_hash, 'interaction', store_params)
+            if stored is not None:
+                return stored
+
+        result = compute_node_interactions_for_performance_pair(
+            network=network,
+            matrices=matrices,
+            perf_i=perf_i_idx,
+            perf_j=perf_j_idx,
+            method=method,
+            n_samples=n_samples
+        )
+        node_infos = extract_node_info(network, matrices)
+
+        response = node_interaction_result_to_dict(result, node_infos, perf_labels, top_k)
+        store_result(db, network_hash, 'interaction', store_params, response, case_id=case_id)
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Node interaction calculation error: {e}")
+        raise HTTPException(status_code=500, detail=f"Node interaction calculation error: {str(e)}")
+
+
 # ========== カップリング＆クラスタリング API ==========
 
 @router.get("/coupling/{project_id}/{case_id}")
@@ -1422,6 +1689,8 @@ def compute_coupling_and_clustering(
     project_id: str,
     case_id: str,
     tradeoff_threshold: float = 0.0,
+    refresh: bool = False,
+    time_budget_ms: Optional[float] = None,
     db: Session = Depends(get_db)
 ):
     """
@@ -1436,6 +1705,9 @@ def compute_coupling_and_clustering(
         project_id: プロジェクトID
         case_id: 設計案ID
         tradeoff_threshold: トレードオフと見なす cos θ の閾値 (default: 0.0)
+        refresh: True なら保存済みの結果を使わず再計算する
+        time_budget_ms: ノードShapley値の計算期限（ミリ秒）。超えた場合は完了した
+            トレードオフペアだけでカップリングを計算する（結果は保存しない）
 
     Returns:
         {
@@ -1451,19 +1723,27 @@ def compute_coupling_and_clustering(
                 'silhouette_score': float,
                 'cluster_groups': {...}
             },
-            'dendrogram': {...}
+            'dendrogram': {...},
+            'shapley_schedule': {'n_pairs', 'n_completed', 'n_workers', 'n_chunks', 'timed_out', 'elapsed_ms'}
         }
+        同じネットワーク・閾値の結果は shapley_results テーブルに保存し、次回はそれを返す
     """
     from app.models.database import DesignCaseModel
-    from app.services.matrix_utils import build_adjacency_matrices, compute_total_effect_matrix
+    from app.services.analysis_cache import get_network_analysis, network_fingerprint
+    from app.services.shapley_store import get_stored_result, store_result
+    from app.services.matrix_utils import to_dense_matrices
     from app.services.coupling_calculator import (
         compute_coupling_for_case,
         coupling_result_to_dict,
         TradeoffInfo
     )
-    from app.services.shapley_calculator import compute_node_shapley_for_performance_pair
+    from app.services.shapley_calculator import compute_node_shapley_all_pairs
+    from app.services.shapley_parallel import PairScheduleStats
     import numpy as np
 
+    if time_budget_ms is not None and time_budget_ms < 0:
+        raise HTTPException(status_code=400, detail="time_budget_ms must be non-negative")
+
     # 設計案を取得
     design_case = db.query(DesignCaseModel).filter(
         DesignCaseModel.id == case_id,
@@ -1481,19 +1761,25 @@ def compute_coupling_and_clustering(
         # weight_mode取得
         weight_mode = getattr(design_case, 'weight_mode', 'discrete_7') or 'discrete_7'
 
-        # 隣接行列を構築
-        matrices = build_adjacency_matrices(network, weight_mode)
+        # 保存済みの結果（ネットワーク内容・weight_mode・閾値が同じ場合）
+        network_hash = network_fingerprint(network, weight_mode)
+        store_params = {'tradeoff_threshold': tradeoff_threshold}
+        if not refresh:
+            stored = get_stored_result(db, network_hash, 'coupling', store_params)
+            if stored is not None:
+                return stored
+
+        # 隣接行列・総効果行列（分析キャッシュを共有）
+        analysis = get_network_analysis(network, weight_mode)
+        matrices = to_dense_matrices(analysis['matrices'])
         if matrices is None or 'B_PA' not in matrices:
             raise HTTPException(status_code=400, detail="Failed to build adjacency matrices")
 
         perf_labels = matrices['node_labels']['P']
         n_perfs = len(perf_labels)
 
-        # 総効果行列と cos θ 行列を計算
-        T_result = compute_total_effect_matrix(
-            matrices['B_PA'], matrices['B_AA'], matrices['B_AV']
-        )
-        T = T_result['T']
+        # cos θ 行列を計算
+        T = analysis['total_effect']['T']
 
         # cos θ と内積行列を計算
         cos_theta_matrix = np.zeros((n_perfs, n_perfs))
@@ -1510,26 +1796,37 @@ def compute_coupling_and_clustering(
                     if norms[i] > 1e-10 and norms[j] > 1e-10:
                         cos_theta_matrix[i][j] = inner_product_matrix[i][j] / (norms[i] * norms[j])
 
-        # ノードShapley計算関数を定義
+        # トレードオフペアのノードShapley値を計算
+        # （ペアのチャンクを全コアに分散し、チャンク内では提携ごとの求解を共有）
+        tradeoff_pairs = [
+            (i, j) for i in range(n_perfs) for j in range(i + 1, n_perfs)
+            if cos_theta_matrix[i][j] < tradeoff_threshold
+        ]
+        schedule = PairScheduleStats(n_pairs=len(tradeoff_pairs))
+        shapley_failed = False
+        try:
+            node_shapley_results = compute_node_shapley_all_pairs(
+                network=network,
+                matrices=matrices,
+                pairs=tradeoff_pairs,
+                n_workers=None,
+                time_budget_ms=time_budget_ms,
+                schedule=schedule
+            )
+        except Exception as e:
+            logger.warning(f"Node Shapley calculation failed: {e}")
+            node_shapley_results = {}
+            shapley_failed = True
+
         def node_shapley_func(perf_i: int, perf_j: int) -> Dict:
-            try:
-                result = compute_node_shapley_for_performance_pair(
-                    network=network,
-                    matrices=matrices,
-                    perf_i=perf_i,
-                    perf_j=perf_j,
-                    method='monte_carlo'  # 高速化のためモンテカルロ
-                )
-                # NodeShapleyResult から寄与ベクトルを抽出
-                # node_shapley_values は Dict[str, float] (node_id -> phi)
-                if result and hasattr(result, 'node_shapley_values') and result.node_shapley_values:
-                    # 順序を維持してベクトル化（値のみを抽出）
-                    shapley_vector = np.array(list(result.node_shapley_values.values()))
-                    return {'shapley_vector': shapley_vector}
-                return None
-            except Exception as e:
-                logger.warning(f"Node Shapley calculation failed for ({perf_i}, {perf_j}): {e}")
-                return None
+            result = node_shapley_results.get((perf_i, perf_j))
+            # NodeShapleyResult から寄与ベクトルを抽出
+            # node_shapley_values は Dict[str, float] (node_id -> phi)
+            if result and result.node_shapley_values:
+                # 順序を維持してベクトル化（値のみを抽出）
+                shapley_vector = np.array(list(result.node_shapley_values.values()))
+                return {'shapley_vector': shapley_vector}
+            return None
 
         # カップリングとクラスタリングを計算
         coupling_result = compute_coupling_for_case(
@@ -1542,10 +1839,43 @@ def compute_coupling_and_clustering(
             tradeoff_threshold=tradeoff_threshold
         )
 
-        return coupling_result_to_dict(coupling_result)
+        response = coupling_result_to_dict(coupling_result)
+        response['shapley_schedule'] = schedule.to_dict()
+        # 期限で打ち切った・Shapley値の計算に失敗した部分的な結果は保存しない
+        if not schedule.timed_out and not shapley_failed:
+            store_result(db, network_hash, 'coupling', store_params, response, case_id=case_id)
+        return response
 
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Coupling calculation error: {e}")
         raise HTTPException(status_code=500, detail=f"Coupling calculation error: {str(e)}")
+
+
+# ========== 分析キャッシュ API ==========
+
+@router.get("/analysis-cache/stats")
+def get_analysis_cache_statistics():
+    """
+    構造分析キャッシュの統計を取得
+
+    Returns:
+        {'entries', 'bytes', 'max_entries', 'max_bytes', 'hits', 'misses', 'evictions', 'hit_rate'}
+    """
+    from app.services.analysis_cache import get_analysis_cache_stats
+
+    return get_analysis_cache_stats()
+
+
+@router.get("/shapley-store/stats")
+def get_shapley_store_statistics(db: Session = Depends(get_db)):
+    """
+    Shapley値・カップリング計算結果の永続ストアの統計を取得
+
+    Returns:
+        {'entries', 'bytes', 'max_entries', 'max_bytes', 'by_kind'}
+    """
+    from app.services.shapley_store import get_shapley_store_stats
+
+    return get_shapley_store_stats(db)
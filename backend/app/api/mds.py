@@ -1,17 +1,30 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Literal
 import numpy as np
 from scipy.linalg import eigh
 from scipy.optimize import minimize
-from concurrent.futures import ProcessPoolExecutor
-import multiprocessing
+import time
+from collections import deque
 
 # Weighted WLカーネルのインポート
 from app.services.weighted_wl_kernel import (
+    DEFAULT_RFF_COMPONENTS,
+    MAX_RFF_COMPONENTS,
     compute_weighted_wl_kernel,
     kernel_to_distance as weighted_kernel_to_distance,
 )
+from app.services.worker_pool import (
+    SharedArrays,
+    cancel_and_wait,
+    get_worker_pool,
+    resolve_workers,
+    submit_shared,
+)
+from app.services.wl_kernel import (
+    compute_classic_wl_kernel,
+    kernel_to_distance as classic_kernel_to_distance,
+)
 
 router = APIRouter()
 
@@ -25,6 +38,9 @@ class NetworkComparisonRequest(BaseModel):
     # Phase 2拡張: カーネルタイプ選択
     kernel_type: Literal['classic_wl', 'weighted_wl'] = 'classic_wl'
     weight_mode: Literal['discrete', 'continuous'] = 'continuous'  # weighted_wl用
+    # weighted_wl の近似モード（ランダムフーリエ特徴、大量の設計案向け）
+    approximate: bool = False
+    n_components: int = Field(DEFAULT_RFF_COMPONENTS, gt=0, le=MAX_RFF_COMPONENTS)
 
 class NetworkComparisonResponse(BaseModel):
     success: bool
@@ -38,42 +54,60 @@ class NetworkComparisonResponse(BaseModel):
     stress: float
     circular_stress: float
     comparison: Optional[dict] = None
+    kernel_approximation: Optional[dict] = None  # 近似モードの誤差（サンプルでの厳密値との比較）
 
 # ===== 並列化用のヘルパー関数（トップレベル関数として定義） =====
 
+def circular_stress_with_gradient(thetas: np.ndarray, D_normalized: np.ndarray) -> tuple:
+    """円環ストレス Σ_{i<j} (D_ij − d_circ(θ_i, θ_j))² とその勾配
+
+    Δθ を [−π, π) に折り返すと円環距離は |Δθ|、その微分は sign(Δθ) になる
+    （区分線形）。minimize(..., jac=True) にそのまま渡せる。
+
+    Args:
+        thetas: 角度 (n,)
+        D_normalized: [0, π] に正規化した距離行列 (n × n)
+
+    Returns:
+        (stress, gradient) のタプル
+    """
+    delta = np.subtract.outer(thetas, thetas)
+    wrapped = (delta + np.pi) % (2 * np.pi) - np.pi
+    residual = D_normalized - np.abs(wrapped)
+    np.fill_diagonal(residual, 0.0)
+
+    stress = 0.5 * np.sum(residual ** 2)
+    gradient = -2.0 * np.sum(residual * np.sign(wrapped), axis=1)
+    return stress, gradient
+
 def _optimize_single_trial(args):
     """単一の最適化試行（並列実行用）
     
     Args:
-        args: (D_normalized, n, seed) のタプル
+        args: (D_normalized, n, seed) または (D_normalized, n, seed, theta0) のタプル
+              theta0 を指定した場合はそこから開始（Noneならランダム初期化）
     
     Returns:
         (stress, thetas) のタプル
     """
-    D_normalized, n, seed = args
+    D_normalized, n, seed = args[:3]
+    theta0 = args[3] if len(args) > 3 else None
     
     # 各ワーカーで乱数シードを設定
     np.random.seed(seed)
     
-    def circular_distance(theta_i: float, theta_j: float) -> float:
-        diff = abs(theta_i - theta_j)
-        return min(diff, 2*np.pi - diff)
-    
-    def stress_function(thetas):
-        total = 0
-        for i in range(n):
-            for j in range(i+1, n):
-                circ_dist = circular_distance(thetas[i], thetas[j])
-                total += (D_normalized[i,j] - circ_dist)**2
-        return total
-    
     # ランダム初期化
-    theta0 = np.random.uniform(0, 2*np.pi, n)
+    if theta0 is None:
+        theta0 = np.random.uniform(0, 2*np.pi, n)
+    else:
+        theta0 = np.mod(np.asarray(theta0, dtype=float), 2*np.pi)
     
-    # 最適化
+    # 最適化（ストレスと解析的な勾配を同時に返す）
     result = minimize(
-        stress_function,
+        circular_stress_with_gradient,
         theta0,
+        args=(D_normalized,),
+        jac=True,
         method='L-BFGS-B',
         bounds=[(0, 2*np.pi)]*n,
         options={'maxiter': 1000}
@@ -81,6 +115,11 @@ def _optimize_single_trial(args):
     
     return (result.fun, result.x)
 
+def _optimize_shared_trial(arrays, seed, theta0):
+    """共有メモリ上の距離行列での最適化試行（共有プールのタスク）"""
+    D_normalized = arrays['D']
+    return _optimize_single_trial((D_normalized, len(D_normalized), seed, theta0))
+
 # ===== 内部計算関数 =====
 
 def classical_mds(distance_matrix: List[List[float]], n_components: int = 2) -> dict:
@@ -141,13 +180,34 @@ def classical_mds(distance_matrix: List[List[float]], n_components: int = 2) ->
         'stress': float(stress)
     }
 
-def circular_mds_parallel(distance_matrix: np.ndarray, n_init: int = 50, n_workers: int = None) -> tuple:
+def classical_mds_angles(distance_matrix: np.ndarray) -> np.ndarray:
+    """古典的MDSの2次元座標の偏角（円環MDSの初期値用）"""
+    coords = np.array(classical_mds(np.asarray(distance_matrix).tolist(), 2)['coordinates'])
+    return np.mod(np.arctan2(coords[:, 1], coords[:, 0]), 2*np.pi)
+
+def circular_mds_parallel(
+    distance_matrix: np.ndarray,
+    n_init: int = 50,
+    n_workers: int = None,
+    initial_thetas: Optional[List[np.ndarray]] = None,
+    patience: Optional[int] = None,
+    time_budget_ms: Optional[float] = None,
+    info: Optional[dict] = None
+) -> tuple:
     """距離行列から直接円環座標を計算（並列版Circular MDS）
 
+    initial_thetas（古典的MDSの偏角・前回の角度など）から先に最適化し、残りはランダム初期化。
+    試行は共有プロセスプールに先行投入して投入順に評価し、最良ストレスが patience 回連続で
+    改善しないか time_budget_ms を超えたら残りの試行を打ち切る（どちらも None なら n_init 回すべて実行）。
+
     Args:
         distance_matrix: 距離行列
-        n_init: 初期値試行回数
-        n_workers: 並列ワーカー数（Noneで自動：CPU数）
+        n_init: 初期値試行回数（initial_thetas を含む上限）
+        n_workers: 並列ワーカー数（Noneで共有プールの設定値）
+        initial_thetas: 初期角度のリスト（各 (n,)）
+        patience: 改善なしで打ち切る連続試行数
+        time_budget_ms: 時間の上限（ミリ秒）
+        info: 実行情報 {'n_restarts', 'n_seeded', 'stop_reason'} の書き込み先
 
     Returns:
         (thetas, normalized_stress) のタプル
@@ -157,6 +217,8 @@ def circular_mds_parallel(distance_matrix: np.ndarray, n_init: int = 50, n_worke
 
     # 1件以下の場合は早期リターン
     if n <= 1:
+        if info is not None:
+            info.update(n_restarts=0, n_seeded=0, stop_reason='trivial')
         return np.array([0.0] * n), 0.0
 
     # 距離を[0, π]の範囲に正規化
@@ -168,30 +230,160 @@ def circular_mds_parallel(distance_matrix: np.ndarray, n_init: int = 50, n_worke
     
     # ワーカー数の決定
     if n_workers is None:
-        n_workers = min(multiprocessing.cpu_count(), n_init)
-    
-    # 並列実行の準備（各試行に異なるシードを割り当て）
-    args_list = [(D_normalized, n, seed) for seed in range(n_init)]
-    
-    # 並列実行
-    with ProcessPoolExecutor(max_workers=n_workers) as executor:
-        results = list(executor.map(_optimize_single_trial, args_list))
+        n_workers = min(resolve_workers(None), n_init)
+    n_workers = max(1, n_workers)
+    
+    # 試行の準備（初期角度を指定した試行を先に、各試行に異なるシードを割り当て）
+    seeded = [np.asarray(theta, dtype=float) for theta in (initial_thetas or [])][:n_init]
+    trials = [(seed, theta) for seed, theta in enumerate(seeded)]
+    trials += [(seed, None) for seed in range(len(seeded), n_init)]
+    
+    start_time = time.time()
+    best_stress, best_thetas = float('inf'), None
+    n_restarts = 0
+    since_improvement = 0
+    stop_reason = 'max_restarts'
+    
+    def run_trials(results):
+        nonlocal best_stress, best_thetas, n_restarts, since_improvement, stop_reason
+        # 結果は投入順に評価する（ワーカー数によらず同じ打ち切り判定）
+        for trial_stress, trial_thetas in results:
+            n_restarts += 1
+            if best_thetas is None or trial_stress < best_stress - 1e-12 * max(1.0, best_stress):
+                best_stress, best_thetas = trial_stress, trial_thetas
+                since_improvement = 0
+            else:
+                since_improvement += 1
+            if patience is not None and since_improvement >= patience:
+                stop_reason = 'converged'
+                return
+            # 時間の上限はワーカー数ぶんの試行ごとに判定
+            if n_restarts % n_workers == 0 and time_budget_ms is not None \
+                    and (time.time() - start_time) * 1000 >= time_budget_ms:
+                stop_reason = 'time_budget'
+                return
+    
+    if n_workers == 1:
+        run_trials(
+            _optimize_single_trial((D_normalized, n, seed, theta)) for seed, theta in trials
+        )
+    else:
+        # 正規化した距離行列はジョブごとに1回だけ共有メモリに置き、
+        # 各試行にはシードと初期角度だけを渡す
+        get_worker_pool(n_workers)
+        with SharedArrays({'D': D_normalized}) as shared:
+            # ワーカーを遊ばせないよう 2×ワーカー数 の試行を先行して投入し、
+            # 打ち切ったら未着手の試行を取り消して実行中の試行の終了を待つ
+            # （共有メモリの削除後にワーカーがアタッチしないように）
+            futures = deque()
+            remaining = iter(trials)
+
+            def submit_next():
+                trial = next(remaining, None)
+                if trial is not None:
+                    futures.append(submit_shared(_optimize_shared_trial, shared.spec, *trial))
+
+            def results():
+                while futures:
+                    result = futures.popleft().result()
+                    submit_next()
+                    yield result
+
+            for _ in range(2 * n_workers):
+                submit_next()
+            try:
+                run_trials(results())
+            finally:
+                cancel_and_wait(futures)
     
-    # 最良の結果を選択
-    best_stress, best_thetas = min(results, key=lambda x: x[0])
+    if info is not None:
+        info.update(n_restarts=n_restarts, n_seeded=len(seeded), stop_reason=stop_reason)
     
     # ストレスを正規化
     normalized_stress = np.sqrt(best_stress / (n * (n-1) / 2))
     
     return best_thetas, normalized_stress
 
+def incremental_circular_mds(
+    distance_matrix: np.ndarray,
+    initial_thetas: np.ndarray,
+    free: List[int],
+    grid_size: int = 360,
+    refine_iterations: int = 10
+) -> tuple:
+    """既存の角度を初期値に、新規・変更された案だけを配置し直す（差分版Circular MDS）
+
+    1. free の案を1件ずつ、配置済みの案とのストレスが最小になる角度にグリッド探索で置く
+    2. free の案の角度だけを L-BFGS-B で最適化（他の案は固定）
+    3. 全案の角度を初期値から refine_iterations 回まで局所的に最適化
+    多初期値の探索をしないので、既存の案の角度はほとんど動かない。
+
+    Args:
+        distance_matrix: 距離行列
+        initial_thetas: 既存の案の角度 (n,)（free の案の値は使わない）
+        free: 配置し直す案のインデックス
+        grid_size: グリッド探索の角度の分割数
+        refine_iterations: 全案の局所最適化の反復回数の上限（0で既存の案を動かさない）
+
+    Returns:
+        (thetas, normalized_stress) のタプル
+    """
+    D = np.array(distance_matrix)
+    n = len(D)
+    if n <= 1:
+        return np.array([0.0] * n), 0.0
+
+    # 距離を[0, π]の範囲に正規化
+    max_dist = np.max(D)
+    D_normalized = (D / max_dist) * np.pi if max_dist > 0 else D
+
+    thetas = np.mod(np.asarray(initial_thetas, dtype=float), 2*np.pi)
+    free = sorted(set(int(k) for k in free))
+    placed = np.ones(n, dtype=bool)
+    placed[free] = False
+
+    # 1. グリッド探索で1件ずつ配置
+    candidates = np.linspace(0, 2*np.pi, grid_size, endpoint=False)
+    for k in free:
+        if placed.any():
+            diff = np.abs(candidates[:, None] - thetas[placed][None, :]) % (2*np.pi)
+            residual = D_normalized[k, placed][None, :] - np.minimum(diff, 2*np.pi - diff)
+            thetas[k] = candidates[np.argmin(np.sum(residual ** 2, axis=1))]
+        placed[k] = True
+
+    # 2. free の案だけを最適化
+    if free:
+        def free_stress(x):
+            trial = thetas.copy()
+            trial[free] = x
+            stress, gradient = circular_stress_with_gradient(trial, D_normalized)
+            return stress, gradient[free]
+
+        result = minimize(free_stress, thetas[free], jac=True, method='L-BFGS-B')
+        thetas[free] = result.x
+
+    # 3. 全案の局所的な最適化（周期関数なので範囲の制約は付けない）
+    if refine_iterations > 0:
+        result = minimize(
+            circular_stress_with_gradient,
+            thetas,
+            args=(D_normalized,),
+            jac=True,
+            method='L-BFGS-B',
+            options={'maxiter': refine_iterations}
+        )
+        thetas = result.x
+    thetas = np.mod(thetas, 2*np.pi)
+    stress, _ = circular_stress_with_gradient(thetas, D_normalized)
+
+    # ストレスを正規化
+    normalized_stress = np.sqrt(stress / (n * (n-1) / 2))
+
+    return thetas, normalized_stress
+
 def circular_mds_sequential(distance_matrix: np.ndarray, n_init: int = 50) -> tuple:
     """距離行列から直接円環座標を計算（逐次版Circular MDS）"""
 
-    def circular_distance(theta_i: float, theta_j: float) -> float:
-        diff = abs(theta_i - theta_j)
-        return min(diff, 2*np.pi - diff)
-
     D = np.array(distance_matrix)
     n = len(D)
 
@@ -206,14 +398,6 @@ def circular_mds_sequential(distance_matrix: np.ndarray, n_init: int = 50) -> tu
     else:
         D_normalized = D
     
-    def stress_function(thetas):
-        total = 0
-        for i in range(n):
-            for j in range(i+1, n):
-                circ_dist = circular_distance(thetas[i], thetas[j])
-                total += (D_normalized[i,j] - circ_dist)**2
-        return total
-    
     # 複数の初期値で最適化
     best_result = None
     best_stress = float('inf')
@@ -222,8 +406,10 @@ def circular_mds_sequential(distance_matrix: np.ndarray, n_init: int = 50) -> tu
         theta0 = np.random.uniform(0, 2*np.pi, n)
         
         result = minimize(
-            stress_function,
+            circular_stress_with_gradient,
             theta0,
+            args=(D_normalized,),
+            jac=True,
             method='L-BFGS-B',
             bounds=[(0, 2*np.pi)]*n,
             options={'maxiter': 1000}
@@ -241,10 +427,6 @@ def circular_mds_sequential(distance_matrix: np.ndarray, n_init: int = 50) -> tu
 def compute_circular_stress(D: np.ndarray, thetas: np.ndarray) -> float:
     """円環距離でのストレス計算"""
     
-    def circular_distance(theta_i: float, theta_j: float) -> float:
-        diff = abs(theta_i - theta_j)
-        return min(diff, 2*np.pi - diff)
-    
     n = len(thetas)
     max_dist = np.max(D)
     if max_dist > 0:
@@ -252,119 +434,21 @@ def compute_circular_stress(D: np.ndarray, thetas: np.ndarray) -> float:
     else:
         D_normalized = D
     
-    stress = 0
-    for i in range(n):
-        for j in range(i+1, n):
-            circ_dist = circular_distance(thetas[i], thetas[j])
-            stress += (D_normalized[i,j] - circ_dist)**2
+    stress, _ = circular_stress_with_gradient(np.asarray(thetas, dtype=float), D_normalized)
     
     return np.sqrt(stress / (n * (n-1) / 2))
 
 def compute_wl_kernel(networks: List[dict], iterations: int) -> np.ndarray:
-    """Weisfeiler-Lehmanカーネル計算"""
-    n = len(networks)
-    kernel = np.zeros((n, n))
-    
-    # ラベル履歴を保存
-    label_histories = []
-    
-    # 初期ラベルの設定
-    for net in networks:
-        initial_labels = []
-        for node in net['nodes']:
-            in_degree = sum(1 for e in net['edges'] if e['target_id'] == node['id'])
-            out_degree = sum(1 for e in net['edges'] if e['source_id'] == node['id'])
-            degree = in_degree + out_degree
-            
-            label = f"L{node['layer']}-{node['type'][0].upper()}-D{degree}"
-            initial_labels.append(label)
-        
-        label_histories.append([initial_labels])
-    
-    # WL反復
-    for iter_num in range(iterations + 1):
-        if iter_num > 0:
-            for net_idx, net in enumerate(networks):
-                prev_labels = label_histories[net_idx][iter_num - 1]
-                new_labels = []
-                
-                for node_idx, node in enumerate(net['nodes']):
-                    neighbor_info = []
-                    
-                    for edge in net['edges']:
-                        if edge['source_id'] == node['id']:
-                            target_idx = next(i for i, n in enumerate(net['nodes']) if n['id'] == edge['target_id'])
-                            # weightがNoneや未定義の場合は0をデフォルト値として使用
-                            weight = edge.get('weight')
-                            if weight is None:
-                                weight = 0
-                            neighbor_info.append({
-                                'label': prev_labels[target_idx],
-                                'weight': weight
-                            })
-                        elif edge['target_id'] == node['id']:
-                            source_idx = next(i for i, n in enumerate(net['nodes']) if n['id'] == edge['source_id'])
-                            # weightがNoneや未定義の場合は0をデフォルト値として使用
-                            weight = edge.get('weight')
-                            if weight is None:
-                                weight = 0
-                            neighbor_info.append({
-                                'label': prev_labels[source_idx],
-                                'weight': weight
-                            })
-
-                    sorted_neighbors = sorted([
-                        f"{info['label']}@{round(info['weight'] * 100) / 100}"
-                        for info in neighbor_info
-                    ])
-                    new_label = f"{prev_labels[node_idx]}|[{','.join(sorted_neighbors)}]"
-                    new_labels.append(new_label)
-                
-                label_histories[net_idx].append(new_labels)
-        
-        # カーネル値の更新
-        for i in range(n):
-            for j in range(i, n):
-                labels_i = label_histories[i][iter_num]
-                labels_j = label_histories[j][iter_num]
-                
-                count_i = {}
-                count_j = {}
-                
-                for label in labels_i:
-                    count_i[label] = count_i.get(label, 0) + 1
-                for label in labels_j:
-                    count_j[label] = count_j.get(label, 0) + 1
-                
-                dot_product = sum(
-                    count_i[label] * count_j.get(label, 0)
-                    for label in count_i
-                )
-                
-                kernel[i, j] += dot_product
-                if i != j:
-                    kernel[j, i] += dot_product
-    
-    # 正規化
-    normalized_kernel = np.zeros((n, n))
-    for i in range(n):
-        for j in range(n):
-            if kernel[i, i] > 0 and kernel[j, j] > 0:
-                normalized_kernel[i, j] = kernel[i, j] / np.sqrt(kernel[i, i] * kernel[j, j])
-    
-    return normalized_kernel
+    """Weisfeiler-Lehmanカーネル計算
+
+    ラベルを整数IDに圧縮した疎なカウント行列 X から K = X Xᵀ を求めて正規化する
+    （実装は app.services.wl_kernel）。
+    """
+    return compute_classic_wl_kernel(networks, iterations)
 
 def kernel_to_distance(kernel: np.ndarray) -> np.ndarray:
     """カーネル行列から距離行列を計算"""
-    n = len(kernel)
-    distances = np.zeros((n, n))
-    
-    for i in range(n):
-        for j in range(n):
-            dist = np.sqrt(max(0, kernel[i, i] + kernel[j, j] - 2 * kernel[i, j]))
-            distances[i, j] = dist
-    
-    return distances
+    return classic_kernel_to_distance(kernel)
 
 # ===== APIエンドポイント =====
 
@@ -379,15 +463,24 @@ async def compute_network_comparison(request: NetworkComparisonRequest):
     weight_mode (weighted_wl用):
     - discrete: 5段階離散値 {-3, -1, 0, +1, +3}
     - continuous: 連続値 [-1, +1]
+
+    approximate (weighted_wl用): ランダムフーリエ特徴（n_components 次元）で近似し、
+    近似誤差を kernel_approximation に返す
     """
 
     try:
         # WLカーネル計算（kernel_typeで切り替え）
+        kernel_approximation = None
         if request.kernel_type == 'weighted_wl':
+            if request.approximate:
+                kernel_approximation = {}
             kernel_matrix = compute_weighted_wl_kernel(
                 request.networks,
                 iterations=request.iterations,
-                weight_mode=request.weight_mode
+                weight_mode=request.weight_mode,
+                approximate=request.approximate,
+                n_components=request.n_components,
+                diagnostics=kernel_approximation
             )
             distance_matrix = weighted_kernel_to_distance(kernel_matrix)
         else:
@@ -456,7 +549,8 @@ async def compute_network_comparison(request: NetworkComparisonRequest):
             circular_coordinates=circular_coords,
             stress=selected_result['stress'],
             circular_stress=selected_result['circular_stress'],
-            comparison=comparison_results if request.compare_methods else None
+            comparison=comparison_results if request.compare_methods else None,
+            kernel_approximation=kernel_approximation
         )
         
     except Exception as e:
@@ -979,6 +979,11 @@ def delete_design_case(
     
     db.delete(db_design_case)
     db.commit()
+
+    from app.services.matrix_session import invalidate_matrix_session
+    from app.services.shapley_store import invalidate_case_results
+    invalidate_matrix_session(case_id)
+    invalidate_case_results(db, case_id)
     
     # 削除後、残りの設計案の座標を再計算
     try:
@@ -1831,6 +1836,7 @@ def recalculate_mountains(
 
     Request body:
         networks: 各設計案のネットワーク情報（オプション）
+        layout_mode: 'incremental'（既定、変わった案だけ配置し直す）または 'global'
     """
     import time
     api_start = time.time()
@@ -1842,6 +1848,10 @@ def recalculate_mountains(
     if len(project.design_cases) == 0:
         return {"message": "No design cases to recalculate", "updated": 0}
 
+    layout_mode = (request_body or {}).get('layout_mode', 'incremental')
+    if layout_mode not in ('incremental', 'global'):
+        raise HTTPException(status_code=400, detail=f"Invalid layout_mode: {layout_mode}")
+
     try:
         from app.services.mountain_calculator import calculate_mountain_positions
 
@@ -1849,7 +1859,7 @@ def recalculate_mountains(
         networks = request_body.get('networks') if request_body else None
 
         calc_start = time.time()
-        result = calculate_mountain_positions(project, db, networks=networks)
+        result = calculate_mountain_positions(project, db, networks=networks, layout_mode=layout_mode)
         calc_time = (time.time() - calc_start) * 1000
 
         positions = result['positions']
@@ -1885,6 +1895,7 @@ def recalculate_mountains(
             "updated": updated_count,
             "H_max": H_max,
             "positions": serializable_positions,  # 追加: 更新されたposition情報
+            "layout": result.get('layout', {}),  # 角度の決め方（差分配置/全体最適化）
             "timings": {
                 "api_total_ms": round(api_total, 2),
                 "calculation_ms": round(calc_time, 2),
@@ -2288,6 +2299,10 @@ def delete_network_node(
     
     # 山の座標を再計算
     try:
+        # 行列セッションに編集差分を反映（エディタ操作間で (I - B_AA)^(-1) を保持）
+        from app.services.matrix_session import sync_matrix_session
+        sync_matrix_session(case_id, network_data, design_case.weight_mode)
+
         project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
         all_design_cases = db.query(DesignCaseModel).filter(
             DesignCaseModel.project_id == project_id
@@ -2369,6 +2384,10 @@ def delete_network_edge(
     
     # 山の座標を再計算
     try:
+        # 行列セッションに編集差分を反映（エディタ操作間で (I - B_AA)^(-1) を保持）
+        from app.services.matrix_session import sync_matrix_session
+        sync_matrix_session(case_id, network_data, design_case.weight_mode)
+
         project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
         all_design_cases = db.query(DesignCaseModel).filter(
             DesignCaseModel.project_id == project_id
@@ -2528,6 +2547,10 @@ def create_network_edge(
     
     # 山の座標を再計算（ネットワーク変更時）
     try:
+        # 行列セッションに編集差分を反映（エディタ操作間で (I - B_AA)^(-1) を保持）
+        from app.services.matrix_session import sync_matrix_session
+        sync_matrix_session(case_id, network_data, design_case.weight_mode)
+
         project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
         all_design_cases = db.query(DesignCaseModel).filter(
             DesignCaseModel.project_id == project_id
@@ -2616,6 +2639,10 @@ def update_network_edge(
     
     # 山の座標を再計算（エッジの重み変更時）
     try:
+        # 行列セッションに編集差分を反映（エディタ操作間で (I - B_AA)^(-1) を保持）
+        from app.services.matrix_session import sync_matrix_session
+        sync_matrix_session(case_id, network_data, design_case.weight_mode)
+
         project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
         all_design_cases = db.query(DesignCaseModel).filter(
             DesignCaseModel.project_id == project_id
@@ -6,6 +6,7 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from app.models.database import init_db
 from app.api import projects, calculations, mds
+from app.services.worker_pool import start_worker_pool, shutdown_worker_pool, worker_pool_status
 import os
 
 # 環境変数
@@ -57,9 +58,18 @@ async def startup_event():
     
     # データベーステーブル作成
     init_db()
+
+    # 計算用の共有プロセスプールを起動（WORKER_POOL_SIZE で大きさを指定）
+    start_worker_pool()
     print(f"🚀 Server started in {ENV_MODE} mode")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """停止時の処理"""
+    shutdown_worker_pool(wait=True)
+
+
 # ルーター登録
 app.include_router(projects.router, prefix="/api/projects", tags=["projects"])
 app.include_router(calculations.router, prefix="/api/calculations", tags=["calculations"])
@@ -79,4 +89,4 @@ async def root():
 @app.get("/health")
 async def health_check():
     """ヘルスチェック"""
-    return {"status": "ok", "mode": ENV_MODE}
+    return {"status": "ok", "mode": ENV_MODE, "worker_pool": worker_pool_status()}
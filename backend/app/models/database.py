@@ -185,6 +185,7 @@ class DesignCaseModel(Base):
     scc_analysis_json = Column(Text, nullable=True)  # SCC分解（ループ検出）結果
     kernel_type = Column(String(50), nullable=True, default='classic_wl')  # WLカーネルタイプ
     weight_mode = Column(String(20), nullable=True, default='discrete_7')  # エッジ重みモード
+    wl_features_json = Column(Text, nullable=True)  # WL特徴ベクトル（network_hash・反復回数つき）
 
     project = relationship('ProjectModel', back_populates='design_cases')
     
@@ -254,6 +255,31 @@ class DesignCaseModel(Base):
         import json
         return json.loads(self.scc_analysis_json) if self.scc_analysis_json else None
 
+    @property
+    def wl_features(self):
+        """wl_features_jsonをパース"""
+        import json
+        return json.loads(self.wl_features_json) if self.wl_features_json else None
+
+
+class ShapleyResultModel(Base):
+    """
+    Shapley値・カップリングの計算結果の永続キャッシュ（shapley_store）
+
+    キーはネットワーク内容のハッシュと計算パラメータから作るため、
+    network_json が変わった設計案の古い結果は参照されず、追い出し・無効化で削除される。
+    """
+    __tablename__ = 'shapley_results'
+
+    cache_key = Column(String(64), primary_key=True)  # (network_hash, 種類, パラメータ) の SHA-256
+    network_hash = Column(String(64), nullable=False, index=True)
+    case_id = Column(String, nullable=True, index=True)
+    kind = Column(String(20), nullable=False)  # 'node' / 'edge' / 'coupling' / 'interaction'
+    result_json = Column(Text, nullable=False)
+    size_bytes = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
+
 
 # テーブル作成
 def init_db():
@@ -286,6 +312,7 @@ def _auto_migrate():
             ('scc_analysis_json', 'TEXT'),
             ('kernel_type', "VARCHAR(50) DEFAULT 'classic_wl'"),
             ('weight_mode', "VARCHAR(20) DEFAULT 'discrete_7'"),
+            ('wl_features_json', 'TEXT'),
         ]
 
         with engine.connect() as conn:
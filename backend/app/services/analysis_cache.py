@@ -0,0 +1,268 @@
+# backend/app/services/analysis_cache.py
+"""
+構造分析結果のコンテンツアドレス型キャッシュ
+
+分析モーダルを開くと /paper-metrics, /structural-tradeoff, /energy, /coupling,
+/shapley*, /discretization-confidence, /scc が同じ設計案に対してそれぞれ
+network_json のパース・行列構築・T / C / cos θ の計算を繰り返す。
+(network, weight_mode) のハッシュをキーに analyze_network_structure の結果を保持し、
+構造計算を1回にまとめる。
+
+- キー: 正規化した network JSON と weight_mode の SHA-256（内容が同じなら設計案をまたいで共有）
+- 追い出し: LRU（エントリ数上限）+ 推定バイトサイズ上限
+- キャッシュ内の ndarray は読み取り専用。取得時は dict/list の構造のみ複製して返す
+"""
+
+import copy
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from .matrix_utils import analyze_network_structure
+
+
+# キャッシュの上限
+MAX_CACHE_ENTRIES = 256
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def network_fingerprint(network: Dict, weight_mode: str = 'discrete_7') -> str:
+    """
+    ネットワーク内容と重みモードのハッシュ
+
+    キー順序に依存しないよう sort_keys で正規化してからハッシュする。
+
+    Args:
+        network: ネットワーク構造 {'nodes': [...], 'edges': [...]}
+        weight_mode: 重みモード
+
+    Returns:
+        SHA-256 の16進文字列
+    """
+    canonical = json.dumps(network, sort_keys=True, separators=(',', ':'), default=str)
+    hasher = hashlib.sha256()
+    hasher.update((weight_mode or 'discrete_7').encode('utf-8'))
+    hasher.update(b'\0')
+    hasher.update(canonical.encode('utf-8'))
+    return hasher.hexdigest()
+
+
+class AnalysisCache:
+    """
+    LRU + バイトサイズ上限付きのスレッドセーフなキャッシュ
+
+    Attributes:
+        max_entries: 最大エントリ数
+        max_bytes: 推定バイトサイズの上限
+    """
+
+    def __init__(self, max_entries: int = MAX_CACHE_ENTRIES, max_bytes: int = MAX_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple, Tuple[Any, int]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """キャッシュから取得（なければ None）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return _thaw(entry[0])
+
+    def put(self, key: Tuple, value: Any) -> bool:
+        """
+        キャッシュに格納（配列は読み取り専用にする）
+
+        単体で上限を超える値は格納せず、配列も読み取り専用にしない。
+
+        Returns:
+            格納したかどうか
+        """
+        size = estimate_nbytes(value)
+        if size > self.max_bytes:
+            return False
+
+        frozen = _freeze(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[1]
+            self._entries[key] = (frozen, size)
+            self._total_bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self._evictions += 1
+        return True
+
+    def get_or_compute(self, key: Tuple, compute: Callable[[], Any]) -> Any:
+        """
+        キャッシュにあれば返し、なければ計算して格納
+
+        計算はロック外で行う（同一キーの同時計算は許容し、後勝ちで格納）。
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        value = compute()
+        if not self.put(key, value):
+            return value
+        return _thaw(value)
+
+    def clear(self):
+        """全エントリを破棄"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict:
+        """ヒット率などの統計"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_rate': self._hits / total if total > 0 else 0.0,
+            }
+
+
+# プロセス全体で共有するキャッシュ
+_analysis_cache = AnalysisCache()
+
+
+def get_network_analysis(network: Dict, weight_mode: str = 'discrete_7') -> Dict:
+    """
+    analyze_network_structure のキャッシュ付き版
+
+    Args:
+        network: ネットワーク構造
+        weight_mode: 重みモード
+
+    Returns:
+        analyze_network_structure と同じ形式の辞書
+        （ndarray は読み取り専用。変更する場合は .copy() すること）
+    """
+    weight_mode = weight_mode or 'discrete_7'
+    key = ('structure', network_fingerprint(network, weight_mode))
+    return _analysis_cache.get_or_compute(
+        key, lambda: analyze_network_structure(network, weight_mode)
+    )
+
+
+def get_cached_result(
+    kind: str,
+    network: Dict,
+    weight_mode: str,
+    compute: Callable[[], Any]
+) -> Any:
+    """
+    任意のネットワーク単位の分析結果をキャッシュ（SCC分解など）
+
+    Args:
+        kind: 結果の種類（キーの名前空間）
+        network: ネットワーク構造
+        weight_mode: 重みモード
+        compute: キャッシュミス時に呼ぶ関数
+
+    Returns:
+        compute() の結果（キャッシュ済みの場合はその複製）
+    """
+    key = (kind, network_fingerprint(network, weight_mode or 'discrete_7'))
+    return _analysis_cache.get_or_compute(key, compute)
+
+
+def get_analysis_cache_stats() -> Dict:
+    """キャッシュ統計を取得"""
+    return _analysis_cache.stats()
+
+
+def clear_analysis_cache():
+    """キャッシュを破棄"""
+    _analysis_cache.clear()
+
+
+# =============================================================================
+# 内部ユーティリティ
+# =============================================================================
+
+def estimate_nbytes(value: Any) -> int:
+    """
+    入れ子の dict/list/ndarray/疎行列の推定バイトサイズ
+
+    Args:
+        value: 対象の値
+
+    Returns:
+        推定バイト数
+    """
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if sp.issparse(value):
+        csr = value.tocsr()
+        return int(csr.data.nbytes + csr.indices.nbytes + csr.indptr.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_nbytes(k) + estimate_nbytes(v) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value)
+    if is_dataclass(value) and not isinstance(value, type):
+        return sys.getsizeof(value) + estimate_nbytes(vars(value))
+    return sys.getsizeof(value)
+
+
+def _freeze(value: Any) -> Any:
+    """
+    ndarray を読み取り専用にする（構造は共有）
+
+    疎行列は scipy 内部でインデックスのソート等をインプレースで行うため対象外
+    """
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _freeze(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            _freeze(v)
+    elif is_dataclass(value) and not isinstance(value, type):
+        for field in fields(value):
+            _freeze(getattr(value, field.name))
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """dict/list/dataclass の構造のみ複製（ndarray・その他のオブジェクトは共有）"""
+    if isinstance(value, dict):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_thaw(v) for v in value]
+    if is_dataclass(value) and not isinstance(value, type):
+        # SCC分解の結果などを呼び出し側が書き換えてもキャッシュに影響しないよう複製する
+        clone = copy.copy(value)
+        for field in fields(value):
+            object.__setattr__(clone, field.name, _thaw(getattr(value, field.name)))
+        return clone
+    return value
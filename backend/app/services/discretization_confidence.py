@@ -18,14 +18,12 @@
 """
 
 import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
 from scipy import stats
 from typing import Dict, List, Optional, Tuple
-from app.services.matrix_utils import (
-    build_adjacency_matrices,
-    compute_total_effect_matrix,
-    compute_inner_products,
-)
 from app.services.weight_normalization import WEIGHT_SCHEMES, WeightModeType
+from app.services.analysis_cache import get_network_analysis
 
 
 def compute_sigma_eff(
@@ -272,8 +270,11 @@ def analyze_discretization_confidence(
     connection_density = compute_connection_density(network)
 
     # 総効果行列を計算（σ_eff に B_AA が必要なため先に計算）
-    matrices = build_adjacency_matrices(network, weight_mode)
-    if matrices['B_PA'].size == 0:
+    # 行列・総効果行列・内積は分析キャッシュを共有
+    analysis = get_network_analysis(network, weight_mode)
+    matrices = analysis['matrices']
+    dims = matrices['dimensions']
+    if dims['n_perf'] == 0 or dims['n_attr'] == 0:
         sigma_eff = compute_sigma_eff(n_levels, n_attributes, connection_density, 0.0)
         return {
             'is_discrete': True,
@@ -295,20 +296,18 @@ def analyze_discretization_confidence(
 
     # B_AA のフロベニウスノルムを計算
     B_AA = matrices['B_AA']
-    B_AA_frobenius_norm = float(np.linalg.norm(B_AA, 'fro'))
+    if sp.issparse(B_AA):
+        B_AA_frobenius_norm = float(spla.norm(B_AA, 'fro'))
+    else:
+        B_AA_frobenius_norm = float(np.linalg.norm(B_AA, 'fro'))
 
     # σ_eff を計算（ループ構造を考慮）
     sigma_eff = compute_sigma_eff(n_levels, n_attributes, connection_density, B_AA_frobenius_norm)
 
-    total_effect = compute_total_effect_matrix(
-        matrices['B_PA'],
-        matrices['B_AA'],
-        matrices['B_AV']
-    )
-    T = total_effect['T']
+    total_effect = analysis['total_effect']
 
-    # 内積・ノルムを計算
-    inner_products = compute_inner_products(T)
+    # 内積・ノルム
+    inner_products = analysis['inner_products']
     C = inner_products['C']
     norms = inner_products['norms']
     n_perf = len(norms)
@@ -0,0 +1,422 @@
+# backend/app/services/matrix_session.py
+"""
+設計案ごとの行列セッション（エッジ編集時の総効果行列の差分更新）
+
+ネットワークエディタでのエッジ追加・更新・削除は PAVE 行列の1要素の変更:
+- A→A エッジ: B_AA のランク1更新 → Sherman–Morrison で (I - B_AA)^(-1) を O(n²) 更新
+- A→P エッジ: B_PA の1要素 → T の1行を更新
+- V→A エッジ: B_AV の1要素 → T の1列を更新
+
+セッションは N = (I - B_AA)^(-1)、L = B_PA N、R = N B_AV、T = B_PA N B_AV を保持し、
+ネットワークJSONとの差分（非ゼロ要素の追加・変更・削除）を順に適用する。
+ノード構成の変更・ρ(B_AA) ≥ 1・数値ドリフト検出時は全再計算にフォールバック。
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .matrix_utils import (
+    collect_adjacency_entries,
+    compute_total_effect_matrix,
+    should_use_sparse,
+)
+from .spectral_radius import compute_spectral_radius, spectral_radius_upper_bound
+
+
+# セッションを保持する設計案の最大数（LRU）
+MAX_SESSIONS = 64
+
+# 差分がこの件数を超える場合は全再計算の方が安い
+MAX_INCREMENTAL_CHANGES = 32
+
+# 何回の差分更新ごとにドリフト検査を行うか
+DRIFT_CHECK_INTERVAL = 16
+
+# 残差 ||z - (I - B_AA) N z|| / ||z|| の許容値
+DRIFT_TOLERANCE = 1e-8
+
+# Sherman–Morrison の分母 1 - δ N[j, i] がこれ以下なら特異とみなす
+SINGULAR_TOLERANCE = 1e-10
+
+
+class MatrixSession:
+    """
+    1設計案分の総効果行列を保持し、エッジ差分を逐次適用するセッション
+
+    Attributes:
+        weight_mode: 重みモード
+        n_updates: 直近の全再計算以降に適用した差分更新の回数
+        n_full_recomputes: 全再計算の回数（初期化を含む）
+    """
+
+    def __init__(self, network: Dict, weight_mode: str = 'discrete_7'):
+        self.weight_mode = weight_mode
+        self.n_updates = 0
+        self.n_full_recomputes = 0
+        self._rebuild(collect_adjacency_entries(network, weight_mode))
+
+    # ------------------------------------------------------------------
+    # 公開API
+    # ------------------------------------------------------------------
+
+    def sync(self, network: Dict) -> Dict:
+        """
+        ネットワークJSONとセッションの差分を適用
+
+        Args:
+            network: 編集後のネットワーク構造
+
+        Returns:
+            {
+                'mode': str,  # 'unchanged' / 'incremental' / 'full'
+                'n_changes': int,  # 変更された非ゼロ要素数
+            }
+        """
+        structure = collect_adjacency_entries(network, self.weight_mode)
+
+        # ノード構成が変わった場合はインデックスが変わるため全再計算
+        if structure['node_ids'] != self._node_ids:
+            self._rebuild(structure)
+            return {'mode': 'full', 'n_changes': -1}
+
+        # ラベル・performance_id はインデックスに影響しないので上書き
+        self._node_labels = structure['node_labels']
+        self._performance_id_map = structure['performance_id_map']
+
+        changes = self._diff_entries(structure['entries'])
+        if not changes:
+            return {'mode': 'unchanged', 'n_changes': 0}
+
+        if self._N is None or len(changes) > MAX_INCREMENTAL_CHANGES:
+            self._rebuild(structure)
+            return {'mode': 'full', 'n_changes': len(changes)}
+
+        for kind, (row, col), delta in changes:
+            if not self._apply_delta(kind, row, col, delta):
+                # 特異・収束条件の破れ → 全再計算
+                self._rebuild(structure)
+                return {'mode': 'full', 'n_changes': len(changes)}
+
+        self._entries = structure['entries']
+        self.n_updates += len(changes)
+
+        if self._drift_check_due(len(changes)) and self._has_drifted():
+            self._rebuild(structure)
+            return {'mode': 'full', 'n_changes': len(changes)}
+
+        return {'mode': 'incremental', 'n_changes': len(changes)}
+
+    def total_effect(self) -> Dict:
+        """
+        現在の総効果行列（compute_total_effect_matrix と同じ形式）
+
+        Returns:
+            {'T', 'spectral_radius', 'convergence', 'method', 'iterations'}
+            'T' は内部状態のコピー
+        """
+        if self._total_effect.get('spectral_radius') is None:
+            # 収束を上界で判定した場合、報告する ρ は必要になった時点で計算する
+            self._total_effect['spectral_radius'] = compute_spectral_radius(self._B_AA)
+        result = dict(self._total_effect)
+        result['T'] = self._total_effect['T'].copy()
+        return result
+
+    def matrices(self) -> Dict:
+        """
+        現在の隣接行列（build_adjacency_matrices と同じ形式の密行列）
+
+        Returns:
+            build_adjacency_matrices 互換の辞書
+        """
+        n_perf, n_attr, n_var = self._dims
+        return {
+            'B_PA': self._B_PA.copy() if n_perf > 0 and n_attr > 0 else np.array([]),
+            'B_AA': self._B_AA.copy() if n_attr > 0 else np.array([]),
+            'B_AV': self._B_AV.copy() if n_attr > 0 and n_var > 0 else np.array([]),
+            'node_ids': self._node_ids,
+            'node_labels': self._node_labels,
+            'performance_id_map': self._performance_id_map,
+            'dimensions': {'n_perf': n_perf, 'n_attr': n_attr, 'n_var': n_var},
+            'sparse': False,
+        }
+
+    # ------------------------------------------------------------------
+    # 内部処理
+    # ------------------------------------------------------------------
+
+    def _rebuild(self, structure: Dict):
+        """行列と分解を全再計算"""
+        dims = structure['dimensions']
+        n_perf, n_attr, n_var = dims['n_perf'], dims['n_attr'], dims['n_var']
+
+        self._node_ids = structure['node_ids']
+        self._node_labels = structure['node_labels']
+        self._performance_id_map = structure['performance_id_map']
+        self._entries = structure['entries']
+        self._dims = (n_perf, n_attr, n_var)
+
+        self._B_PA = np.zeros((n_perf, n_attr))
+        self._B_AA = np.zeros((n_attr, n_attr))
+        self._B_AV = np.zeros((n_attr, n_var))
+        for (i, j), value in self._entries['PA'].items():
+            self._B_PA[i, j] = value
+        for (i, j), value in self._entries['AA'].items():
+            self._B_AA[i, j] = value
+        for (i, j), value in self._entries['AV'].items():
+            self._B_AV[i, j] = value
+
+        self.n_updates = 0
+        self.n_full_recomputes += 1
+        self._N = None
+        self._L = None
+        self._R = None
+
+        if n_perf == 0 or n_attr == 0 or n_var == 0:
+            m = self.matrices()
+            self._total_effect = compute_total_effect_matrix(m['B_PA'], m['B_AA'], m['B_AV'])
+            return
+
+        converges, spectral_radius = self._check_convergence()
+        if converges:
+            try:
+                self._N = np.linalg.inv(np.eye(n_attr) - self._B_AA)
+            except np.linalg.LinAlgError:
+                self._N = None
+
+        if self._N is None:
+            # ρ ≥ 1 または特異: 通常の計算（Neumann級数）に委ね、差分更新は行わない
+            self._total_effect = compute_total_effect_matrix(self._B_PA, self._B_AA, self._B_AV)
+            return
+
+        self._L = self._B_PA @ self._N
+        self._R = self._N @ self._B_AV
+        self._total_effect = {
+            'T': self._L @ self._B_AV,
+            'spectral_radius': spectral_radius,
+            'convergence': True,
+            'method': 'direct' if not self._entries['AA'] else 'inverse',
+            'iterations': 0,
+        }
+
+    def _diff_entries(self, new_entries: Dict) -> List[Tuple[str, Tuple[int, int], float]]:
+        """
+        非ゼロ要素の差分を (種類, (行, 列), δ) のリストで返す
+
+        A→P / V→A の差分を先に、A→A を最後に並べる（L, R の更新順序を揃えるため）
+        """
+        changes = []
+        for kind in ('PA', 'AV', 'AA'):
+            old, new = self._entries[kind], new_entries[kind]
+            for key in set(old) | set(new):
+                delta = new.get(key, 0.0) - old.get(key, 0.0)
+                if delta != 0.0:
+                    changes.append((kind, key, delta))
+        return changes
+
+    def _apply_delta(self, kind: str, row: int, col: int, delta: float) -> bool:
+        """
+        1要素の変更を N, L, R, T に反映
+
+        Returns:
+            差分更新に成功した場合 True（False の場合は全再計算が必要）
+        """
+        T = self._total_effect['T']
+
+        if kind == 'PA':
+            # B_PA[p, a] += δ → L[p, :] += δ N[a, :], T[p, :] += δ R[a, :]
+            self._B_PA[row, col] += delta
+            self._L[row, :] += delta * self._N[col, :]
+            T[row, :] += delta * self._R[col, :]
+            return True
+
+        if kind == 'AV':
+            # B_AV[a, v] += δ → R[:, v] += δ N[:, a], T[:, v] += δ L[:, a]
+            self._B_AV[row, col] += delta
+            self._R[:, col] += delta * self._N[:, row]
+            T[:, col] += delta * self._L[:, row]
+            return True
+
+        # B_AA[i, j] += δ → (I - B_AA) に -δ e_i e_jᵀ を加えるランク1更新
+        # N' = N + c N[:, i] N[j, :],  c = δ / (1 - δ N[j, i])
+        i, j = row, col
+        denom = 1.0 - delta * self._N[j, i]
+        if abs(denom) < SINGULAR_TOLERANCE:
+            return False
+
+        self._B_AA[i, j] += delta
+        converges, spectral_radius = self._check_convergence()
+        if not converges:
+            return False
+
+        c = delta / denom
+        n_col = self._N[:, i].copy()
+        n_row = self._N[j, :].copy()
+        l_col = self._L[:, i].copy()
+        r_row = self._R[j, :].copy()
+
+        self._N += c * np.outer(n_col, n_row)
+        self._L += c * np.outer(l_col, n_row)
+        self._R += c * np.outer(n_col, r_row)
+        T += c * np.outer(l_col, r_row)
+
+        self._total_effect['spectral_radius'] = spectral_radius
+        self._total_effect['method'] = 'inverse' if np.any(self._B_AA) else 'direct'
+        return True
+
+    def _check_convergence(self) -> Tuple[bool, Optional[float]]:
+        """
+        ρ(B_AA) < 1 かを判定（ノルム上界 < 1 の場合は固有値計算を省略）
+
+        上界は収束の判定にだけ使い、ρ として報告しない。
+
+        Returns:
+            (収束するか, ρ(B_AA))。上界で判定した場合の ρ は None（total_effect で計算）
+        """
+        if self._B_AA.size == 0:
+            return True, 0.0
+        if spectral_radius_upper_bound(self._B_AA) < 1.0:
+            return True, None
+        spectral_radius = compute_spectral_radius(self._B_AA)
+        return spectral_radius < 1.0, spectral_radius
+
+    def _drift_check_due(self, n_applied: int) -> bool:
+        """直近の更新で DRIFT_CHECK_INTERVAL の境界をまたいだか"""
+        return (self.n_updates // DRIFT_CHECK_INTERVAL) != (
+            (self.n_updates - n_applied) // DRIFT_CHECK_INTERVAL
+        )
+
+    def _has_drifted(self) -> bool:
+        """
+        ランダムプローブで N と T の数値ドリフトを検出（O(n²)）
+
+        - N: ||z - (I - B_AA) N z|| / ||z||
+        - T: ||T - L B_AV|| / max(||T||, 1)
+        """
+        n_attr = self._dims[1]
+        rng = np.random.default_rng(self.n_updates)
+        z = rng.standard_normal(n_attr)
+        Nz = self._N @ z
+        residual = z - (Nz - self._B_AA @ Nz)
+        if np.linalg.norm(residual) > DRIFT_TOLERANCE * np.linalg.norm(z):
+            return True
+
+        T = self._total_effect['T']
+        t_residual = np.linalg.norm(T - self._L @ self._B_AV)
+        return bool(t_residual > DRIFT_TOLERANCE * max(np.linalg.norm(T), 1.0))
+
+
+# =============================================================================
+# セッションレジストリ（設計案ID → セッション、LRU）
+# =============================================================================
+
+_sessions: "OrderedDict[str, MatrixSession]" = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def sync_matrix_session(case_id: str, network: Dict, weight_mode: str = 'discrete_7') -> Optional[MatrixSession]:
+    """
+    エディタ操作後のネットワークでセッションを更新（なければ作成）
+
+    大規模・疎なネットワーク（疎行列パスの対象）は密な N を保持できないため
+    セッションを作らず None を返す。
+
+    Args:
+        case_id: 設計案ID
+        network: 編集後のネットワーク構造
+        weight_mode: 設計案の重みモード
+
+    Returns:
+        更新後のセッション、または None
+    """
+    weight_mode = weight_mode or 'discrete_7'
+    with _sessions_lock:
+        session = _sessions.get(case_id)
+        if session is not None and session.weight_mode == weight_mode:
+            session.sync(network)
+            _sessions.move_to_end(case_id)
+            return session
+
+        structure_dims = _attribute_density(network)
+        if should_use_sparse(*structure_dims):
+            _sessions.pop(case_id, None)
+            return None
+
+        session = MatrixSession(network, weight_mode)
+        _sessions[case_id] = session
+        _sessions.move_to_end(case_id)
+        while len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+        return session
+
+
+def get_matrix_session(case_id: str, network: Dict, weight_mode: str = 'discrete_7') -> Optional[MatrixSession]:
+    """
+    既存セッションがあれば、ネットワークと同期して返す
+
+    セッションはエディタ操作（sync_matrix_session）でのみ作成されるため、
+    セッションのない設計案では None を返し、呼び出し側は通常計算を行う。
+
+    Args:
+        case_id: 設計案ID
+        network: 現在のネットワーク構造
+        weight_mode: 設計案の重みモード
+
+    Returns:
+        同期済みのセッション、または None
+    """
+    weight_mode = weight_mode or 'discrete_7'
+    with _sessions_lock:
+        session = _sessions.get(case_id)
+        if session is None or session.weight_mode != weight_mode:
+            return None
+        session.sync(network)
+        _sessions.move_to_end(case_id)
+        return session
+
+
+def get_matrix_session_snapshot(
+    case_id: str,
+    network: Dict,
+    weight_mode: str = 'discrete_7'
+) -> Optional[Tuple[Dict, Dict]]:
+    """
+    既存セッションをネットワークと同期し、隣接行列と総効果行列の複製を返す
+
+    同期と読み出しを同じロック内で行うので、並行するエディタ操作の
+    sync（B_AA・T のインプレース更新）と食い違った組み合わせにならない。
+
+    Args:
+        case_id: 設計案ID
+        network: 現在のネットワーク構造
+        weight_mode: 設計案の重みモード
+
+    Returns:
+        (session.matrices(), session.total_effect())、セッションがなければ None
+    """
+    weight_mode = weight_mode or 'discrete_7'
+    with _sessions_lock:
+        session = _sessions.get(case_id)
+        if session is None or session.weight_mode != weight_mode:
+            return None
+        session.sync(network)
+        _sessions.move_to_end(case_id)
+        return session.matrices(), session.total_effect()
+
+
+def invalidate_matrix_session(case_id: str):
+    """設計案のセッションを破棄（設計案削除時など）"""
+    with _sessions_lock:
+        _sessions.pop(case_id, None)
+
+
+def _attribute_density(network: Dict) -> Tuple[int, int]:
+    """(属性ノード数, A→A エッジ数の上界) を簡易に数える"""
+    attr_ids = {n['id'] for n in network.get('nodes', []) if n.get('layer') == 2}
+    nnz_aa = sum(
+        1 for e in network.get('edges', [])
+        if e.get('source_id') in attr_ids and e.get('target_id') in attr_ids
+    )
+    return len(attr_ids), nnz_aa
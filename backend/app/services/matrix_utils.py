@@ -9,10 +9,16 @@
 """
 
 import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
 from typing import Dict, List, Tuple, Optional
 from collections import defaultdict
 
 # 統一重み正規化モジュールをインポート
+from app.services.spectral_radius import (
+    compute_spectral_radius,
+    check_spectral_convergence,
+)
 from app.services.weight_normalization import (
     normalize_weight as _normalize_weight_impl,
     discrete_to_continuous,
@@ -42,6 +48,11 @@ DISCRETE_TO_CONTINUOUS = WEIGHT_SCHEMES['discrete_5']['discrete_values'] and {
     )
 } or {}
 
+# 疎行列パスの自動選択しきい値
+# 属性数がこれ以上、かつ B_AA の密度がこれ以下の場合に CSR + 疎LU/反復法を使用
+SPARSE_MIN_ATTRS = 500
+SPARSE_MAX_DENSITY = 0.05
+
 
 # =============================================================================
 # Step 1: 隣接行列の構築
@@ -66,7 +77,11 @@ def normalize_weight(weight: float, mode: WeightModeType = 'discrete_7') -> floa
     return _normalize_weight_impl(weight, mode)
 
 
-def build_adjacency_matrices(network: Dict, weight_mode: WeightModeType = 'discrete_7') -> Dict:
+def build_adjacency_matrices(
+    network: Dict,
+    weight_mode: WeightModeType = 'discrete_7',
+    sparse: Optional[bool] = False
+) -> Dict:
     """
     ネットワークから隣接行列を構築
 
@@ -77,12 +92,15 @@ def build_adjacency_matrices(network: Dict, weight_mode: WeightModeType = 'discr
 
     Args:
         network: ネットワーク構造 {'nodes': [...], 'edges': [...]}
+        weight_mode: 重みモード
+        sparse: True で scipy.sparse の CSR 行列、False で密行列、
+            None で属性数と密度から自動選択（should_use_sparse）
 
     Returns:
         {
-            'B_PA': np.ndarray,  # (n_perf × n_attr)
-            'B_AA': np.ndarray,  # (n_attr × n_attr)
-            'B_AV': np.ndarray,  # (n_attr × n_var)
+            'B_PA': np.ndarray | csr_matrix,  # (n_perf × n_attr)
+            'B_AA': np.ndarray | csr_matrix,  # (n_attr × n_attr)
+            'B_AV': np.ndarray | csr_matrix,  # (n_attr × n_var)
             'node_ids': {
                 'P': List[str],  # Performance node IDs
                 'A': List[str],  # Attribute (Property) node IDs
@@ -96,6 +114,59 @@ def build_adjacency_matrices(network: Dict, weight_mode: WeightModeType = 'discr
             'performance_id_map': Dict[str, str],  # node_id → performance_id
         }
     """
+    structure = collect_adjacency_entries(network, weight_mode)
+    n_perf, n_attr, n_var = (
+        structure['dimensions']['n_perf'],
+        structure['dimensions']['n_attr'],
+        structure['dimensions']['n_var'],
+    )
+    pa_entries = structure['entries']['PA']
+    aa_entries = structure['entries']['AA']
+    av_entries = structure['entries']['AV']
+
+    # 疎/密の選択（None の場合は属性数と B_AA の密度で自動判定）
+    if sparse is None:
+        sparse = should_use_sparse(n_attr, len(aa_entries))
+
+    # 行列の生成（いずれかの次元が0の場合は従来どおり空配列）
+    B_PA = _materialize(pa_entries, (n_perf, n_attr), sparse) if n_perf > 0 and n_attr > 0 else np.array([])
+    B_AA = _materialize(aa_entries, (n_attr, n_attr), sparse) if n_attr > 0 else np.array([])
+    B_AV = _materialize(av_entries, (n_attr, n_var), sparse) if n_attr > 0 and n_var > 0 else np.array([])
+
+    return {
+        'B_PA': B_PA,
+        'B_AA': B_AA,
+        'B_AV': B_AV,
+        'node_ids': structure['node_ids'],
+        'node_labels': structure['node_labels'],
+        'performance_id_map': structure['performance_id_map'],
+        'dimensions': structure['dimensions'],
+        'sparse': bool(sparse),
+    }
+
+
+def collect_adjacency_entries(network: Dict, weight_mode: WeightModeType = 'discrete_7') -> Dict:
+    """
+    ネットワークから PAVE 行列の非ゼロ要素を収集（行列は生成しない）
+
+    build_adjacency_matrices と行列セッション（差分更新）の共通処理。
+    同じ位置への重複エッジは後勝ち。
+
+    Args:
+        network: ネットワーク構造 {'nodes': [...], 'edges': [...]}
+        weight_mode: 重みモード
+
+    Returns:
+        {
+            'entries': {
+                'PA': Dict[(int, int), float],  # (perf_idx, attr_idx) → 重み
+                'AA': Dict[(int, int), float],  # (target_attr_idx, source_attr_idx) → 重み
+                'AV': Dict[(int, int), float],  # (attr_idx, var_idx) → 重み
+            },
+            'node_ids', 'node_labels', 'performance_id_map', 'dimensions':
+                build_adjacency_matrices と同じ
+        }
+    """
     nodes = network.get('nodes', [])
     edges = network.get('edges', [])
 
@@ -139,12 +210,12 @@ def build_adjacency_matrices(network: Dict, weight_mode: WeightModeType = 'discr
     a_idx = {node_id: i for i, node_id in enumerate(a_ids)}
     v_idx = {node_id: i for i, node_id in enumerate(v_ids)}
 
-    # 行列の初期化
-    B_PA = np.zeros((n_perf, n_attr)) if n_perf > 0 and n_attr > 0 else np.array([])
-    B_AA = np.zeros((n_attr, n_attr)) if n_attr > 0 else np.array([])
-    B_AV = np.zeros((n_attr, n_var)) if n_attr > 0 and n_var > 0 else np.array([])
+    # 非ゼロ要素を (行, 列) → 値 で収集（同じ位置への重複エッジは後勝ち）
+    pa_entries: Dict[Tuple[int, int], float] = {}
+    aa_entries: Dict[Tuple[int, int], float] = {}
+    av_entries: Dict[Tuple[int, int], float] = {}
 
-    # エッジから行列を構築
+    # エッジから非ゼロ要素を収集
     for edge in edges:
         source_id = edge.get('source_id')
         target_id = edge.get('target_id')
@@ -162,23 +233,25 @@ def build_adjacency_matrices(network: Dict, weight_mode: WeightModeType = 'discr
         #
         # Attribute → Performance (A→P)
         if source_id in a_idx and target_id in p_idx:
-            B_PA[p_idx[target_id], a_idx[source_id]] = normalized_weight
+            pa_entries[(p_idx[target_id], a_idx[source_id])] = normalized_weight
 
         # Attribute → Attribute (A→A, ループ構造)
         elif source_id in a_idx and target_id in a_idx:
-            B_AA[a_idx[target_id], a_idx[source_id]] = normalized_weight
+            aa_entries[(a_idx[target_id], a_idx[source_id])] = normalized_weight
 
         # Variable → Attribute (V→A)
         elif source_id in v_idx and target_id in a_idx:
-            B_AV[a_idx[target_id], v_idx[source_id]] = normalized_weight
+            av_entries[(a_idx[target_id], v_idx[source_id])] = normalized_weight
 
         # その他のエッジは無視（V→V, A→V, P→X, E→X 等）
         # バリデーションは NetworkEditor.vue と data_migration.py で実施
 
     return {
-        'B_PA': B_PA,
-        'B_AA': B_AA,
-        'B_AV': B_AV,
+        'entries': {
+            'PA': pa_entries,
+            'AA': aa_entries,
+            'AV': av_entries,
+        },
         'node_ids': {
             'P': p_ids,
             'A': a_ids,
@@ -194,10 +267,81 @@ def build_adjacency_matrices(network: Dict, weight_mode: WeightModeType = 'discr
             'n_perf': n_perf,
             'n_attr': n_attr,
             'n_var': n_var,
-        }
+        },
     }
 
 
+def should_use_sparse(n_attr: int, nnz_aa: int) -> bool:
+    """
+    属性数と B_AA の非ゼロ要素数から疎行列表現を使うべきか判定
+
+    密行列の (I - B_AA)^(-1) は O(n³) 時間・O(n²) メモリのため、
+    属性数が多く、かつ B_AA が十分に疎な場合のみ疎行列パスを選ぶ。
+
+    Args:
+        n_attr: 属性ノード数
+        nnz_aa: B_AA の非ゼロ要素数
+
+    Returns:
+        疎行列パスを使う場合 True
+    """
+    if n_attr < SPARSE_MIN_ATTRS:
+        return False
+    return nnz_aa / float(n_attr * n_attr) <= SPARSE_MAX_DENSITY
+
+
+def to_dense_matrices(matrices: Dict) -> Dict:
+    """
+    build_adjacency_matrices の結果を密行列版に変換（密行列の場合はそのまま返す）
+
+    Shapley値計算など、密行列のインデックス操作を前提とする処理の入口で使う。
+
+    Args:
+        matrices: build_adjacency_matrices の結果
+
+    Returns:
+        B_PA / B_AA / B_AV が np.ndarray の辞書
+    """
+    if not matrices.get('sparse'):
+        return matrices
+    dense = dict(matrices)
+    for key in ('B_PA', 'B_AA', 'B_AV'):
+        if sp.issparse(dense[key]):
+            dense[key] = dense[key].toarray()
+    dense['sparse'] = False
+    return dense
+
+
+def _materialize(
+    entries: Dict[Tuple[int, int], float],
+    shape: Tuple[int, int],
+    sparse: bool
+):
+    """
+    収集した非ゼロ要素から密行列または CSR 行列を生成
+
+    Args:
+        entries: (行, 列) → 値
+        shape: 行列の形状
+        sparse: True の場合 CSR 行列を返す
+
+    Returns:
+        np.ndarray または scipy.sparse.csr_matrix
+    """
+    if sparse:
+        if entries:
+            rows, cols = zip(*entries.keys())
+            data = list(entries.values())
+        else:
+            rows, cols, data = (), (), ()
+        return sp.csr_matrix((data, (rows, cols)), shape=shape, dtype=float)
+
+    matrix = np.zeros(shape)
+    for (i, j), value in entries.items():
+        matrix[i, j] = value
+    return matrix
+
+
 # =============================================================================
 # Step 2: 総効果行列の計算
 # =============================================================================
@@ -206,7 +350,8 @@ def compute_total_effect_matrix(
     B_PA: np.ndarray,
     B_AA: np.ndarray,
     B_AV: np.ndarray,
-    max_iterations: int = 100
+    max_iterations: int = 100,
+    exact_spectral_radius: bool = True
 ) -> Dict:
     """
     総効果行列 T = B_PA × (I - B_AA)^(-1) × B_AV を計算
@@ -220,16 +365,28 @@ def compute_total_effect_matrix(
         B_AA: Attribute → Attribute への相互作用行列 (n_attr × n_attr)
         B_AV: Variable → Attribute への直接効果行列 (n_attr × n_var)
         max_iterations: Neumann級数の最大反復回数
+        exact_spectral_radius: False の場合、ノルム上界 < 1 なら固有値計算を省略し
+            'spectral_radius' に上界を返す（Shapley値の部分集合評価など収束判定のみ必要な場合）
 
     Returns:
         {
             'T': np.ndarray,  # 総効果行列 (n_perf × n_var)
             'spectral_radius': float,  # B_AAのスペクトル半径
             'convergence': bool,  # 収束したか
-            'method': str,  # 計算方法 ('inverse' or 'neumann')
+            'method': str,  # 計算方法 ('inverse' or 'neumann'、疎行列パスは
+                            #   'sparse_lu' / 'gmres' / 'bicgstab' / 'sparse_neumann')
             'iterations': int,  # 使用した反復回数（Neumannの場合）
         }
     """
+    # 疎行列入力、または大規模かつ疎な B_AA は疎行列パスで計算
+    if any(sp.issparse(M) for M in (B_PA, B_AA, B_AV)) or (
+        B_AA.ndim == 2 and should_use_sparse(B_AA.shape[0], int(np.count_nonzero(B_AA)))
+    ):
+        return compute_total_effect_matrix_sparse(
+            B_PA, B_AA, B_AV, max_iterations,
+            exact_spectral_radius=exact_spectral_radius
+        )
+
     # 空行列のチェック
     if B_PA.size == 0 or B_AV.size == 0:
         n_perf = B_PA.shape[0] if B_PA.size > 0 else 0
@@ -258,12 +415,11 @@ def compute_total_effect_matrix(
 
     I = np.eye(n_attr)
 
-    # スペクトル半径の計算
-    try:
-        eigenvalues = np.linalg.eigvals(B_AA)
-        spectral_radius = np.max(np.abs(eigenvalues))
-    except np.linalg.LinAlgError:
-        spectral_radius = float('inf')
+    # スペクトル半径の計算（大きい行列は eigs(k=1)、必要なら上界で省略）
+    if exact_spectral_radius:
+        spectral_radius = compute_spectral_radius(B_AA)
+    else:
+        _, spectral_radius = check_spectral_convergence(B_AA)
 
     # 収束条件: ρ(B_AA) < 1
     convergence = bool(spectral_radius < 1.0)
@@ -306,6 +462,276 @@ def compute_total_effect_matrix(
     }
 
 
+def compute_total_effect_matrix_sparse(
+    B_PA,
+    B_AA,
+    B_AV,
+    max_iterations: int = 100,
+    tol: float = 1e-8,
+    exact_spectral_radius: bool = True
+) -> Dict:
+    """
+    疎行列版の総効果行列 T = B_PA × (I - B_AA)^(-1) × B_AV
+
+    逆行列を陽に作らず、(I - B_AA) X = B_AV を疎LU分解（splu）で解く。
+    疎LUが失敗した場合（フィルインによるメモリ不足など）は
+    列ごとの反復法（GMRES → BiCGSTAB）にフォールバックする。
+    ρ(B_AA) ≥ 1 の場合は compute_total_effect_matrix と同様に
+    Neumann級数 Σ B_AA^k B_AV を疎行列×密行列積で打ち切り計算する。
+
+    Args:
+        B_PA: (n_perf × n_attr) 密行列または疎行列
+        B_AA: (n_attr × n_attr) 密行列または疎行列
+        B_AV: (n_attr × n_var) 密行列または疎行列
+        max_iterations: Neumann級数の最大反復回数
+        tol: 反復法の相対許容誤差
+        exact_spectral_radius: compute_total_effect_matrix と同じ
+
+    Returns:
+        compute_total_effect_matrix と同じ形式（'T' は密行列）
+    """
+    n_perf = B_PA.shape[0] if B_PA.ndim == 2 else 0
+    n_attr = B_AA.shape[0] if B_AA.ndim == 2 else 0
+    n_var = B_AV.shape[1] if B_AV.ndim == 2 else 0
+
+    if n_perf == 0 or n_var == 0 or n_attr == 0:
+        return {
+            'T': np.zeros((n_perf, n_var)),
+            'spectral_radius': 0.0,
+            'convergence': True,
+            'method': 'empty',
+            'iterations': 0,
+        }
+
+    P = sp.csr_matrix(B_PA)
+    A = sp.csr_matrix(B_AA)
+    # 右辺は n_attr × n_var の密行列（n_var は通常小さい）
+    V = B_AV.toarray() if sp.issparse(B_AV) else np.asarray(B_AV, dtype=float)
+
+    # B_AAが零行列の場合: T = B_PA × B_AV
+    if A.nnz == 0 or np.max(np.abs(A.data)) <= 1e-8:
+        return {
+            'T': np.asarray(P @ V),
+            'spectral_radius': 0.0,
+            'convergence': True,
+            'method': 'direct',
+            'iterations': 0,
+        }
+
+    if exact_spectral_radius:
+        spectral_radius = compute_spectral_radius(A)
+    else:
+        _, spectral_radius = check_spectral_convergence(A)
+    convergence = bool(spectral_radius < 1.0)
+
+    if convergence:
+        M = (sp.identity(n_attr, format='csr') - A).tocsc()
+
+        # 疎LU分解
+        try:
+            X = spla.splu(M).solve(V)
+            return {
+                'T': np.asarray(P @ X),
+                'spectral_radius': float(spectral_radius),
+                'convergence': True,
+                'method': 'sparse_lu',
+                'iterations': 0,
+            }
+        except (RuntimeError, MemoryError):
+            pass  # 特異・フィルイン過大の場合は反復法へ
+
+        # 反復法（列ごと）: GMRES → BiCGSTAB
+        X = np.zeros_like(V)
+        method = 'gmres'
+        solved = True
+        for col in range(n_var):
+            b = V[:, col]
+            if not np.any(b):
+                continue
+            x, info = spla.gmres(M, b, tol=tol, atol=0.0, restart=50, maxiter=max_iterations)
+            if info != 0:
+                x, info = spla.bicgstab(M, b, tol=tol, atol=0.0, maxiter=max_iterations * 10)
+                method = 'bicgstab'
+            if info != 0:
+                solved = False
+                break
+            X[:, col] = x
+
+        if solved:
+            return {
+                'T': np.asarray(P @ X),
+                'spectral_radius': float(spectral_radius),
+                'convergence': True,
+                'method': method,
+                'iterations': 0,
+            }
+
+    # Neumann級数: X = Σ_k B_AA^k B_AV（B_AA^k 自体は作らない）
+    X = V.copy()
+    term = V
+    iteration = 0
+    for iteration in range(1, max_iterations + 1):
+        term = A @ term
+        X += term
+        if np.max(np.abs(term)) < 1e-10:
+            break
+
+    return {
+        'T': np.asarray(P @ X),
+        'spectral_radius': float(spectral_radius),
+        'convergence': convergence,
+        'method': 'sparse_neumann',
+        'iterations': iteration,
+    }
+
+
+def compute_total_effect_matrices_batch(
+    matrices_list: List[Dict],
+    max_batch_bytes: int = 256 * 1024 * 1024
+) -> List[Dict]:
+    """
+    複数設計案の総効果行列をまとめて計算（プロジェクト単位のバッチ計算）
+
+    各設計案の B_PA / B_AA / B_AV を共通の次元（各層の最大ノード数）に
+    ゼロパディングしてスタックし、スペクトル半径は1回のバッチ固有値計算、
+    T は1回のスタック np.linalg.solve で求める。
+    ゼロ行/列のパディングは固有値0と T のゼロ行/列を追加するだけなので、
+    各設計案の結果は compute_total_effect_matrix と一致する。
+
+    - 属性数の近い設計案をまとめてチャンク化（パディングの無駄を抑える）
+    - ρ(B_AA) ≥ 1 や特異行列の設計案は compute_total_effect_matrix にフォールバック
+    - 疎行列（CSR）の設計案はスタックせず疎行列パスで個別に計算
+
+    Args:
+        matrices_list: build_adjacency_matrices() の結果のリスト
+        max_batch_bytes: 1チャンクあたりのスタック行列の最大バイト数
+
+    Returns:
+        各設計案の compute_total_effect_matrix 互換の結果（入力と同じ順序）
+        'T' は各設計案の実次元 (n_perf × n_var) のビュー
+    """
+    results: List[Optional[Dict]] = [None] * len(matrices_list)
+
+    # 空行列の設計案は個別に処理し、それ以外をバッチ対象にする
+    batch_indices = []
+    for k, matrices in enumerate(matrices_list):
+        B_PA, B_AV = matrices['B_PA'], matrices['B_AV']
+        if matrices.get('sparse') or sp.issparse(matrices['B_AA']):
+            # 疎行列の設計案はパディングせず疎行列パスで個別に計算
+            results[k] = compute_total_effect_matrix(B_PA, matrices['B_AA'], B_AV)
+        elif B_PA.size == 0 or B_AV.size == 0:
+            results[k] = compute_total_effect_matrix(B_PA, matrices['B_AA'], B_AV)
+        else:
+            batch_indices.append(k)
+
+    # 属性数でソートしてチャンク化
+    batch_indices.sort(key=lambda k: matrices_list[k]['B_AA'].shape[0])
+
+    start = 0
+    while start < len(batch_indices):
+        # チャンクの終端を決定（最大次元でのスタックサイズが上限を超えない範囲）
+        end = start
+        n_p = n_a = n_v = 0
+        while end < len(batch_indices):
+            m = matrices_list[batch_indices[end]]
+            cand_p = max(n_p, m['B_PA'].shape[0])
+            cand_a = max(n_a, m['B_AA'].shape[0])
+            cand_v = max(n_v, m['B_AV'].shape[1])
+            n_items = end - start + 1
+            n_bytes = 8 * n_items * cand_a * (cand_p + 2 * cand_a + cand_v)
+            if end > start and n_bytes > max_batch_bytes:
+                break
+            n_p, n_a, n_v = cand_p, cand_a, cand_v
+            end += 1
+
+        chunk = batch_indices[start:end]
+        chunk_results = _solve_total_effect_chunk(
+            [matrices_list[k] for k in chunk], n_p, n_a, n_v
+        )
+        for k, result in zip(chunk, chunk_results):
+            results[k] = result
+        start = end
+
+    return results
+
+
+def _solve_total_effect_chunk(
+    chunk: List[Dict],
+    n_p: int,
+    n_a: int,
+    n_v: int
+) -> List[Dict]:
+    """
+    パディング済みスタックで1チャンク分の総効果行列を計算
+
+    Args:
+        chunk: build_adjacency_matrices() の結果のリスト
+        n_p, n_a, n_v: パディング後の各層の次元
+
+    Returns:
+        compute_total_effect_matrix 互換の結果のリスト
+    """
+    n_items = len(chunk)
+    P = np.zeros((n_items, n_p, n_a))
+    A = np.zeros((n_items, n_a, n_a))
+    V = np.zeros((n_items, n_a, n_v))
+    dims = []
+
+    for k, m in enumerate(chunk):
+        p, a = m['B_PA'].shape
+        v = m['B_AV'].shape[1]
+        P[k, :p, :a] = m['B_PA']
+        if m['B_AA'].size > 0:
+            A[k, :a, :a] = m['B_AA']
+        V[k, :a, :v] = m['B_AV']
+        dims.append((p, v))
+
+    # B_AAが零行列の設計案は (I - B_AA)^(-1) = I
+    is_zero = np.all(np.abs(A) <= 1e-8, axis=(1, 2))
+
+    # スペクトル半径（バッチ固有値計算）
+    try:
+        spectral_radii = np.max(np.abs(np.linalg.eigvals(A)), axis=1)
+    except np.linalg.LinAlgError:
+        spectral_radii = None
+
+    if spectral_radii is None:
+        return [
+            compute_total_effect_matrix(m['B_PA'], m['B_AA'], m['B_AV'])
+            for m in chunk
+        ]
+
+    spectral_radii = np.where(is_zero, 0.0, spectral_radii)
+    solvable = spectral_radii < 1.0
+
+    T_stack = None
+    if np.any(solvable):
+        idx = np.flatnonzero(solvable)
+        I = np.eye(n_a)
+        try:
+            # (I - B_AA) X = B_AV をスタックで一括求解
+            X = np.linalg.solve(I[np.newaxis, :, :] - A[idx], V[idx])
+            T_stack = {int(k): T for k, T in zip(idx, P[idx] @ X)}
+        except np.linalg.LinAlgError:
+            T_stack = None  # 特異行列を含む場合は個別計算にフォールバック
+
+    results = []
+    for k, m in enumerate(chunk):
+        p, v = dims[k]
+        if T_stack is not None and k in T_stack:
+            results.append({
+                'T': T_stack[k][:p, :v],
+                'spectral_radius': float(spectral_radii[k]),
+                'convergence': True,
+                'method': 'direct' if is_zero[k] else 'inverse',
+                'iterations': 0,
+            })
+        else:
+            results.append(compute_total_effect_matrix(m['B_PA'], m['B_AA'], m['B_AV']))
+
+    return results
+
+
 # =============================================================================
 # Step 3: 内積行列・構造的トレードオフ指標の計算
 # =============================================================================
@@ -485,8 +911,8 @@ def analyze_network_structure(network: Dict, weight_mode: WeightModeType = 'disc
             }
         }
     """
-    # Step 1: 隣接行列の構築
-    matrices = build_adjacency_matrices(network, weight_mode)
+    # Step 1: 隣接行列の構築（大規模・疎なネットワークは CSR）
+    matrices = build_adjacency_matrices(network, weight_mode, sparse=None)
 
     # Step 2: 総効果行列の計算
     total_effect = compute_total_effect_matrix(
@@ -495,6 +921,54 @@ def analyze_network_structure(network: Dict, weight_mode: WeightModeType = 'disc
         matrices['B_AV']
     )
 
+    return _assemble_network_analysis(matrices, total_effect)
+
+
+def analyze_network_structures_batch(
+    networks: List[Dict],
+    weight_modes: List[WeightModeType]
+) -> List[Dict]:
+    """
+    複数設計案の構造的トレードオフ分析をまとめて実行
+
+    総効果行列の計算を compute_total_effect_matrices_batch で一括化した
+    analyze_network_structure のバッチ版
+
+    Args:
+        networks: ネットワーク構造のリスト
+        weight_modes: 各ネットワークの重みモードのリスト
+
+    Returns:
+        各ネットワークの analyze_network_structure 互換の結果（入力と同じ順序）
+    """
+    if len(networks) != len(weight_modes):
+        raise ValueError(
+            f"weight_modes length ({len(weight_modes)}) must match networks length ({len(networks)})"
+        )
+
+    all_matrices = [
+        build_adjacency_matrices(network, mode, sparse=None)
+        for network, mode in zip(networks, weight_modes)
+    ]
+    total_effects = compute_total_effect_matrices_batch(all_matrices)
+
+    return [
+        _assemble_network_analysis(matrices, total_effect)
+        for matrices, total_effect in zip(all_matrices, total_effects)
+    ]
+
+
+def _assemble_network_analysis(matrices: Dict, total_effect: Dict) -> Dict:
+    """
+    隣接行列と総効果行列から analyze_network_structure の結果を組み立てる
+
+    Args:
+        matrices: build_adjacency_matrices の結果
+        total_effect: compute_total_effect_matrix の結果
+
+    Returns:
+        analyze_network_structure と同じ形式の辞書
+    """
     # Step 3a: 内積行列の計算（論文Chapter 7のエネルギー計算用）
     inner_products = compute_inner_products(total_effect['T'])
 
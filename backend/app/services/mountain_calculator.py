@@ -9,14 +9,42 @@
 import numpy as np
 from sklearn.manifold import MDS
 from scipy.spatial.distance import pdist, squareform
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from sqlalchemy.orm import Session
 import json
 import time
 
 from app.models.database import ProjectModel, DesignCaseModel, NeedPerformanceRelationModel
-from app.api.mds import compute_wl_kernel, kernel_to_distance, circular_mds_parallel
-from app.services.structural_energy import compute_structural_energy
+from app.api.mds import (
+    kernel_to_distance,
+    circular_mds_parallel,
+    classical_mds_angles,
+    incremental_circular_mds,
+)
+from app.services.wl_kernel import (
+    WLFeatureVector,
+    WLLabelHasher,
+    compute_incremental_wl_kernel,
+    compute_wl_features,
+    wl_network_hash,
+)
+from app.services.structural_energy import compute_structural_energy_batch
+
+
+# 円環MDSの試行回数の上限・改善なしで打ち切る連続試行数・時間の上限（ミリ秒）
+CIRCULAR_MDS_MAX_RESTARTS = 500
+CIRCULAR_MDS_PATIENCE = 30
+CIRCULAR_MDS_TIME_BUDGET_MS = 10000
+
+# 差分配置（layout_mode='incremental'）で配置し直す案の割合の上限（超えたら全体を最適化）
+INCREMENTAL_MAX_CHANGED_FRACTION = 0.5
+
+# 差分配置のストレスが前回の全体最適化のストレスから許容する悪化（相対・絶対の大きい方）
+INCREMENTAL_STRESS_TOLERANCE = 0.25
+INCREMENTAL_STRESS_MIN_MARGIN = 0.02
+
+# 差分配置の最後に全案の角度を局所的に最適化する反復回数の上限
+INCREMENTAL_REFINE_ITERATIONS = 10
 
 
 # Timing utility
@@ -75,6 +103,110 @@ def calculate_network_kernel(networks: List[Dict]) -> np.ndarray:
     return K
 
 
+def collect_wl_features(
+    design_cases: List[DesignCaseModel],
+    networks: List[Dict],
+    iterations: int,
+    recomputed: Optional[List[int]] = None
+) -> List[WLFeatureVector]:
+    """
+    各ネットワークの WL 特徴ベクトルを取得（設計案に保存済みならそれを使う）
+
+    networks が設計案と同じ並びの場合、network_hash と反復回数が一致する
+    wl_features_json を再利用し、計算し直した特徴ベクトルは設計案に書き戻す
+    （コミットは呼び出し側）。
+
+    Args:
+        design_cases: 設計案のリスト
+        networks: 各設計案のネットワーク情報のリスト
+        iterations: WL反復回数
+        recomputed: 計算し直した（新規・ネットワークが変わった）案のインデックスの書き込み先
+
+    Returns:
+        WLFeatureVector のリスト（networks と同じ並び）
+    """
+    hasher = WLLabelHasher()
+    aligned = len(design_cases) == len(networks)
+    features = []
+    for k, network in enumerate(networks):
+        case = design_cases[k] if aligned else None
+        stored = case.wl_features if case is not None else None
+        if (stored and stored.get('iterations') == iterations
+                and stored.get('network_hash') == wl_network_hash(network)):
+            features.append(WLFeatureVector.from_dict(stored))
+            continue
+
+        feature = compute_wl_features(network, iterations, hasher)
+        if recomputed is not None:
+            recomputed.append(k)
+        if case is not None:
+            case.wl_features_json = json.dumps(feature.to_dict())
+        features.append(feature)
+    return features
+
+
+def initial_circular_angles(
+    distance_matrix: np.ndarray,
+    design_cases: List[DesignCaseModel]
+) -> List[np.ndarray]:
+    """
+    円環MDSの初期角度の候補
+
+    - 古典的MDSの2次元座標の偏角
+    - 前回保存した山の角度（距離行列と設計案の数が一致する場合。
+      角度のない案は古典的MDSの偏角で補う）
+
+    Args:
+        distance_matrix: 距離行列
+        design_cases: 設計案のリスト
+
+    Returns:
+        初期角度 (n,) のリスト
+    """
+    n = len(distance_matrix)
+    if n <= 1:
+        return []
+
+    classical = classical_mds_angles(distance_matrix)
+    candidates = [classical]
+
+    if len(design_cases) == n:
+        stored, _ = stored_layout(design_cases)
+        known = ~np.isnan(stored)
+        if known.any():
+            candidates.append(np.where(known, stored, classical))
+
+    return candidates
+
+
+def stored_layout(design_cases: List[DesignCaseModel]) -> Tuple[np.ndarray, Optional[float]]:
+    """
+    前回保存した山の角度と、その配置の基準ストレス
+
+    角度は保存した theta、なければ座標 (x, z) の偏角（頂点 r≈0 の案は不明）。
+    基準ストレスは最後に全体最適化したときの円環MDSのストレス（layout_stress）。
+
+    Args:
+        design_cases: 設計案のリスト
+
+    Returns:
+        (角度 (n,)、不明な案は NaN, 基準ストレスまたは None)
+    """
+    thetas = np.full(len(design_cases), np.nan)
+    stresses = []
+    for k, case in enumerate(design_cases):
+        position = case.mountain_position
+        if not position:
+            continue
+        if position.get('theta') is not None:
+            thetas[k] = position['theta'] % (2 * np.pi)
+        elif 'x' in position and 'z' in position and np.hypot(position['x'], position['z']) >= 1e-9:
+            thetas[k] = np.arctan2(position['z'], position['x']) % (2 * np.pi)
+        if position.get('layout_stress') is not None:
+            stresses.append(position['layout_stress'])
+    return thetas, (min(stresses) if stresses else None)
+
+
 def circular_mds_one_iteration(K: np.ndarray, initial_theta: np.ndarray = None) -> np.ndarray:
     """
     円環MDS: 1回の反復でθを計算
@@ -378,7 +510,8 @@ def calculate_mountain_positions(
     project: ProjectModel,
     db: Session,
     hemisphere_radius: float = 5.0,
-    networks: List[Dict] = None  # ネットワーク情報を追加
+    networks: List[Dict] = None,  # ネットワーク情報を追加
+    layout_mode: str = 'incremental'
 ) -> List[Dict]:
     """
     全設計案の半球座標を計算
@@ -386,14 +519,26 @@ def calculate_mountain_positions(
     標高H_max（全効用関数が1.0の場合）が半球の頂点になるようにスケーリングする。
     各設計案は半球の表面上に配置される：x² + y² + z² = R²（y ≥ 0）
 
+    ネットワーク情報がある場合の角度の決め方（layout_mode）:
+    - 'incremental': 保存済みの角度を初期値に、新規・ネットワークが変わった案だけを
+      配置し直す（他の案は回転させない）。変わった案が多すぎる・前回の角度や
+      基準ストレスがない・ストレスが基準から許容以上に悪化した場合は 'global' で計算
+    - 'global': 多初期値の円環MDSで全体を最適化し、最高標高の案を角度0に回転
+
     Args:
         project: プロジェクトモデル
         db: データベースセッション
         hemisphere_radius: 半球の半径（デフォルト5.0）
+        networks: 各設計案のネットワーク情報
+        layout_mode: 'incremental' または 'global'
 
     Returns:
-        [{'case_id': str, 'x': float, 'y': float, 'z': float, 'H': float, 'utility_vector': dict}, ...]
+        {'positions': [{'case_id': str, 'x': float, 'y': float, 'z': float, 'H': float,
+        'utility_vector': dict, ...}, ...], 'H_max': float, 'timings': dict, 'layout': dict}
     """
+    if layout_mode not in ('incremental', 'global'):
+        raise ValueError(f"Unknown layout_mode: {layout_mode}")
+
     timer = Timer()
     timer.start("total")
 
@@ -402,7 +547,7 @@ def calculate_mountain_positions(
     n_networks = len(networks) if networks else 0
 
     if len(design_cases) == 0:
-        return {'positions': [], 'H_max': 1.0, 'timings': {}}
+        return {'positions': [], 'H_max': 1.0, 'timings': {}, 'layout': {}}
 
     # 1. 性能×ニーズペアごとの重みを計算
     timer.start("1_vote_distribution")
@@ -480,13 +625,19 @@ def calculate_mountain_positions(
         elevations.append(H)
     timer.stop("2_utility_vectors")
 
+    # 角度の決め方（mode: 'global' / 'incremental' / 'utility_mds'）
+    layout = {'mode': 'utility_mds', 'n_changed': n_cases, 'fallback': False}
+
     # 3. 効用ベクトルからMDSで2D座標を計算
     # ↓ ネットワーク情報がある場合は円環MDSを使用（テスト段階）
     if networks is not None and len(networks) > 0:
 
         # WLカーネル計算（反復1回）
+        # 設計案に保存した特徴ベクトルを使い、ネットワークが変わった案の行・列だけ再計算
         timer.start("3a_wl_kernel")
-        K = compute_wl_kernel(networks, iterations=int(1))
+        changed_cases = []
+        wl_features = collect_wl_features(design_cases, networks, iterations=1, recomputed=changed_cases)
+        K, _ = compute_incremental_wl_kernel(wl_features, scope=project.id, iterations=1)
         timer.stop("3a_wl_kernel")
 
         # カーネル→距離行列変換
@@ -494,16 +645,51 @@ def calculate_mountain_positions(
         distance_matrix = kernel_to_distance(K)
         timer.stop("3b_kernel_to_distance")
 
-        # 円環MDS（並列版、n_init=500）
         timer.start("3c_circular_mds")
-        circular_mds_angles, circular_stress = circular_mds_parallel(
-            distance_matrix,
-            n_init=500,
-            n_workers=None  # 自動でCPU数に応じて設定
-        )
+        mds_angles = None
+
+        # 差分配置: 保存済みの角度を初期値に、新規・変わった案だけを配置し直す
+        if layout_mode == 'incremental' and len(networks) == n_cases:
+            previous_thetas, baseline_stress = stored_layout(design_cases)
+            changed = sorted(set(changed_cases) | set(np.flatnonzero(np.isnan(previous_thetas)).tolist()))
+            if (baseline_stress is not None and n_cases - len(changed) >= 2
+                    and len(changed) <= INCREMENTAL_MAX_CHANGED_FRACTION * n_cases):
+                thetas, stress = incremental_circular_mds(
+                    distance_matrix, np.nan_to_num(previous_thetas), changed,
+                    refine_iterations=INCREMENTAL_REFINE_ITERATIONS
+                )
+                allowed = baseline_stress + max(
+                    INCREMENTAL_STRESS_TOLERANCE * baseline_stress, INCREMENTAL_STRESS_MIN_MARGIN
+                )
+                layout.update(
+                    n_changed=len(changed),
+                    incremental_stress=float(stress),
+                    baseline_stress=float(baseline_stress),
+                )
+                if stress <= allowed:
+                    mds_angles = thetas
+                    layout.update(mode='incremental', stress=float(stress))
+                else:
+                    layout['fallback'] = True
+
+        # 全体最適化: 円環MDS（並列版、最大500回）
+        # 古典的MDSの偏角・前回の角度から先に始め、最良ストレスが改善しなくなったら打ち切る
+        if mds_angles is None:
+            mds_info = {}
+            mds_angles, circular_stress = circular_mds_parallel(
+                distance_matrix,
+                n_init=CIRCULAR_MDS_MAX_RESTARTS,
+                n_workers=None,  # 共有プロセスプールの設定に従う
+                initial_thetas=initial_circular_angles(distance_matrix, design_cases),
+                patience=CIRCULAR_MDS_PATIENCE,
+                time_budget_ms=CIRCULAR_MDS_TIME_BUDGET_MS,
+                info=mds_info
+            )
+            baseline_stress = circular_stress
+            timer.timings["3c_circular_mds_restarts"] = mds_info['n_restarts']
+            layout.update(mode='global', stress=float(circular_stress))
+        layout['baseline_stress'] = float(baseline_stress)
         timer.stop("3c_circular_mds")
-
-        mds_angles = circular_mds_angles
     else:
         # 既存のMDS処理（効用ベクトルベース）
         if len(design_cases) == 1:
@@ -532,9 +718,12 @@ def calculate_mountain_positions(
             mds_angles = mds_angles - mds_angles[0]  # 第1案を0度に
     
     # 5. 最高標高の案を正面（角度0）に配置するため回転
-    max_H_index = np.argmax(elevations)
-    rotation_offset = -mds_angles[max_H_index]
-    mds_angles = mds_angles + rotation_offset
+    # （差分配置では保存済みの角度を保つため回転しない）
+    if layout['mode'] != 'incremental':
+        max_H_index = np.argmax(elevations)
+        rotation_offset = -mds_angles[max_H_index]
+        mds_angles = mds_angles + rotation_offset
+    mds_angles = np.mod(mds_angles, 2 * np.pi)
 
     # 6. 円錐座標に変換（半球の制約に従う）
     timer.start("4_position_calculation")
@@ -615,21 +804,27 @@ def calculate_mountain_positions(
 
     # 7. データベースに座標を保存（オプション）
     timer.start("5_energy_and_db")
+    # 4象限分解エネルギーを計算（総効果行列は全設計案で一括計算）
+    # E = Σ(i<j) (W_i W_j |C_ij| - δ_i δ_j C_ij) / (2 (Σ W_k)²)
+    case_networks = [case.network for case in design_cases]
+    energy_inputs = [
+        {
+            'network': network,
+            'performance_weights': case.performance_weights or {},
+            'weight_mode': getattr(case, 'weight_mode', 'discrete_7') or 'discrete_7',
+            'performance_deltas': case.performance_deltas or {},
+            'case_id': case.id,
+        }
+        for case, network in zip(design_cases, case_networks)
+        if network and 'nodes' in network and 'edges' in network
+    ]
+    energy_results = iter(compute_structural_energy_batch(energy_inputs))
+
     for i, case in enumerate(design_cases):
-        # 4象限分解エネルギーを計算
-        # E = Σ(i<j) (W_i W_j |C_ij| - δ_i δ_j C_ij) / (2 (Σ W_k)²)
-        network = case.network
-        perf_weights = case.performance_weights or {}
-        perf_deltas = case.performance_deltas or {}
-        weight_mode = getattr(case, 'weight_mode', 'discrete_7') or 'discrete_7'
+        network = case_networks[i]
 
         if network and 'nodes' in network and 'edges' in network:
-            energy_result = compute_structural_energy(
-                network=network,
-                performance_weights=perf_weights,
-                weight_mode=weight_mode,
-                performance_deltas=perf_deltas
-            )
+            energy_result = next(energy_results)
             total_energy = energy_result['E']
 
             # 性能ごとの部分エネルギーを集計（論文準拠: E_ij から E_i を導出）
@@ -653,11 +848,14 @@ def calculate_mountain_positions(
         }
 
         # 座標とエネルギーを保存（partial_energiesも含む）
+        # 角度と基準ストレスは次回の差分配置で使う
         case.mountain_position_json = json.dumps({
             'x': positions[i]['x'],
             'y': positions[i]['y'],
             'z': positions[i]['z'],
             'H': positions[i]['H'],
+            'theta': float(mds_angles[i]),
+            'layout_stress': layout.get('baseline_stress'),
             'total_energy': total_energy,
             'partial_energies': partial_energies
         })
@@ -687,5 +885,6 @@ def calculate_mountain_positions(
     return {
         'positions': positions,
         'H_max': float(H_max),
-        'timings': timer.get_report()
+        'timings': timer.get_report(),
+        'layout': layout
     }
\ No newline at end of file
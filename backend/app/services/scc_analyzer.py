@@ -15,6 +15,7 @@ import numpy as np
 
 # 統一重み正規化モジュールをインポート
 from app.services.weight_normalization import discrete_to_continuous as _normalize_weight
+from app.services.spectral_radius import compute_spectral_radius
 
 
 class LoopResolutionType(str, Enum):
@@ -168,14 +169,8 @@ def compute_local_spectral_radius(
             continuous_weight = _discrete_to_continuous(weight)
             B_AA_local[i, j] = continuous_weight
 
-    # スペクトル半径を計算
-    try:
-        eigenvalues = np.linalg.eigvals(B_AA_local)
-        spectral_radius = float(np.max(np.abs(eigenvalues)))
-    except np.linalg.LinAlgError:
-        spectral_radius = float('inf')
-
-    return spectral_radius
+    # スペクトル半径を計算（大きいSCCは eigs(k=1)）
+    return compute_spectral_radius(B_AA_local)
 
 
 def _discrete_to_continuous(weight: float, mode: str = 'discrete_7') -> float:
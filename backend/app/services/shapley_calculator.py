@@ -5,10 +5,12 @@ Shapley値によるトレードオフ寄与度分解
 論文 design.tex 2849-2913行に基づく実装:
 - 協力ゲーム理論に基づくShapley値の計算
 - トレードオフ指標 C_ij を各属性の寄与に分解
-- 計算量 O(2^l) の厳密計算とMonte Carlo近似
+- 変数レベルのゲームは加法的なため φ_k = T_ik × T_jk を O(l) で解析的に計算
+- 計算量 O(2^l) の厳密計算（検証用）とMonte Carlo / KernelSHAP 近似
 """
 
 from typing import Dict, List, Set, Tuple, Optional, Any
+from collections import OrderedDict
 from dataclasses import dataclass
 from functools import lru_cache
 from itertools import combinations
@@ -17,6 +19,33 @@ import time
 import random
 import math
 
+from scipy.stats import norm
+
+from .shapley_subset_table import (
+    EXACT_AUTO_MAX_PLAYERS,
+    EXACT_TABLE_MAX_PLAYERS,
+    build_node_game,
+    build_edge_game,
+    compute_monte_carlo_shapley_all_pairs,
+    compute_adaptive_monte_carlo_shapley,
+    compute_kernel_shapley,
+    KERNEL_AUTO_MIN_PLAYERS,
+)
+from .shapley_path_decomposition import compute_path_shapley
+from .shapley_pruning import reduce_game, compute_reduced_exact_shapley
+from .shapley_owen import build_node_groups, compute_owen_values
+from .shapley_interaction import compute_interaction_index
+from .shapley_parallel import (
+    PARALLEL_MIN_PAIRS,
+    PairScheduleStats,
+    collect_pair_results,
+)
+from .worker_pool import resolve_workers
+
+
+# 適応的 Monte Carlo の信頼区間の信頼水準
+CONFIDENCE_LEVEL = 0.95
+
 
 @dataclass
 class ShapleyResult:
@@ -27,7 +56,7 @@ class ShapleyResult:
     cos_theta: float
     shapley_values: Dict[int, float]  # property_idx -> phi_k
     sum_check: float  # Σφ_k （= C_ij になるはず）
-    computation_method: str  # 'exact' or 'monte_carlo'
+    computation_method: str  # 'analytic', 'exact' or 'monte_carlo'
     computation_time_ms: float
     n_properties: int
 
@@ -56,6 +85,15 @@ class NodeShapleyResult:
     n_nodes: int  # |V| + |A|
     n_variables: int  # |V|
     n_attributes: int  # |A|
+    # 適応的 Monte Carlo / KernelSHAP の場合のみ
+    standard_errors: Optional[Dict[str, float]] = None  # node_id -> 標準誤差
+    n_samples: Optional[int] = None  # 評価した順列数（KernelSHAP は提携数）
+    stop_reason: Optional[str] = None  # 'tolerance' / 'time_budget' / 'max_samples'
+    # ナル/対称プレイヤーの縮約統計（'path' 以外）
+    pruning: Optional[Dict[str, Any]] = None
+    # Owen値（グループ構造付き）の場合のみ
+    groups: Optional[List[Dict[str, Any]]] = None  # [{'group_id', 'label', 'node_ids'}]
+    grouping: Optional[Dict[str, Any]] = None  # グループ化の方法と統計
 
 
 def compute_partial_tradeoff(
@@ -88,13 +126,52 @@ def compute_partial_tradeoff(
     return float(partial_inner)
 
 
+def compute_shapley_values_analytic(
+    T: np.ndarray,
+    perf_i: int,
+    perf_j: int
+) -> Dict[int, float]:
+    """
+    Shapley値の解析解（加法的ゲーム）
+
+    C_ij(S) = Σ_{k∈S} T_ik × T_jk は加法的ゲームであり、
+    任意の S で限界貢献 C_ij(S∪{k}) - C_ij(S) = T_ik × T_jk となるため
+    φ_k = T_ik × T_jk が厳密に成り立つ（効率性 Σφ_k = C_ij も自動的に満たす）。
+
+    Args:
+        T: 総効果行列 (n_perf × n_vars)
+        perf_i, perf_j: 性能のインデックス
+
+    Returns:
+        {property_idx: shapley_value}
+    """
+    contributions = T[perf_i, :] * T[perf_j, :]
+    return {k: float(phi) for k, phi in enumerate(contributions)}
+
+
+def compute_shapley_matrix_analytic(T: np.ndarray) -> np.ndarray:
+    """
+    全性能ペアの変数Shapley値を一括計算
+
+    Args:
+        T: 総効果行列 (n_perf × n_vars)
+
+    Returns:
+        Φ (n_perf × n_perf × n_vars)、Φ[i, j, k] = T_ik × T_jk
+    """
+    return T[:, None, :] * T[None, :, :]
+
+
 def compute_shapley_values_exact(
     T: np.ndarray,
     perf_i: int,
     perf_j: int
 ) -> Dict[int, float]:
     r"""
-    Shapley値の厳密計算
+    Shapley値の厳密計算（全部分集合の列挙）
+
+    変数レベルのゲームは加法的なので通常は compute_shapley_values_analytic を使う。
+    この関数は解析解の検証用として残している。
 
     φ_k = Σ_{S⊆Z\{k}} [|S|!(|Z|-|S|-1)!/|Z|!] × [C_ij(S∪{k}) - C_ij(S)]
 
@@ -223,6 +300,7 @@ def estimate_computation_cost(n_properties: int) -> Dict[str, Any]:
     # 大まかな時間見積もり（1サブセットあたり約0.01ms）
     estimated_time_ms = n_subsets * 0.01
 
+    # 列挙（method='exact'）のコスト。既定の 'analytic' は O(l) で常に低コスト
     if n_properties <= 10:
         warning = "low"
         recommendation = "exact"
@@ -258,7 +336,9 @@ def compute_shapley_for_performance_pair(
         T: 総効果行列 (n_perf × n_vars)
         perf_i, perf_j: 性能のインデックス
         property_ids: 属性IDのリスト（オプション）
-        method: 'exact', 'monte_carlo', 'auto'
+        method: 'analytic', 'exact', 'monte_carlo', 'auto'
+            'auto' は加法的ゲームの解析解 'analytic' を使う。
+            'exact'（全部分集合の列挙）は解析解の検証用
         n_monte_carlo_samples: Monte Carloのサンプル数
 
     Returns:
@@ -280,15 +360,15 @@ def compute_shapley_for_performance_pair(
     else:
         cos_theta = 0.0
 
-    # 計算方法の選択
+    # 計算方法の選択（C_ij(S) は加法的ゲームなので解析解が厳密）
     if method == "auto":
-        if n_vars <= 12:
-            method = "exact"
-        else:
-            method = "monte_carlo"
+        method = "analytic"
 
     # Shapley値の計算
-    if method == "exact":
+    if method == "analytic":
+        shapley_values = compute_shapley_values_analytic(T, perf_i, perf_j)
+        computation_method = "analytic"
+    elif method == "exact":
         shapley_values = compute_shapley_values_exact(T, perf_i, perf_j)
         computation_method = "exact"
     else:
@@ -375,8 +455,9 @@ def shapley_result_to_dict(
     }
 
 
-# キャッシュ付きの計算（同じ設計案内で繰り返し呼ばれる場合用）
-_shapley_cache: Dict[Tuple[int, int, int], ShapleyResult] = {}
+# キャッシュ付きの計算（同じ設計案内で繰り返し呼ばれる場合用、LRU で件数を制限）
+MAX_SHAPLEY_CACHE_ENTRIES = 1024
+_shapley_cache: "OrderedDict[Tuple, ShapleyResult]" = OrderedDict()
 
 
 def get_cached_shapley(
@@ -393,18 +474,25 @@ def get_cached_shapley(
         T: 総効果行列
         perf_i, perf_j: 性能インデックス
         cache_key: キャッシュキー（例: hash of network）
-        **kwargs: compute_shapley_for_performance_pair への引数
+        **kwargs: compute_shapley_for_performance_pair への引数（キーにも含める）
 
     Returns:
         ShapleyResult
     """
     if cache_key is not None:
-        key = (cache_key, perf_i, perf_j)
+        # property_ids などのリストはタプルにしてキーに含める
+        params = tuple(sorted(
+            (name, tuple(value) if isinstance(value, list) else value) for name, value in kwargs.items()
+        ))
+        key = (cache_key, perf_i, perf_j, params)
         if key in _shapley_cache:
+            _shapley_cache.move_to_end(key)
             return _shapley_cache[key]
 
         result = compute_shapley_for_performance_pair(T, perf_i, perf_j, **kwargs)
         _shapley_cache[key] = result
+        while len(_shapley_cache) > MAX_SHAPLEY_CACHE_ENTRIES:
+            _shapley_cache.popitem(last=False)
         return result
 
     return compute_shapley_for_performance_pair(T, perf_i, perf_j, **kwargs)
@@ -412,8 +500,7 @@ def get_cached_shapley(
 
 def clear_shapley_cache():
     """キャッシュをクリア"""
-    global _shapley_cache
-    _shapley_cache = {}
+    _shapley_cache.clear()
 
 
 def compute_all_pairwise_shapley(
@@ -421,34 +508,83 @@ def compute_all_pairwise_shapley(
     performance_names: Optional[List[str]] = None,
     property_names: Optional[List[str]] = None,
     method: str = "auto",
-    only_tradeoffs: bool = True
+    only_tradeoffs: bool = True,
+    n_workers: Optional[int] = 1,
+    time_budget_ms: Optional[float] = None,
+    schedule: Optional[PairScheduleStats] = None
 ) -> List[Dict[str, Any]]:
     """
     全ての性能ペアに対するShapley値を計算
 
+    'auto' / 'analytic' では C = T Tᵀ と要素積 T_ik × T_jk から全ペアを
+    O(P²·V) で一括計算する。それ以外の方法ではペアを shapley_parallel の
+    スケジューラでプロセス並列に計算する（T は共有メモリで各ワーカーに1回だけ渡す）。
+
     Args:
         T: 総効果行列 (n_perf × n_vars)
         performance_names: 性能名のリスト
         property_names: 属性名のリスト
         method: 計算方法
         only_tradeoffs: Trueの場合、トレードオフ関係（cos θ < 0）のみ
+        n_workers: ペア単位の並列ワーカー数（1で逐次、Noneで CPU 数）
+        time_budget_ms: 期限（ミリ秒）。超えた場合は完了したペアだけを返す
+        schedule: スケジューラの実行統計の書き込み先
 
     Returns:
         各ペアのShapley分解結果のリスト
     """
-    n_perf = T.shape[0]
+    n_perf, n_vars = T.shape
     results = []
 
-    for i in range(n_perf):
-        for j in range(i + 1, n_perf):
-            result = compute_shapley_for_performance_pair(T, i, j, method=method)
-
-            # トレードオフのみの場合、cos θ < 0 のペアだけを含める
-            if only_tradeoffs and result.cos_theta >= 0:
-                continue
+    if method in ("auto", "analytic"):
+        start_time = time.time()
+        T = np.asarray(T, dtype=float)
+        C = T @ T.T
+        norms = np.linalg.norm(T, axis=1)
+        denom = np.outer(norms, norms)
+        valid = np.outer(norms > 1e-10, norms > 1e-10)
+        cos_matrix = np.divide(C, denom, out=np.zeros_like(C), where=valid)
+        Phi = compute_shapley_matrix_analytic(T)
+
+        pairs = [
+            (i, j) for i in range(n_perf) for j in range(i + 1, n_perf)
+            if not (only_tradeoffs and cos_matrix[i, j] >= 0)
+        ]
+        elapsed_ms = (time.time() - start_time) * 1000
+        per_pair_ms = elapsed_ms / len(pairs) if pairs else 0.0
+
+        for i, j in pairs:
+            contributions = Phi[i, j]
+            result = ShapleyResult(
+                perf_i_idx=i,
+                perf_j_idx=j,
+                C_ij=float(C[i, j]),
+                cos_theta=float(cos_matrix[i, j]),
+                shapley_values={k: float(phi) for k, phi in enumerate(contributions)},
+                sum_check=float(contributions.sum()),
+                computation_method="analytic",
+                computation_time_ms=per_pair_ms,
+                n_properties=n_vars
+            )
+            results.append(shapley_result_to_dict(result, performance_names, property_names))
 
-            result_dict = shapley_result_to_dict(result, performance_names, property_names)
-            results.append(result_dict)
+        if schedule is not None:
+            schedule.n_pairs = schedule.n_completed = len(pairs)
+            schedule.elapsed_ms = elapsed_ms
+    else:
+        T = np.asarray(T, dtype=float)
+        pairs = [(i, j) for i in range(n_perf) for j in range(i + 1, n_perf)]
+        if only_tradeoffs:
+            # トレードオフのみの場合、cos θ < 0 のペアだけを計算する
+            pairs = [(i, j) for i, j in pairs if _pair_tradeoff_stats(T, i, j)[1] < 0]
+
+        pair_results, _ = collect_pair_results(
+            _property_shapley_chunk, {'T': T}, pairs, method,
+            n_workers=n_workers, time_budget_ms=time_budget_ms, stats=schedule
+        )
+        for pair in pairs:
+            if pair in pair_results:
+                results.append(shapley_result_to_dict(pair_results[pair], performance_names, property_names))
 
     # cos θ の絶対値でソート（強いトレードオフ/相乗効果を先に）
     results.sort(key=lambda x: -abs(x['cos_theta']))
@@ -559,8 +695,8 @@ def compute_tradeoff_with_node_subset(
                 if idx < B_PA.shape[1]:
                     B_PA[:, idx] = 0
 
-    # 総効果行列を計算
-    result = compute_total_effect_matrix(B_PA, B_AA, B_AV)
+    # 総効果行列を計算（部分集合評価では収束判定のみ必要なので ρ の上界で省略可）
+    result = compute_total_effect_matrix(B_PA, B_AA, B_AV, exact_spectral_radius=False)
     T = result['T']
 
     if T.size == 0:
@@ -581,58 +717,30 @@ def compute_node_shapley_values_exact(
     B_AV: np.ndarray,
     node_infos: List[NodeInfo],
     perf_i: int,
-    perf_j: int
+    perf_j: int,
+    n_workers: Optional[int] = 1
 ) -> Dict[str, float]:
-    """
+    r"""
     ノードShapley値の厳密計算（V ∪ A がプレイヤー）
 
     φ_k = Σ_{S⊆N\{k}} [|S|!(|N|-|S|-1)!/|N|!] × [C_ij(S∪{k}) - C_ij(S)]
 
+    ナル/対称プレイヤーを縮約したうえで、各提携の C_ij(S) を1回だけ評価した
+    価値テーブル（ビットマスクDP）から計算する。
+
     Args:
         B_PA, B_AA, B_AV: 行列
         node_infos: 全ノード情報
         perf_i, perf_j: 性能インデックス
+        n_workers: 価値テーブル評価の並列ワーカー数（1で逐次、Noneで自動）
 
     Returns:
         {node_id: shapley_value}
     """
-    all_node_ids = set(n.node_id for n in node_infos)
-    n = len(all_node_ids)
-
-    if n == 0:
-        return {}
-
-    factorial_n = math.factorial(n)
-    shapley_values = {}
-
-    for node in node_infos:
-        node_id = node.node_id
-        phi = 0.0
-        others = all_node_ids - {node_id}
-
-        for size in range(len(others) + 1):
-            for S in combinations(others, size):
-                S_set = set(S)
-                S_with_node = S_set | {node_id}
-
-                # 限界貢献
-                c_with = compute_tradeoff_with_node_subset(
-                    B_PA, B_AA, B_AV, node_infos, S_with_node, perf_i, perf_j
-                )
-                c_without = compute_tradeoff_with_node_subset(
-                    B_PA, B_AA, B_AV, node_infos, S_set, perf_i, perf_j
-                )
-                marginal = c_with - c_without
-
-                # Shapley係数
-                s = len(S_set)
-                coeff = math.factorial(s) * math.factorial(n - s - 1) / factorial_n
-
-                phi += coeff * marginal
-
-        shapley_values[node_id] = phi
-
-    return shapley_values
+    game = build_node_game(B_PA, B_AA, B_AV, node_infos)
+    reduction = reduce_game(game, [(perf_i, perf_j)])
+    phi = compute_reduced_exact_shapley(reduction, [(perf_i, perf_j)], n_workers)
+    return {pid: float(phi[k, 0]) for k, pid in enumerate(game.player_ids)}
 
 
 def compute_node_shapley_values_monte_carlo(
@@ -648,56 +756,22 @@ def compute_node_shapley_values_monte_carlo(
     """
     ノードShapley値のMonte Carlo近似（V ∪ A がプレイヤー）
 
+    順列を NumPy 配列として一括生成し、プレフィックスごとの総効果行列を
+    スタックした np.linalg.solve でまとめて解く。
+
     Args:
         B_PA, B_AA, B_AV: 行列
         node_infos: 全ノード情報
         perf_i, perf_j: 性能インデックス
         n_samples: サンプル数
-        seed: 乱数シード
+        seed: 乱数シード（np.random.Generator）
 
     Returns:
         {node_id: shapley_value}
     """
-    if seed is not None:
-        random.seed(seed)
-
-    all_node_ids = [n.node_id for n in node_infos]
-    n = len(all_node_ids)
-
-    if n == 0:
-        return {}
-
-    marginal_sums = {nid: 0.0 for nid in all_node_ids}
-    counts = {nid: 0 for nid in all_node_ids}
-
-    for _ in range(n_samples):
-        perm = all_node_ids.copy()
-        random.shuffle(perm)
-
-        S = set()
-        prev_value = 0.0
-
-        for node_id in perm:
-            S_with_node = S | {node_id}
-            curr_value = compute_tradeoff_with_node_subset(
-                B_PA, B_AA, B_AV, node_infos, S_with_node, perf_i, perf_j
-            )
-            marginal = curr_value - prev_value
-
-            marginal_sums[node_id] += marginal
-            counts[node_id] += 1
-
-            S = S_with_node
-            prev_value = curr_value
-
-    shapley_values = {}
-    for node_id in all_node_ids:
-        if counts[node_id] > 0:
-            shapley_values[node_id] = marginal_sums[node_id] / counts[node_id]
-        else:
-            shapley_values[node_id] = 0.0
-
-    return shapley_values
+    game = build_node_game(B_PA, B_AA, B_AV, node_infos)
+    phi = compute_monte_carlo_shapley_all_pairs(game, [(perf_i, perf_j)], n_samples, seed)
+    return {pid: float(phi[k, 0]) for k, pid in enumerate(game.player_ids)}
 
 
 def compute_node_shapley_for_performance_pair(
@@ -706,7 +780,10 @@ def compute_node_shapley_for_performance_pair(
     perf_i: int,
     perf_j: int,
     method: str = "auto",
-    n_monte_carlo_samples: int = 500
+    n_monte_carlo_samples: int = 500,
+    tolerance: Optional[float] = None,
+    time_budget_ms: Optional[float] = None,
+    sampling: str = "antithetic"
 ) -> NodeShapleyResult:
     """
     性能ペアに対するノードShapley値を計算（V ∪ A がプレイヤー）
@@ -715,8 +792,15 @@ def compute_node_shapley_for_performance_pair(
         network: ネットワーク構造
         matrices: build_adjacency_matrices()の結果
         perf_i, perf_j: 性能インデックス
-        method: 'exact', 'monte_carlo', 'auto'
-        n_monte_carlo_samples: Monte Carloサンプル数
+        method: 'path', 'exact', 'monte_carlo', 'adaptive', 'kernel', 'auto'
+            'auto' は非巡回なら経路単項式分解（'path'）、小規模なら厳密計算、
+            それ以外は tolerance / time_budget_ms の指定があれば 'adaptive'、
+            なければ縮約後のプレイヤー数が KERNEL_AUTO_MIN_PLAYERS 以上で 'kernel'（KernelSHAP）、
+            未満で 'monte_carlo'（'path' が適用できない場合も 'auto' と同じく選択する）
+        n_monte_carlo_samples: Monte Carloサンプル数（'monte_carlo' のみ）
+        tolerance: 'adaptive' の標準誤差の許容値（C_ij と同じ単位）
+        time_budget_ms: 'adaptive' の時間予算（ミリ秒）
+        sampling: 'adaptive' のサンプリング方式（'random' / 'antithetic' / 'stratified'）
 
     Returns:
         NodeShapleyResult
@@ -765,26 +849,332 @@ def compute_node_shapley_for_performance_pair(
     else:
         cos_theta = 0.0
 
-    # 計算方法の選択
+    # 計算方法の選択と計算（経路分解 → ナル/対称プレイヤーの縮約 → 厳密計算 / Monte Carlo）
+    game = build_node_game(B_PA, B_AA, B_AV, node_infos)
+    solution = _compute_game_shapley(
+        game, [(perf_i, perf_j)], method, n_monte_carlo_samples,
+        tolerance=tolerance, time_budget_ms=time_budget_ms, sampling=sampling
+    )
+    node_shapley_values = {
+        pid: float(solution.phi[k, 0]) for k, pid in enumerate(game.player_ids)
+    }
+    standard_errors = None
+    if solution.std_error is not None:
+        standard_errors = {
+            pid: float(solution.std_error[k, 0]) for k, pid in enumerate(game.player_ids)
+        }
+
+    sum_check = sum(node_shapley_values.values())
+    elapsed_ms = (time.time() - start_time) * 1000
+
+    return NodeShapleyResult(
+        perf_i_idx=perf_i,
+        perf_j_idx=perf_j,
+        C_ij=C_ij,
+        cos_theta=cos_theta,
+        node_shapley_values=node_shapley_values,
+        sum_check=sum_check,
+        computation_method=solution.method,
+        computation_time_ms=elapsed_ms,
+        n_nodes=n_nodes,
+        n_variables=n_variables,
+        n_attributes=n_attributes,
+        standard_errors=standard_errors,
+        n_samples=solution.n_samples,
+        stop_reason=solution.stop_reason,
+        pruning=solution.pruning
+    )
+
+
+@dataclass
+class _GameSolution:
+    """提携ゲームのShapley値の計算結果（ノード/エッジ共通）"""
+    phi: np.ndarray  # (n_players × ペア数)
+    method: str
+    std_error: Optional[np.ndarray] = None
+    n_samples: Optional[int] = None
+    stop_reason: Optional[str] = None
+    pruning: Optional[Dict[str, Any]] = None
+
+
+def _compute_game_shapley(
+    game,
+    pairs: List[Tuple[int, int]],
+    method: str,
+    n_monte_carlo_samples: int,
+    n_workers: Optional[int] = 1,
+    tolerance: Optional[float] = None,
+    time_budget_ms: Optional[float] = None,
+    sampling: str = "antithetic"
+) -> _GameSolution:
+    """
+    提携ゲームのShapley値（ノード/エッジ、単一/複数ペア共通）
+
+    非巡回なら経路単項式分解で計算する。それ以外はナルプレイヤーを除き
+    対称プレイヤーをまとめた縮約ゲームで、縮約後の価値テーブルの大きさから
+    厳密計算 / KernelSHAP / Monte Carlo を選ぶ（ナルプレイヤーは φ = 0）。
+
+    Returns:
+        _GameSolution
+    """
+    if method in ("auto", "path"):
+        path_phi = compute_path_shapley(game, pairs)
+        if path_phi is not None:
+            return _GameSolution(path_phi, "path")
+        method = "auto"
+
+    reduction = reduce_game(game, pairs)
+    table_size = reduction.table_size
     if method == "auto":
-        if n_nodes <= 8:
+        if table_size <= 1 << EXACT_AUTO_MAX_PLAYERS:
             method = "exact"
+        elif tolerance is not None or time_budget_ms is not None:
+            method = "adaptive"
+        elif reduction.core_game.n_players >= KERNEL_AUTO_MIN_PLAYERS:
+            method = "kernel"
         else:
             method = "monte_carlo"
+    elif method == "exact" and table_size > 1 << EXACT_TABLE_MAX_PLAYERS:
+        method = "monte_carlo"
 
-    # ノードShapley値の計算
+    pruning = reduction.to_dict()
     if method == "exact":
-        node_shapley_values = compute_node_shapley_values_exact(
-            B_PA, B_AA, B_AV, node_infos, perf_i, perf_j
+        phi = compute_reduced_exact_shapley(reduction, pairs, n_workers)
+        return _GameSolution(phi, "exact", pruning=pruning)
+    if method == "adaptive":
+        estimate = compute_adaptive_monte_carlo_shapley(
+            reduction.core_game, pairs,
+            tolerance=tolerance,
+            time_budget_ms=time_budget_ms,
+            sampling=sampling
         )
-        computation_method = "exact"
+        return _GameSolution(
+            reduction.expand(estimate.phi), "adaptive",
+            std_error=reduction.expand(estimate.std_error),
+            n_samples=estimate.n_samples,
+            stop_reason=estimate.stop_reason,
+            pruning=pruning
+        )
+    if method == "kernel":
+        estimate = compute_kernel_shapley(reduction.core_game, pairs)
+        return _GameSolution(
+            reduction.expand(estimate.phi), "kernel",
+            std_error=reduction.expand(estimate.std_error),
+            n_samples=estimate.n_samples,
+            stop_reason=estimate.stop_reason,
+            pruning=pruning
+        )
+    phi = compute_monte_carlo_shapley_all_pairs(reduction.core_game, pairs, n_monte_carlo_samples)
+    return _GameSolution(reduction.expand(phi), "monte_carlo", pruning=pruning)
+
+
+def _split_solution(solution: _GameSolution, n_pairs: int) -> List[_GameSolution]:
+    """複数ペアの計算結果をペアごとに分割"""
+    return [
+        _GameSolution(
+            phi=solution.phi[:, [p]],
+            method=solution.method,
+            std_error=None if solution.std_error is None else solution.std_error[:, [p]],
+            n_samples=solution.n_samples,
+            stop_reason=solution.stop_reason,
+            pruning=solution.pruning
+        )
+        for p in range(n_pairs)
+    ]
+
+
+def _property_shapley_chunk(arrays: Dict[str, np.ndarray], pairs: List[Tuple[int, int]], method: str):
+    """属性レベルのShapley値（ペアのチャンク、shapley_parallel のタスク）"""
+    return [compute_shapley_for_performance_pair(arrays['T'], i, j, method=method) for i, j in pairs]
+
+
+def _node_shapley_chunk(arrays: Dict[str, np.ndarray], pairs: List[Tuple[int, int]], payload):
+    """ノードShapley値（ペアのチャンク、shapley_parallel のタスク）"""
+    node_infos, method, n_monte_carlo_samples, n_workers = payload
+    game = build_node_game(arrays['B_PA'], arrays['B_AA'], arrays['B_AV'], node_infos)
+    solution = _compute_game_shapley(game, pairs, method, n_monte_carlo_samples, n_workers)
+    return _split_solution(solution, len(pairs))
+
+
+def _edge_shapley_chunk(arrays: Dict[str, np.ndarray], pairs: List[Tuple[int, int]], payload):
+    """エッジShapley値（ペアのチャンク、shapley_parallel のタスク）"""
+    edge_infos, method, n_monte_carlo_samples, n_workers = payload
+    game = build_edge_game(arrays['B_PA'], arrays['B_AA'], arrays['B_AV'], edge_infos)
+    solution = _compute_game_shapley(game, pairs, method, n_monte_carlo_samples, n_workers)
+    return _split_solution(solution, len(pairs))
+
+
+def _inner_workers(n_workers: Optional[int], n_pairs: int) -> Optional[int]:
+    """ペアを並列化する場合は各ワーカー内の厳密計算を逐次にする（プールを入れ子にしない）"""
+    if resolve_workers(n_workers) > 1 and n_pairs >= PARALLEL_MIN_PAIRS:
+        return 1
+    return n_workers
+
+
+def _pair_tradeoff_stats(T: np.ndarray, perf_i: int, perf_j: int) -> Tuple[float, float]:
+    """(C_ij, cos θ) を計算"""
+    T_i = T[perf_i, :]
+    T_j = T[perf_j, :]
+    C_ij = float(np.dot(T_i, T_j))
+
+    norm_i = np.linalg.norm(T_i)
+    norm_j = np.linalg.norm(T_j)
+    if norm_i > 1e-10 and norm_j > 1e-10:
+        cos_theta = C_ij / (norm_i * norm_j)
     else:
-        node_shapley_values = compute_node_shapley_values_monte_carlo(
-            B_PA, B_AA, B_AV, node_infos, perf_i, perf_j, n_monte_carlo_samples
+        cos_theta = 0.0
+    return C_ij, cos_theta
+
+
+def compute_node_shapley_all_pairs(
+    network: Dict,
+    matrices: Dict,
+    pairs: Optional[List[Tuple[int, int]]] = None,
+    method: str = "auto",
+    n_monte_carlo_samples: int = 500,
+    n_workers: Optional[int] = 1,
+    time_budget_ms: Optional[float] = None,
+    schedule: Optional[PairScheduleStats] = None
+) -> Dict[Tuple[int, int], NodeShapleyResult]:
+    """
+    複数の性能ペアに対するノードShapley値を一括計算（V ∪ A がプレイヤー）
+
+    提携ごとの総効果行列 T(S) から全ペアの C_ij(S) を同時に得るため、
+    ペアごとに compute_node_shapley_for_performance_pair を呼ぶ場合に比べ
+    求解回数がペア数分の1になる。
+
+    Args:
+        network: ネットワーク構造
+        matrices: build_adjacency_matrices()の結果
+        pairs: 性能インデックスのペア（Noneで全ペア i < j）
+        method: 'path', 'exact', 'monte_carlo', 'kernel', 'auto'（非巡回なら 'path'）
+        n_monte_carlo_samples: Monte Carloサンプル数
+        n_workers: 並列ワーカー数。ペアが PARALLEL_MIN_PAIRS 以上ならペアのチャンクを
+            プロセス並列に計算し、それ未満なら厳密計算の提携を並列化する
+        time_budget_ms: 期限（ミリ秒）。超えた場合は完了したペアだけを返す
+        schedule: スケジューラの実行統計の書き込み先
+
+    Returns:
+        {(perf_i, perf_j): NodeShapleyResult}（期限切れのペアは含まない）
+    """
+    from app.services.matrix_utils import compute_total_effect_matrix
+
+    start_time = time.time()
+
+    B_PA = matrices['B_PA']
+    B_AA = matrices['B_AA']
+    B_AV = matrices['B_AV']
+    n_perf = B_PA.shape[0]
+
+    if pairs is None:
+        pairs = [(i, j) for i in range(n_perf) for j in range(i + 1, n_perf)]
+    pairs = [(i, j) for i, j in pairs if i < n_perf and j < n_perf]
+    if not pairs:
+        return {}
+
+    node_infos = extract_node_info(network, matrices)
+    n_variables = sum(1 for n in node_infos if n.node_type == 'V')
+    n_attributes = sum(1 for n in node_infos if n.node_type == 'A')
+
+    T = compute_total_effect_matrix(B_PA, B_AA, B_AV)['T']
+
+    payload = (node_infos, method, n_monte_carlo_samples, _inner_workers(n_workers, len(pairs)))
+    solutions, _ = collect_pair_results(
+        _node_shapley_chunk, {'B_PA': B_PA, 'B_AA': B_AA, 'B_AV': B_AV}, pairs, payload,
+        n_workers=n_workers, time_budget_ms=time_budget_ms, stats=schedule
+    )
+    elapsed_ms = (time.time() - start_time) * 1000
+
+    results = {}
+    for i, j in pairs:
+        if (i, j) not in solutions:
+            continue
+        solution = solutions[(i, j)]
+        C_ij, cos_theta = _pair_tradeoff_stats(T, i, j)
+        node_shapley_values = {
+            node.node_id: float(solution.phi[k, 0]) for k, node in enumerate(node_infos)
+        }
+        results[(i, j)] = NodeShapleyResult(
+            perf_i_idx=i,
+            perf_j_idx=j,
+            C_ij=C_ij,
+            cos_theta=cos_theta,
+            node_shapley_values=node_shapley_values,
+            sum_check=sum(node_shapley_values.values()),
+            computation_method=solution.method,
+            computation_time_ms=elapsed_ms / len(pairs),
+            n_nodes=len(node_infos),
+            n_variables=n_variables,
+            n_attributes=n_attributes,
+            pruning=solution.pruning
         )
-        computation_method = "monte_carlo"
 
-    sum_check = sum(node_shapley_values.values())
+    return results
+
+
+def compute_node_owen_for_performance_pair(
+    network: Dict,
+    matrices: Dict,
+    perf_i: int,
+    perf_j: int,
+    grouping: str = "entity",
+    method: str = "auto",
+    n_monte_carlo_samples: int = 500
+) -> NodeShapleyResult:
+    """
+    性能ペアに対するノード寄与をグループ構造付きShapley値（Owen値）で計算
+
+    V ∪ A のノードを Layer 4 の実体（またはそのカテゴリ）ごとのグループにまとめ、
+    グループ間・グループ内をそれぞれ厳密に計算する（評価提携数 Σ_g 2^(m-1) × 2^|g|）。
+    Owen値も加法性 Σφ_k = C_ij を満たし、グループ内の和がグループの寄与になる。
+
+    Args:
+        network: ネットワーク構造
+        matrices: build_adjacency_matrices()の結果
+        perf_i, perf_j: 性能インデックス
+        grouping: 'entity' または 'category'
+        method: 'exact', 'monte_carlo', 'auto'（評価提携数が上限以下なら厳密計算）
+        n_monte_carlo_samples: Monte Carloサンプル数
+
+    Returns:
+        NodeShapleyResult（computation_method は 'owen' または 'owen_monte_carlo'）
+    """
+    from app.services.matrix_utils import compute_total_effect_matrix
+
+    start_time = time.time()
+
+    B_PA = matrices['B_PA']
+    B_AA = matrices['B_AA']
+    B_AV = matrices['B_AV']
+
+    node_infos = extract_node_info(network, matrices)
+    groups = build_node_groups(network, node_infos, B_AV, grouping)
+
+    T = compute_total_effect_matrix(B_PA, B_AA, B_AV)['T']
+    if T.size == 0 or perf_i >= T.shape[0] or perf_j >= T.shape[0]:
+        return NodeShapleyResult(
+            perf_i_idx=perf_i,
+            perf_j_idx=perf_j,
+            C_ij=0.0,
+            cos_theta=0.0,
+            node_shapley_values={},
+            sum_check=0.0,
+            computation_method="empty",
+            computation_time_ms=0.0,
+            n_nodes=0,
+            n_variables=0,
+            n_attributes=0
+        )
+
+    C_ij, cos_theta = _pair_tradeoff_stats(T, perf_i, perf_j)
+
+    game = build_node_game(B_PA, B_AA, B_AV, node_infos)
+    phi, owen_method, stats = compute_owen_values(
+        game, groups, [(perf_i, perf_j)], method, n_monte_carlo_samples
+    )
+    node_shapley_values = {
+        node.node_id: float(phi[k, 0]) for k, node in enumerate(node_infos)
+    }
     elapsed_ms = (time.time() - start_time) * 1000
 
     return NodeShapleyResult(
@@ -793,15 +1183,68 @@ def compute_node_shapley_for_performance_pair(
         C_ij=C_ij,
         cos_theta=cos_theta,
         node_shapley_values=node_shapley_values,
-        sum_check=sum_check,
-        computation_method=computation_method,
+        sum_check=sum(node_shapley_values.values()),
+        computation_method="owen" if owen_method == "exact" else "owen_monte_carlo",
         computation_time_ms=elapsed_ms,
-        n_nodes=n_nodes,
-        n_variables=n_variables,
-        n_attributes=n_attributes
+        n_nodes=len(node_infos),
+        n_variables=sum(1 for n in node_infos if n.node_type == 'V'),
+        n_attributes=sum(1 for n in node_infos if n.node_type == 'A'),
+        groups=[
+            {
+                "group_id": group.group_id,
+                "label": group.label,
+                "node_ids": [node_infos[k].node_id for k in group.members],
+            }
+            for group in groups
+        ],
+        grouping={"grouping": grouping, **stats}
     )
 
 
+def _confidence_interval(phi: float, std_error: Optional[float]) -> Dict[str, Any]:
+    """サンプリング推定（適応的 Monte Carlo / KernelSHAP など）の標準誤差と信頼区間（正規近似）"""
+    if std_error is None or not np.isfinite(std_error):
+        return {"std_error": None, "ci_lower": None, "ci_upper": None}
+    z = float(norm.ppf(0.5 + CONFIDENCE_LEVEL / 2))
+    return {
+        "std_error": std_error,
+        "ci_lower": phi - z * std_error,
+        "ci_upper": phi + z * std_error,
+    }
+
+
+def _adaptive_computation_info(result) -> Dict[str, Any]:
+    """適応的 Monte Carlo / KernelSHAP のサンプル数・停止情報（それ以外の計算方法では空）"""
+    if result.standard_errors is None:
+        return {}
+    finite = [se for se in result.standard_errors.values() if np.isfinite(se)]
+    return {
+        "n_samples": result.n_samples,
+        "stop_reason": result.stop_reason,
+        "max_std_error": max(finite) if finite else None,
+        "confidence_level": CONFIDENCE_LEVEL,
+    }
+
+
+def _pruning_computation_info(result) -> Dict[str, Any]:
+    """ナル/対称プレイヤーの縮約統計（'path' などでは空）"""
+    if result.pruning is None:
+        return {}
+    return {"pruning": result.pruning}
+
+
+def _owen_groups_info(result: NodeShapleyResult) -> Dict[str, Any]:
+    """Owen値のグループごとの寄与（グループ内の φ の和、Owen値以外では空）"""
+    if result.groups is None:
+        return {}
+    groups = []
+    for group in result.groups:
+        phi = sum(result.node_shapley_values.get(node_id, 0.0) for node_id in group["node_ids"])
+        groups.append({**group, "phi": phi, "abs_phi": abs(phi)})
+    groups.sort(key=lambda g: -g["abs_phi"])
+    return {"groups": groups}
+
+
 def node_shapley_result_to_dict(
     result: NodeShapleyResult,
     node_infos: List[NodeInfo],
@@ -842,6 +1285,8 @@ def node_shapley_result_to_dict(
             "percentage": percentage,
             "sign": "positive" if phi > 0 else ("negative" if phi < 0 else "neutral")
         })
+        if result.standard_errors is not None:
+            shapley_list[-1].update(_confidence_interval(phi, result.standard_errors.get(node_id)))
 
     return {
         "perf_i": {
@@ -863,7 +1308,178 @@ def node_shapley_result_to_dict(
             "n_nodes": result.n_nodes,
             "n_variables": result.n_variables,
             "n_attributes": result.n_attributes,
-            "time_ms": result.computation_time_ms
+            "time_ms": result.computation_time_ms,
+            **_adaptive_computation_info(result),
+            **_pruning_computation_info(result),
+            **({"grouping": result.grouping} if result.grouping is not None else {})
+        },
+        **_owen_groups_info(result)
+    }
+
+
+# =============================================================================
+# ノードペアのShapley相互作用指数
+# =============================================================================
+
+@dataclass
+class NodeInteractionResult:
+    """ノードペアのShapley相互作用指数の計算結果（V ∪ A がプレイヤー）"""
+    perf_i_idx: int
+    perf_j_idx: int
+    C_ij: float
+    cos_theta: float
+    node_ids: List[str]  # 行列の行・列の順
+    interactions: np.ndarray  # (n_nodes × n_nodes)、対称で対角は0
+    computation_method: str  # 'exact' / 'sampled'
+    computation_time_ms: float
+    standard_errors: Optional[np.ndarray] = None  # 'sampled' の場合のみ
+    stats: Optional[Dict[str, Any]] = None  # プレイヤー数・ナルプレイヤー数・サンプル数
+
+
+def compute_node_interactions_for_performance_pair(
+    network: Dict,
+    matrices: Dict,
+    perf_i: int,
+    perf_j: int,
+    method: str = "auto",
+    n_samples: Optional[int] = None
+) -> NodeInteractionResult:
+    """
+    性能ペアに対する全ノードペアのShapley相互作用指数を計算
+
+    各提携の C_ij(S) を1回ずつ評価し、その同じ評価から全ノードペアの I_kl を求める
+    （ノードペアごとに別の計算はしない）。I_kl > 0 は k と l が揃うと C_ij が増える
+    （補完的）、I_kl < 0 は一方があれば十分（代替的）であることを表す。
+
+    Args:
+        network: ネットワーク構造
+        matrices: build_adjacency_matrices()の結果
+        perf_i, perf_j: 性能インデックス
+        method: 'exact', 'sampled', 'auto'（ナルプレイヤー除去後が小規模なら厳密計算）
+        n_samples: 'sampled' で評価する提携数
+
+    Returns:
+        NodeInteractionResult
+    """
+    from app.services.matrix_utils import compute_total_effect_matrix
+
+    start_time = time.time()
+
+    B_PA = matrices['B_PA']
+    B_AA = matrices['B_AA']
+    B_AV = matrices['B_AV']
+
+    node_infos = extract_node_info(network, matrices)
+    node_ids = [n.node_id for n in node_infos]
+
+    T = compute_total_effect_matrix(B_PA, B_AA, B_AV)['T']
+    if T.size == 0 or perf_i >= T.shape[0] or perf_j >= T.shape[0]:
+        return NodeInteractionResult(
+            perf_i_idx=perf_i,
+            perf_j_idx=perf_j,
+            C_ij=0.0,
+            cos_theta=0.0,
+            node_ids=[],
+            interactions=np.zeros((0, 0)),
+            computation_method="empty",
+            computation_time_ms=0.0
+        )
+
+    C_ij, cos_theta = _pair_tradeoff_stats(T, perf_i, perf_j)
+
+    game = build_node_game(B_PA, B_AA, B_AV, node_infos)
+    interactions, std_error, interaction_method, stats = compute_interaction_index(
+        game, [(perf_i, perf_j)], method, n_samples
+    )
+    elapsed_ms = (time.time() - start_time) * 1000
+
+    return NodeInteractionResult(
+        perf_i_idx=perf_i,
+        perf_j_idx=perf_j,
+        C_ij=C_ij,
+        cos_theta=cos_theta,
+        node_ids=node_ids,
+        interactions=interactions[:, :, 0],
+        computation_method=interaction_method,
+        computation_time_ms=elapsed_ms,
+        standard_errors=None if std_error is None else std_error[:, :, 0],
+        stats=stats
+    )
+
+
+def node_interaction_result_to_dict(
+    result: NodeInteractionResult,
+    node_infos: List[NodeInfo],
+    performance_names: Optional[List[str]] = None,
+    top_k: int = 20
+) -> Dict[str, Any]:
+    """
+    NodeInteractionResultを辞書形式に変換（API用）
+
+    Args:
+        result: NodeInteractionResult
+        node_infos: ノード情報リスト
+        performance_names: 性能名のリスト
+        top_k: 絶対値の大きい順に返すノードペア数
+
+    Returns:
+        API用の辞書
+    """
+    perf_i_name = performance_names[result.perf_i_idx] if performance_names else f"P{result.perf_i_idx}"
+    perf_j_name = performance_names[result.perf_j_idx] if performance_names else f"P{result.perf_j_idx}"
+
+    node_map = {n.node_id: n for n in node_infos}
+
+    def node_entry(node_id: str) -> Dict[str, Any]:
+        node = node_map.get(node_id)
+        return {
+            "node_id": node_id,
+            "node_label": node.node_label if node else node_id,
+            "node_type": node.node_type if node else "?",
+            "layer": node.layer if node else 0,
+        }
+
+    # 上三角のノードペアを相互作用の絶対値でソート
+    n = len(result.node_ids)
+    rows, cols = np.triu_indices(n, k=1)
+    order = np.argsort(-np.abs(result.interactions[rows, cols]), kind='stable')
+    top_pairs = []
+    for idx in order[:max(top_k, 0)]:
+        k, l = int(rows[idx]), int(cols[idx])
+        value = float(result.interactions[k, l])
+        if value == 0.0:
+            break
+        top_pairs.append({
+            "node_a": node_entry(result.node_ids[k]),
+            "node_b": node_entry(result.node_ids[l]),
+            "interaction": value,
+            "abs_interaction": abs(value),
+            "sign": "complementary" if value > 0 else "substitutive",
+        })
+        if result.standard_errors is not None:
+            top_pairs[-1].update(_confidence_interval(value, float(result.standard_errors[k, l])))
+
+    return {
+        "perf_i": {
+            "idx": result.perf_i_idx,
+            "name": perf_i_name
+        },
+        "perf_j": {
+            "idx": result.perf_j_idx,
+            "name": perf_j_name
+        },
+        "C_ij": result.C_ij,
+        "cos_theta": result.cos_theta,
+        "relationship": "tradeoff" if result.cos_theta < -0.1 else ("synergy" if result.cos_theta > 0.1 else "neutral"),
+        "nodes": [node_entry(node_id) for node_id in result.node_ids],
+        "interaction_matrix": result.interactions.tolist(),
+        "top_interactions": top_pairs,
+        "computation": {
+            "method": result.computation_method,
+            "n_nodes": n,
+            "time_ms": result.computation_time_ms,
+            **(result.stats or {}),
+            **({"confidence_level": CONFIDENCE_LEVEL} if result.standard_errors is not None else {})
         }
     }
 
@@ -897,6 +1513,12 @@ class EdgeShapleyResult:
     computation_method: str
     computation_time_ms: float
     n_edges: int
+    # 適応的 Monte Carlo / KernelSHAP の場合のみ
+    standard_errors: Optional[Dict[str, float]] = None  # edge_id -> 標準誤差
+    n_samples: Optional[int] = None  # 評価した順列数（KernelSHAP は提携数）
+    stop_reason: Optional[str] = None  # 'tolerance' / 'time_budget' / 'max_samples'
+    # ナル/対称プレイヤーの縮約統計（'path' 以外）
+    pruning: Optional[Dict[str, Any]] = None
 
 
 def extract_edge_info(
@@ -1017,8 +1639,8 @@ def compute_tradeoff_with_edge_subset(
             elif edge.edge_type == 'AV':
                 B_AV[row, col] = edge.weight
 
-    # 総効果行列を計算
-    result = compute_total_effect_matrix(B_PA, B_AA, B_AV)
+    # 総効果行列を計算（部分集合評価では収束判定のみ必要なので ρ の上界で省略可）
+    result = compute_total_effect_matrix(B_PA, B_AA, B_AV, exact_spectral_radius=False)
     T = result['T']
 
     if T.size == 0:
@@ -1039,58 +1661,30 @@ def compute_edge_shapley_values_exact(
     B_AV: np.ndarray,
     edge_infos: List[EdgeInfo],
     perf_i: int,
-    perf_j: int
+    perf_j: int,
+    n_workers: Optional[int] = 1
 ) -> Dict[str, float]:
-    """
+    r"""
     エッジShapley値の厳密計算
 
     φ_e = Σ_{S⊆E\{e}} [|S|!(|E|-|S|-1)!/|E|!] × [C_ij(S∪{e}) - C_ij(S)]
 
+    ナル/対称プレイヤーを縮約したうえで、各提携の C_ij(S) を1回だけ評価した
+    価値テーブル（ビットマスクDP）から計算する。
+
     Args:
         B_PA, B_AA, B_AV: 元の行列
         edge_infos: 全エッジ情報
         perf_i, perf_j: 性能インデックス
+        n_workers: 価値テーブル評価の並列ワーカー数（1で逐次、Noneで自動）
 
     Returns:
         {edge_id: shapley_value}
     """
-    all_edge_ids = set(e.edge_id for e in edge_infos)
-    n = len(all_edge_ids)
-
-    if n == 0:
-        return {}
-
-    factorial_n = math.factorial(n)
-    shapley_values = {}
-
-    for edge in edge_infos:
-        edge_id = edge.edge_id
-        phi_e = 0.0
-        others = all_edge_ids - {edge_id}
-
-        for size in range(len(others) + 1):
-            for S in combinations(others, size):
-                S_set = set(S)
-                S_with_e = S_set | {edge_id}
-
-                # 限界貢献
-                c_with_e = compute_tradeoff_with_edge_subset(
-                    B_PA, B_AA, B_AV, edge_infos, S_with_e, perf_i, perf_j
-                )
-                c_without_e = compute_tradeoff_with_edge_subset(
-                    B_PA, B_AA, B_AV, edge_infos, S_set, perf_i, perf_j
-                )
-                marginal = c_with_e - c_without_e
-
-                # Shapley係数
-                s = len(S_set)
-                coeff = math.factorial(s) * math.factorial(n - s - 1) / factorial_n
-
-                phi_e += coeff * marginal
-
-        shapley_values[edge_id] = phi_e
-
-    return shapley_values
+    game = build_edge_game(B_PA, B_AA, B_AV, edge_infos)
+    reduction = reduce_game(game, [(perf_i, perf_j)])
+    phi = compute_reduced_exact_shapley(reduction, [(perf_i, perf_j)], n_workers)
+    return {pid: float(phi[k, 0]) for k, pid in enumerate(game.player_ids)}
 
 
 def compute_edge_shapley_values_monte_carlo(
@@ -1106,56 +1700,22 @@ def compute_edge_shapley_values_monte_carlo(
     """
     エッジShapley値のMonte Carlo近似
 
+    順列を NumPy 配列として一括生成し、プレフィックスごとの総効果行列を
+    スタックした np.linalg.solve でまとめて解く。
+
     Args:
         B_PA, B_AA, B_AV: 元の行列
         edge_infos: 全エッジ情報
         perf_i, perf_j: 性能インデックス
         n_samples: サンプル数
-        seed: 乱数シード
+        seed: 乱数シード（np.random.Generator）
 
     Returns:
         {edge_id: shapley_value}
     """
-    if seed is not None:
-        random.seed(seed)
-
-    all_edge_ids = [e.edge_id for e in edge_infos]
-    n = len(all_edge_ids)
-
-    if n == 0:
-        return {}
-
-    marginal_sums = {eid: 0.0 for eid in all_edge_ids}
-    counts = {eid: 0 for eid in all_edge_ids}
-
-    for _ in range(n_samples):
-        perm = all_edge_ids.copy()
-        random.shuffle(perm)
-
-        S = set()
-        prev_value = 0.0
-
-        for edge_id in perm:
-            S_with_e = S | {edge_id}
-            curr_value = compute_tradeoff_with_edge_subset(
-                B_PA, B_AA, B_AV, edge_infos, S_with_e, perf_i, perf_j
-            )
-            marginal = curr_value - prev_value
-
-            marginal_sums[edge_id] += marginal
-            counts[edge_id] += 1
-
-            S = S_with_e
-            prev_value = curr_value
-
-    shapley_values = {}
-    for edge_id in all_edge_ids:
-        if counts[edge_id] > 0:
-            shapley_values[edge_id] = marginal_sums[edge_id] / counts[edge_id]
-        else:
-            shapley_values[edge_id] = 0.0
-
-    return shapley_values
+    game = build_edge_game(B_PA, B_AA, B_AV, edge_infos)
+    phi = compute_monte_carlo_shapley_all_pairs(game, [(perf_i, perf_j)], n_samples, seed)
+    return {pid: float(phi[k, 0]) for k, pid in enumerate(game.player_ids)}
 
 
 def compute_edge_shapley_for_performance_pair(
@@ -1165,7 +1725,10 @@ def compute_edge_shapley_for_performance_pair(
     perf_j: int,
     weight_mode: str = 'discrete_7',
     method: str = "auto",
-    n_monte_carlo_samples: int = 500
+    n_monte_carlo_samples: int = 500,
+    tolerance: Optional[float] = None,
+    time_budget_ms: Optional[float] = None,
+    sampling: str = "antithetic"
 ) -> EdgeShapleyResult:
     """
     性能ペアに対するエッジShapley値を計算
@@ -1175,8 +1738,15 @@ def compute_edge_shapley_for_performance_pair(
         matrices: build_adjacency_matrices()の結果
         perf_i, perf_j: 性能インデックス
         weight_mode: 重みモード
-        method: 'exact', 'monte_carlo', 'auto'
-        n_monte_carlo_samples: Monte Carloサンプル数
+        method: 'path', 'exact', 'monte_carlo', 'adaptive', 'kernel', 'auto'
+            'auto' は非巡回なら経路単項式分解（'path'）、小規模なら厳密計算、
+            それ以外は tolerance / time_budget_ms の指定があれば 'adaptive'、
+            なければ縮約後のプレイヤー数が KERNEL_AUTO_MIN_PLAYERS 以上で 'kernel'（KernelSHAP）、
+            未満で 'monte_carlo'（'path' が適用できない場合も 'auto' と同じく選択する）
+        n_monte_carlo_samples: Monte Carloサンプル数（'monte_carlo' のみ）
+        tolerance: 'adaptive' の標準誤差の許容値（C_ij と同じ単位）
+        time_budget_ms: 'adaptive' の時間予算（ミリ秒）
+        sampling: 'adaptive' のサンプリング方式（'random' / 'antithetic' / 'stratified'）
 
     Returns:
         EdgeShapleyResult
@@ -1221,24 +1791,20 @@ def compute_edge_shapley_for_performance_pair(
     else:
         cos_theta = 0.0
 
-    # 計算方法の選択
-    if method == "auto":
-        if n_edges <= 10:
-            method = "exact"
-        else:
-            method = "monte_carlo"
-
-    # エッジShapley値の計算
-    if method == "exact":
-        edge_shapley_values = compute_edge_shapley_values_exact(
-            B_PA, B_AA, B_AV, edge_infos, perf_i, perf_j
-        )
-        computation_method = "exact"
-    else:
-        edge_shapley_values = compute_edge_shapley_values_monte_carlo(
-            B_PA, B_AA, B_AV, edge_infos, perf_i, perf_j, n_monte_carlo_samples
-        )
-        computation_method = "monte_carlo"
+    # 計算方法の選択と計算（経路分解 → ナル/対称プレイヤーの縮約 → 厳密計算 / Monte Carlo）
+    game = build_edge_game(B_PA, B_AA, B_AV, edge_infos)
+    solution = _compute_game_shapley(
+        game, [(perf_i, perf_j)], method, n_monte_carlo_samples,
+        tolerance=tolerance, time_budget_ms=time_budget_ms, sampling=sampling
+    )
+    edge_shapley_values = {
+        pid: float(solution.phi[k, 0]) for k, pid in enumerate(game.player_ids)
+    }
+    standard_errors = None
+    if solution.std_error is not None:
+        standard_errors = {
+            pid: float(solution.std_error[k, 0]) for k, pid in enumerate(game.player_ids)
+        }
 
     sum_check = sum(edge_shapley_values.values())
     elapsed_ms = (time.time() - start_time) * 1000
@@ -1250,12 +1816,96 @@ def compute_edge_shapley_for_performance_pair(
         cos_theta=cos_theta,
         edge_shapley_values=edge_shapley_values,
         sum_check=sum_check,
-        computation_method=computation_method,
+        computation_method=solution.method,
         computation_time_ms=elapsed_ms,
-        n_edges=n_edges
+        n_edges=n_edges,
+        standard_errors=standard_errors,
+        n_samples=solution.n_samples,
+        stop_reason=solution.stop_reason,
+        pruning=solution.pruning
     )
 
 
+def compute_edge_shapley_all_pairs(
+    network: Dict,
+    matrices: Dict,
+    pairs: Optional[List[Tuple[int, int]]] = None,
+    weight_mode: str = 'discrete_7',
+    method: str = "auto",
+    n_monte_carlo_samples: int = 500,
+    n_workers: Optional[int] = 1,
+    time_budget_ms: Optional[float] = None,
+    schedule: Optional[PairScheduleStats] = None
+) -> Dict[Tuple[int, int], EdgeShapleyResult]:
+    """
+    複数の性能ペアに対するエッジShapley値を一括計算
+
+    Args:
+        network: ネットワーク構造
+        matrices: build_adjacency_matrices()の結果
+        pairs: 性能インデックスのペア（Noneで全ペア i < j）
+        weight_mode: 重みモード
+        method: 'path', 'exact', 'monte_carlo', 'kernel', 'auto'（非巡回なら 'path'）
+        n_monte_carlo_samples: Monte Carloサンプル数
+        n_workers: 並列ワーカー数。ペアが PARALLEL_MIN_PAIRS 以上ならペアのチャンクを
+            プロセス並列に計算し、それ未満なら厳密計算の提携を並列化する
+        time_budget_ms: 期限（ミリ秒）。超えた場合は完了したペアだけを返す
+        schedule: スケジューラの実行統計の書き込み先
+
+    Returns:
+        {(perf_i, perf_j): EdgeShapleyResult}（期限切れのペアは含まない）
+    """
+    from app.services.matrix_utils import compute_total_effect_matrix
+
+    start_time = time.time()
+
+    B_PA = matrices['B_PA']
+    B_AA = matrices['B_AA']
+    B_AV = matrices['B_AV']
+    n_perf = B_PA.shape[0]
+
+    if pairs is None:
+        pairs = [(i, j) for i in range(n_perf) for j in range(i + 1, n_perf)]
+    pairs = [(i, j) for i, j in pairs if i < n_perf and j < n_perf]
+    if not pairs:
+        return {}
+
+    edge_infos = extract_edge_info(network, matrices, weight_mode)
+
+    T = compute_total_effect_matrix(B_PA, B_AA, B_AV)['T']
+
+    payload = (edge_infos, method, n_monte_carlo_samples, _inner_workers(n_workers, len(pairs)))
+    solutions, _ = collect_pair_results(
+        _edge_shapley_chunk, {'B_PA': B_PA, 'B_AA': B_AA, 'B_AV': B_AV}, pairs, payload,
+        n_workers=n_workers, time_budget_ms=time_budget_ms, stats=schedule
+    )
+    elapsed_ms = (time.time() - start_time) * 1000
+
+    results = {}
+    for i, j in pairs:
+        if (i, j) not in solutions:
+            continue
+        solution = solutions[(i, j)]
+        C_ij, cos_theta = _pair_tradeoff_stats(T, i, j)
+        edge_shapley_values = {
+            edge.edge_id: float(solution.phi[k, 0]) for k, edge in enumerate(edge_infos)
+        }
+        results[(i, j)] = EdgeShapleyResult(
+            perf_i_idx=i,
+            perf_j_idx=j,
+            C_ij=C_ij,
+            cos_theta=cos_theta,
+            edge_shapley_values=edge_shapley_values,
+            sum_check=sum(edge_shapley_values.values()),
+            computation_method=solution.method,
+            computation_time_ms=elapsed_ms / len(pairs),
+            n_edges=len(edge_infos),
+            pruning=solution.pruning
+        )
+
+    return results
+
+
 def edge_shapley_result_to_dict(
     result: EdgeShapleyResult,
     edge_infos: List[EdgeInfo],
@@ -1299,6 +1949,8 @@ def edge_shapley_result_to_dict(
             "percentage": percentage,
             "sign": "positive" if phi > 0 else ("negative" if phi < 0 else "neutral")
         })
+        if result.standard_errors is not None:
+            shapley_list[-1].update(_confidence_interval(phi, result.standard_errors.get(edge_id)))
 
     return {
         "perf_i": {
@@ -1318,6 +1970,8 @@ def edge_shapley_result_to_dict(
         "computation": {
             "method": result.computation_method,
             "n_edges": result.n_edges,
-            "time_ms": result.computation_time_ms
+            "time_ms": result.computation_time_ms,
+            **_adaptive_computation_info(result),
+            **_pruning_computation_info(result)
         }
     }
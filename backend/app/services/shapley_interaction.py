@@ -0,0 +1,300 @@
+# backend/app/services/shapley_interaction.py
+"""
+Shapley相互作用指数によるノードペアの共同寄与の分解
+
+プレイヤー k, l の相互作用指数（Grabisch 1997）
+
+    I_kl = Σ_{S ⊆ N\\{k,l}} [s!(n-s-2)!/(n-1)!] × [v(S∪{k,l}) - v(S∪{k}) - v(S∪{l}) + v(S)]
+
+は、k と l が同時に存在することで C_ij がどれだけ増減するかを表す
+（正: 補完的、負: 代替的）。φ の絶対値の比較と異なり、どのノードの組が
+トレードオフを共同で生んでいるかを直接示す。
+
+各提携の価値を1回ずつ評価すれば全ペアの I_kl が得られる:
+- 厳密計算: 部分集合価値テーブル（shapley_subset_table）から全ペアを計算
+- サンプリング: I_kl = Σ_T c_kl(T) v(T) と書き直し、大きさ一様・提携一様に抽出した
+  提携 T の価値から全ペアを同時に不偏推定する（係数 c_kl(T) は k, l が T に
+  両方含まれる / 片方だけ / どちらも含まれないかで決まる）。
+  加法的なゲームの相互作用は0なので、v(T) から |T| の線形関数を引いて分散を下げる。
+"""
+
+import itertools
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .shapley_subset_table import (
+    CoalitionGame,
+    EXACT_TABLE_MAX_PLAYERS,
+    compute_subset_gram_table,
+    evaluate_coalitions,
+)
+from .shapley_pruning import reduce_game
+
+
+# method='auto' で厳密計算を選ぶ（ナルプレイヤー除去後の）プレイヤー数の上限
+INTERACTION_AUTO_MAX_PLAYERS = 14
+
+# サンプリングの既定の提携数
+INTERACTION_DEFAULT_SAMPLES = 4000
+
+
+def interaction_from_value_table(values: np.ndarray, n_players: int) -> np.ndarray:
+    """
+    価値テーブルから全ペアのShapley相互作用指数を計算
+
+    Args:
+        values: 価値テーブル (2^n,) または全ペアの価値テーブル (2^n × ペア数)
+        n_players: プレイヤー数 n
+
+    Returns:
+        I (n × n) または (n × n × ペア数)、対称で対角は0
+    """
+    n = n_players
+    interactions = np.zeros((n, n) + values.shape[1:])
+    if n < 2:
+        return interactions
+
+    masks = np.arange(1 << n, dtype=np.int64)
+    sizes = np.zeros(1 << n, dtype=np.int64)
+    for bit in range(n):
+        sizes += (masks >> bit) & 1
+    weights = np.exp(_log_interaction_weights(n))
+
+    for k in range(n):
+        for l in range(k + 1, n):
+            both = (1 << k) | (1 << l)
+            without = masks[(masks & both) == 0]
+            delta = (values[without | both] - values[without | (1 << k)]
+                     - values[without | (1 << l)] + values[without])
+            interactions[k, l] = interactions[l, k] = weights[sizes[without]] @ delta
+
+    return interactions
+
+
+def compute_exact_interactions(
+    game: CoalitionGame,
+    pairs: Sequence[Tuple[int, int]],
+    n_workers: Optional[int] = 1
+) -> np.ndarray:
+    """
+    全提携の価値テーブルからShapley相互作用指数を厳密計算
+
+    Args:
+        game: CoalitionGame（プレイヤー数 ≤ EXACT_TABLE_MAX_PLAYERS）
+        pairs: 性能インデックスのペア [(i, j), ...]
+        n_workers: 並列ワーカー数
+
+    Returns:
+        I (n_players × n_players × ペア数)
+    """
+    pairs = list(pairs)
+    n = game.n_players
+    if n < 2 or not pairs:
+        return np.zeros((n, n, len(pairs)))
+    values = compute_subset_gram_table(game, pairs, n_workers)
+    return interaction_from_value_table(values, n)
+
+
+def compute_sampled_interactions(
+    game: CoalitionGame,
+    pairs: Sequence[Tuple[int, int]],
+    n_samples: int = INTERACTION_DEFAULT_SAMPLES,
+    seed: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    抽出した提携の価値から全ペアのShapley相互作用指数を同時に不偏推定
+
+    I_kl = Σ_T c_kl(T) [v(T) - b(|T|)] の各項は全ペア (k, l) について同時に得られ、
+    その和は提携のブール行列 Z の行列積で求まる。
+
+    - 提携数の少ない両端の大きさ（t = 1, n-1, 2, n-2, ...）は予算の半分まで全提携を評価する
+      （予算が全提携数以上なら全て評価し、厳密値になる）
+    - 残りの大きさ t は一様に、その大きさの提携を一様に抽出する
+      （q(T) = 1 / (大きさの種類数 × C(n,t)) で重み付け）
+    - t = 0, n の提携は b で厳密に打ち消されるため評価しない
+
+    Args:
+        game: CoalitionGame
+        pairs: 性能インデックスのペア [(i, j), ...]
+        n_samples: 評価する提携数の予算
+        seed: 乱数シード
+
+    Returns:
+        (I (n × n × ペア数), 標準誤差 (n × n × ペア数)。全提携を評価した場合は0)
+    """
+    pairs = list(pairs)
+    n = game.n_players
+    n_pairs = len(pairs)
+    if n < 2 or not pairs:
+        empty = np.zeros((n, n, n_pairs))
+        return empty, empty.copy()
+
+    exact_sizes, sampled_sizes = _split_sizes(n, n_samples)
+    Z_exact = np.zeros((0, n), dtype=bool)
+    if exact_sizes:
+        Z_exact = np.array([
+            [k in members for k in range(n)]
+            for t in exact_sizes for members in itertools.combinations(range(n), t)
+        ], dtype=bool)
+
+    n_sampled = max(n_samples - len(Z_exact), 0) if sampled_sizes else 0
+    rng = np.random.default_rng(seed)
+    t_sampled = rng.choice(np.array(sampled_sizes or [1], dtype=np.int64), size=n_sampled)
+    ranks = np.argsort(rng.random((n_sampled, n)), axis=1).argsort(axis=1)
+    Z = np.concatenate([Z_exact, ranks < t_sampled[:, None]])
+    t = Z.sum(axis=1)
+
+    bounds = evaluate_coalitions(game, np.array([np.zeros(n, dtype=bool), np.ones(n, dtype=bool)]), pairs)
+    values = evaluate_coalitions(game, Z, pairs)
+    residual = values - (bounds[0] + np.outer(t / n, bounds[1] - bounds[0]))
+
+    # 行ごとの重み 1/q(T)（全提携を評価した大きさは1、抽出した提携は 種類数 × C(n,t) / 抽出数）
+    log_scale = np.zeros(len(Z))
+    if n_sampled:
+        log_scale[len(Z_exact):] = (
+            math.log(len(sampled_sizes) / n_sampled)
+            + np.array([_log_comb(n, size) for size in t_sampled])
+        )
+
+    # c_kl(T): 両方含む w(t-2)、どちらも含まない w(t)、片方だけ -w(t-1)
+    log_w = _log_interaction_weights(n)
+
+    def coefficient(offset: int) -> np.ndarray:
+        s = t - offset
+        valid = (s >= 0) & (s <= n - 2)
+        coef = np.zeros(len(Z))
+        coef[valid] = np.exp(log_scale[valid] + log_w[s[valid]])
+        return coef
+
+    coef_both, coef_none, coef_mixed = coefficient(2), coefficient(0), coefficient(1)
+    Zf = Z.astype(float)
+    Yf = 1.0 - Zf
+
+    def weighted_sum(rows: slice, g: np.ndarray, c_both, c_none, c_mixed) -> np.ndarray:
+        """Σ_T g(T) × [両方含む: c_both / どちらも含まない: c_none / 片方だけ: c_mixed]"""
+        Zr, Yr = Zf[rows], Yf[rows]
+        result = np.empty((n, n, n_pairs))
+        for p in range(n_pairs):
+            both = Zr.T @ (Zr * (g[:, p] * c_both[rows])[:, None])
+            none = Yr.T @ (Yr * (g[:, p] * c_none[rows])[:, None])
+            mixed = Zr.T @ (Yr * (g[:, p] * c_mixed[rows])[:, None])
+            result[:, :, p] = both + none + mixed + mixed.T
+        return result
+
+    interactions = weighted_sum(slice(None), residual, coef_both, coef_none, -coef_mixed)
+
+    # 標準誤差は抽出した提携ごとの観測（行の項 × 抽出数、その平均が抽出部分の推定値）の分散から
+    # （各 (k, l) ではどれか1つの係数だけが効くので、2乗和も係数を2乗して同じ形で求める）
+    std_error = np.zeros_like(interactions)
+    if n_sampled > 1:
+        rows = slice(len(Z_exact), None)
+        sampled_residual = residual[rows]
+        mean = weighted_sum(rows, sampled_residual, coef_both, coef_none, -coef_mixed)
+        sum_sq = weighted_sum(rows, sampled_residual ** 2, coef_both ** 2, coef_none ** 2, coef_mixed ** 2)
+        sum_sq *= n_sampled ** 2
+        variance = np.maximum(sum_sq - mean ** 2 * n_sampled, 0.0) / (n_sampled - 1)
+        std_error = np.sqrt(variance / n_sampled)
+
+    diagonal = np.arange(n)
+    interactions[diagonal, diagonal] = 0.0
+    std_error[diagonal, diagonal] = 0.0
+    return interactions, std_error
+
+
+def compute_interaction_index(
+    game: CoalitionGame,
+    pairs: Sequence[Tuple[int, int]],
+    method: str = 'auto',
+    n_samples: Optional[int] = None
+) -> Tuple[np.ndarray, Optional[np.ndarray], str, Dict[str, Any]]:
+    """
+    ナルプレイヤーを除いたうえでShapley相互作用指数を計算
+
+    ナルプレイヤーを含むペアの相互作用は0なので、コアプレイヤーだけで計算して戻す。
+
+    Args:
+        game: CoalitionGame
+        pairs: 性能インデックスのペア [(i, j), ...]
+        method: 'exact', 'sampled', 'auto'（コアのプレイヤー数が上限以下なら厳密計算）
+        n_samples: 'sampled' の提携数（Noneで INTERACTION_DEFAULT_SAMPLES）
+
+    Returns:
+        (I (n × n × ペア数), 標準誤差（厳密計算では None）, 使用した計算方法, 統計)
+    """
+    pairs = list(pairs)
+    reduction = reduce_game(game, pairs)
+    core = reduction.core_game
+    n_core = core.n_players
+
+    if method == 'auto':
+        method = 'exact' if n_core <= INTERACTION_AUTO_MAX_PLAYERS else 'sampled'
+    if method == 'exact' and n_core > EXACT_TABLE_MAX_PLAYERS:
+        method = 'sampled'
+    if n_samples is None:
+        n_samples = INTERACTION_DEFAULT_SAMPLES
+
+    std_core = None
+    if method == 'exact':
+        core_interactions = compute_exact_interactions(core, pairs)
+    else:
+        core_interactions, std_core = compute_sampled_interactions(core, pairs, n_samples)
+
+    n = game.n_players
+    index = np.ix_(reduction.core_players, reduction.core_players)
+    interactions = np.zeros((n, n, len(pairs)))
+    interactions[index] = core_interactions
+    std_error = None
+    if std_core is not None:
+        std_error = np.zeros_like(interactions)
+        std_error[index] = std_core
+
+    stats = {
+        "n_players": n,
+        "n_core_players": n_core,
+        "n_null_players": reduction.n_null_players,
+        "null_pruning": reduction.null_pruning,
+        "n_samples": n_samples if method == 'sampled' else None,
+    }
+    return interactions, std_error, method, stats
+
+
+# =============================================================================
+# 内部関数
+# =============================================================================
+
+def _log_interaction_weights(n: int) -> np.ndarray:
+    """log w(s) = log[s!(n-s-2)!/(n-1)!]（s = 0, ..., n-2）"""
+    s = np.arange(max(n - 1, 0))
+    return np.array([
+        math.lgamma(k + 1) + math.lgamma(n - k - 1) - math.lgamma(n) for k in s
+    ])
+
+
+def _split_sizes(n: int, budget: int) -> Tuple[List[int], List[int]]:
+    """
+    提携の大きさ 1, ..., n-1 を、全提携を評価する両端と抽出する中間に分ける
+
+    全提携数 2^n - 2 が予算以下なら全て全評価とし、それ以外は両端から (t, n-t) の組で
+    全提携数の累計が予算の半分以下の間だけ全評価とする。
+    """
+    if (1 << n) - 2 <= budget:
+        return list(range(1, n)), []
+    exact: List[int] = []
+    used = 0
+    lower, upper = 1, n - 1
+    while lower <= upper:
+        sizes = [lower] if lower == upper else [lower, upper]
+        count = sum(math.comb(n, size) for size in sizes)
+        if used + count > budget // 2:
+            break
+        exact.extend(sizes)
+        used += count
+        lower, upper = lower + 1, upper - 1
+    return sorted(exact), list(range(lower, upper + 1))
+
+
+def _log_comb(n: int, k: int) -> float:
+    """log C(n, k)"""
+    return math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
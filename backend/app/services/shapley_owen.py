@@ -0,0 +1,314 @@
+# backend/app/services/shapley_owen.py
+"""
+グループ構造付きShapley値（Owen値）によるノード寄与の階層的分解
+
+V ∪ A のノードを Layer 4 の実体（Entity: Object / Environment）ごと、
+またはそのカテゴリごとのグループにまとめ、
+
+    φ_k = Σ_{R ⊆ M\\{g}} [r!(m-r-1)!/m!] Σ_{T ⊆ g\\{k}} [t!(|g|-t-1)!/|g|!]
+          × [v(Q_R ∪ T ∪ {k}) - v(Q_R ∪ T)]     （k ∈ g、Q_R = R のグループの和集合）
+
+を計算する。グループ間の寄与（商ゲームのShapley値）はグループ内の φ の和に等しい。
+グループ g ごとに 2^(m-1) × 2^|g| 個の提携だけを評価すればよく、
+2^n 個の全提携を列挙する通常の厳密計算より大幅に少ない。
+
+評価する提携数が上限を超える場合は、グループ順とグループ内順序をランダムにした
+順列のサンプリング（グループ単位で連続する順列）で近似する。
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .shapley_subset_table import (
+    CoalitionGame,
+    EXACT_TABLE_MAX_PLAYERS,
+    evaluate_coalitions,
+    compute_permutation_shapley,
+    shapley_from_value_table,
+)
+from .shapley_pruning import reduce_game
+
+
+# ノードのグループ化の方法
+# - entity: Layer 4 の実体ごと（実体に接続する変数と、その変数が主に影響する属性）
+# - category: 実体の種類（object / environment）ごと
+OWEN_GROUPINGS = ('entity', 'category')
+
+# Owen値の計算方法
+OWEN_METHODS = ('exact', 'monte_carlo', 'auto')
+
+# method='auto' で厳密計算を選ぶ評価提携数の上限（50ノード規模でスタックした一括求解の数秒分）
+OWEN_AUTO_MAX_COALITIONS = 1 << 16
+
+# 1回の一括評価で扱う提携数
+OWEN_EVAL_CHUNK = 1 << 14
+
+
+@dataclass
+class PlayerGroup:
+    """
+    Owen値のグループ（提携構造の1ブロック）
+
+    Attributes:
+        group_id: 実体のノードID・カテゴリ名、またはグループ外ノードのID
+        label: 表示ラベル
+        members: プレイヤーインデックス
+    """
+    group_id: str
+    label: str
+    members: List[int]
+
+
+def build_node_groups(
+    network: Dict,
+    node_infos: List,
+    B_AV: np.ndarray,
+    grouping: str = 'entity'
+) -> List[PlayerGroup]:
+    """
+    V ∪ A のノードを実体またはカテゴリごとのグループに分割
+
+    - 変数: V ↔ E エッジで接続する実体（複数ある場合は最初のエッジの実体）
+    - 属性: 流入する変数の |B_AV| の和が最大の実体
+    - どの実体にも属さないノード: 'entity' では単独のグループ、
+      'category' では 'variable' / 'attribute' のグループ
+
+    Args:
+        network: ネットワーク構造
+        node_infos: NodeInfo のリスト（プレイヤー順）
+        B_AV: Variable → Attribute 行列
+        grouping: 'entity' または 'category'
+
+    Returns:
+        PlayerGroup のリスト（全プレイヤーを1回ずつ含む）
+    """
+    if grouping not in OWEN_GROUPINGS:
+        raise ValueError(f"Unknown grouping: {grouping}")
+
+    nodes = {n['id']: n for n in network.get('nodes', [])}
+    entities = {nid for nid, n in nodes.items() if n.get('layer') == 4}
+
+    # 変数 → 実体
+    var_ids = {n.node_id for n in node_infos if n.node_type == 'V'}
+    var_entity: Dict[str, str] = {}
+    for edge in network.get('edges', []):
+        source_id = edge.get('source_id')
+        target_id = edge.get('target_id')
+        if source_id in var_ids and target_id in entities:
+            var_entity.setdefault(source_id, target_id)
+        elif target_id in var_ids and source_id in entities:
+            var_entity.setdefault(target_id, source_id)
+
+    # 属性 → 実体（流入する変数の重みの和が最大の実体）
+    var_index = {n.matrix_idx: n.node_id for n in node_infos if n.node_type == 'V'}
+    owner: Dict[str, Optional[str]] = {
+        n.node_id: var_entity.get(n.node_id) for n in node_infos if n.node_type == 'V'
+    }
+    for node in node_infos:
+        if node.node_type != 'A' or node.matrix_idx >= B_AV.shape[0]:
+            continue
+        strength: Dict[str, float] = {}
+        for v, weight in enumerate(np.abs(B_AV[node.matrix_idx])):
+            entity_id = var_entity.get(var_index.get(v))
+            if weight > 0 and entity_id is not None:
+                strength[entity_id] = strength.get(entity_id, 0.0) + weight
+        owner[node.node_id] = max(strength, key=strength.get) if strength else None
+
+    groups: Dict[str, PlayerGroup] = {}
+    for k, node in enumerate(node_infos):
+        entity_id = owner.get(node.node_id)
+        if grouping == 'entity':
+            if entity_id is None:
+                key, label = node.node_id, node.node_label
+            else:
+                key, label = entity_id, nodes[entity_id].get('label', entity_id)
+        else:
+            if entity_id is None:
+                key = 'variable' if node.node_type == 'V' else 'attribute'
+            else:
+                key = nodes[entity_id].get('type', 'entity')
+            label = key
+        groups.setdefault(key, PlayerGroup(key, label, [])).members.append(k)
+
+    return list(groups.values())
+
+
+def owen_table_size(groups: Sequence[PlayerGroup]) -> int:
+    """厳密計算で評価する提携数 Σ_g 2^(m-1) × 2^|g|"""
+    m = len(groups)
+    if m == 0:
+        return 0
+    return sum(1 << (m - 1 + len(g.members)) for g in groups)
+
+
+def compute_owen_values_exact(
+    game: CoalitionGame,
+    groups: Sequence[PlayerGroup],
+    pairs: Sequence[Tuple[int, int]]
+) -> np.ndarray:
+    """
+    Owen値の厳密計算
+
+    グループ g ごとに、他グループの部分集合 R と g の部分集合 T の全組の価値
+    v(Q_R ∪ T) を評価し、R について商ゲームの重みで平均した U(T) から
+    グループ内のShapley値として求める。
+
+    Args:
+        game: CoalitionGame
+        groups: PlayerGroup のリスト（全プレイヤーを1回ずつ含む）
+        pairs: 性能インデックスのペア [(i, j), ...]
+
+    Returns:
+        φ (n_players × ペア数)
+    """
+    pairs = list(pairs)
+    n = game.n_players
+    phi = np.zeros((n, len(pairs)))
+    if n == 0 or not pairs:
+        return phi
+
+    m = len(groups)
+    membership = np.zeros((m, n), dtype=bool)
+    for h, group in enumerate(groups):
+        membership[h, group.members] = True
+
+    for h, group in enumerate(groups):
+        others = np.delete(membership, h, axis=0)
+        m1 = m - 1
+        size = len(group.members)
+        if m1 + size > EXACT_TABLE_MAX_PLAYERS:
+            raise ValueError(
+                f"Too many coalitions for exact Owen value: 2^{m1 + size} > 2^{EXACT_TABLE_MAX_PLAYERS}"
+            )
+
+        # R（他グループ）のマスクごとの有効プレイヤーと、商ゲームの重み
+        r_masks = np.arange(1 << m1, dtype=np.int64)
+        r_bits = ((r_masks[:, None] >> np.arange(m1)) & 1).astype(bool)
+        r_active = (r_bits.astype(np.int64) @ others.astype(np.int64)) > 0
+        r_sizes = r_bits.sum(axis=1)
+        quotient_weights = np.array([
+            math.factorial(r) * math.factorial(m1 - r) / math.factorial(m)
+            for r in range(m1 + 1)
+        ])[r_sizes]
+
+        # T（グループ内）のマスクごとの有効プレイヤー
+        t_masks = np.arange(1 << size, dtype=np.int64)
+        t_active = np.zeros((1 << size, n), dtype=bool)
+        t_active[:, group.members] = ((t_masks[:, None] >> np.arange(size)) & 1).astype(bool)
+
+        # U(T) = Σ_R w(|R|) v(Q_R ∪ T)
+        inner = np.zeros((1 << size, len(pairs)))
+        rows_per_chunk = max(1, OWEN_EVAL_CHUNK // (1 << size))
+        for start in range(0, 1 << m1, rows_per_chunk):
+            chunk = r_active[start:start + rows_per_chunk]
+            active = (chunk[:, None, :] | t_active[None, :, :]).reshape(-1, n)
+            values = evaluate_coalitions(game, active, pairs).reshape(len(chunk), 1 << size, len(pairs))
+            inner += np.einsum('r,rtp->tp', quotient_weights[start:start + len(chunk)], values)
+
+        phi[group.members] = shapley_from_value_table(inner, size)
+
+    return phi
+
+
+def compute_monte_carlo_owen_values(
+    game: CoalitionGame,
+    groups: Sequence[PlayerGroup],
+    pairs: Sequence[Tuple[int, int]],
+    n_samples: int = 500,
+    seed: Optional[int] = None
+) -> np.ndarray:
+    """
+    Owen値の順列サンプリング近似
+
+    グループの順序とグループ内の順序を一様にランダムにした（グループが連続する）
+    順列の限界貢献を平均する。
+
+    Args:
+        game: CoalitionGame
+        groups: PlayerGroup のリスト
+        pairs: 性能インデックスのペア [(i, j), ...]
+        n_samples: サンプル数
+        seed: 乱数シード
+
+    Returns:
+        φ (n_players × ペア数)
+    """
+    n = game.n_players
+    if n == 0 or n_samples <= 0:
+        return np.zeros((n, len(list(pairs))))
+
+    rng = np.random.default_rng(seed)
+    group_of = np.empty(n, dtype=np.int64)
+    for h, group in enumerate(groups):
+        group_of[group.members] = h
+
+    # キー = グループの位置 + [0, 1) の乱数 → グループ単位で連続し、グループ内は一様な順列
+    group_positions = rng.permuted(np.tile(np.arange(len(groups)), (n_samples, 1)), axis=1)
+    keys = group_positions[:, group_of] + rng.random((n_samples, n))
+    permutations = np.argsort(keys, axis=1)
+
+    return compute_permutation_shapley(game, permutations, pairs)
+
+
+def compute_owen_values(
+    game: CoalitionGame,
+    groups: Sequence[PlayerGroup],
+    pairs: Sequence[Tuple[int, int]],
+    method: str = 'auto',
+    n_monte_carlo_samples: int = 500
+) -> Tuple[np.ndarray, str, Dict[str, Any]]:
+    """
+    ナルプレイヤーを除いたうえでOwen値を計算
+
+    ナルプレイヤー（shapley_pruning）は Owen 値でも0であり、除いても他の値は変わらない。
+    空になったグループは商ゲームからも除く。
+
+    Args:
+        game: CoalitionGame
+        groups: PlayerGroup のリスト
+        pairs: 性能インデックスのペア [(i, j), ...]
+        method: 'exact', 'monte_carlo', 'auto'（評価提携数が上限以下なら厳密計算）
+        n_monte_carlo_samples: Monte Carloサンプル数
+
+    Returns:
+        (φ (n_players × ペア数), 使用した計算方法, 統計)
+    """
+    if method not in OWEN_METHODS:
+        raise ValueError(f"Unknown Owen method: {method}")
+
+    reduction = reduce_game(game, pairs)
+    position = {k: c for c, k in enumerate(reduction.core_players)}
+    core_groups = []
+    for group in groups:
+        members = [position[k] for k in group.members if k in position]
+        if members:
+            core_groups.append(PlayerGroup(group.group_id, group.label, members))
+    core_game = reduction.core_game
+
+    table_size = owen_table_size(core_groups)
+    max_group = max((len(g.members) for g in core_groups), default=0)
+    exact_feasible = len(core_groups) - 1 + max_group <= EXACT_TABLE_MAX_PLAYERS
+    if method == 'auto':
+        method = 'exact' if table_size <= OWEN_AUTO_MAX_COALITIONS else 'monte_carlo'
+    if method == 'exact' and not exact_feasible:
+        method = 'monte_carlo'
+
+    if method == 'exact':
+        phi_core = compute_owen_values_exact(core_game, core_groups, pairs)
+    else:
+        phi_core = compute_monte_carlo_owen_values(
+            core_game, core_groups, pairs, n_monte_carlo_samples
+        )
+
+    stats = {
+        "n_groups": len(groups),
+        "n_core_groups": len(core_groups),
+        "max_group_size": max_group,
+        "table_size": table_size,
+        "n_null_players": reduction.n_null_players,
+        "null_pruning": reduction.null_pruning,
+    }
+    return reduction.expand(phi_core), method, stats
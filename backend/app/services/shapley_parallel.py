@@ -0,0 +1,175 @@
+# backend/app/services/shapley_parallel.py
+"""
+性能ペア単位のShapley値計算のプロセス並列スケジューラ
+
+性能ペアごとの Shapley 分解は互いに独立なので、ペアをチャンクに分けて
+アプリケーション共有のプロセスプール（worker_pool）に割り当てる。
+
+- 行列（B_PA, B_AA, B_AV, T など）はリクエストごとに共有メモリ
+  （multiprocessing.shared_memory）に1回だけ書き込み、各ワーカーは名前で
+  アタッチしてリクエスト中は使い回す（タスクごとに行列をpickleしない）
+- 結果は完了したチャンクから順にジェネレータで返す
+- 期限（time_budget_ms）を過ぎたら未着手のチャンクをキャンセルし、
+  それまでに完了したペアだけを返す（実行中のチャンクは待たず、終わってから
+  共有メモリを削除する）
+
+チャンク内のペアは従来どおり提携ごとの求解を共有する（ペアを細かく分けすぎない）。
+"""
+
+import math
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .worker_pool import SharedArrays, close_when_done, get_worker_pool, resolve_workers, submit_shared
+
+
+# これ未満のペア数では並列化のオーバーヘッドの方が大きい
+PARALLEL_MIN_PAIRS = 8
+
+# ワーカーあたりのチャンク数（負荷分散と提携の求解の共有のバランス）
+CHUNKS_PER_WORKER = 4
+
+# 逐次実行で期限を判定するときのチャンクあたりのペア数
+SEQUENTIAL_CHUNK_PAIRS = 16
+
+
+@dataclass
+class PairScheduleStats:
+    """
+    スケジューラの実行統計
+
+    Attributes:
+        n_pairs: 要求されたペア数
+        n_completed: 完了したペア数
+        n_workers: 使用したワーカー数（1は逐次）
+        n_chunks: チャンク数
+        timed_out: 期限で打ち切ったか
+        elapsed_ms: 経過時間（ミリ秒）
+    """
+    n_pairs: int = 0
+    n_completed: int = 0
+    n_workers: int = 1
+    n_chunks: int = 0
+    timed_out: bool = False
+    elapsed_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "n_pairs": self.n_pairs,
+            "n_completed": self.n_completed,
+            "n_workers": self.n_workers,
+            "n_chunks": self.n_chunks,
+            "timed_out": self.timed_out,
+            "elapsed_ms": self.elapsed_ms,
+        }
+
+
+def stream_pair_results(
+    task: Callable[[Dict[str, np.ndarray], List[Tuple[int, int]], Any], Any],
+    arrays: Dict[str, np.ndarray],
+    pairs: Sequence[Tuple[int, int]],
+    payload: Any = None,
+    n_workers: Optional[int] = None,
+    time_budget_ms: Optional[float] = None,
+    stats: Optional[PairScheduleStats] = None
+) -> Iterator[Tuple[List[Tuple[int, int]], Any]]:
+    """
+    ペアのチャンクを並列に計算し、完了したものから返す
+
+    task はモジュールトップレベルの関数 task(arrays, chunk_pairs, payload) で、
+    チャンクの結果を返す（ワーカーでは arrays は共有メモリ上の配列）。
+    ワーカー数が1またはペア数が PARALLEL_MIN_PAIRS 未満なら同じプロセスで実行する。
+
+    Args:
+        task: チャンクを計算する関数
+        arrays: 共有する行列 {キー: 配列}
+        pairs: 性能インデックスのペア
+        payload: task に渡す追加の引数（ノード情報など、pickle 可能なもの）
+        n_workers: ワーカー数（Noneで設定値）
+        time_budget_ms: 期限（ミリ秒、Noneで制限なし）
+        stats: 実行統計の書き込み先
+
+    Yields:
+        (チャンクのペア, task の結果)
+    """
+    start_time = time.time()
+    deadline = None if time_budget_ms is None else start_time + time_budget_ms / 1000
+    pairs = list(pairs)
+    stats = stats if stats is not None else PairScheduleStats()
+    stats.n_pairs = len(pairs)
+    n_workers = min(resolve_workers(n_workers), max(1, len(pairs)))
+
+    if n_workers <= 1 or len(pairs) < PARALLEL_MIN_PAIRS:
+        stats.n_workers = 1
+        # 期限がなければ全ペアを1チャンクにして提携の求解を最大限共有する
+        chunk_size = len(pairs) if deadline is None else SEQUENTIAL_CHUNK_PAIRS
+        chunks = _split_pairs(pairs, max(1, chunk_size))
+        stats.n_chunks = len(chunks)
+        for chunk in chunks:
+            if deadline is not None and time.time() >= deadline:
+                stats.timed_out = True
+                break
+            result = task(arrays, chunk, payload)
+            stats.n_completed += len(chunk)
+            stats.elapsed_ms = (time.time() - start_time) * 1000
+            yield chunk, result
+        stats.elapsed_ms = (time.time() - start_time) * 1000
+        return
+
+    stats.n_workers = n_workers
+    chunks = _split_pairs(pairs, math.ceil(len(pairs) / (n_workers * CHUNKS_PER_WORKER)))
+    stats.n_chunks = len(chunks)
+
+    get_worker_pool(n_workers)
+    shared = SharedArrays(arrays)
+    futures = {}
+    try:
+        for chunk in chunks:
+            futures[submit_shared(task, shared.spec, chunk, payload)] = chunk
+        pending = set(futures)
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                stats.timed_out = True
+                break
+            for future in done:
+                chunk = futures[future]
+                result = future.result()
+                stats.n_completed += len(chunk)
+                stats.elapsed_ms = (time.time() - start_time) * 1000
+                yield chunk, result
+    finally:
+        # 期限切れ・途中終了では未着手のチャンクを取り消す。実行中のチャンクは待たず、
+        # 終わってから共有メモリを削除する（削除後にアタッチして失敗しないように）
+        close_when_done(shared, list(futures))
+        stats.elapsed_ms = (time.time() - start_time) * 1000
+
+
+def collect_pair_results(*args, **kwargs) -> Tuple[Dict[Tuple[int, int], Any], PairScheduleStats]:
+    """
+    stream_pair_results の結果をペアごとの辞書に集める
+
+    task の結果はチャンクのペア順のリストであること。
+
+    Returns:
+        ({(perf_i, perf_j): 結果}, PairScheduleStats)
+    """
+    stats = kwargs.pop('stats', None) or PairScheduleStats()
+    results: Dict[Tuple[int, int], Any] = {}
+    for chunk, chunk_results in stream_pair_results(*args, stats=stats, **kwargs):
+        results.update(zip(chunk, chunk_results))
+    return results, stats
+
+
+# =============================================================================
+# 内部関数
+# =============================================================================
+
+def _split_pairs(pairs: List[Tuple[int, int]], chunk_size: int) -> List[List[Tuple[int, int]]]:
+    """ペアを chunk_size ごとのチャンクに分割"""
+    return [pairs[start:start + chunk_size] for start in range(0, len(pairs), chunk_size)]
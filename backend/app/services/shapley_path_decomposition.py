@@ -0,0 +1,237 @@
+# backend/app/services/shapley_path_decomposition.py
+"""
+経路単項式分解による非巡回ネットワークのノード/エッジShapley値の厳密計算
+
+B_AA が冪零（Attribute 間にループがない）の場合、(I - B_AA)^(-1) = Σ_k B_AA^k は
+有限和となり、総効果は V → A → … → A → P の経路の重みの積の和になる:
+
+    T_pv(S) = Σ_{π: v→p} w(π) × 1[π の要素 ⊆ S]
+    C_ij(S) = Σ_v Σ_{π: v→i} Σ_{σ: v→j} w(π) w(σ) × 1[U(π, σ) ⊆ S]
+
+ここで U(π, σ) は2つの経路が使うプレイヤー（エッジゲーム: エッジ、
+ノードゲーム: 変数と属性）の和集合。各項は全会一致ゲームであり、その Shapley 値は
+係数 w(π) w(σ) を U の要素に均等に配分したものになる。したがって
+
+    φ_k = Σ_{(π, σ): k ∈ U} w(π) w(σ) / |U|
+
+を経路ペアの列挙で計算でき、2^n 個の部分集合を評価する必要がない。
+
+適用条件（満たさない場合は None を返し、呼び出し側が他の方法にフォールバックする）:
+- Attribute グラフが非巡回（自己ループを含まない）
+- エッジゲームで同じ行列位置に複数のエッジがない（後勝ちは多重線形にならない）
+- 経路ペア数・列挙する経路数がともに PATH_PAIR_LIMIT 以下
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# 列挙する経路ペア数（および経路数）の上限
+PATH_PAIR_LIMIT = 100_000
+
+
+def compute_path_shapley(
+    game,
+    pairs: Sequence[Tuple[int, int]],
+    max_path_pairs: int = PATH_PAIR_LIMIT
+) -> Optional[np.ndarray]:
+    """
+    経路単項式分解によるShapley値の厳密計算
+
+    Args:
+        game: CoalitionGame（shapley_subset_table）
+        pairs: 性能インデックスのペア [(i, j), ...]
+        max_path_pairs: 経路ペア数・列挙する経路数の上限
+
+    Returns:
+        φ (n_players × ペア数)。適用できない場合は None
+    """
+    pairs = list(pairs)
+    n_players = game.n_players
+    graph = _build_path_graph(game)
+    if graph is None:
+        return None
+
+    successors, var_sources, n_perf = graph
+    order = _topological_order(successors)
+    if order is None:
+        return None
+
+    targets = {p for pair in pairs for p in pair if p < n_perf}
+
+    # 経路数を DP で数えて上限を確認（列挙前）
+    # 変数ごとに、ペアの相手の性能にも到達する性能だけを列挙の対象にする
+    path_counts = _count_paths(successors, order, targets)
+    wanted: Dict[Tuple[str, int], set] = {}
+    total_pairs = 0
+    total_paths = 0
+    for v_node in var_sources:
+        counts = path_counts.get(v_node, {})
+        v_targets = set()
+        for i, j in pairs:
+            n_path_pairs = counts.get(i, 0) * counts.get(j, 0)
+            if n_path_pairs:
+                total_pairs += n_path_pairs
+                v_targets.update((i, j))
+        wanted[v_node] = v_targets
+        total_paths += sum(counts[p] for p in v_targets)
+    if total_pairs > max_path_pairs or total_paths > max_path_pairs:
+        return None
+
+    phi = np.zeros((n_players, len(pairs)))
+    for v_node, v_players in var_sources.items():
+        if not wanted[v_node]:
+            continue
+        paths = _enumerate_paths(successors, path_counts, v_node, v_players, n_players, wanted[v_node])
+        for p, (i, j) in enumerate(pairs):
+            if i not in paths or j not in paths:
+                continue
+            weights_i, members_i = paths[i]
+            weights_j, members_j = paths[j]
+
+            # 経路ペアごとの全会一致ゲーム: U = 和集合、係数 w(π) w(σ) を |U| で均等配分
+            union = members_i[:, None, :] | members_j[None, :, :]
+            sizes = union.sum(axis=2)
+            shares = np.outer(weights_i, weights_j) / sizes
+            phi[:, p] += np.einsum('ab,abk->k', shares, union)
+
+    return phi
+
+
+def is_path_decomposable(game) -> bool:
+    """
+    経路単項式分解が適用可能か（非巡回かつ同じ行列位置のエッジが重複しない）
+
+    Args:
+        game: CoalitionGame
+
+    Returns:
+        適用可能なら True（経路ペア数の上限は判定しない）
+    """
+    graph = _build_path_graph(game)
+    return graph is not None and _topological_order(graph[0]) is not None
+
+
+# =============================================================================
+# 内部関数
+# =============================================================================
+
+def _build_path_graph(game):
+    """
+    プレイヤー付きの有向グラフを構築
+
+    ノードは ('V', idx) / ('A', idx) / ('P', idx)。各辺は (次ノード, 重み, 辺のプレイヤー集合)
+    を持つ。ノードゲームでは経路上の属性・変数がプレイヤー、エッジゲームでは辺自体がプレイヤー。
+
+    Returns:
+        (successors, var_sources, n_perf)。重複エッジなどで適用できない場合は None
+        var_sources: {始点の V ノード: 始点自身のプレイヤー集合}
+    """
+    successors: Dict[Tuple[str, int], List[Tuple[Tuple[str, int], float, Tuple[int, ...]]]] = defaultdict(list)
+    var_sources: Dict[Tuple[str, int], Tuple[int, ...]] = {}
+    n_perf = game.B_PA.shape[0]
+
+    if game.kind == 'edge':
+        seen_positions = set()
+        for k, ((row, col), edge_type) in enumerate(zip(game.edge_positions, game.player_types)):
+            if (edge_type, row, col) in seen_positions:
+                return None
+            seen_positions.add((edge_type, row, col))
+            weight = game.edge_weights[k]
+            if edge_type == 'AV':
+                successors[('V', col)].append((('A', row), weight, (k,)))
+                var_sources[('V', col)] = ()
+            elif edge_type == 'AA':
+                successors[('A', col)].append((('A', row), weight, (k,)))
+            elif edge_type == 'PA':
+                successors[('A', col)].append((('P', row), weight, (k,)))
+        return successors, var_sources, n_perf
+
+    # ノードゲーム: 行列の非零要素が辺。プレイヤーでない属性・変数を通る経路は常に不在
+    attr_player = {}
+    var_player = {}
+    for k, (node_type, idx) in enumerate(zip(game.player_types, game.player_index)):
+        if node_type == 'A':
+            attr_player[idx] = k
+        else:
+            var_player[idx] = k
+
+    for a, v in zip(*np.nonzero(game.B_AV)):
+        if a in attr_player and v in var_player:
+            successors[('V', v)].append((('A', a), game.B_AV[a, v], (attr_player[a],)))
+            var_sources[('V', v)] = (var_player[v],)
+    for target, source in zip(*np.nonzero(game.B_AA)):
+        if target in attr_player and source in attr_player:
+            successors[('A', source)].append((('A', target), game.B_AA[target, source], (attr_player[target],)))
+    for p, a in zip(*np.nonzero(game.B_PA)):
+        if a in attr_player:
+            successors[('A', a)].append((('P', p), game.B_PA[p, a], ()))
+    return successors, var_sources, n_perf
+
+
+def _topological_order(successors) -> Optional[List[Tuple[str, int]]]:
+    """Kahn 法によるトポロジカル順序（閉路があれば None）"""
+    nodes = set(successors)
+    indegree: Dict[Tuple[str, int], int] = defaultdict(int)
+    for node, edges in successors.items():
+        for target, _, _ in edges:
+            nodes.add(target)
+            indegree[target] += 1
+
+    queue = [node for node in nodes if indegree[node] == 0]
+    order = []
+    while queue:
+        node = queue.pop()
+        order.append(node)
+        for target, _, _ in successors.get(node, []):
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                queue.append(target)
+
+    return order if len(order) == len(nodes) else None
+
+
+def _count_paths(successors, order, targets) -> Dict[Tuple[str, int], Dict[int, int]]:
+    """各ノードから各性能ノードへの経路数（逆トポロジカル順の DP）"""
+    counts: Dict[Tuple[str, int], Dict[int, int]] = {}
+    for node in reversed(order):
+        if node[0] == 'P':
+            counts[node] = {node[1]: 1} if node[1] in targets else {}
+            continue
+        node_counts: Dict[int, int] = defaultdict(int)
+        for target, _, _ in successors.get(node, []):
+            for p, c in counts.get(target, {}).items():
+                node_counts[p] += c
+        counts[node] = dict(node_counts)
+    return counts
+
+
+def _enumerate_paths(successors, path_counts, v_node, v_players, n_players, targets):
+    """
+    変数ノードから targets の各性能ノードへの全経路を列挙（targets に到達しない枝は辿らない）
+
+    Returns:
+        {性能 idx: (重み (n_paths,), プレイヤー所属 (n_paths × n_players) のブール行列)}
+    """
+    collected: Dict[int, Tuple[List[float], List[Tuple[int, ...]]]] = defaultdict(lambda: ([], []))
+    stack = [(v_node, 1.0, tuple(v_players))]
+    while stack:
+        node, weight, members = stack.pop()
+        if node[0] == 'P':
+            collected[node[1]][0].append(weight)
+            collected[node[1]][1].append(members)
+            continue
+        for target, edge_weight, edge_members in successors.get(node, []):
+            if not any(p in targets for p in path_counts.get(target, ())):
+                continue
+            stack.append((target, weight * edge_weight, members + edge_members))
+
+    paths = {}
+    for p, (weights, members_list) in collected.items():
+        members = np.zeros((len(weights), n_players), dtype=bool)
+        for row, path_members in enumerate(members_list):
+            members[row, list(path_members)] = True
+        paths[p] = (np.array(weights), members)
+    return paths
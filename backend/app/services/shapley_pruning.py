@@ -0,0 +1,351 @@
+# backend/app/services/shapley_pruning.py
+"""
+Shapley値の列挙前に行うナルプレイヤー・対称プレイヤーの検出
+
+性能ペア (P_i, P_j) の C_ij(S) = Σ_v T_iv(S) T_jv(S) に寄与し得るのは、
+P_i と P_j の両方に到達する変数 v と、その v から P_i / P_j への経路上にある
+属性・エッジだけである。それ以外のプレイヤー（どちらかの性能に到達しない変数、
+両性能の祖先集合の外にある属性、そこに接続するエッジなど）は全ての提携で
+限界貢献が0のナルプレイヤーなので φ = 0 とし、残りの「コア」だけで計算する
+（ナルプレイヤーを除いてもコアのShapley値は変わらない）。
+
+さらにコア内で構造的に対称なプレイヤー（ノードゲーム: 行列の添字を入れ替えても
+B_PA, B_AA, B_AV が変わらない属性・変数、エッジゲーム: 同じ位置・同じ重みのエッジや
+同じ属性に同じ重みで接続する葉の変数のエッジ）をクラスにまとめ、厳密計算では
+各クラスの人数だけで提携を表した価値テーブルを使う。
+
+ナルプレイヤーの除去は経路（ウォーク）の和 (I - B_AA)^(-1) = Σ B_AA^k が全提携で
+成り立つ場合に限って正確なため、ρ(|B_AA|) ≥ 1 の場合は対称性の検出のみ行う。
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+
+from .shapley_subset_table import CoalitionGame, compute_exact_shapley_by_classes
+from .spectral_radius import check_spectral_convergence
+
+
+@dataclass
+class GameReduction:
+    """
+    列挙前の縮約結果
+
+    Attributes:
+        game: 元のゲーム
+        core_game: コアプレイヤーだけに制限したゲーム
+        core_players: core_game のプレイヤー k に対応する元のプレイヤーインデックス
+        classes: core_game 内の対称クラス（core_game のインデックス）
+        null_pruning: ナルプレイヤーの除去を行ったか（ρ(|B_AA|) ≥ 1 では行わない）
+    """
+    game: CoalitionGame
+    core_game: CoalitionGame
+    core_players: List[int]
+    classes: List[List[int]]
+    null_pruning: bool
+
+    @property
+    def n_null_players(self) -> int:
+        return self.game.n_players - len(self.core_players)
+
+    @property
+    def table_size(self) -> int:
+        """厳密計算で評価する提携（人数の組）の数 Π(s_c + 1)"""
+        size = 1
+        for members in self.classes:
+            size *= len(members) + 1
+        return size
+
+    def expand(self, phi_core: np.ndarray) -> np.ndarray:
+        """コアの値 (n_core × ペア数) を元のプレイヤー順に戻す（ナルプレイヤーは0）"""
+        phi = np.zeros((self.game.n_players,) + phi_core.shape[1:])
+        phi[self.core_players] = phi_core
+        return phi
+
+    def to_dict(self) -> Dict[str, Any]:
+        """API の computation ブロック用の統計"""
+        return {
+            "n_players": self.game.n_players,
+            "n_null_players": self.n_null_players,
+            "n_core_players": len(self.core_players),
+            "n_symmetry_classes": len(self.classes),
+            "n_symmetric_players": sum(len(c) for c in self.classes if len(c) > 1),
+            "table_size": self.table_size,
+            "null_pruning": self.null_pruning,
+        }
+
+
+def reduce_game(game: CoalitionGame, pairs: Sequence[Tuple[int, int]]) -> GameReduction:
+    """
+    ナルプレイヤーを除き、コア内の対称クラスを求める
+
+    複数ペアの場合は、いずれかのペアでナルでないプレイヤーをコアとする。
+
+    Args:
+        game: CoalitionGame
+        pairs: 性能インデックスのペア [(i, j), ...]
+
+    Returns:
+        GameReduction
+    """
+    null_pruning = check_spectral_convergence(_abs_interaction_matrix(game))[0]
+    if null_pruning:
+        relevant = _relevant_players(game, list(pairs))
+        core_players = [k for k in range(game.n_players) if relevant[k]]
+    else:
+        core_players = list(range(game.n_players))
+
+    core_game = restrict_game(game, core_players)
+    perf_rows = sorted({p for pair in pairs for p in pair if p < game.n_performances})
+    if core_game.kind == 'node':
+        classes = _node_symmetry_classes(core_game, perf_rows)
+    else:
+        classes = _edge_symmetry_classes(core_game)
+
+    return GameReduction(game, core_game, core_players, classes, null_pruning)
+
+
+def restrict_game(game: CoalitionGame, players: Sequence[int]) -> CoalitionGame:
+    """
+    指定したプレイヤーだけのゲーム（それ以外は常に不在）
+
+    Args:
+        game: CoalitionGame
+        players: 残すプレイヤーのインデックス
+
+    Returns:
+        CoalitionGame
+    """
+    players = list(players)
+
+    def pick(values):
+        return None if values is None else [values[k] for k in players]
+
+    return CoalitionGame(
+        kind=game.kind,
+        B_PA=game.B_PA,
+        B_AA=game.B_AA,
+        B_AV=game.B_AV,
+        player_ids=pick(game.player_ids),
+        player_types=pick(game.player_types),
+        player_index=pick(game.player_index),
+        edge_positions=pick(game.edge_positions),
+        edge_weights=pick(game.edge_weights),
+    )
+
+
+def compute_reduced_exact_shapley(
+    reduction: GameReduction,
+    pairs: Sequence[Tuple[int, int]],
+    n_workers: int = 1
+) -> np.ndarray:
+    """
+    縮約したゲームで厳密計算し、元のプレイヤー順の φ を返す
+
+    Args:
+        reduction: reduce_game() の結果
+        pairs: 性能インデックスのペア [(i, j), ...]
+        n_workers: 並列ワーカー数
+
+    Returns:
+        φ (n_players × ペア数)
+    """
+    phi_core = compute_exact_shapley_by_classes(
+        reduction.core_game, reduction.classes, pairs, n_workers
+    )
+    return reduction.expand(phi_core)
+
+
+# =============================================================================
+# 内部関数
+# =============================================================================
+
+def _abs_interaction_matrix(game: CoalitionGame) -> np.ndarray:
+    """全プレイヤー有効時の |B_AA|（エッジゲームは同じ位置の最大の重み）"""
+    if game.kind == 'node':
+        return np.abs(game.B_AA)
+    abs_AA = np.zeros(game.B_AA.shape)
+    for (row, col), edge_type, weight in zip(game.edge_positions, game.player_types, game.edge_weights):
+        if edge_type == 'AA':
+            abs_AA[row, col] = max(abs_AA[row, col], abs(weight))
+    return abs_AA
+
+
+def _closure(starts: Set[int], neighbors: Dict[int, Set[int]]) -> Set[int]:
+    """starts から neighbors を辿って到達できるノード（starts を含む）"""
+    reached = set(starts)
+    stack = list(starts)
+    while stack:
+        node = stack.pop()
+        for nxt in neighbors.get(node, ()):
+            if nxt not in reached:
+                reached.add(nxt)
+                stack.append(nxt)
+    return reached
+
+
+def _relevant_players(game: CoalitionGame, pairs: List[Tuple[int, int]]) -> np.ndarray:
+    """
+    いずれかのペアでナルでない（C_ij に寄与する経路上にある）プレイヤー
+
+    Returns:
+        ブール配列 (n_players,)
+    """
+    n_perf = game.n_performances
+    successors: Dict[int, Set[int]] = {}
+    predecessors: Dict[int, Set[int]] = {}
+    perf_sources: Dict[int, Set[int]] = {}
+    var_targets: Dict[int, Set[int]] = {}
+
+    if game.kind == 'node':
+        types = game.player_types
+        attrs = {idx for t, idx in zip(types, game.player_index) if t == 'A'}
+        variables = {idx for t, idx in zip(types, game.player_index) if t == 'V'}
+        for target, source in zip(*np.nonzero(game.B_AA)):
+            if target in attrs and source in attrs:
+                successors.setdefault(source, set()).add(target)
+                predecessors.setdefault(target, set()).add(source)
+        for p, a in zip(*np.nonzero(game.B_PA)):
+            if a in attrs:
+                perf_sources.setdefault(p, set()).add(a)
+        for a, v in zip(*np.nonzero(game.B_AV)):
+            if a in attrs and v in variables:
+                var_targets.setdefault(v, set()).add(a)
+    else:
+        for (row, col), edge_type in zip(game.edge_positions, game.player_types):
+            if edge_type == 'AA':
+                successors.setdefault(col, set()).add(row)
+                predecessors.setdefault(row, set()).add(col)
+            elif edge_type == 'PA':
+                perf_sources.setdefault(row, set()).add(col)
+            elif edge_type == 'AV':
+                var_targets.setdefault(col, set()).add(row)
+
+    # 各性能に到達できる属性（祖先集合）
+    ancestors = {
+        p: _closure(perf_sources.get(p, set()), predecessors)
+        for p in {p for pair in pairs for p in pair if p < n_perf}
+    }
+
+    relevant = np.zeros(game.n_players, dtype=bool)
+    for i, j in pairs:
+        if i >= n_perf or j >= n_perf:
+            continue
+        reach_i, reach_j = ancestors[i], ancestors[j]
+        reach_ij = reach_i | reach_j
+
+        # 両方の性能に到達する変数と、そこから到達できる属性
+        pair_vars = {
+            v for v, targets in var_targets.items()
+            if targets & reach_i and targets & reach_j
+        }
+        descendants = _closure(
+            set().union(*(var_targets[v] for v in pair_vars)) if pair_vars else set(),
+            successors
+        )
+        on_path = descendants & reach_ij
+
+        for k in range(game.n_players):
+            if relevant[k]:
+                continue
+            if game.kind == 'node':
+                idx = game.player_index[k]
+                relevant[k] = idx in pair_vars if game.player_types[k] == 'V' else idx in on_path
+                continue
+            row, col = game.edge_positions[k]
+            edge_type = game.player_types[k]
+            if edge_type == 'AV':
+                relevant[k] = col in pair_vars and row in reach_ij
+            elif edge_type == 'AA':
+                relevant[k] = col in descendants and row in reach_ij
+            elif edge_type == 'PA':
+                relevant[k] = row in (i, j) and col in descendants
+
+    return relevant
+
+
+def _node_symmetry_classes(game: CoalitionGame, perf_rows: List[int]) -> List[List[int]]:
+    """
+    ノードゲームの対称クラス
+
+    属性 a, b は添字の入れ替えで (コアに制限した) B_PA, B_AA, B_AV が不変なとき、
+    変数 v, w は B_AV の列が一致するとき対称。入れ替えの合成も対称なので、
+    各クラスの代表との比較で分類できる。
+    """
+    types = game.player_types
+    index = game.player_index
+    n_attr = game.B_PA.shape[1]
+    n_var = game.B_AV.shape[1]
+    a_idx = sorted({idx for t, idx in zip(types, index) if t == 'A' and idx < n_attr})
+    v_idx = sorted({idx for t, idx in zip(types, index) if t == 'V' and idx < n_var})
+    a_pos = {a: p for p, a in enumerate(a_idx)}
+    v_pos = {v: p for p, v in enumerate(v_idx)}
+
+    B_PA = game.B_PA[perf_rows][:, a_idx]
+    B_AA = game.B_AA[a_idx][:, a_idx]
+    B_AV = game.B_AV[a_idx][:, v_idx]
+
+    def attrs_symmetric(p: int, q: int) -> bool:
+        if p == q:
+            return True
+        if not (np.array_equal(B_PA[:, p], B_PA[:, q]) and np.array_equal(B_AV[p], B_AV[q])):
+            return False
+        perm = np.arange(len(a_idx))
+        perm[[p, q]] = perm[[q, p]]
+        return np.array_equal(B_AA[perm][:, perm], B_AA)
+
+    def vars_symmetric(p: int, q: int) -> bool:
+        return np.array_equal(B_AV[:, p], B_AV[:, q])
+
+    classes: List[List[int]] = []
+    representatives: List[Tuple[str, int]] = []
+    for k, (node_type, idx) in enumerate(zip(types, index)):
+        if node_type == 'A' and idx in a_pos:
+            key = ('A', a_pos[idx])
+            same = attrs_symmetric
+        elif node_type == 'V' and idx in v_pos:
+            key = ('V', v_pos[idx])
+            same = vars_symmetric
+        else:
+            classes.append([k])
+            representatives.append(('-', k))
+            continue
+        for c, (rep_type, rep_pos) in enumerate(representatives):
+            if rep_type == key[0] and same(rep_pos, key[1]):
+                classes[c].append(k)
+                break
+        else:
+            classes.append([k])
+            representatives.append(key)
+    return classes
+
+
+def _edge_symmetry_classes(game: CoalitionGame) -> List[List[int]]:
+    """
+    エッジゲームの対称クラス
+
+    - 同じ種類・位置・重みのエッジ（その位置の重みが全て等しい場合のみ。
+      異なる重みが混在すると後勝ちの順序で値が変わる）
+    - 同じ属性へ同じ重みで接続する AV エッジのうち、変数側がそのエッジしか持たないもの
+      （変数の入れ替えでこのエッジの組だけが入れ替わる）
+    """
+    var_degree: Dict[int, int] = {}
+    position_weights: Dict[Tuple, Set[float]] = {}
+    for (row, col), edge_type, weight in zip(game.edge_positions, game.player_types, game.edge_weights):
+        if edge_type == 'AV':
+            var_degree[col] = var_degree.get(col, 0) + 1
+        position_weights.setdefault((edge_type, row, col), set()).add(weight)
+
+    classes: Dict[Tuple, List[int]] = {}
+    for k, ((row, col), edge_type, weight) in enumerate(
+        zip(game.edge_positions, game.player_types, game.edge_weights)
+    ):
+        if len(position_weights[(edge_type, row, col)]) > 1:
+            key = ('single', k)
+        elif edge_type == 'AV' and var_degree[col] == 1:
+            key = ('leaf', row, weight)
+        else:
+            key = (edge_type, row, col, weight)
+        classes.setdefault(key, []).append(k)
+    return list(classes.values())
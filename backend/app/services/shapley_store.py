@@ -0,0 +1,226 @@
+# backend/app/services/shapley_store.py
+"""
+Shapley値・カップリング計算結果の永続ストア（SQLite の shapley_results テーブル）
+
+/node-shapley, /edge-shapley, /coupling, /node-interaction は同じ設計案に対して繰り返し呼ばれるが、
+計算結果はネットワーク内容と計算パラメータだけで決まる。API 用の辞書をJSONで保存し、
+再起動後や複数 uvicorn ワーカー間でも共有する。
+
+- キー: network_fingerprint（ネットワーク内容 + weight_mode）、種類（node / edge / coupling / interaction）、
+  性能ペア・計算方法・サンプル数などのパラメータの SHA-256
+- 無効化: 設計案の network_json が変わると別のハッシュになるため古い結果は参照されない。
+  同じ設計案の異なるハッシュの結果は保存時に削除する（設計案の削除時も削除）
+- 追い出し: 最終参照時刻の古い順（件数上限 + バイトサイズ上限）
+
+ストアの読み書きの失敗は計算結果に影響させない（ログに残してキャッシュなしで続行）。
+"""
+
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.database import ShapleyResultModel
+
+logger = logging.getLogger(__name__)
+
+
+# ストアの上限
+MAX_STORED_RESULTS = 2000
+MAX_STORED_BYTES = 64 * 1024 * 1024
+
+
+def shapley_store_key(network_hash: str, kind: str, params: Dict[str, Any]) -> str:
+    """
+    ストアのキー
+
+    Args:
+        network_hash: network_fingerprint() の値
+        kind: 'node' / 'edge' / 'coupling' / 'interaction'
+        params: 計算パラメータ（性能ペア・method・サンプル数など）
+
+    Returns:
+        SHA-256 の16進文字列
+    """
+    canonical = json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+    hasher = hashlib.sha256()
+    for part in (network_hash, kind, canonical):
+        hasher.update(part.encode('utf-8'))
+        hasher.update(b'\0')
+    return hasher.hexdigest()
+
+
+def get_stored_result(
+    db: Session,
+    network_hash: str,
+    kind: str,
+    params: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """
+    保存済みの結果を取得（なければ None）
+
+    Args:
+        db: DBセッション
+        network_hash: network_fingerprint() の値
+        kind: 'node' / 'edge' / 'coupling' / 'interaction'
+        params: 計算パラメータ
+
+    Returns:
+        保存した API 用の辞書
+    """
+    key = shapley_store_key(network_hash, kind, params)
+    try:
+        row = db.query(ShapleyResultModel).filter(ShapleyResultModel.cache_key == key).first()
+        if row is None:
+            return None
+        row.accessed_at = datetime.utcnow()
+        db.commit()
+        return json.loads(row.result_json)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Shapley store lookup failed: {e}")
+        return None
+
+
+def store_result(
+    db: Session,
+    network_hash: str,
+    kind: str,
+    params: Dict[str, Any],
+    result: Dict[str, Any],
+    case_id: Optional[str] = None
+):
+    """
+    結果を保存し、同じ設計案の古いネットワークの結果を削除して上限まで追い出す
+
+    Args:
+        db: DBセッション
+        network_hash: network_fingerprint() の値
+        kind: 'node' / 'edge' / 'coupling' / 'interaction'
+        params: 計算パラメータ
+        result: API 用の辞書（JSON化できる値。ndarray・NumPyスカラーは変換する）
+        case_id: 設計案ID
+    """
+    key = shapley_store_key(network_hash, kind, params)
+    try:
+        result_json = json.dumps(result, ensure_ascii=False, default=_json_default)
+        if len(result_json) > MAX_STORED_BYTES:
+            return
+
+        if case_id is not None:
+            invalidate_case_results(db, case_id, keep_network_hash=network_hash, commit=False)
+
+        now = datetime.utcnow()
+        db.merge(ShapleyResultModel(
+            cache_key=key,
+            network_hash=network_hash,
+            case_id=case_id,
+            kind=kind,
+            result_json=result_json,
+            size_bytes=len(result_json),
+            created_at=now,
+            accessed_at=now
+        ))
+        db.flush()
+        _evict(db)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Shapley store write failed: {e}")
+
+
+def invalidate_case_results(
+    db: Session,
+    case_id: str,
+    keep_network_hash: Optional[str] = None,
+    commit: bool = True
+) -> int:
+    """
+    設計案の保存済み結果を削除
+
+    Args:
+        db: DBセッション
+        case_id: 設計案ID
+        keep_network_hash: このハッシュの結果は残す（Noneで全削除）
+        commit: 削除後にコミットするか
+
+    Returns:
+        削除した件数
+    """
+    query = db.query(ShapleyResultModel).filter(ShapleyResultModel.case_id == case_id)
+    if keep_network_hash is not None:
+        query = query.filter(ShapleyResultModel.network_hash != keep_network_hash)
+    deleted = query.delete(synchronize_session=False)
+    if commit:
+        db.commit()
+    return deleted
+
+
+def get_shapley_store_stats(db: Session) -> Dict[str, Any]:
+    """ストアの件数・サイズ"""
+    count, total = db.query(
+        func.count(ShapleyResultModel.cache_key),
+        func.coalesce(func.sum(ShapleyResultModel.size_bytes), 0)
+    ).one()
+    by_kind = dict(
+        db.query(ShapleyResultModel.kind, func.count(ShapleyResultModel.cache_key))
+        .group_by(ShapleyResultModel.kind).all()
+    )
+    return {
+        'entries': int(count),
+        'bytes': int(total),
+        'max_entries': MAX_STORED_RESULTS,
+        'max_bytes': MAX_STORED_BYTES,
+        'by_kind': by_kind,
+    }
+
+
+def clear_shapley_store(db: Session) -> int:
+    """ストアを全削除"""
+    deleted = db.query(ShapleyResultModel).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+# =============================================================================
+# 内部関数
+# =============================================================================
+
+def _evict(db: Session):
+    """最終参照時刻の古い順に、件数・バイトサイズが上限以下になるまで削除"""
+    count, total = db.query(
+        func.count(ShapleyResultModel.cache_key),
+        func.coalesce(func.sum(ShapleyResultModel.size_bytes), 0)
+    ).one()
+    if count <= MAX_STORED_RESULTS and total <= MAX_STORED_BYTES:
+        return
+
+    evict_keys = []
+    rows = db.query(ShapleyResultModel.cache_key, ShapleyResultModel.size_bytes).order_by(
+        ShapleyResultModel.accessed_at.asc()
+    )
+    for key, size in rows:
+        if count <= MAX_STORED_RESULTS and total <= MAX_STORED_BYTES:
+            break
+        evict_keys.append(key)
+        count -= 1
+        total -= size or 0
+
+    if evict_keys:
+        db.query(ShapleyResultModel).filter(
+            ShapleyResultModel.cache_key.in_(evict_keys)
+        ).delete(synchronize_session=False)
+
+
+def _json_default(value: Any) -> Any:
+    """NumPy の値を JSON 化できる型に変換"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
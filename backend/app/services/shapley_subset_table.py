@@ -0,0 +1,1031 @@
+# backend/app/services/shapley_subset_table.py
+"""
+部分集合価値テーブル（ビットマスクDP）によるノード/エッジShapley値の厳密計算
+
+従来の厳密計算はプレイヤー k ごとに全部分集合 S ⊆ N\\{k} を列挙し、
+C_ij(S∪{k}) と C_ij(S) をそれぞれ総効果行列から計算していた（n·2^n 回の求解）。
+各提携 S の価値 v(S) は1回計算すれば十分なので:
+
+1. 全ビットマスク S ∈ {0, ..., 2^n - 1} について v(S) を1回だけ評価し float64 配列に格納
+   （マスク付き行列をスタックして一括で求解し、必要ならマスク範囲をチャンクに分けてプロセス並列で評価）
+2. φ_k = Σ_{S∌k} w(|S|) × [v(S ∪ {k}) - v(S)],  w(s) = s!(n-s-1)!/n!
+   をビット演算とベクトル化した差分の重み付き和で求める
+
+これにより実用的な厳密計算の上限が約10プレイヤーから約20プレイヤーに広がる。
+
+構造的に対称なプレイヤーのクラス（shapley_pruning で検出）がある場合は、
+各クラスから何人を含むかの組だけで提携を表し、評価する提携数を Π(s_c + 1) に減らす。
+
+提携 S の T(S) からは全性能ペアの C_ij(S) = [T(S) T(S)ᵀ]_ij が同時に得られるため、
+複数ペア（/coupling のトレードオフペアなど）は提携ごとの求解を共有して
+価値テーブル (2^n × ペア数) や順列サンプリングの限界貢献を一括で計算する。
+
+大規模なゲームでは KernelSHAP（Shapley カーネルで重み付けした提携の最小二乗回帰）で近似する。
+提携の大きさ s を p(s) ∝ 1/(s(n-s)) で、提携をその補集合とのペアで抽出し、
+効率性 Σφ = v(N) - v(∅) を等式制約として厳密に満たす解を閉形式で求める。
+
+Monte Carlo 近似は順列を (n_samples × n_players) の配列として np.random.Generator で生成し、
+全プレフィックスのマスク付き行列をスタックして np.linalg.solve で一括求解する。
+適応的 Monte Carlo はプレイヤーごとの平均・分散を逐次更新し（Welford）、
+標準誤差が許容値を下回るか時間予算に達した時点で停止する。
+
+提携 S の総効果行列は従来と同じ意味（不在ノードの行/列を0、不在エッジを0）で、
+有効な属性・変数だけに縮小した部分行列から、compute_total_effect_matrix と
+同じ分岐で計算する。
+"""
+
+import math
+import time
+from dataclasses import dataclass, replace
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .matrix_utils import compute_total_effect_matrix
+from .worker_pool import map_shared, resolve_workers
+
+
+# 厳密計算（価値テーブル）で扱うプレイヤー数の上限（2^20 × 8 byte = 8 MB）
+EXACT_TABLE_MAX_PLAYERS = 20
+
+# method='auto' で厳密計算を選ぶプレイヤー数の上限（2^12 回の求解で数百ms）
+EXACT_AUTO_MAX_PLAYERS = 12
+
+# これ未満のプレイヤー数では並列化のオーバーヘッドの方が大きい
+PARALLEL_MIN_PLAYERS = 12
+
+# 並列評価のチャンクあたりのマスク数
+PARALLEL_CHUNK_SIZE = 4096
+
+# 全ペアの価値テーブル (2^n × ペア数) のメモリ上限（超える場合はペアを分割して評価）
+MAX_PAIR_TABLE_BYTES = 256 * 1024 * 1024
+
+# Monte Carlo でまとめて解くプレフィックス行列スタックのメモリ上限
+MONTE_CARLO_BATCH_BYTES = 32 * 1024 * 1024
+
+# 適応的 Monte Carlo のサンプリング方式
+# - random: 独立な順列
+# - antithetic: 順列とその逆順のペア
+# - stratified: 順列の巡回シフト n 個の組（各プレイヤーが全ての位置に1回ずつ現れる）
+SAMPLING_SCHEMES = ('random', 'antithetic', 'stratified')
+
+# 適応的 Monte Carlo の既定値
+ADAPTIVE_MIN_BLOCKS = 8  # 標準誤差で停止判定する前の最小ブロック数
+ADAPTIVE_MAX_SAMPLES = 20000  # 順列数の上限
+
+# KernelSHAP の既定値
+KERNEL_SAMPLES_PER_PLAYER = 32  # プレイヤーあたりの提携ペア数（既定のサンプル数 = 32n ペア）
+KERNEL_AUTO_MIN_PLAYERS = 64  # method='auto' で順列サンプリングの代わりに KernelSHAP を選ぶプレイヤー数
+
+
+@dataclass
+class CoalitionGame:
+    """
+    ノード/エッジ提携ゲームの定義
+
+    Attributes:
+        kind: 'node' または 'edge'
+        B_PA, B_AA, B_AV: 全プレイヤー有効時の行列
+        player_ids: プレイヤーID（ビット k がプレイヤー k に対応）
+        player_types: node: 'V' / 'A'、edge: 'PA' / 'AA' / 'AV'
+        player_index: node: 行列内インデックス、edge: 使用しない
+        edge_positions: edge: 行列内の位置 (row, col)
+        edge_weights: edge: 正規化された重み
+    """
+    kind: str
+    B_PA: np.ndarray
+    B_AA: np.ndarray
+    B_AV: np.ndarray
+    player_ids: List[str]
+    player_types: List[str]
+    player_index: Optional[List[int]] = None
+    edge_positions: Optional[List[Tuple[int, int]]] = None
+    edge_weights: Optional[List[float]] = None
+
+    @property
+    def n_players(self) -> int:
+        return len(self.player_ids)
+
+    @property
+    def n_performances(self) -> int:
+        return self.B_PA.shape[0]
+
+
+@dataclass
+class MonteCarloEstimate:
+    """
+    適応的 Monte Carlo 推定の結果
+
+    Attributes:
+        phi: Shapley値の推定 (n_players × ペア数)
+        std_error: 標準誤差 (n_players × ペア数)
+        n_samples: 評価した順列数
+        stop_reason: 'tolerance' / 'time_budget' / 'max_samples'
+        sampling: サンプリング方式
+    """
+    phi: np.ndarray
+    std_error: np.ndarray
+    n_samples: int
+    stop_reason: str
+    sampling: str
+
+
+def build_node_game(
+    B_PA: np.ndarray,
+    B_AA: np.ndarray,
+    B_AV: np.ndarray,
+    node_infos: List
+) -> CoalitionGame:
+    """
+    ノード提携ゲーム（V ∪ A がプレイヤー）を構築
+
+    Args:
+        B_PA, B_AA, B_AV: 行列
+        node_infos: NodeInfo のリスト
+
+    Returns:
+        CoalitionGame
+    """
+    return CoalitionGame(
+        kind='node',
+        B_PA=np.asarray(B_PA, dtype=float),
+        B_AA=np.asarray(B_AA, dtype=float),
+        B_AV=np.asarray(B_AV, dtype=float),
+        player_ids=[n.node_id for n in node_infos],
+        player_types=[n.node_type for n in node_infos],
+        player_index=[n.matrix_idx for n in node_infos],
+    )
+
+
+def build_edge_game(
+    B_PA: np.ndarray,
+    B_AA: np.ndarray,
+    B_AV: np.ndarray,
+    edge_infos: List
+) -> CoalitionGame:
+    """
+    エッジ提携ゲームを構築
+
+    Args:
+        B_PA, B_AA, B_AV: 元の行列（形状のみ使用）
+        edge_infos: EdgeInfo のリスト
+
+    Returns:
+        CoalitionGame
+    """
+    return CoalitionGame(
+        kind='edge',
+        B_PA=np.asarray(B_PA, dtype=float),
+        B_AA=np.asarray(B_AA, dtype=float),
+        B_AV=np.asarray(B_AV, dtype=float),
+        player_ids=[e.edge_id for e in edge_infos],
+        player_types=[e.edge_type for e in edge_infos],
+        edge_positions=[tuple(e.matrix_pos) for e in edge_infos],
+        edge_weights=[float(e.weight) for e in edge_infos],
+    )
+
+
+def mask_to_active(mask: int, n_players: int) -> np.ndarray:
+    """ビットマスクを有効プレイヤーのブール配列に変換"""
+    return ((mask >> np.arange(n_players)) & 1).astype(bool)
+
+
+def coalition_total_effect(game: CoalitionGame, active: np.ndarray) -> np.ndarray:
+    """
+    提携（有効プレイヤー集合）に対する総効果行列 T(S) を計算
+
+    Args:
+        game: CoalitionGame
+        active: 有効プレイヤーのブール配列 (n_players,)
+
+    Returns:
+        T(S) (n_perf × n_var)
+    """
+    if game.kind == 'node':
+        return _node_coalition_total_effect(game, active)
+    return _edge_coalition_total_effect(game, active)
+
+
+def compute_subset_value_table(
+    game: CoalitionGame,
+    perf_i: int,
+    perf_j: int,
+    n_workers: Optional[int] = 1
+) -> np.ndarray:
+    """
+    全提携の価値 v(S) = C_ij(S) を1回ずつ評価したテーブルを作成
+
+    Args:
+        game: CoalitionGame
+        perf_i, perf_j: 性能インデックス
+        n_workers: 並列ワーカー数（1で逐次、Noneで共有プールの設定値）
+
+    Returns:
+        values (2^n,)、values[mask] = C_ij(mask が表す提携)
+    """
+    return compute_subset_gram_table(game, [(perf_i, perf_j)], n_workers)[:, 0]
+
+
+def compute_subset_gram_table(
+    game: CoalitionGame,
+    pairs: Sequence[Tuple[int, int]],
+    n_workers: Optional[int] = 1
+) -> np.ndarray:
+    """
+    全提携について T(S) を1回ずつ求め、指定ペアの C_ij(S) を同時に格納
+
+    Args:
+        game: CoalitionGame
+        pairs: 性能インデックスのペア [(i, j), ...]
+        n_workers: 並列ワーカー数（1で逐次、Noneで共有プールの設定値）
+
+    Returns:
+        values (2^n × ペア数)、values[mask, p] = C_{pairs[p]}(mask が表す提携)
+    """
+    n = game.n_players
+    if n > EXACT_TABLE_MAX_PLAYERS:
+        raise ValueError(
+            f"Too many players for exact Shapley table: {n} > {EXACT_TABLE_MAX_PLAYERS}"
+        )
+
+    n_masks = 1 << n
+    n_workers = resolve_workers(n_workers)
+
+    if n_workers <= 1 or n < PARALLEL_MIN_PLAYERS:
+        return _evaluate_gram_chunk((game, pairs, 0, n_masks))
+
+    matrices, shell = _split_game(game)
+    args_list = [
+        (shell, pairs, start, min(start + PARALLEL_CHUNK_SIZE, n_masks))
+        for start in range(0, n_masks, PARALLEL_CHUNK_SIZE)
+    ]
+    chunks = map_shared(_shared_gram_chunk, matrices, args_list, n_workers)
+    return np.concatenate(chunks)
+
+
+def shapley_from_value_table(values: np.ndarray, n_players: int) -> np.ndarray:
+    """
+    価値テーブルから全プレイヤーのShapley値を計算
+
+    φ_k = Σ_{S∌k} [|S|!(n-|S|-1)!/n!] × [v(S ∪ {k}) - v(S)]
+
+    Args:
+        values: 価値テーブル (2^n,) または全ペアの価値テーブル (2^n × ペア数)
+        n_players: プレイヤー数 n
+
+    Returns:
+        φ (n,) または (n × ペア数)
+    """
+    n = n_players
+    if n == 0:
+        return np.zeros((0,) + values.shape[1:])
+
+    masks = np.arange(1 << n, dtype=np.int64)
+    sizes = np.zeros(1 << n, dtype=np.int64)
+    for bit in range(n):
+        sizes += (masks >> bit) & 1
+
+    factorial_n = math.factorial(n)
+    weights = np.array([
+        math.factorial(s) * math.factorial(n - s - 1) / factorial_n
+        for s in range(n)
+    ])
+
+    phi = np.empty((n,) + values.shape[1:])
+    for k in range(n):
+        bit = 1 << k
+        without_k = masks[(masks & bit) == 0]
+        marginals = values[without_k | bit] - values[without_k]
+        phi[k] = weights[sizes[without_k]] @ marginals
+
+    return phi
+
+
+def compute_exact_shapley_by_table(
+    game: CoalitionGame,
+    perf_i: int,
+    perf_j: int,
+    n_workers: Optional[int] = 1
+) -> dict:
+    """
+    価値テーブル経由でShapley値を厳密計算
+
+    Args:
+        game: CoalitionGame
+        perf_i, perf_j: 性能インデックス
+        n_workers: 並列ワーカー数
+
+    Returns:
+        {player_id: shapley_value}
+    """
+    if game.n_players == 0:
+        return {}
+    values = compute_subset_value_table(game, perf_i, perf_j, n_workers)
+    phi = shapley_from_value_table(values, game.n_players)
+    return {pid: float(phi[k]) for k, pid in enumerate(game.player_ids)}
+
+
+def compute_exact_shapley_all_pairs(
+    game: CoalitionGame,
+    pairs: Sequence[Tuple[int, int]],
+    n_workers: Optional[int] = 1
+) -> np.ndarray:
+    """
+    複数の性能ペアのShapley値を、提携ごとの求解を共有して厳密計算
+
+    価値テーブルがメモリ上限を超える場合はペアを分割して評価する。
+
+    Args:
+        game: CoalitionGame
+        pairs: 性能インデックスのペア [(i, j), ...]
+        n_workers: 並列ワーカー数
+
+    Returns:
+        φ (n_players × ペア数)
+    """
+    pairs = list(pairs)
+    n = game.n_players
+    if n == 0 or not pairs:
+        return np.zeros((n, len(pairs)))
+
+    pairs_per_batch = max(1, MAX_PAIR_TABLE_BYTES // ((1 << n) * 8))
+    phi = np.empty((n, len(pairs)))
+    for start in range(0, len(pairs), pairs_per_batch):
+        batch = pairs[start:start + pairs_per_batch]
+        values = compute_subset_gram_table(game, batch, n_workers)
+        phi[:, start:start + len(batch)] = shapley_from_value_table(values, n)
+    return phi
+
+
+def compute_exact_shapley_by_classes(
+    game: CoalitionGame,
+    classes: Sequence[Sequence[int]],
+    pairs: Sequence[Tuple[int, int]],
+    n_workers: Optional[int] = 1
+) -> np.ndarray:
+    """
+    対称なプレイヤーのクラスを人数だけで数えた価値テーブルからShapley値を厳密計算
+
+    クラス内のプレイヤーは交換しても価値が変わらないため、v(S) は各クラスから何人を
+    含むかの組 x = (x_1, ..., x_m) だけで決まる。Π(s_c + 1) 個の x について v を1回ずつ評価し
+
+        φ_c = Σ_{x: x_c < s_c} M(x) × (s_c - x_c) / s_c × w(|x|) × [v(x + e_c) - v(x)]
+        M(x) = Π_d C(s_d, x_d),  w(s) = s!(n-s-1)!/n!
+
+    をクラスの各メンバーの値とする（全クラスが1人ならビットマスクDPと同じ）。
+
+    Args:
+        game: CoalitionGame
+        classes: プレイヤーインデックスのクラス分割（全プレイヤーを1回ずつ含む）
+        pairs: 性能インデックスのペア [(i, j), ...]
+        n_workers: 並列ワーカー数
+
+    Returns:
+        φ (n_players × ペア数)
+    """
+    pairs = list(pairs)
+    n = game.n_players
+    if n == 0 or not pairs:
+        return np.zeros((n, len(pairs)))
+
+    sizes = np.array([len(c) for c in classes], dtype=np.int64)
+    radices = sizes + 1
+    strides = np.concatenate(([1], np.cumprod(radices)[:-1]))
+    n_states = int(np.prod(radices))
+    if n_states > 1 << EXACT_TABLE_MAX_PLAYERS:
+        raise ValueError(
+            f"Too many coalitions for exact Shapley table: {n_states} > {1 << EXACT_TABLE_MAX_PLAYERS}"
+        )
+
+    n_workers = resolve_workers(n_workers)
+    pairs_per_batch = max(1, MAX_PAIR_TABLE_BYTES // (n_states * 8))
+    values = np.empty((n_states, len(pairs)))
+    for start in range(0, len(pairs), pairs_per_batch):
+        batch = pairs[start:start + pairs_per_batch]
+        if n_workers <= 1 or n < PARALLEL_MIN_PLAYERS:
+            chunks = [_evaluate_class_chunk((game, batch, classes, 0, n_states))]
+        else:
+            matrices, shell = _split_game(game)
+            args_list = [
+                (shell, batch, classes, lo, min(lo + PARALLEL_CHUNK_SIZE, n_states))
+                for lo in range(0, n_states, PARALLEL_CHUNK_SIZE)
+            ]
+            chunks = map_shared(_shared_class_chunk, matrices, args_list, n_workers)
+        values[:, start:start + len(batch)] = np.concatenate(chunks)
+
+    states = np.arange(n_states, dtype=np.int64)
+    counts = (states[:, None] // strides[None, :]) % radices[None, :]
+    totals = counts.sum(axis=1)
+
+    factorial_n = math.factorial(n)
+    weights = np.array([
+        math.factorial(s) * math.factorial(n - s - 1) / factorial_n
+        for s in range(n)
+    ])
+    multiplicity = np.ones(n_states)
+    for c, size in enumerate(sizes):
+        binomials = np.array([math.comb(int(size), x) for x in range(size + 1)], dtype=float)
+        multiplicity *= binomials[counts[:, c]]
+
+    phi = np.empty((n, len(pairs)))
+    for c, members in enumerate(classes):
+        size = sizes[c]
+        without = counts[:, c] < size
+        coef = (
+            multiplicity[without] * (size - counts[without, c]) / size * weights[totals[without]]
+        )
+        marginals = values[states[without] + strides[c]] - values[states[without]]
+        phi[list(members)] = coef @ marginals
+
+    return phi
+
+
+def compute_monte_carlo_shapley_all_pairs(
+    game: CoalitionGame,
+    pairs: Sequence[Tuple[int, int]],
+    n_samples: int = 500,
+    seed: Optional[int] = None
+) -> np.ndarray:
+    """
+    複数の性能ペアのShapley値を順列サンプリングで近似（ベクトル化版）
+
+    1. 順列を (n_samples × n) の配列として生成
+    2. 各順列の全プレフィックス（提携）のマスク付き行列をバッチごとにスタックし、
+       (I - B_AA) X = B_AV を1回の np.linalg.solve で解く
+    3. 連続するプレフィックスの C_ij の差分を、追加されたプレイヤーの限界貢献として加算
+
+    ノルム上界 ≥ 1 または特異なプレフィックスのみ coalition_total_effect で個別に計算する。
+
+    Args:
+        game: CoalitionGame
+        pairs: 性能インデックスのペア [(i, j), ...]
+        n_samples: サンプル数
+        seed: 乱数シード
+
+    Returns:
+        φ (n_players × ペア数)
+    """
+    pairs = list(pairs)
+    n = game.n_players
+    if n == 0 or not pairs or n_samples <= 0:
+        return np.zeros((n, len(pairs)))
+
+    rng = np.random.default_rng(seed)
+    permutations = rng.permuted(np.tile(np.arange(n), (n_samples, 1)), axis=1)
+    return compute_permutation_shapley(game, permutations, pairs)
+
+
+def compute_permutation_shapley(
+    game: CoalitionGame,
+    permutations: np.ndarray,
+    pairs: Sequence[Tuple[int, int]]
+) -> np.ndarray:
+    """
+    与えられた順列の限界貢献の平均（順列サンプリングの共通部分）
+
+    一様な順列なら Shapley 値、グループ構造に沿った順列なら Owen 値の推定になる。
+
+    Args:
+        game: CoalitionGame
+        permutations: 順列 (n_samples × n_players)
+        pairs: 性能インデックスのペア [(i, j), ...]
+
+    Returns:
+        φ (n_players × ペア数)
+    """
+    pairs = list(pairs)
+    n = game.n_players
+    n_samples = permutations.shape[0]
+    if n == 0 or not pairs or n_samples == 0:
+        return np.zeros((n, len(pairs)))
+
+    layout = _BatchLayout(game)
+    rows_i, rows_j, valid = _pair_index_arrays(game, pairs)
+    samples_per_batch = max(1, layout.batch_size // n)
+    marginal_sums = np.zeros((n, len(pairs)))
+
+    for start in range(0, n_samples, samples_per_batch):
+        perms = permutations[start:start + samples_per_batch]
+        n_batch = perms.shape[0]
+
+        # ranks[s, k] = 順列 s でのプレイヤー k の位置。プレフィックス t は ranks <= t
+        ranks = np.argsort(perms, axis=1)
+        active = ranks[:, None, :] <= np.arange(n)[None, :, None]
+
+        values = layout.pair_values(active.reshape(n_batch * n, n), rows_i, rows_j, valid)
+        values = values.reshape(n_batch, n, len(pairs))
+        marginals = np.diff(values, axis=1, prepend=0.0)
+
+        np.add.at(marginal_sums, perms.ravel(), marginals.reshape(-1, len(pairs)))
+
+    return marginal_sums / n_samples
+
+
+def evaluate_coalitions(
+    game: CoalitionGame,
+    active: np.ndarray,
+    pairs: Sequence[Tuple[int, int]]
+) -> np.ndarray:
+    """
+    任意の提携のバッチに対する C_ij(S) をマスク付き行列スタックでまとめて評価
+
+    Args:
+        game: CoalitionGame
+        active: 有効プレイヤーのブール配列 (B × n_players)
+        pairs: 性能インデックスのペア [(i, j), ...]
+
+    Returns:
+        values (B × ペア数)
+    """
+    rows_i, rows_j, valid = _pair_index_arrays(game, list(pairs))
+    return _BatchLayout(game).pair_values(active, rows_i, rows_j, valid)
+
+
+def compute_adaptive_monte_carlo_shapley(
+    game: CoalitionGame,
+    pairs: Sequence[Tuple[int, int]],
+    tolerance: Optional[float] = None,
+    time_budget_ms: Optional[float] = None,
+    max_samples: int = ADAPTIVE_MAX_SAMPLES,
+    sampling: str = 'antithetic',
+    seed: Optional[int] = None
+) -> MonteCarloEstimate:
+    """
+    標準誤差に基づいて早期停止する Monte Carlo Shapley 近似
+
+    順列をブロック（antithetic: 順列と逆順、stratified: n 個の巡回シフト、random: 1順列）
+    単位で生成し、ブロック内平均を1観測としてプレイヤーごとの平均・分散を
+    Welford 法（バッチ単位は Chan の併合式）で更新する。
+    最大標準誤差が tolerance 以下になるか、time_budget_ms を超えるか、
+    順列数が max_samples に達したら停止する。
+
+    Args:
+        game: CoalitionGame
+        pairs: 性能インデックスのペア [(i, j), ...]
+        tolerance: 標準誤差の許容値（C_ij と同じ単位、Noneで判定しない）
+        time_budget_ms: 時間予算（ミリ秒、Noneで制限なし）
+        max_samples: 順列数の上限
+        sampling: 'random' / 'antithetic' / 'stratified'
+        seed: 乱数シード
+
+    Returns:
+        MonteCarloEstimate
+    """
+    if sampling not in SAMPLING_SCHEMES:
+        raise ValueError(f"Unknown sampling scheme: {sampling}")
+
+    start_time = time.time()
+    pairs = list(pairs)
+    n = game.n_players
+    n_pairs = len(pairs)
+    if n == 0 or not pairs:
+        empty = np.zeros((n, n_pairs))
+        return MonteCarloEstimate(empty, empty.copy(), 0, 'max_samples', sampling)
+
+    rng = np.random.default_rng(seed)
+    layout = _BatchLayout(game)
+    rows_i, rows_j, valid = _pair_index_arrays(game, pairs)
+
+    block_size = {'random': 1, 'antithetic': 2, 'stratified': n}[sampling]
+    # 1ラウンドのブロック数は最小ブロック数から倍々に増やす（時間予算を細かく判定するため）
+    max_blocks_per_round = max(ADAPTIVE_MIN_BLOCKS, layout.batch_size // (n * block_size))
+    blocks_per_round = ADAPTIVE_MIN_BLOCKS
+
+    count = 0
+    mean = np.zeros((n, n_pairs))
+    m2 = np.zeros((n, n_pairs))
+    std_error = np.full((n, n_pairs), np.inf)
+    n_samples = 0
+    stop_reason = 'max_samples'
+
+    while n_samples + block_size <= max(max_samples, block_size):
+        n_blocks = min(blocks_per_round, max(1, (max_samples - n_samples) // block_size))
+        base = rng.permuted(np.tile(np.arange(n), (n_blocks, 1)), axis=1)
+        perms = _expand_blocks(base, sampling)
+
+        ranks = np.argsort(perms, axis=1)
+        active = ranks[:, None, :] <= np.arange(n)[None, :, None]
+        values = layout.pair_values(active.reshape(-1, n), rows_i, rows_j, valid)
+        marginals = np.diff(values.reshape(-1, n, n_pairs), axis=1, prepend=0.0)
+
+        # 順列ごとにプレイヤー順へ並べ替え、ブロック内で平均して1観測とする
+        by_player = np.take_along_axis(marginals, ranks[:, :, None], axis=1)
+        observations = by_player.reshape(n_blocks, block_size, n, n_pairs).mean(axis=1)
+
+        # Welford / Chan の併合
+        batch_mean = observations.mean(axis=0)
+        batch_m2 = ((observations - batch_mean) ** 2).sum(axis=0)
+        total = count + n_blocks
+        delta = batch_mean - mean
+        mean += delta * (n_blocks / total)
+        m2 += batch_m2 + delta ** 2 * (count * n_blocks / total)
+        count = total
+        n_samples += n_blocks * block_size
+        blocks_per_round = min(blocks_per_round * 2, max_blocks_per_round)
+
+        if count > 1:
+            std_error = np.sqrt(m2 / (count - 1) / count)
+
+        if tolerance is not None and count >= ADAPTIVE_MIN_BLOCKS and std_error.max() <= tolerance:
+            stop_reason = 'tolerance'
+            break
+        if time_budget_ms is not None and (time.time() - start_time) * 1000 >= time_budget_ms:
+            stop_reason = 'time_budget'
+            break
+
+    if count <= 1:
+        std_error = np.full((n, n_pairs), np.nan)
+
+    return MonteCarloEstimate(mean, std_error, n_samples, stop_reason, sampling)
+
+
+def compute_kernel_shapley(
+    game: CoalitionGame,
+    pairs: Sequence[Tuple[int, int]],
+    n_samples: Optional[int] = None,
+    seed: Optional[int] = None
+) -> MonteCarloEstimate:
+    """
+    KernelSHAP（ペアサンプリング）による Shapley 値の近似
+
+    Shapley 値は制約付き重み付き最小二乗
+        min_φ Σ_S μ(S) [v(S) - v(∅) - z_Sᵀφ]²  s.t.  1ᵀφ = v(N) - v(∅)
+    の解であり、μ(S) は大きさ s の分布 p(s) ∝ 1/(s(n-s)) と一様な提携の選択に等しい。
+    正規方程式の A = E[z zᵀ] = (1/2 - q) I + q 11ᵀ（q は閉形式）は厳密に与え、
+    b = E[z (v(S) - v(∅))] だけを抽出した提携（S とその補集合のペア）で推定すると
+
+        φ = (b - mean(b)) / (1/2 - q) + (v(N) - v(∅)) / n
+
+    となる。φ は b について線形なので、ペアごとの観測から標準誤差も得られる。
+    全提携はスタックしたマスク付き行列でまとめて求解する。
+
+    Args:
+        game: CoalitionGame
+        pairs: 性能インデックスのペア [(i, j), ...]
+        n_samples: 提携ペア数（Noneで KERNEL_SAMPLES_PER_PLAYER × n）
+        seed: 乱数シード
+
+    Returns:
+        MonteCarloEstimate（n_samples は評価した提携数、sampling は 'paired'）
+    """
+    pairs = list(pairs)
+    n = game.n_players
+    n_pairs = len(pairs)
+    if n_samples is None:
+        n_samples = KERNEL_SAMPLES_PER_PLAYER * n
+    if n == 0 or not pairs:
+        empty = np.zeros((n, n_pairs))
+        return MonteCarloEstimate(empty, empty.copy(), 0, 'max_samples', 'paired')
+
+    layout = _BatchLayout(game)
+    rows_i, rows_j, valid = _pair_index_arrays(game, pairs)
+    bounds = layout.pair_values(np.array([np.zeros(n, dtype=bool), np.ones(n, dtype=bool)]),
+                                rows_i, rows_j, valid)
+    v_empty, v_full = bounds[0], bounds[1]
+    if n == 1 or n_samples <= 0:
+        phi = np.tile((v_full - v_empty) / n, (n, 1))
+        return MonteCarloEstimate(phi, np.full((n, n_pairs), np.nan), 2, 'max_samples', 'paired')
+
+    # 大きさの分布 p(s) ∝ 1/(s(n-s)) と A の非対角要素 q = Σ p(s) s(s-1) / (n(n-1))
+    sizes = np.arange(1, n)
+    size_probs = 1.0 / (sizes * (n - sizes))
+    size_probs /= size_probs.sum()
+    q = float(np.sum(size_probs * sizes * (sizes - 1))) / (n * (n - 1))
+
+    # 提携 S（大きさ s、プレイヤーは一様）とその補集合
+    rng = np.random.default_rng(seed)
+    drawn = rng.choice(sizes, size=n_samples, p=size_probs)
+    ranks = np.argsort(rng.random((n_samples, n)), axis=1).argsort(axis=1)
+    z = ranks < drawn[:, None]
+    values = layout.pair_values(np.concatenate([z, ~z]), rows_i, rows_j, valid) - v_empty
+    values_in, values_out = values[:n_samples], values[n_samples:]
+
+    # ペアごとの観測 b_obs = [z_S (v(S) - v(∅)) + z_S̄ (v(S̄) - v(∅))] / 2 を中心化して
+    # (1/2 - q) で割ったもの。全プレイヤー共通の成分は中心化で消えるので
+    # c = (z_S - |S|/n) (v(S) - v(S̄)) / (2 (1/2 - q)) となり、その平均と分散を行列積で求める
+    centered_z = (z - drawn[:, None] / n) / (2.0 * (0.5 - q))
+    diff = values_in - values_out
+    mean = centered_z.T @ diff / n_samples
+    phi = mean + (v_full - v_empty) / n
+    if n_samples > 1:
+        sum_sq = (centered_z ** 2).T @ (diff ** 2)
+        variance = np.maximum(sum_sq - n_samples * mean ** 2, 0.0) / (n_samples - 1)
+        std_error = np.sqrt(variance / n_samples)
+    else:
+        std_error = np.full((n, n_pairs), np.nan)
+
+    return MonteCarloEstimate(phi, std_error, 2 * n_samples + 2, 'max_samples', 'paired')
+
+
+# =============================================================================
+# 内部関数
+# =============================================================================
+
+class _BatchLayout:
+    """
+    提携のバッチからマスク付き行列スタックを作るための前計算
+
+    T に寄与し得る属性・変数（ノードゲーム: プレイヤーの属性・変数、
+    エッジゲーム: エッジの端点）だけに縮小した行列を使う。
+    """
+
+    def __init__(self, game: CoalitionGame):
+        self.game = game
+        n_perf, n_attr = game.B_PA.shape
+        n_var = game.B_AV.shape[1]
+        types = np.asarray(game.player_types)
+
+        if game.kind == 'node':
+            index = np.asarray(game.player_index, dtype=np.int64)
+            self.a_players = np.flatnonzero((types == 'A') & (index < n_attr))
+            self.v_players = np.flatnonzero((types == 'V') & (index < n_var))
+            a_idx = np.unique(index[self.a_players])
+            v_idx = np.unique(index[self.v_players])
+            self.a_pos = np.searchsorted(a_idx, index[self.a_players])
+            self.v_pos = np.searchsorted(v_idx, index[self.v_players])
+            self.B_PA = game.B_PA[:, a_idx]
+            self.B_AA = game.B_AA[a_idx][:, a_idx]
+            self.B_AV = game.B_AV[a_idx][:, v_idx]
+        else:
+            attrs = set()
+            variables = set()
+            for (row, col), edge_type in zip(game.edge_positions, game.player_types):
+                if edge_type == 'PA':
+                    attrs.add(col)
+                elif edge_type == 'AA':
+                    attrs.update((row, col))
+                elif edge_type == 'AV':
+                    attrs.add(row)
+                    variables.add(col)
+            a_idx = np.array(sorted(attrs), dtype=np.int64)
+            v_idx = np.array(sorted(variables), dtype=np.int64)
+            a_map = {a: i for i, a in enumerate(a_idx)}
+            v_map = {v: i for i, v in enumerate(v_idx)}
+            self.edge_targets = []
+            for (row, col), edge_type in zip(game.edge_positions, game.player_types):
+                if edge_type == 'PA':
+                    self.edge_targets.append(('PA', row, a_map[col]))
+                elif edge_type == 'AA':
+                    self.edge_targets.append(('AA', a_map[row], a_map[col]))
+                elif edge_type == 'AV':
+                    self.edge_targets.append(('AV', a_map[row], v_map[col]))
+                else:
+                    self.edge_targets.append(None)
+            self.B_PA = np.zeros((n_perf, len(a_idx)))
+            self.B_AA = np.zeros((len(a_idx), len(a_idx)))
+            self.B_AV = np.zeros((len(a_idx), len(v_idx)))
+
+        n_a = self.B_AA.shape[0]
+        bytes_per_item = 8 * (n_a * n_a + n_a * self.B_AV.shape[1] + n_perf * n_a + 1)
+        self.batch_size = max(1, MONTE_CARLO_BATCH_BYTES // bytes_per_item)
+
+    def matrices(self, active: np.ndarray):
+        """提携のバッチ (B × n_players) に対するマスク付き行列スタック"""
+        n_batch = active.shape[0]
+        if self.game.kind == 'node':
+            a_mask = np.zeros((n_batch, self.B_AA.shape[0]), dtype=bool)
+            v_mask = np.zeros((n_batch, self.B_AV.shape[1]), dtype=bool)
+            for player, pos in zip(self.a_players, self.a_pos):
+                a_mask[:, pos] |= active[:, player]
+            for player, pos in zip(self.v_players, self.v_pos):
+                v_mask[:, pos] |= active[:, player]
+            B_PA = self.B_PA[None, :, :] * a_mask[:, None, :]
+            B_AA = self.B_AA[None, :, :] * (a_mask[:, :, None] & a_mask[:, None, :])
+            B_AV = self.B_AV[None, :, :] * (a_mask[:, :, None] & v_mask[:, None, :])
+            return B_PA, B_AA, B_AV
+
+        stacks = {
+            'PA': np.zeros((n_batch,) + self.B_PA.shape),
+            'AA': np.zeros((n_batch,) + self.B_AA.shape),
+            'AV': np.zeros((n_batch,) + self.B_AV.shape),
+        }
+        # エッジ順に上書きする（同じ位置のエッジは後勝ち）
+        for k, target in enumerate(self.edge_targets):
+            if target is None:
+                continue
+            kind, row, col = target
+            M = stacks[kind]
+            M[:, row, col] = np.where(active[:, k], self.game.edge_weights[k], M[:, row, col])
+        return stacks['PA'], stacks['AA'], stacks['AV']
+
+    def pair_values(
+        self,
+        active: np.ndarray,
+        rows_i: np.ndarray,
+        rows_j: np.ndarray,
+        valid: np.ndarray
+    ) -> np.ndarray:
+        """提携のバッチに対する各ペアの C_ij(S)（B × ペア数）"""
+        values = np.empty((active.shape[0], len(rows_i)))
+        for start in range(0, active.shape[0], self.batch_size):
+            chunk = active[start:start + self.batch_size]
+            values[start:start + len(chunk)] = self._chunk_pair_values(chunk, rows_i, rows_j, valid)
+        return values
+
+    def _chunk_pair_values(self, active, rows_i, rows_j, valid) -> np.ndarray:
+        n_batch = active.shape[0]
+        values = np.zeros((n_batch, len(rows_i)))
+        n_a = self.B_AA.shape[0]
+        if n_a == 0 or self.B_AV.shape[1] == 0 or self.B_PA.shape[0] == 0:
+            return values
+
+        B_PA, B_AA, B_AV = self.matrices(active)
+
+        # ノルム上界 < 1 のものはスタックして一括で解く
+        abs_AA = np.abs(B_AA)
+        bound = np.minimum(abs_AA.sum(axis=1).max(axis=1), abs_AA.sum(axis=2).max(axis=1))
+        fast = bound < 1.0
+        if fast.any():
+            try:
+                X = np.linalg.solve(np.eye(n_a)[None, :, :] - B_AA[fast], B_AV[fast])
+                T = B_PA[fast] @ X
+                pair_values = np.einsum('bpk,bpk->bp', T[:, rows_i, :], T[:, rows_j, :])
+                pair_values[:, ~valid] = 0.0
+                values[fast] = pair_values
+            except np.linalg.LinAlgError:
+                fast[:] = False
+
+        # 残り（ρ の厳密判定・Neumann級数が必要なもの）は個別に計算
+        for b in np.flatnonzero(~fast):
+            T = coalition_total_effect(self.game, active[b])
+            values[b] = _pair_values(T, rows_i, rows_j, valid)
+        return values
+
+
+def _expand_blocks(base: np.ndarray, sampling: str) -> np.ndarray:
+    """基準順列 (B × n) をサンプリング方式のブロック (B·block_size × n) に展開"""
+    if sampling == 'antithetic':
+        return np.stack([base, base[:, ::-1]], axis=1).reshape(-1, base.shape[1])
+    if sampling == 'stratified':
+        n = base.shape[1]
+        shifts = (np.arange(n)[:, None] + np.arange(n)[None, :]) % n
+        return base[:, shifts].reshape(-1, n)
+    return base
+
+
+def _pair_index_arrays(game: CoalitionGame, pairs: Sequence[Tuple[int, int]]):
+    """ペアの行インデックス配列（範囲外のペアは価値0として扱う）"""
+    n_perf = game.n_performances
+    rows_i = np.array([i for i, _ in pairs], dtype=np.int64)
+    rows_j = np.array([j for _, j in pairs], dtype=np.int64)
+    valid = (rows_i < n_perf) & (rows_j < n_perf)
+    return np.where(valid, rows_i, 0), np.where(valid, rows_j, 0), valid
+
+
+def _pair_values(T: np.ndarray, rows_i: np.ndarray, rows_j: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """T(S) から各ペアの C_ij(S) = T_i · T_j を計算"""
+    if T.size == 0:
+        return np.zeros(len(rows_i))
+    values = np.einsum('pk,pk->p', T[rows_i], T[rows_j])
+    values[~valid] = 0.0
+    return values
+
+
+def _split_game(game: CoalitionGame) -> Tuple[dict, CoalitionGame]:
+    """共有メモリに置く行列と、行列を除いたゲーム定義に分ける"""
+    matrices = {'B_PA': game.B_PA, 'B_AA': game.B_AA, 'B_AV': game.B_AV}
+    return matrices, replace(game, B_PA=None, B_AA=None, B_AV=None)
+
+
+def _shared_gram_chunk(arrays, shell, pairs, start, stop) -> np.ndarray:
+    """共有メモリの行列で _evaluate_gram_chunk を実行（共有プールのタスク）"""
+    return _evaluate_gram_chunk((replace(shell, **arrays), pairs, start, stop))
+
+
+def _shared_class_chunk(arrays, shell, pairs, classes, start, stop) -> np.ndarray:
+    """共有メモリの行列で _evaluate_class_chunk を実行（共有プールのタスク）"""
+    return _evaluate_class_chunk((replace(shell, **arrays), pairs, classes, start, stop))
+
+
+def _evaluate_gram_chunk(args) -> np.ndarray:
+    """マスク範囲 [start, stop) の全ペアの価値を評価（プロセス並列用）"""
+    game, pairs, start, stop = args
+    n = game.n_players
+    rows_i, rows_j, valid = _pair_index_arrays(game, pairs)
+    layout = _BatchLayout(game)
+    values = np.empty((stop - start, len(pairs)))
+    # マスク付き行列スタックの一括求解（バッチ単位でブール配列を作りメモリを抑える）
+    for batch_start in range(start, stop, layout.batch_size):
+        masks = np.arange(batch_start, min(batch_start + layout.batch_size, stop), dtype=np.int64)
+        active = ((masks[:, None] >> np.arange(n)) & 1).astype(bool)
+        values[batch_start - start:batch_start - start + len(masks)] = layout.pair_values(
+            active, rows_i, rows_j, valid
+        )
+    return values
+
+
+def _evaluate_class_chunk(args) -> np.ndarray:
+    """人数の組（状態）範囲 [start, stop) の全ペアの価値を評価（プロセス並列用）"""
+    game, pairs, classes, start, stop = args
+    rows_i, rows_j, valid = _pair_index_arrays(game, pairs)
+    radices = [len(c) + 1 for c in classes]
+    values = np.empty((stop - start, len(pairs)))
+    active = np.zeros(game.n_players, dtype=bool)
+    for offset, state in enumerate(range(start, stop)):
+        active[:] = False
+        for members, radix in zip(classes, radices):
+            state, count = divmod(state, radix)
+            active[list(members[:count])] = True
+        T = coalition_total_effect(game, active)
+        values[offset] = _pair_values(T, rows_i, rows_j, valid)
+    return values
+
+
+def _total_effect(B_PA: np.ndarray, B_AA: np.ndarray, B_AV: np.ndarray) -> np.ndarray:
+    """
+    部分行列の総効果行列（2^n 回呼ばれるため典型ケースを直接計算）
+
+    compute_total_effect_matrix と同じ分岐:
+    - B_AA が零行列（allclose の既定許容値 1e-8）: T = B_PA B_AV
+    - ノルム上界 < 1: (I - B_AA) X = B_AV を解く
+    - それ以外（ρ の厳密判定・Neumann級数）は compute_total_effect_matrix に委ねる
+    """
+    abs_AA = np.abs(B_AA)
+    if not np.any(abs_AA > 1e-8):
+        return B_PA @ B_AV
+
+    bound = min(abs_AA.sum(axis=0).max(), abs_AA.sum(axis=1).max())
+    if bound < 1.0:
+        try:
+            return B_PA @ np.linalg.solve(np.eye(B_AA.shape[0]) - B_AA, B_AV)
+        except np.linalg.LinAlgError:
+            pass
+
+    return compute_total_effect_matrix(B_PA, B_AA, B_AV, exact_spectral_radius=False)['T']
+
+
+def _node_coalition_total_effect(game: CoalitionGame, active: np.ndarray) -> np.ndarray:
+    """
+    ノード提携の T(S)
+
+    不在の属性は B_PA の列・B_AA の行/列・B_AV の行が0、不在の変数は B_AV の列が0。
+    零の行/列は (I - B_AA)^(-1) でも単位行列ブロックとなり T に寄与しないため、
+    有効な属性・変数の部分行列だけで計算しても同じ結果になる。
+    """
+    n_perf, n_attr = game.B_PA.shape
+    n_var = game.B_AV.shape[1]
+    types = np.asarray(game.player_types)
+    index = np.asarray(game.player_index, dtype=np.int64)
+    a_idx = np.unique(index[active & (types == 'A') & (index < n_attr)])
+    v_idx = np.unique(index[active & (types == 'V') & (index < n_var)])
+
+    T = np.zeros((n_perf, n_var))
+    if a_idx.size == 0 or v_idx.size == 0 or n_perf == 0:
+        return T
+
+    T[:, v_idx] = _total_effect(
+        game.B_PA[:, a_idx],
+        game.B_AA[a_idx][:, a_idx],
+        game.B_AV[a_idx][:, v_idx]
+    )
+    return T
+
+
+def _edge_coalition_total_effect(game: CoalitionGame, active: np.ndarray) -> np.ndarray:
+    """
+    エッジ提携の T(S)
+
+    有効なエッジのみ値を設定した行列から計算する（同じ位置のエッジは後勝ち）。
+    エッジの端点にならない属性・変数は T に寄与しないため除いて計算する。
+    """
+    n_perf, n_attr = game.B_PA.shape
+    n_var = game.B_AV.shape[1]
+
+    attrs = set()
+    variables = set()
+    for k in np.flatnonzero(active):
+        row, col = game.edge_positions[k]
+        edge_type = game.player_types[k]
+        if edge_type == 'PA':
+            attrs.add(col)
+        elif edge_type == 'AA':
+            attrs.update((row, col))
+        elif edge_type == 'AV':
+            attrs.add(row)
+            variables.add(col)
+
+    T = np.zeros((n_perf, n_var))
+    if not attrs or not variables or n_perf == 0:
+        return T
+
+    a_idx = sorted(attrs)
+    v_idx = sorted(variables)
+    a_pos = {a: i for i, a in enumerate(a_idx)}
+    v_pos = {v: i for i, v in enumerate(v_idx)}
+
+    B_PA = np.zeros((n_perf, len(a_idx)))
+    B_AA = np.zeros((len(a_idx), len(a_idx)))
+    B_AV = np.zeros((len(a_idx), len(v_idx)))
+    for k in np.flatnonzero(active):
+        row, col = game.edge_positions[k]
+        weight = game.edge_weights[k]
+        edge_type = game.player_types[k]
+        if edge_type == 'PA':
+            B_PA[row, a_pos[col]] = weight
+        elif edge_type == 'AA':
+            B_AA[a_pos[row], a_pos[col]] = weight
+        elif edge_type == 'AV':
+            B_AV[a_pos[row], v_pos[col]] = weight
+
+    T[:, v_idx] = _total_effect(B_PA, B_AA, B_AV)
+    return T
@@ -0,0 +1,168 @@
+# backend/app/services/spectral_radius.py
+"""
+スペクトル半径 ρ(B_AA) の計算サービス
+
+総効果行列の収束判定（ρ(B_AA) < 1）のためだけに非対称固有値分解 O(n³) を
+毎回行うのを避ける:
+- ノルム上界: ρ(A) ≤ min(||A||_1, ||A||_∞)（Gershgorin の行/列和）
+  上界 < 1 なら収束が保証されるため固有値計算を省略できる
+- 小さい行列: np.linalg.eigvals（密）
+- 大きい行列: 強連結成分に分解し（非巡回部分の固有値は0）、
+  ループを含む成分ごとに ARPACK（scipy.sparse.linalg.eigs, k=1）で最大絶対値固有値のみ計算
+  収束しない場合はべき乗法の推定値にフォールバック
+
+matrix_utils（総効果行列）・scc_analyzer（ループの局所スペクトル半径）・
+matrix_session（差分更新）から共通に使う。
+"""
+
+from typing import Tuple
+
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+from scipy.sparse import csgraph
+
+
+# これ以下の次元では密な eigvals の方が速い
+DENSE_EIGVALS_MAX_SIZE = 64
+
+# べき乗法の既定反復回数・許容誤差
+POWER_ITERATION_MAX_ITER = 500
+POWER_ITERATION_TOL = 1e-10
+
+
+def spectral_radius_upper_bound(A) -> float:
+    """
+    ρ(A) のノルム上界 min(||A||_1, ||A||_∞)
+
+    Args:
+        A: 正方行列（密または疎）
+
+    Returns:
+        上界（空行列は 0.0）
+    """
+    if A.shape[0] == 0:
+        return 0.0
+    abs_A = abs(A)
+    col_sums = np.asarray(abs_A.sum(axis=0)).ravel()
+    row_sums = np.asarray(abs_A.sum(axis=1)).ravel()
+    return float(min(col_sums.max(), row_sums.max()))
+
+
+def compute_spectral_radius(A) -> float:
+    """
+    スペクトル半径 ρ(A) = max |λ_i| を計算
+
+    Args:
+        A: 正方行列（密または疎）
+
+    Returns:
+        スペクトル半径（計算不能の場合は inf）
+    """
+    n = A.shape[0] if A.ndim == 2 else 0
+    if n == 0:
+        return 0.0
+
+    if sp.issparse(A):
+        if A.nnz == 0:
+            return 0.0
+    elif not np.any(A):
+        return 0.0
+
+    # 小さい行列（ARPACK は k < n - 1 が必要）は密に計算
+    if n <= DENSE_EIGVALS_MAX_SIZE or n < 3:
+        dense = A.toarray() if sp.issparse(A) else A
+        try:
+            return float(np.max(np.abs(np.linalg.eigvals(dense))))
+        except np.linalg.LinAlgError:
+            return float('inf')
+
+    # 強連結成分に分解: ρ(A) = max_k ρ(A[C_k, C_k])
+    # 非巡回（DAG）部分は固有値0なので、ループを含む成分のみ計算すれば良い
+    pattern = sp.csr_matrix(A) != 0
+    n_components, labels = csgraph.connected_components(
+        pattern, directed=True, connection='strong'
+    )
+    if n_components > 1:
+        sizes = np.bincount(labels, minlength=n_components)
+
+        # 単独ノードの成分: 固有値は自己ループの重みのみ
+        diag = np.abs(A.diagonal()) if sp.issparse(A) else np.abs(np.diag(A))
+        singletons = sizes[labels] == 1
+        spectral_radius = float(diag[singletons].max()) if np.any(singletons) else 0.0
+
+        for component in np.flatnonzero(sizes > 1):
+            idx = np.flatnonzero(labels == component)
+            block = A[idx][:, idx]
+            spectral_radius = max(spectral_radius, compute_spectral_radius(block))
+        return spectral_radius
+
+    try:
+        eigenvalues = spla.eigs(
+            A, k=1, which='LM', return_eigenvectors=False, maxiter=n * 10
+        )
+        return float(np.abs(eigenvalues[0]))
+    except (spla.ArpackNoConvergence, spla.ArpackError):
+        return power_iteration_spectral_radius(A)
+
+
+def check_spectral_convergence(A) -> Tuple[bool, float]:
+    """
+    ρ(A) < 1 かどうかを判定（上界で判定できる場合は固有値計算を省略）
+
+    Args:
+        A: 正方行列（密または疎）
+
+    Returns:
+        (収束するか, スペクトル半径またはその上界)
+        上界 < 1 の場合、2番目の値は上界（ρ 自体ではない）
+    """
+    bound = spectral_radius_upper_bound(A)
+    if bound < 1.0:
+        return True, bound
+    spectral_radius = compute_spectral_radius(A)
+    return bool(spectral_radius < 1.0), spectral_radius
+
+
+def power_iteration_spectral_radius(
+    A,
+    max_iterations: int = POWER_ITERATION_MAX_ITER,
+    tol: float = POWER_ITERATION_TOL
+) -> float:
+    """
+    べき乗法による ρ(A) の推定
+
+    非対称行列で最大絶対値固有値が複素共役対・符号違いの対になる場合でも
+    成長率 ||A^k x||^(1/k) は ρ(A) に収束する（Gelfand の公式）ため、
+    連続する2ステップの成長率の幾何平均で推定する。
+
+    Args:
+        A: 正方行列（密または疎）
+        max_iterations: 最大反復回数
+        tol: 推定値の相対変化の許容値
+
+    Returns:
+        スペクトル半径の推定値
+    """
+    n = A.shape[0]
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal(n)
+    x /= np.linalg.norm(x)
+
+    estimate = 0.0
+    for _ in range(max_iterations):
+        y = A @ x
+        y_norm = np.linalg.norm(y)
+        if y_norm == 0.0:
+            return 0.0
+        z = A @ (y / y_norm)
+        z_norm = np.linalg.norm(z)
+        if z_norm == 0.0:
+            return 0.0
+        new_estimate = float(np.sqrt(y_norm * z_norm))
+        x = z / z_norm
+        if abs(new_estimate - estimate) <= tol * max(new_estimate, 1.0):
+            return new_estimate
+        estimate = new_estimate
+
+    return estimate
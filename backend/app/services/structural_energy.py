@@ -13,14 +13,23 @@ where:
 既存の energy_calculator.py (Match値+クーロン力モデル) とは別の指標として提供
 """
 
+import math
 import numpy as np
 from typing import Dict, List, Optional, Tuple
 
 from .matrix_utils import (
     build_adjacency_matrices,
     compute_total_effect_matrix,
+    compute_total_effect_matrices_batch,
     compute_inner_products,
 )
+from .matrix_session import get_matrix_session, get_matrix_session_snapshot
+from .analysis_cache import get_network_analysis
+from .worker_pool import map_shared, resolve_workers
+
+
+# これ未満の設計案数では共有プールに分けず、1回のバッチ計算で済ませる
+PARALLEL_MIN_CASES = 32
 
 
 def loss_function(x: float) -> float:
@@ -84,30 +93,159 @@ def compute_structural_energy(
             }
         }
     """
-    # Step 1: 隣接行列を構築
-    matrices = build_adjacency_matrices(network, weight_mode)
+    # Step 1-2: 隣接行列・総効果行列・内積行列（分析キャッシュを共有）
+    analysis = get_network_analysis(network, weight_mode)
+    matrices = analysis['matrices']
+
+    if matrices['dimensions']['n_perf'] == 0:
+        return _empty_result()
+
+    return _compute_energy_from_total_effect(
+        matrices,
+        analysis['total_effect'],
+        performance_weights,
+        performance_deltas,
+        inner_products=analysis['inner_products'],
+    )
+
+
+def compute_structural_energy_batch(cases: List[Dict], n_workers: Optional[int] = None) -> List[Dict]:
+    """
+    複数設計案の4象限分解エネルギーをまとめて計算
+
+    総効果行列をプロジェクト単位で一括計算（compute_total_effect_matrices_batch）し、
+    各設計案のエネルギーを compute_structural_energy と同じ形式で返す。
+    設計案が PARALLEL_MIN_CASES 件以上あれば、行列セッションのない設計案を
+    ワーカー数に分けて共有プールで計算する。
+
+    Args:
+        cases: [
+            {
+                'network': Dict,
+                'performance_weights': Dict[str, float],
+                'weight_mode': str,  # 省略時 'discrete_7'
+                'performance_deltas': Dict[str, float],  # 省略可
+                'case_id': str,  # 省略可（行列セッションがあれば差分更新済みの T を使用）
+            },
+            ...
+        ]
+        n_workers: 並列ワーカー数（1で逐次、Noneで共有プールの設定値）
+
+    Returns:
+        各設計案の compute_structural_energy の結果（入力と同じ順序）
+    """
+    n_workers = resolve_workers(n_workers)
+    if n_workers > 1 and len(cases) >= PARALLEL_MIN_CASES:
+        return _compute_energy_batch_parallel(cases, n_workers)
+
+    all_matrices = []
+    total_effect_map = {}
+    for k, case in enumerate(cases):
+        weight_mode = case.get('weight_mode') or 'discrete_7'
+        # エディタ操作で行列セッションが温まっている設計案は差分更新済みの T を使う
+        snapshot = None
+        if case.get('case_id'):
+            snapshot = get_matrix_session_snapshot(case['case_id'], case['network'], weight_mode)
+        if snapshot is not None:
+            all_matrices.append(snapshot[0])
+            total_effect_map[k] = snapshot[1]
+        else:
+            all_matrices.append(build_adjacency_matrices(case['network'], weight_mode, sparse=None))
+
+    # 性能ノードを持つ設計案のみ総効果行列を計算
+    active = [
+        k for k, m in enumerate(all_matrices)
+        if m['dimensions']['n_perf'] > 0 and k not in total_effect_map
+    ]
+    total_effects = compute_total_effect_matrices_batch([all_matrices[k] for k in active])
+    total_effect_map.update(zip(active, total_effects))
+
+    results = []
+    for k, case in enumerate(cases):
+        if all_matrices[k]['dimensions']['n_perf'] == 0:
+            results.append(_empty_result())
+            continue
+        results.append(_compute_energy_from_total_effect(
+            all_matrices[k],
+            total_effect_map[k],
+            case.get('performance_weights') or {},
+            case.get('performance_deltas'),
+        ))
+
+    return results
+
+
+def _compute_energy_batch_parallel(cases: List[Dict], n_workers: int) -> List[Dict]:
+    """
+    行列セッションのない設計案をチャンクに分けて共有プールで計算
+
+    セッションはこのプロセスにしかないため、セッションのある設計案は
+    この場で計算し、ワーカーには case_id を外した設計案を渡す。
+    """
+    local = [
+        k for k, case in enumerate(cases)
+        if case.get('case_id') and get_matrix_session(
+            case['case_id'], case['network'], case.get('weight_mode') or 'discrete_7'
+        ) is not None
+    ]
+    local_set = set(local)
+    remote = [k for k in range(len(cases)) if k not in local_set]
+
+    results: List[Optional[Dict]] = [None] * len(cases)
+    if local:
+        for k, result in zip(local, compute_structural_energy_batch([cases[k] for k in local], n_workers=1)):
+            results[k] = result
+
+    chunk_size = math.ceil(len(remote) / n_workers) if remote else 1
+    chunks = [remote[start:start + chunk_size] for start in range(0, len(remote), chunk_size)]
+    args_list = [
+        ([{key: value for key, value in cases[k].items() if key != 'case_id'} for k in chunk],)
+        for chunk in chunks
+    ]
+    for chunk, chunk_results in zip(chunks, map_shared(_energy_chunk, {}, args_list, n_workers)):
+        for k, result in zip(chunk, chunk_results):
+            results[k] = result
+    return results
+
+
+def _energy_chunk(arrays, cases: List[Dict]) -> List[Dict]:
+    """設計案のチャンクのエネルギーを計算（共有プールのタスク）"""
+    return compute_structural_energy_batch(cases, n_workers=1)
+
+
+def _compute_energy_from_total_effect(
+    matrices: Dict,
+    total_effect: Dict,
+    performance_weights: Dict[str, float],
+    performance_deltas: Dict[str, float] = None,
+    inner_products: Optional[Dict] = None,
+) -> Dict:
+    """
+    隣接行列と総効果行列から4象限分解エネルギーを計算（Step 3以降）
+
+    Args:
+        matrices: build_adjacency_matrices の結果
+        total_effect: compute_total_effect_matrix の結果
+        performance_weights: 性能の重み {performance_id: W_i}
+        performance_deltas: 性能の正味方向票 {performance_id: δ_i}
+        inner_products: 計算済みの compute_inner_products の結果（省略時は計算）
 
+    Returns:
+        compute_structural_energy と同じ形式の辞書
+    """
     n_perf = matrices['dimensions']['n_perf']
     perf_ids = matrices['node_ids']['P']
     perf_labels = matrices['node_labels']['P']
     perf_id_map = matrices['performance_id_map']
 
-    if n_perf == 0:
-        return _empty_result()
-
-    # Step 2: 総効果行列を計算
-    total_effect = compute_total_effect_matrix(
-        matrices['B_PA'],
-        matrices['B_AA'],
-        matrices['B_AV']
-    )
     T = total_effect['T']
 
     if T.size == 0:
         return _empty_result()
 
     # Step 3: 内積行列を計算
-    inner_products = compute_inner_products(T)
+    if inner_products is None:
+        inner_products = compute_inner_products(T)
     C = inner_products['C']
     cos_theta = inner_products['cos_theta']
     norms = inner_products['norms']
@@ -16,6 +16,7 @@ from .matrix_utils import (
     compute_structural_tradeoff,
     analyze_network_structure,
 )
+from .analysis_cache import get_network_analysis
 
 
 class StructuralTradeoffCalculator:
@@ -32,7 +33,8 @@ class StructuralTradeoffCalculator:
         performances: List[Dict] = None,
         weight_mode: str = 'discrete_7',
         performance_weights: Dict[str, float] = None,
-        performance_deltas: Dict[str, float] = None
+        performance_deltas: Dict[str, float] = None,
+        raw_analysis: Optional[Dict] = None
     ):
         """
         Args:
@@ -41,12 +43,15 @@ class StructuralTradeoffCalculator:
             weight_mode: 重みモード ('discrete_3', 'discrete_5', 'discrete_7', 'continuous')
             performance_weights: 性能の重み {performance_id: W_i}（E_ij計算用）
             performance_deltas: 性能の正味方向票 {performance_id: δ_i}（Noneの場合W_iにフォールバック）
+            raw_analysis: 計算済みの analyze_network_structure の結果（オプション）
+                          analyze_network_structures_batch で一括計算した場合に渡す
         """
         self.network = network
         self.performances = performances or []
         self.weight_mode = weight_mode
         self.performance_weights = performance_weights or {}
         self.performance_deltas = performance_deltas or {}
+        self._raw_analysis = raw_analysis
         self._analysis_result = None
 
     def analyze(self) -> Dict:
@@ -89,7 +94,10 @@ class StructuralTradeoffCalculator:
             return self._analysis_result
 
         # 基本分析を実行（weight_modeを渡す）
-        raw_result = analyze_network_structure(self.network, self.weight_mode)
+        if self._raw_analysis is not None:
+            raw_result = self._raw_analysis
+        else:
+            raw_result = get_network_analysis(self.network, self.weight_mode)
 
         # 結果を整形
         matrices = raw_result['matrices']
@@ -13,6 +13,7 @@ Weighted版は数値的な特徴ベクトルを保持し連続的に比較。
 """
 
 import numpy as np
+import scipy.sparse as sp
 from typing import Dict, List, Optional, Tuple
 from collections import defaultdict
 
@@ -24,6 +25,22 @@ from app.services.weight_normalization import (
 )
 
 
+# ノードRBF行列をブロックで計算するときの1ブロックの最大要素数
+NODE_KERNEL_BLOCK_ELEMENTS = 4_000_000
+
+# 近似モード（ランダムフーリエ特徴）の既定の次元数
+DEFAULT_RFF_COMPONENTS = 256
+
+# 近似モードで指定できる次元数の上限（特徴行列はグラフ数 × 次元数）
+MAX_RFF_COMPONENTS = 4096
+
+# 近似誤差を厳密カーネルと比較するグラフ数の上限
+APPROXIMATION_SAMPLE_GRAPHS = 40
+
+# グラフカーネル = HISTOGRAM_KERNEL_WEIGHT × ヒストグラムRBF + (1 − HISTOGRAM_KERNEL_WEIGHT) × 平均ノードRBF
+HISTOGRAM_KERNEL_WEIGHT = 0.7
+
+
 class WeightedWLKernel:
     """
     Weighted Weisfeiler-Lehman カーネル
@@ -44,7 +61,10 @@ class WeightedWLKernel:
         n_iterations: int = 3,
         weight_mode: str = 'continuous',
         aggregation: str = 'weighted_mean',
-        sigma: float = 1.0
+        sigma: float = 1.0,
+        approximate: bool = False,
+        n_components: int = DEFAULT_RFF_COMPONENTS,
+        random_state: Optional[int] = 0
     ):
         """
         Args:
@@ -57,6 +77,9 @@ class WeightedWLKernel:
                 - 'discrete_7': 7段階 {-5, -3, -1, 0, +1, +3, +5}
             aggregation: 近傍集約方法 ('weighted_mean', 'weighted_sum', 'attention')
             sigma: RBFカーネルの幅パラメータ
+            approximate: True ならランダムフーリエ特徴で近似する（総ノード数に線形）
+            n_components: 近似モードの特徴の次元数
+            random_state: 近似モードの乱数シード
         """
         self.n_iterations = n_iterations
         # 後方互換性: 'discrete' → 'discrete_5'
@@ -65,6 +88,12 @@ class WeightedWLKernel:
         self.weight_mode = weight_mode
         self.aggregation = aggregation
         self.sigma = sigma
+        self.approximate = approximate
+        self.n_components = n_components
+        self.random_state = random_state
+
+        # 近似モードで fit_transform した後の近似誤差（サンプルしたグラフでの厳密値との比較）
+        self.approximation_error_: Optional[Dict] = None
 
         # レイヤー・タイプのエンコーディング
         self.layer_encoding = {1: 0, 2: 1, 3: 2, 4: 3}  # P, A, V, E
@@ -105,17 +134,19 @@ class WeightedWLKernel:
             features = self._extract_features(graph, weight_mode=wm)
             all_features.append(features)
 
-        # カーネル行列を計算
-        K = np.zeros((n, n))
-        for i in range(n):
-            for j in range(i, n):
-                k_ij = self._graph_kernel(all_features[i], all_features[j])
-                K[i, j] = k_ij
-                K[j, i] = k_ij
+        # カーネル行列を計算（全ペアを行列演算で一括計算）
+        if self.approximate:
+            K = self._approximate_kernel_matrix(all_features)
+        else:
+            K = self._kernel_matrix(all_features)
 
         # 正規化
         K_normalized = self._normalize_kernel(K)
 
+        self.approximation_error_ = (
+            self._approximation_error(all_features, K_normalized) if self.approximate else None
+        )
+
         return K_normalized
 
     def _extract_features(self, graph: Dict, weight_mode: Optional[str] = None) -> Dict:
@@ -332,11 +363,162 @@ class WeightedWLKernel:
         # 全反復のヒストグラムを結合
         return np.concatenate(histograms)
 
+    def _kernel_matrix(self, all_features: List[Dict]) -> np.ndarray:
+        """
+        全グラフペアのカーネル値を一括計算（_graph_kernel のベクトル化版）
+
+        同じ反復回数では空でないグラフのヒストグラム・ノード特徴の次元は揃うため、
+        グラフごとにスタックして
+        - ヒストグラムRBF: 二乗ノルム + 1回の行列積で全ペアの距離
+        - 平均ノードRBF: 全ノードを並べた RBF 行列をブロックごとに計算し、
+          グラフの所属行列との積でグラフペアごとの和を取って n_i·n_j で割る
+
+        Args:
+            all_features: _extract_features() の結果のリスト
+
+        Returns:
+            K: 未正規化のカーネル行列（空のグラフの行・列は0）
+        """
+        n = len(all_features)
+        K = np.zeros((n, n))
+        active = [
+            g for g, f in enumerate(all_features)
+            if f['histogram'].size > 0 and len(f['node_features']) > 0
+        ]
+        if not active:
+            return K
+
+        gamma = 1.0 / (2 * self.sigma ** 2)
+
+        # ヒストグラム特徴のRBFカーネル
+        H = np.vstack([all_features[g]['histogram'] for g in active])
+        k_histogram = np.exp(-gamma * _squared_distances(H, H))
+
+        # ノード特徴の平均RBF
+        node_blocks = [np.vstack(all_features[g]['node_features']) for g in active]
+        sizes = np.array([len(block) for block in node_blocks])
+        F = np.vstack(node_blocks)
+        membership = np.repeat(np.arange(len(active)), sizes)
+        total = len(F)
+
+        node_sums = np.zeros((len(active), len(active)))
+        block_rows = max(1, NODE_KERNEL_BLOCK_ELEMENTS // total)
+        for start in range(0, total, block_rows):
+            R = np.exp(-gamma * _squared_distances(F[start:start + block_rows], F))
+            # 列方向: グラフごとに和（R Aᵀ）、行方向: グラフごとに和
+            col_sums = np.add.reduceat(R, np.r_[0, np.cumsum(sizes)[:-1]], axis=1)
+            np.add.at(node_sums, membership[start:start + block_rows], col_sums)
+        k_nodes = node_sums / np.outer(sizes, sizes)
+
+        K[np.ix_(active, active)] = (
+            HISTOGRAM_KERNEL_WEIGHT * k_histogram + (1 - HISTOGRAM_KERNEL_WEIGHT) * k_nodes
+        )
+        return K
+
+    def _approximate_kernel_matrix(self, all_features: List[Dict]) -> np.ndarray:
+        """
+        ランダムフーリエ特徴による近似カーネル行列
+
+        RBF exp(−||x−y||²/(2σ²)) ≈ z(x)·z(y)、z(x) = √(2/D) cos(Wx + b)
+        （W ~ N(0, 1/σ²)、b ~ U(0, 2π)）を使い、グラフを
+        Φ_g = [√0.7 z(ヒストグラム), √0.3 mean_{v∈g} z(ノード特徴)] で表して K ≈ Φ Φᵀ とする。
+        平均ノードRBF（ノードの全ペアの平均）が平均埋め込みの内積になるため、
+        計算量は総ノード数に線形、グラフペアは1回の低ランクの行列積になる。
+
+        Args:
+            all_features: _extract_features() の結果のリスト
+
+        Returns:
+            K: 未正規化の近似カーネル行列（空のグラフの行・列は0）
+        """
+        n = len(all_features)
+        K = np.zeros((n, n))
+        active = [
+            g for g, f in enumerate(all_features)
+            if f['histogram'].size > 0 and len(f['node_features']) > 0
+        ]
+        if not active:
+            return K
+
+        rng = np.random.default_rng(self.random_state)
+        H = np.vstack([all_features[g]['histogram'] for g in active])
+        z_histogram = self._random_fourier_features(H, rng)
+
+        node_blocks = [np.vstack(all_features[g]['node_features']) for g in active]
+        sizes = np.array([len(block) for block in node_blocks])
+        F = np.vstack(node_blocks)
+        W, b = self._random_fourier_weights(F.shape[1], rng)
+        # グラフの所属行列 A (n_graphs × 総ノード数)
+        membership = sp.csr_matrix(
+            (np.ones(len(F)), (np.repeat(np.arange(len(active)), sizes), np.arange(len(F)))),
+            shape=(len(active), len(F))
+        )
+
+        # ノードの埋め込みをブロックごとに計算し、グラフごとの和 A Z を取る
+        node_sums = np.zeros((len(active), self.n_components))
+        block_rows = max(1, NODE_KERNEL_BLOCK_ELEMENTS // self.n_components)
+        for start in range(0, len(F), block_rows):
+            Z = np.sqrt(2.0 / self.n_components) * np.cos(F[start:start + block_rows] @ W + b)
+            node_sums += membership[:, start:start + block_rows] @ Z
+        z_nodes = node_sums / sizes[:, None]
+
+        Phi = np.hstack([
+            np.sqrt(HISTOGRAM_KERNEL_WEIGHT) * z_histogram,
+            np.sqrt(1 - HISTOGRAM_KERNEL_WEIGHT) * z_nodes,
+        ])
+        K[np.ix_(active, active)] = Phi @ Phi.T
+        return K
+
+    def _random_fourier_weights(self, dim: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        """RBF（幅 sigma）のランダムフーリエ特徴の W (dim × D) と b (D,)"""
+        W = rng.normal(0.0, 1.0 / self.sigma, size=(dim, self.n_components))
+        b = rng.uniform(0.0, 2 * np.pi, size=self.n_components)
+        return W, b
+
+    def _random_fourier_features(self, X: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """行ごとのランダムフーリエ特徴 z(x) = √(2/D) cos(Wx + b)"""
+        W, b = self._random_fourier_weights(X.shape[1], rng)
+        return np.sqrt(2.0 / self.n_components) * np.cos(X @ W + b)
+
+    def _approximation_error(self, all_features: List[Dict], K_approx: np.ndarray) -> Dict:
+        """
+        近似カーネルの誤差（最大 APPROXIMATION_SAMPLE_GRAPHS 個のグラフで厳密値と比較）
+
+        Args:
+            all_features: _extract_features() の結果のリスト
+            K_approx: 正規化した近似カーネル行列
+
+        Returns:
+            {'n_components', 'n_sample_graphs', 'max_abs_error', 'mean_abs_error'}
+        """
+        active = [
+            g for g, f in enumerate(all_features)
+            if f['histogram'].size > 0 and len(f['node_features']) > 0
+        ]
+        rng = np.random.default_rng(self.random_state)
+        if len(active) > APPROXIMATION_SAMPLE_GRAPHS:
+            active = sorted(rng.choice(active, APPROXIMATION_SAMPLE_GRAPHS, replace=False).tolist())
+
+        if active:
+            exact = self._normalize_kernel(self._kernel_matrix([all_features[g] for g in active]))
+            error = np.abs(K_approx[np.ix_(active, active)] - exact)
+            max_error, mean_error = float(error.max()), float(error.mean())
+        else:
+            max_error = mean_error = 0.0
+
+        return {
+            'n_components': self.n_components,
+            'n_sample_graphs': len(active),
+            'max_abs_error': max_error,
+            'mean_abs_error': mean_error,
+        }
+
     def _graph_kernel(self, features_i: Dict, features_j: Dict) -> float:
         """
         2つのグラフ間のカーネル値を計算
 
         ヒストグラム特徴のRBFカーネル + ノード特徴のマッチング
+        （fit_transform は全ペアを _kernel_matrix で一括計算する）
         """
         # ヒストグラム特徴のRBFカーネル
         hist_i = features_i['histogram']
@@ -379,7 +561,7 @@ class WeightedWLKernel:
             k_nodes = 0.0
 
         # 組み合わせ
-        return 0.7 * k_histogram + 0.3 * k_nodes
+        return HISTOGRAM_KERNEL_WEIGHT * k_histogram + (1 - HISTOGRAM_KERNEL_WEIGHT) * k_nodes
 
     def _normalize_kernel(self, K: np.ndarray) -> np.ndarray:
         """
@@ -387,16 +569,11 @@ class WeightedWLKernel:
 
         K_normalized[i,j] = K[i,j] / sqrt(K[i,i] * K[j,j])
         """
-        n = K.shape[0]
-        K_normalized = np.zeros_like(K)
-
         diag = np.diag(K)
-        for i in range(n):
-            for j in range(n):
-                if diag[i] > 0 and diag[j] > 0:
-                    K_normalized[i, j] = K[i, j] / np.sqrt(diag[i] * diag[j])
-
-        return K_normalized
+        scale = np.zeros_like(diag, dtype=float)
+        positive = diag > 0
+        scale[positive] = 1.0 / np.sqrt(diag[positive])
+        return K * np.outer(scale, scale)
 
 
 def kernel_to_distance(K: np.ndarray) -> np.ndarray:
@@ -405,15 +582,14 @@ def kernel_to_distance(K: np.ndarray) -> np.ndarray:
 
     D[i,j] = sqrt(K[i,i] + K[j,j] - 2*K[i,j])
     """
-    n = K.shape[0]
-    D = np.zeros((n, n))
+    diag = np.diag(K)
+    return np.sqrt(np.maximum(0, diag[:, None] + diag[None, :] - 2 * K))
 
-    for i in range(n):
-        for j in range(n):
-            d_squared = K[i, i] + K[j, j] - 2 * K[i, j]
-            D[i, j] = np.sqrt(max(0, d_squared))
 
-    return D
+def _squared_distances(A: np.ndarray, B: np.ndarray) -> np.ndarray:
+    """行同士の二乗ユークリッド距離 ||a||² + ||b||² − 2 a·b（丸め誤差の負値は0）"""
+    sq = np.sum(A ** 2, axis=1)[:, None] + np.sum(B ** 2, axis=1)[None, :] - 2 * (A @ B.T)
+    return np.maximum(sq, 0.0)
 
 
 # =============================================================================
@@ -628,7 +804,10 @@ def compute_weighted_wl_kernel(
     networks: List[Dict],
     iterations: int = 3,
     weight_mode: str = 'continuous',
-    weight_modes: Optional[List[str]] = None
+    weight_modes: Optional[List[str]] = None,
+    approximate: bool = False,
+    n_components: int = DEFAULT_RFF_COMPONENTS,
+    diagnostics: Optional[Dict] = None
 ) -> np.ndarray:
     """
     Weighted WLカーネルを計算する便利関数
@@ -641,12 +820,20 @@ def compute_weighted_wl_kernel(
         weight_mode: デフォルトのweight_mode（weight_modesが指定されていない場合に使用）
         weight_modes: 各ネットワークのweight_modeリスト（オプション）
                       指定された場合はweight_modeパラメータより優先
+        approximate: True ならランダムフーリエ特徴で近似する（大量の設計案向け）
+        n_components: 近似モードの特徴の次元数
+        diagnostics: 近似モードの誤差（approximation_error_）の書き込み先
 
     Returns:
         正規化されたカーネル行列
     """
     kernel = WeightedWLKernel(
         n_iterations=iterations,
-        weight_mode=weight_mode
+        weight_mode=weight_mode,
+        approximate=approximate,
+        n_components=n_components
     )
-    return kernel.fit_transform(networks, weight_modes=weight_modes)
+    K = kernel.fit_transform(networks, weight_modes=weight_modes)
+    if diagnostics is not None and kernel.approximation_error_ is not None:
+        diagnostics.update(kernel.approximation_error_)
+    return K
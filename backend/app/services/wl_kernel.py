@@ -0,0 +1,419 @@
+# backend/app/services/wl_kernel.py
+"""
+従来の Weisfeiler-Lehman カーネル（ラベル一致カウント）の計算エンジン
+
+mds.compute_wl_kernel の実装本体。山の座標計算はノード・エッジの編集のたびに
+全設計案のカーネルを再計算するため、次のようにまとめて計算する。
+
+- 隣接リストはグラフごとに1回だけ作る（ノードIDは辞書で引く）
+- ラベルは文字列を連結せず、全グラフ共有のラベル辞書で整数IDに圧縮する
+  （初期ラベル: (レイヤー, タイプ, 次数)、反復ラベル: (前回のID, 近傍の(ID, 重み)のソート列)）
+- グラフごとに全反復のラベルIDのカウントを疎行列 X の1行にまとめ、
+  K = X Xᵀ を1回の疎行列積で求める
+
+ラベルの圧縮は単射なので、ラベル文字列を比較する従来の実装と同じカーネル値になる。
+
+山の座標計算では、ラベルを blake2b の64bitハッシュにした設計案ごとの特徴ベクトル
+（WLFeatureVector）を設計案に保存して使い回し、IncrementalWLKernel で
+ネットワークが変わった設計案の行・列だけを再計算する（1案の編集で O(N)）。
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import scipy.sparse as sp
+
+
+# プロジェクトごとのカーネル状態の保持数
+MAX_KERNEL_STATES = 64
+
+
+class WLLabelDictionary:
+    """
+    WLラベル → 整数ID の共有辞書
+
+    全グラフ・全反復で1つの辞書を使う。反復ラベルのキーは前回のIDを含むため、
+    異なる反復のラベルが同じIDになることはない。
+    """
+
+    def __init__(self):
+        self._ids: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def compress(self, key: Hashable) -> int:
+        """ラベルのキーを整数IDに変換（未登録なら新しいIDを振る）"""
+        label_id = self._ids.get(key)
+        if label_id is None:
+            label_id = len(self._ids)
+            self._ids[key] = label_id
+        return label_id
+
+
+class WLLabelHasher:
+    """
+    WLラベル → blake2b の64bitハッシュ
+
+    WLLabelDictionary と同じインターフェースで、リクエストや設計案をまたいで
+    同じラベルが同じ値になる（保存した特徴ベクトルを比較できる）。
+    """
+
+    def __init__(self):
+        self._memo: Dict[Hashable, int] = {}
+
+    def compress(self, key: Hashable) -> int:
+        """ラベルのキーを64bitハッシュに変換"""
+        label_id = self._memo.get(key)
+        if label_id is None:
+            digest = hashlib.blake2b(repr(key).encode('utf-8'), digest_size=8).digest()
+            label_id = int.from_bytes(digest, 'little')
+            self._memo[key] = label_id
+        return label_id
+
+
+@dataclass
+class WLFeatureVector:
+    """
+    1グラフの WL 特徴ベクトル（ラベルハッシュごとのカウント）
+
+    Attributes:
+        network_hash: wl_network_hash() の値
+        iterations: WL反復回数
+        labels: ラベルハッシュ（昇順、uint64）
+        counts: 各ラベルの出現数
+    """
+    network_hash: str
+    iterations: int
+    labels: np.ndarray
+    counts: np.ndarray
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'network_hash': self.network_hash,
+            'iterations': self.iterations,
+            'labels': [int(label) for label in self.labels],
+            'counts': [int(count) for count in self.counts],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "WLFeatureVector":
+        return cls(
+            network_hash=data['network_hash'],
+            iterations=int(data['iterations']),
+            labels=np.asarray(data['labels'], dtype=np.uint64),
+            counts=np.asarray(data['counts'], dtype=np.int64),
+        )
+
+
+def build_wl_adjacency(network: Dict) -> Tuple[List[Tuple], List[List[Tuple[int, float]]]]:
+    """
+    初期ラベルのキーと無向の隣接リストを作成
+
+    Args:
+        network: {'nodes': [...], 'edges': [...]}
+
+    Returns:
+        (ノードごとの初期ラベルのキー (レイヤー, タイプ頭文字, 次数),
+         ノードごとの [(近傍のインデックス, 重み)])
+    """
+    nodes = network.get('nodes', [])
+    edges = network.get('edges', [])
+    index = {node['id']: k for k, node in enumerate(nodes)}
+    degree = [0] * len(nodes)
+    neighbors: List[List[Tuple[int, float]]] = [[] for _ in nodes]
+
+    for edge in edges:
+        source = index.get(edge['source_id'])
+        target = index.get(edge['target_id'])
+        if source is not None:
+            degree[source] += 1
+        if target is not None:
+            degree[target] += 1
+        if source is None or target is None:
+            continue
+
+        # weightがNoneや未定義の場合は0をデフォルト値として使用
+        weight = edge.get('weight')
+        if weight is None:
+            weight = 0
+        weight = round(weight * 100) / 100
+
+        neighbors[source].append((target, weight))
+        if target != source:
+            neighbors[target].append((source, weight))
+
+    initial_keys = [
+        (node['layer'], node['type'][0].upper(), degree[k])
+        for k, node in enumerate(nodes)
+    ]
+    return initial_keys, neighbors
+
+
+def extract_wl_labels(
+    network: Dict,
+    iterations: int,
+    labels: Union[WLLabelDictionary, WLLabelHasher]
+) -> List[int]:
+    """
+    1グラフの全反復（0〜iterations）のラベルID
+
+    Args:
+        network: {'nodes': [...], 'edges': [...]}
+        iterations: WL反復回数
+        labels: 共有ラベル辞書（または WLLabelHasher）
+
+    Returns:
+        全ノード・全反復のラベルIDのリスト（重複あり）
+    """
+    initial_keys, neighbors = build_wl_adjacency(network)
+    current = [labels.compress(('L',) + key) for key in initial_keys]
+    all_ids = list(current)
+
+    for _ in range(iterations):
+        current = [
+            labels.compress((
+                current[k],
+                tuple(sorted((current[nb], weight) for nb, weight in neighbors[k]))
+            ))
+            for k in range(len(current))
+        ]
+        all_ids.extend(current)
+
+    return all_ids
+
+
+def wl_feature_matrix(
+    networks: List[Dict],
+    iterations: int,
+    labels: Optional[WLLabelDictionary] = None
+) -> sp.csr_matrix:
+    """
+    WL特徴（ラベルIDのカウント）の疎行列
+
+    Args:
+        networks: ネットワークのリスト
+        iterations: WL反復回数
+        labels: 共有ラベル辞書（Noneで新規作成）
+
+    Returns:
+        X (n_graphs × n_labels)
+    """
+    labels = labels if labels is not None else WLLabelDictionary()
+    rows = []
+    cols = []
+    for g, network in enumerate(networks):
+        ids = extract_wl_labels(network, iterations, labels)
+        rows.append(np.full(len(ids), g, dtype=np.int64))
+        cols.append(np.asarray(ids, dtype=np.int64))
+
+    if not networks:
+        return sp.csr_matrix((0, 0))
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+    X = sp.coo_matrix(
+        (np.ones(len(rows)), (rows, cols)),
+        shape=(len(networks), len(labels))
+    ).tocsr()
+    X.sum_duplicates()
+    return X
+
+
+def normalize_kernel(kernel: np.ndarray) -> np.ndarray:
+    """
+    K_ij / √(K_ii K_jj)（対角が0のグラフの行・列は0）
+
+    Args:
+        kernel: 未正規化のカーネル行列
+
+    Returns:
+        正規化したカーネル行列
+    """
+    diag = np.diag(kernel).astype(float)
+    scale = np.zeros_like(diag)
+    positive = diag > 0
+    scale[positive] = 1.0 / np.sqrt(diag[positive])
+    return kernel * np.outer(scale, scale)
+
+
+def compute_classic_wl_kernel(networks: List[Dict], iterations: int) -> np.ndarray:
+    """
+    正規化した従来の WL カーネル行列
+
+    Args:
+        networks: ネットワークのリスト
+        iterations: WL反復回数
+
+    Returns:
+        K (n_graphs × n_graphs)
+    """
+    X = wl_feature_matrix(networks, iterations)
+    if X.shape[0] == 0:
+        return np.zeros((0, 0))
+    return normalize_kernel((X @ X.T).toarray())
+
+
+def kernel_to_distance(kernel: np.ndarray) -> np.ndarray:
+    """カーネル行列から距離行列を計算 d_ij = √max(0, K_ii + K_jj − 2K_ij)"""
+    kernel = np.asarray(kernel, dtype=float)
+    diag = np.diag(kernel)
+    return np.sqrt(np.maximum(0.0, diag[:, None] + diag[None, :] - 2 * kernel))
+
+
+def wl_network_hash(network: Dict) -> str:
+    """
+    WL カーネルに効くネットワーク内容だけのハッシュ
+
+    ノードの (id, layer, type) とエッジの (source_id, target_id, weight) だけを見るため、
+    ノードの移動や名前の変更では変わらない。
+
+    Args:
+        network: {'nodes': [...], 'edges': [...]}
+
+    Returns:
+        blake2b の16進文字列
+    """
+    canonical = json.dumps(
+        [
+            [[node['id'], node.get('layer'), node.get('type')] for node in network.get('nodes', [])],
+            [[e['source_id'], e['target_id'], e.get('weight')] for e in network.get('edges', [])],
+        ],
+        separators=(',', ':'),
+        default=str
+    )
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def compute_wl_features(
+    network: Dict,
+    iterations: int,
+    hasher: Optional[WLLabelHasher] = None
+) -> WLFeatureVector:
+    """
+    1グラフの WL 特徴ベクトルを計算
+
+    Args:
+        network: {'nodes': [...], 'edges': [...]}
+        iterations: WL反復回数
+        hasher: ラベルのハッシュ（Noneで新規作成。複数グラフで共有するとメモが効く）
+
+    Returns:
+        WLFeatureVector
+    """
+    hasher = hasher if hasher is not None else WLLabelHasher()
+    ids = np.asarray(extract_wl_labels(network, iterations, hasher), dtype=np.uint64)
+    labels, counts = np.unique(ids, return_counts=True)
+    return WLFeatureVector(
+        network_hash=wl_network_hash(network),
+        iterations=iterations,
+        labels=labels,
+        counts=counts.astype(np.int64),
+    )
+
+
+def feature_vectors_to_matrix(features: Sequence[WLFeatureVector]) -> sp.csr_matrix:
+    """
+    特徴ベクトルを共通の列（ラベルハッシュ）の疎行列にまとめる
+
+    Args:
+        features: WLFeatureVector のリスト
+
+    Returns:
+        X (n_graphs × 出現したラベル数)
+    """
+    if not features:
+        return sp.csr_matrix((0, 0))
+    all_labels = np.concatenate([f.labels for f in features])
+    columns, cols = np.unique(all_labels, return_inverse=True)
+    rows = np.repeat(np.arange(len(features)), [len(f.labels) for f in features])
+    data = np.concatenate([f.counts for f in features]).astype(float)
+    return sp.csr_matrix((data, (rows, cols)), shape=(len(features), len(columns)))
+
+
+class IncrementalWLKernel:
+    """
+    WL カーネルの差分更新
+
+    前回の未正規化カーネル K = X Xᵀ とグラフごとの network_hash を保持し、
+    update() ではハッシュが前回になかったグラフの行・列だけを
+    疎行列積 X_changed Xᵀ で再計算する（それ以外は前回の K から並べ替える）。
+    """
+
+    def __init__(self, iterations: int):
+        self.iterations = iterations
+        self._hashes: List[str] = []
+        self._raw = np.zeros((0, 0))
+        self.n_recomputed = 0
+
+    def update(self, features: Sequence[WLFeatureVector]) -> np.ndarray:
+        """
+        グラフの並びを更新して正規化カーネルを返す
+
+        Args:
+            features: 今回のグラフの特徴ベクトル（反復回数は self.iterations）
+
+        Returns:
+            正規化したカーネル行列
+        """
+        n = len(features)
+        previous = {}
+        for k, network_hash in enumerate(self._hashes):
+            previous.setdefault(network_hash, k)
+
+        old_index = np.array([previous.get(f.network_hash, -1) for f in features], dtype=int)
+        reused = np.flatnonzero(old_index >= 0)
+        changed = np.flatnonzero(old_index < 0)
+
+        raw = np.zeros((n, n))
+        raw[np.ix_(reused, reused)] = self._raw[np.ix_(old_index[reused], old_index[reused])]
+        if len(changed):
+            X = feature_vectors_to_matrix(features)
+            rows = (X[changed] @ X.T).toarray()
+            raw[changed, :] = rows
+            raw[:, changed] = rows.T
+
+        self._hashes = [f.network_hash for f in features]
+        self._raw = raw
+        self.n_recomputed = len(changed)
+        return normalize_kernel(raw)
+
+
+def compute_incremental_wl_kernel(
+    features: Sequence[WLFeatureVector],
+    scope: Hashable,
+    iterations: int
+) -> Tuple[np.ndarray, int]:
+    """
+    scope（プロジェクトIDなど）ごとの IncrementalWLKernel で正規化カーネルを計算
+
+    Args:
+        features: グラフの特徴ベクトル
+        scope: 差分更新の単位
+        iterations: WL反復回数
+
+    Returns:
+        (正規化したカーネル行列, 再計算した行数)
+    """
+    key = (scope, iterations)
+    with _kernel_lock:
+        state = _kernel_states.pop(key, None) or IncrementalWLKernel(iterations)
+        _kernel_states[key] = state
+        while len(_kernel_states) > MAX_KERNEL_STATES:
+            _kernel_states.popitem(last=False)
+        K = state.update(features)
+        return K, state.n_recomputed
+
+
+def clear_wl_kernel_states():
+    """差分更新の状態を全削除"""
+    with _kernel_lock:
+        _kernel_states.clear()
+
+
+_kernel_states: "OrderedDict[Hashable, IncrementalWLKernel]" = OrderedDict()
+_kernel_lock = threading.Lock()
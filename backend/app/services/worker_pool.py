@@ -0,0 +1,348 @@
+# backend/app/services/worker_pool.py
+"""
+アプリケーション全体で共有する常駐プロセスプール
+
+円環MDSの多初期値試行・Shapley値のペア並列/提携テーブル・複数設計案の
+構造エネルギーなど、CPUを使う計算は呼び出しごとにプールを作らず、
+このモジュールの1つのプールに投入する。
+
+- プールは FastAPI の起動時に作成し（start_worker_pool）、停止時に閉じる
+  （shutdown_worker_pool）。起動前に呼ばれた場合（スクリプト・テスト）は
+  初回の get_worker_pool で作成する
+- ワーカー数は環境変数 WORKER_POOL_SIZE（未設定・0で CPU 数、1で並列化しない）
+- 起動時にワーカー数ぶんのプロセスを立ち上げ、NumPy/SciPy と計算モジュールを
+  インポートしておく（最初のリクエストでワーカー起動を待たない）
+- 大きな配列はジョブごとに1回だけ共有メモリ（SharedArrays）に書き込み、
+  タスクには名前（spec）だけを渡す。ワーカーは attach_shared_arrays で
+  アタッチし、同じジョブの間は使い回す
+"""
+
+import atexit
+import importlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# ワーカー数（環境変数、0で CPU 数）
+WORKER_POOL_SIZE = int(os.getenv('WORKER_POOL_SIZE', '0') or 0)
+
+# ワーカーの起動時にインポートしておくモジュール
+WARM_MODULES = (
+    'scipy.linalg',
+    'scipy.optimize',
+    'scipy.sparse',
+    'app.services.matrix_utils',
+    'app.services.shapley_calculator',
+    'app.services.structural_energy',
+    'app.api.mds',
+)
+
+# プールの開始方式（プラットフォームの既定に依存させない。fork が使えれば
+# 親でインポート済みのモジュールを引き継げる fork、なければ spawn）
+POOL_START_METHOD = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# ワーカーごとにアタッチしたままにする共有メモリのジョブ数
+MAX_WORKER_ATTACHMENTS = 4
+
+
+class SharedArrays:
+    """
+    NumPy 配列の辞書を共有メモリに置くコンテキストマネージャ
+
+    spec（{キー: (共有メモリ名, shape, dtype)}）をタスクに渡し、
+    ワーカー側は attach_shared_arrays(spec) で同じ配列を参照する。
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self.spec: Dict[str, Tuple[str, Tuple[int, ...], str]] = {}
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self._blocks.append(block)
+            self.spec[key] = (block.name, array.shape, array.dtype.str)
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks = []
+
+
+def attach_shared_arrays(spec: Dict[str, Tuple[str, Tuple[int, ...], str]]) -> Dict[str, np.ndarray]:
+    """
+    共有メモリの配列にアタッチ（ワーカー内で呼ぶ）
+
+    同じジョブの共有メモリはワーカーごとに1回だけアタッチして使い回す。
+    異なるジョブ（MDS と Shapley など）が交互に来ても付け直さないよう、
+    直近 MAX_WORKER_ATTACHMENTS ジョブぶんのアタッチを保持する。
+
+    Args:
+        spec: SharedArrays.spec
+
+    Returns:
+        {キー: 読み取り専用の配列}
+    """
+    names = tuple(sorted(name for name, _, _ in spec.values()))
+    cached = _attachments.get(names)
+    if cached is not None:
+        _attachments.move_to_end(names)
+        return cached[1]
+
+    blocks = []
+    arrays = {}
+    for key, (name, shape, dtype) in spec.items():
+        # アタッチでも resource_tracker に登録されるが、ワーカーは親プロセスの
+        # トラッカーを共有する（POSIX の fork/spawn とも）ので同じ名前の再登録になる。
+        # ここで登録を外すと親の登録まで消え、親の unlink でトラッカーが KeyError を出す
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        arrays[key] = array
+    _attachments[names] = (blocks, arrays)
+
+    while len(_attachments) > MAX_WORKER_ATTACHMENTS:
+        _, (old_blocks, old_arrays) = _attachments.popitem(last=False)
+        old_arrays.clear()
+        for block in old_blocks:
+            try:
+                block.close()
+            except BufferError:
+                # 配列がまだ参照されている場合は参照が切れたときに解放される
+                pass
+    return arrays
+
+
+def configured_workers() -> int:
+    """設定上のワーカー数（WORKER_POOL_SIZE、0で CPU 数）"""
+    return WORKER_POOL_SIZE if WORKER_POOL_SIZE > 0 else multiprocessing.cpu_count()
+
+
+def resolve_workers(n_workers: Optional[int]) -> int:
+    """ワーカー数（Noneで設定値、最低1）"""
+    if n_workers is None:
+        n_workers = configured_workers()
+    return max(1, int(n_workers))
+
+
+def start_worker_pool(n_workers: Optional[int] = None) -> Optional[ProcessPoolExecutor]:
+    """
+    プールを作成し、全ワーカーを起動しておく（アプリケーションの起動時に呼ぶ）
+
+    Args:
+        n_workers: ワーカー数（Noneで設定値）。1以下ならプールを作らない
+
+    Returns:
+        ProcessPoolExecutor、または None（並列化しない設定）
+    """
+    n_workers = resolve_workers(n_workers)
+    if n_workers <= 1:
+        return None
+    pool = get_worker_pool(n_workers)
+    # ProcessPoolExecutor はワーカーを必要時に起動するので、ワーカー数ぶんの
+    # タスクを続けて投入して全プロセスを立ち上げ、初期化の完了を待つ
+    for future in [pool.submit(_warm_worker) for _ in range(n_workers)]:
+        future.result()
+    return pool
+
+
+def get_worker_pool(n_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    共有プロセスプールを取得（未作成または壊れていた場合に作成）
+
+    既存のプールがあればその大きさのまま使う（要求より小さい場合、
+    チャンクはキューで待つ）。
+
+    Args:
+        n_workers: 新しく作る場合のワーカー数（Noneで設定値）
+
+    Returns:
+        ProcessPoolExecutor
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or getattr(_pool, '_broken', False):
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool_workers = max(resolve_workers(n_workers), 1)
+            _pool = ProcessPoolExecutor(
+                max_workers=_pool_workers,
+                mp_context=multiprocessing.get_context(POOL_START_METHOD),
+                initializer=_initialize_worker,
+            )
+        return _pool
+
+
+def shutdown_worker_pool(wait: bool = False):
+    """共有プロセスプールを停止（アプリケーションの停止時に呼ぶ）"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=wait, cancel_futures=True)
+        _pool = None
+        _pool_workers = 0
+
+
+def worker_pool_status() -> Dict[str, Any]:
+    """プールの状態（ヘルスチェック用）"""
+    with _pool_lock:
+        return {
+            "running": _pool is not None and not getattr(_pool, '_broken', False),
+            "n_workers": _pool_workers,
+            "configured_workers": configured_workers(),
+        }
+
+
+def submit_shared(task: Callable, spec: Dict[str, Tuple[str, Tuple[int, ...], str]], *args) -> Future:
+    """
+    共有メモリの配列を使うタスクをプールに投入
+
+    task はモジュールトップレベルの関数 task(arrays, *args) で、
+    ワーカーでは arrays は spec の共有メモリ上の配列になる。
+
+    Args:
+        task: 実行する関数
+        spec: SharedArrays.spec
+        *args: task に渡す追加の引数（pickle 可能なもの）
+
+    Returns:
+        Future
+    """
+    pool = get_worker_pool()
+    try:
+        return pool.submit(_run_shared_task, task, spec, *args)
+    except BrokenProcessPool:
+        shutdown_worker_pool()
+        raise
+
+
+def cancel_and_wait(futures: Sequence[Future]):
+    """
+    未着手のタスクを取り消し、実行中のタスクの終了を待つ
+
+    実行中のタスクは取り消せないため、共有メモリを閉じる前に呼んで
+    削除後にワーカーがアタッチしない（プールにも残らない）ようにする。
+    タスクの例外は無視する。
+
+    Args:
+        futures: 投入済みの Future
+    """
+    running = [future for future in futures if not future.cancel()]
+    wait(running)
+
+
+def close_when_done(shared: SharedArrays, futures: Sequence[Future]):
+    """
+    未着手のタスクを取り消し、実行中のタスクが終わってから共有メモリを閉じる
+
+    cancel_and_wait と異なり呼び出し側は待たない（期限で打ち切った応答を
+    遅らせないため）。実行中のタスクが削除済みの共有メモリにアタッチして
+    失敗しないよう、最後のタスクの完了コールバックで shared.close() する。
+
+    Args:
+        shared: タスクが参照する SharedArrays
+        futures: 投入済みの Future
+    """
+    running = [future for future in futures if not future.cancel()]
+    if not running:
+        shared.close()
+        return
+
+    remaining = [len(running)]
+    lock = threading.Lock()
+
+    def on_done(_future):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            shared.close()
+
+    for future in running:
+        future.add_done_callback(on_done)
+
+
+def map_shared(
+    task: Callable,
+    arrays: Dict[str, np.ndarray],
+    args_list: Sequence[Tuple],
+    n_workers: Optional[int] = None
+) -> List[Any]:
+    """
+    task(arrays, *args) を args_list の各要素について実行し、順に結果を返す
+
+    arrays はジョブ全体で1回だけ共有メモリに書き込む。ワーカー数が1または
+    タスクが1つ以下なら同じプロセスで実行する。
+
+    Args:
+        task: モジュールトップレベルの関数
+        arrays: 共有する配列 {キー: 配列}
+        args_list: 各タスクの追加の引数のタプル
+        n_workers: ワーカー数（Noneで設定値）
+
+    Returns:
+        args_list と同じ順序の結果
+    """
+    if resolve_workers(n_workers) <= 1 or len(args_list) <= 1:
+        return [task(arrays, *args) for args in args_list]
+
+    get_worker_pool(n_workers)
+    with SharedArrays(arrays) as shared:
+        futures = [submit_shared(task, shared.spec, *args) for args in args_list]
+        try:
+            return [future.result() for future in futures]
+        finally:
+            # 途中で失敗した場合も残りのタスクを止めてから共有メモリを削除する
+            cancel_and_wait(futures)
+
+
+# =============================================================================
+# 内部関数
+# =============================================================================
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+# ワーカー内の共有メモリのアタッチ {名前の組: (ブロック, 配列)}
+_attachments: "OrderedDict[Tuple[str, ...], Tuple[list, Dict[str, np.ndarray]]]" = OrderedDict()
+
+atexit.register(shutdown_worker_pool)
+
+
+def _initialize_worker():
+    """ワーカーの初期化（計算モジュールを先にインポート）"""
+    for module in WARM_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+
+def _warm_worker() -> int:
+    """何もしないタスク（起動時にワーカーを立ち上げる）"""
+    return os.getpid()
+
+
+def _run_shared_task(task, spec, *args):
+    """ワーカーで共有メモリにアタッチしてタスクを実行"""
+    return task(attach_shared_arrays(spec), *args)
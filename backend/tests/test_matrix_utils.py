@@ -7,6 +7,7 @@ import pytest
 import numpy as np
 import sys
 import os
+import threading
 
 # パスを追加
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
@@ -15,10 +16,23 @@ from app.services.matrix_utils import (
     normalize_weight,
     build_adjacency_matrices,
     compute_total_effect_matrix,
+    compute_total_effect_matrices_batch,
+    compute_total_effect_matrix_sparse,
     compute_inner_products,
     compute_structural_tradeoff,
     analyze_network_structure,
 )
+from app.services.matrix_session import (
+    MatrixSession,
+    get_matrix_session_snapshot,
+    invalidate_matrix_session,
+    sync_matrix_session,
+)
+from app.services.analysis_cache import (
+    AnalysisCache,
+    get_network_analysis,
+    network_fingerprint,
+)
 
 
 class TestNormalizeWeight:
@@ -183,6 +197,326 @@ class TestComputeTotalEffectMatrix:
         assert result['method'] == 'empty'
 
 
+class TestComputeTotalEffectMatricesBatch:
+    """compute_total_effect_matrices_batch のテスト"""
+
+    def test_matches_single_case(self):
+        """サイズの異なる設計案でも個別計算と一致する"""
+        rng = np.random.default_rng(0)
+        matrices_list = []
+        for p, a, v in [(2, 3, 2), (1, 1, 1), (3, 5, 4), (2, 2, 3)]:
+            matrices_list.append({
+                'B_PA': rng.uniform(-0.5, 0.5, (p, a)),
+                'B_AA': rng.uniform(-0.2, 0.2, (a, a)),
+                'B_AV': rng.uniform(-0.5, 0.5, (a, v)),
+            })
+        # B_AA = 0（直接効果のみ）
+        matrices_list.append({
+            'B_PA': np.array([[0.8]]),
+            'B_AA': np.zeros((1, 1)),
+            'B_AV': np.array([[0.4]]),
+        })
+
+        results = compute_total_effect_matrices_batch(matrices_list)
+
+        assert len(results) == len(matrices_list)
+        for m, res in zip(matrices_list, results):
+            expected = compute_total_effect_matrix(m['B_PA'], m['B_AA'], m['B_AV'])
+            assert res['T'].shape == expected['T'].shape
+            assert np.allclose(res['T'], expected['T'])
+            assert res['method'] == expected['method']
+            assert res['spectral_radius'] == pytest.approx(expected['spectral_radius'])
+
+    def test_empty_and_divergent_cases(self):
+        """空行列・ρ ≥ 1 の設計案は個別計算にフォールバック"""
+        empty = {'B_PA': np.array([]), 'B_AA': np.array([]), 'B_AV': np.array([])}
+        divergent = {
+            'B_PA': np.array([[1.0, 0.0]]),
+            'B_AA': np.array([[0.0, 1.2], [1.2, 0.0]]),
+            'B_AV': np.array([[1.0], [0.0]]),
+        }
+
+        results = compute_total_effect_matrices_batch([empty, divergent])
+
+        assert results[0]['method'] == 'empty'
+        expected = compute_total_effect_matrix(
+            divergent['B_PA'], divergent['B_AA'], divergent['B_AV']
+        )
+        assert results[1]['method'] == expected['method']
+        assert np.allclose(results[1]['T'], expected['T'])
+
+
+class TestSparseTotalEffect:
+    """疎行列バックエンド（CSR + 疎LU/反復法）のテスト"""
+
+    def _chain_network(self, n_attr):
+        """V → A0 → A1 → ... → A(n-1) → P の鎖状ネットワーク"""
+        nodes = [
+            {'id': 'p1', 'layer': 1, 'label': 'P1'},
+            {'id': 'v1', 'layer': 3, 'label': 'V1'},
+        ] + [{'id': f'a{i}', 'layer': 2, 'label': f'A{i}'} for i in range(n_attr)]
+        edges = [{'source_id': 'v1', 'target_id': 'a0', 'weight': 5}]
+        edges += [
+            {'source_id': f'a{i}', 'target_id': f'a{i + 1}', 'weight': 5}
+            for i in range(n_attr - 1)
+        ]
+        edges += [{'source_id': f'a{i}', 'target_id': 'p1', 'weight': 1} for i in range(n_attr)]
+        return {'nodes': nodes, 'edges': edges}
+
+    def test_build_sparse_matches_dense(self):
+        """sparse=True の CSR 行列は密行列と同じ値"""
+        network = self._chain_network(10)
+        dense = build_adjacency_matrices(network)
+        csr = build_adjacency_matrices(network, sparse=True)
+
+        assert csr['sparse'] is True
+        for key in ('B_PA', 'B_AA', 'B_AV'):
+            assert np.allclose(csr[key].toarray(), dense[key])
+
+    def test_auto_selection_by_density(self):
+        """属性数が多く疎な場合のみ自動で CSR を選択"""
+        small = build_adjacency_matrices(self._chain_network(10), sparse=None)
+        large = build_adjacency_matrices(self._chain_network(600), sparse=None)
+
+        assert small['sparse'] is False
+        assert large['sparse'] is True
+
+    def test_sparse_solve_matches_dense(self):
+        """疎LUの結果が密行列の逆行列計算と一致する"""
+        rng = np.random.default_rng(1)
+        n = 50
+        B_PA = rng.uniform(-1, 1, (4, n))
+        B_AA = rng.uniform(-0.3, 0.3, (n, n)) * (rng.random((n, n)) < 2 / n)
+        B_AV = rng.uniform(-1, 1, (n, 3))
+
+        dense = compute_total_effect_matrix(B_PA, B_AA, B_AV)
+        result = compute_total_effect_matrix_sparse(B_PA, B_AA, B_AV)
+
+        assert result['method'] == 'sparse_lu'
+        assert result['convergence'] is True
+        assert np.allclose(result['T'], dense['T'])
+        assert result['spectral_radius'] == pytest.approx(dense['spectral_radius'])
+
+    def test_large_network_dispatches_to_sparse(self):
+        """大規模ネットワークは analyze_network_structure で疎行列パスを使う"""
+        n_attr = 600
+        result = analyze_network_structure(self._chain_network(n_attr))
+
+        assert result['total_effect']['method'] == 'sparse_lu'
+        # 鎖の和: Σ_{k=0}^{n-1} (6/7)^(k+1) × (2/7)
+        w, w_pa = 6 / 7, 2 / 7
+        expected = w_pa * sum(w ** (k + 1) for k in range(n_attr))
+        assert result['total_effect']['T'][0, 0] == pytest.approx(expected)
+
+
+class TestMatrixSession:
+    """MatrixSession（Sherman–Morrison による差分更新）のテスト"""
+
+    def _network(self):
+        nodes = [
+            {'id': 'p1', 'layer': 1}, {'id': 'p2', 'layer': 1},
+            {'id': 'a1', 'layer': 2}, {'id': 'a2', 'layer': 2}, {'id': 'a3', 'layer': 2},
+            {'id': 'v1', 'layer': 3}, {'id': 'v2', 'layer': 3},
+        ]
+        edges = [
+            {'id': 'e1', 'source_id': 'a1', 'target_id': 'p1', 'weight': 3},
+            {'id': 'e2', 'source_id': 'a2', 'target_id': 'p2', 'weight': -3},
+            {'id': 'e3', 'source_id': 'a3', 'target_id': 'p2', 'weight': 1},
+            {'id': 'e4', 'source_id': 'a1', 'target_id': 'a2', 'weight': 3},
+            {'id': 'e5', 'source_id': 'v1', 'target_id': 'a1', 'weight': 5},
+            {'id': 'e6', 'source_id': 'v2', 'target_id': 'a3', 'weight': 3},
+        ]
+        return {'nodes': nodes, 'edges': edges}
+
+    def _assert_matches_full(self, session, network):
+        expected = analyze_network_structure(network)['total_effect']['T']
+        assert np.allclose(session.total_effect()['T'], expected)
+
+    def test_edge_edits_are_incremental(self):
+        """A→A / A→P / V→A の追加・更新・削除が差分更新で全再計算と一致"""
+        network = self._network()
+        session = MatrixSession(network)
+
+        # A→A 追加（ループ）
+        network['edges'].append({'id': 'e7', 'source_id': 'a2', 'target_id': 'a1', 'weight': -3})
+        assert session.sync(network)['mode'] == 'incremental'
+        self._assert_matches_full(session, network)
+
+        # A→P 更新
+        network['edges'][0]['weight'] = -5
+        assert session.sync(network)['mode'] == 'incremental'
+        self._assert_matches_full(session, network)
+
+        # V→A 追加
+        network['edges'].append({'id': 'e8', 'source_id': 'v2', 'target_id': 'a2', 'weight': 1})
+        assert session.sync(network)['mode'] == 'incremental'
+        self._assert_matches_full(session, network)
+
+        # A→A 削除
+        network['edges'] = [e for e in network['edges'] if e['id'] != 'e4']
+        assert session.sync(network)['mode'] == 'incremental'
+        self._assert_matches_full(session, network)
+
+        assert session.n_full_recomputes == 1
+
+    def test_node_change_triggers_full_recompute(self):
+        """ノード構成の変更は全再計算"""
+        network = self._network()
+        session = MatrixSession(network)
+
+        network['nodes'] = [n for n in network['nodes'] if n['id'] != 'a3']
+        network['edges'] = [
+            e for e in network['edges'] if 'a3' not in (e['source_id'], e['target_id'])
+        ]
+
+        assert session.sync(network)['mode'] == 'full'
+        self._assert_matches_full(session, network)
+
+    def test_reports_exact_spectral_radius(self):
+        """ノルム上界で収束を判定しても、報告する ρ は全再計算と同じ厳密値"""
+        network = self._network()
+        network['edges'].append({'id': 'e7', 'source_id': 'a2', 'target_id': 'a1', 'weight': 3})
+        session = MatrixSession(network)
+        expected = analyze_network_structure(network)['total_effect']
+        assert session.total_effect()['spectral_radius'] == pytest.approx(expected['spectral_radius'])
+
+        network['edges'][3]['weight'] = 5  # a1 → a2
+        assert session.sync(network)['mode'] == 'incremental'
+        expected = analyze_network_structure(network)['total_effect']
+        assert session.total_effect()['spectral_radius'] == pytest.approx(expected['spectral_radius'])
+
+    def test_divergent_edit_falls_back(self):
+        """ρ(B_AA) ≥ 1 になる編集は全再計算（Neumann級数）にフォールバック"""
+        network = self._network()
+        session = MatrixSession(network, weight_mode='continuous')
+
+        network['edges'].append({'id': 'e7', 'source_id': 'a2', 'target_id': 'a1', 'weight': 1.0})
+        network['edges'][3]['weight'] = 1.0  # a1 → a2
+
+        assert session.sync(network)['mode'] == 'full'
+        result = session.total_effect()
+        expected = analyze_network_structure(network, 'continuous')['total_effect']
+        assert result['method'] == expected['method'] == 'neumann'
+        assert np.allclose(result['T'], expected['T'])
+
+    def test_snapshot_is_consistent_under_concurrent_edits(self):
+        """スナップショットの隣接行列と総効果行列は並行する編集中も対応する"""
+        first = self._network()
+        second = self._network()
+        second['edges'][3]['weight'] = -1  # a1 → a2
+        second['edges'].append({'id': 'e7', 'source_id': 'a3', 'target_id': 'a2', 'weight': 3})
+        sync_matrix_session('case-snapshot', first)
+        stop = threading.Event()
+
+        def edit():
+            k = 0
+            while not stop.is_set():
+                sync_matrix_session('case-snapshot', second if k % 2 else first)
+                k += 1
+
+        editor = threading.Thread(target=edit)
+        editor.start()
+        try:
+            for k in range(200):
+                matrices, total_effect = get_matrix_session_snapshot('case-snapshot', second if k % 2 else first)
+                n_attr = matrices['B_AA'].shape[0]
+                expected = matrices['B_PA'] @ np.linalg.solve(np.eye(n_attr) - matrices['B_AA'], matrices['B_AV'])
+                assert np.allclose(total_effect['T'], expected)
+        finally:
+            stop.set()
+            editor.join()
+            invalidate_matrix_session('case-snapshot')
+
+        assert get_matrix_session_snapshot('case-snapshot', first) is None
+
+
+class TestAnalysisCache:
+    """分析キャッシュ（network + weight_mode のハッシュ）のテスト"""
+
+    def _network(self):
+        return {
+            'nodes': [
+                {'id': 'p1', 'layer': 1}, {'id': 'p2', 'layer': 1},
+                {'id': 'a1', 'layer': 2}, {'id': 'v1', 'layer': 3},
+            ],
+            'edges': [
+                {'source_id': 'a1', 'target_id': 'p1', 'weight': 3},
+                {'source_id': 'a1', 'target_id': 'p2', 'weight': -3},
+                {'source_id': 'v1', 'target_id': 'a1', 'weight': 3},
+            ],
+        }
+
+    def test_fingerprint_is_content_addressed(self):
+        """キー順序に依存せず、weight_mode で区別される"""
+        network = self._network()
+        reordered = {'edges': network['edges'], 'nodes': network['nodes']}
+
+        assert network_fingerprint(network) == network_fingerprint(reordered)
+        assert network_fingerprint(network, 'discrete_7') != network_fingerprint(network, 'discrete_5')
+
+    def test_cached_analysis_matches_and_is_read_only(self):
+        """キャッシュ結果は analyze_network_structure と一致し、配列は読み取り専用"""
+        network = self._network()
+        first = get_network_analysis(network, 'discrete_5')
+        second = get_network_analysis(network, 'discrete_5')
+        expected = analyze_network_structure(network, 'discrete_5')
+
+        assert np.allclose(second['total_effect']['T'], expected['total_effect']['T'])
+        assert second['total_effect']['T'] is first['total_effect']['T']
+        with pytest.raises(ValueError):
+            second['total_effect']['T'][0, 0] = 1.0
+        # dict/list は複製されるので呼び出し側で変更しても他に影響しない
+        second['tradeoff']['tradeoff_pairs'].clear()
+        assert get_network_analysis(network, 'discrete_5')['tradeoff']['tradeoff_pairs']
+
+    def test_lru_and_byte_eviction(self):
+        """エントリ数・バイトサイズの上限で古いものから追い出す"""
+        cache = AnalysisCache(max_entries=2, max_bytes=10_000)
+        cache.put(('a',), np.zeros(100))
+        cache.put(('b',), np.zeros(100))
+        cache.get(('a',))
+        cache.put(('c',), np.zeros(100))
+
+        assert cache.get(('b',)) is None
+        assert cache.get(('a',)) is not None
+
+        cache.put(('d',), np.zeros(1000))  # 8000 bytes → a, c を追い出す
+        stats = cache.stats()
+        assert stats['bytes'] <= 10_000
+        assert cache.get(('d',)) is not None
+        assert stats['evictions'] >= 2
+
+    def test_oversized_value_is_not_frozen(self):
+        """上限を超えて格納しない値の配列は書き込み可能のまま"""
+        cache = AnalysisCache(max_bytes=1_000)
+        value = {'X': np.zeros(1000)}
+
+        assert cache.get_or_compute(('big',), lambda: value) is value
+        assert value['X'].flags.writeable
+        assert cache.get(('big',)) is None
+
+    def test_dataclass_is_copied(self):
+        """dataclass（SCC分解の結果）も複製して返し、書き換えがキャッシュに残らない"""
+        from app.services.scc_analyzer import SCCAnalysisResult, SCCComponent
+        cache = AnalysisCache()
+        component = SCCComponent(
+            nodes=['a1', 'a2'], edges=[('a1', 'a2'), ('a2', 'a1')],
+            spectral_radius=0.5, converges=True, suggestions=[]
+        )
+        cache.put(('scc',), SCCAnalysisResult(
+            has_loops=True, components=[component], all_nodes=['a1', 'a2'], dag_after_condensation=[]
+        ))
+
+        first = cache.get(('scc',))
+        first.components[0].nodes.append('a3')
+        first.components.append(component)
+        second = cache.get(('scc',))
+
+        assert second is not first
+        assert len(second.components) == 1
+        assert second.components[0].nodes == ['a1', 'a2']
+
+
 class TestComputeInnerProducts:
     """compute_inner_products のテスト（論文Chapter 7のエネルギー計算用）"""
 
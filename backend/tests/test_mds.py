@@ -0,0 +1,147 @@
+# backend/tests/test_mds.py
+"""
+円環MDS（mds.py）のユニットテスト
+"""
+
+import pytest
+import numpy as np
+import sys
+import os
+from scipy.optimize import check_grad
+
+# パスを追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.api.mds import (
+    circular_stress_with_gradient,
+    circular_mds_parallel,
+    circular_mds_sequential,
+    classical_mds_angles,
+    compute_circular_stress,
+    incremental_circular_mds,
+)
+
+
+def _loop_stress(thetas, D_normalized):
+    """i < j のループによる円環ストレス（比較用）"""
+    total = 0.0
+    n = len(thetas)
+    for i in range(n):
+        for j in range(i + 1, n):
+            diff = abs(thetas[i] - thetas[j])
+            total += (D_normalized[i, j] - min(diff, 2 * np.pi - diff)) ** 2
+    return total
+
+
+def _circle_distances(angles):
+    diff = np.abs(np.subtract.outer(angles, angles))
+    return np.minimum(diff, 2 * np.pi - diff)
+
+
+class TestCircularStress:
+    """ベクトル化した円環ストレスと解析的な勾配のテスト"""
+
+    def test_matches_loop_and_gradient(self):
+        """ループ版と同じ値、勾配は数値微分と一致"""
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(12, 3))
+        D = np.sqrt(((X[:, None] - X[None]) ** 2).sum(-1))
+        D_normalized = D / D.max() * np.pi
+        thetas = rng.uniform(0, 2 * np.pi, 12)
+
+        stress, _ = circular_stress_with_gradient(thetas, D_normalized)
+        assert stress == pytest.approx(_loop_stress(thetas, D_normalized))
+        assert compute_circular_stress(D, thetas) == pytest.approx(
+            np.sqrt(_loop_stress(thetas, D_normalized) / (12 * 11 / 2))
+        )
+
+        error = check_grad(
+            lambda t: circular_stress_with_gradient(t, D_normalized)[0],
+            lambda t: circular_stress_with_gradient(t, D_normalized)[1],
+            thetas
+        )
+        assert error < 1e-4
+
+    def test_recovers_circular_layout(self):
+        """円周上の配置から作った距離はストレスほぼ0で復元できる"""
+        np.random.seed(0)
+        angles = np.array([0.0, 0.7, 1.9, np.pi, 4.4, 5.5])  # 最大距離 π（正規化で不変）
+        D = _circle_distances(angles)
+
+        thetas, stress = circular_mds_sequential(D, n_init=10)
+        assert stress < 1e-3
+        np.testing.assert_allclose(_circle_distances(thetas), D, atol=1e-2)
+
+
+class TestAdaptiveCircularMDS:
+    """初期角度の指定と試行の打ち切りのテスト"""
+
+    def test_seeded_start_and_patience(self):
+        """正解の角度から始めると最初の試行が最良になり、patience 回で打ち切る"""
+        angles = np.array([0.0, 0.7, 1.9, np.pi, 4.4, 5.5])
+        D = _circle_distances(angles)
+
+        info = {}
+        thetas, stress = circular_mds_parallel(
+            D, n_init=100, n_workers=1, initial_thetas=[angles], patience=5, info=info
+        )
+        assert info == {'n_restarts': 6, 'n_seeded': 1, 'stop_reason': 'converged'}
+        assert stress < 1e-6
+        np.testing.assert_allclose(_circle_distances(thetas), D, atol=1e-6)
+
+    def test_time_budget(self):
+        """時間の上限を超えたら最初の波で打ち切る"""
+        rng = np.random.default_rng(2)
+        X = rng.normal(size=(8, 2))
+        D = np.sqrt(((X[:, None] - X[None]) ** 2).sum(-1))
+
+        info = {}
+        thetas, _ = circular_mds_parallel(
+            D, n_init=50, n_workers=1, initial_thetas=[classical_mds_angles(D)],
+            time_budget_ms=0, info=info
+        )
+        assert info['stop_reason'] == 'time_budget'
+        assert info['n_restarts'] == 1
+        assert thetas.shape == (8,)
+
+    def test_shared_pool_matches_sequential(self):
+        """共有プール（距離行列は共有メモリ）でも同じシードなら逐次と同じ結果"""
+        rng = np.random.default_rng(5)
+        X = rng.normal(size=(7, 2))
+        D = np.sqrt(((X[:, None] - X[None]) ** 2).sum(-1))
+
+        sequential = circular_mds_parallel(D, n_init=6, n_workers=1)
+        parallel = circular_mds_parallel(D, n_init=6, n_workers=2)
+        np.testing.assert_allclose(parallel[0], sequential[0])
+        assert parallel[1] == pytest.approx(sequential[1])
+
+
+class TestIncrementalCircularMDS:
+    """既存の角度を保った差分配置のテスト"""
+
+    def test_places_changed_case(self):
+        """変わった案だけを正しい角度に置き、refine_iterations=0 なら他の案は動かない"""
+        angles = np.array([0.0, 0.7, 1.9, np.pi, 4.4, 5.5])
+        D = _circle_distances(angles)
+        initial = angles.copy()
+        initial[3] = 0.2  # 変わった案の古い角度（使われない）
+
+        thetas, stress = incremental_circular_mds(D, initial, [3], refine_iterations=0)
+        np.testing.assert_array_equal(np.delete(thetas, 3), np.delete(angles, 3))
+        assert thetas[3] == pytest.approx(np.pi, abs=1e-4)
+        assert stress < 1e-4
+
+    def test_refinement_keeps_layout(self):
+        """局所最適化はストレスを下げ、既存の案を大きく動かさない"""
+        rng = np.random.default_rng(1)
+        X = rng.normal(size=(9, 2))
+        D = np.sqrt(((X[:, None] - X[None]) ** 2).sum(-1))
+        base, _ = circular_mds_parallel(D[:8, :8], n_init=20, n_workers=1)
+
+        initial = np.append(base, 0.0)
+        placed, placed_stress = incremental_circular_mds(D, initial, [8], refine_iterations=0)
+        refined, refined_stress = incremental_circular_mds(D, initial, [8])
+
+        assert refined_stress <= placed_stress + 1e-12
+        shift = np.abs(refined[:8] - base) % (2 * np.pi)
+        assert np.minimum(shift, 2 * np.pi - shift).max() < 1.0
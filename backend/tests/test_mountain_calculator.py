@@ -0,0 +1,222 @@
+# backend/tests/test_mountain_calculator.py
+"""
+山の座標計算（mountain_calculator.py）の差分配置のユニットテスト
+"""
+
+import pytest
+import numpy as np
+import json
+import sys
+import os
+
+# パスを追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.models.database import DesignCaseModel, PerformanceModel, ProjectModel
+from app.services import mountain_calculator
+from app.services.mountain_calculator import (
+    calculate_mountain_positions,
+    collect_wl_features,
+    stored_layout,
+)
+
+
+def _network(seed):
+    """性能2・属性3・変数2のランダムなネットワーク"""
+    rng = np.random.default_rng(seed)
+    nodes = [{'id': f"p{k}", 'layer': 1, 'type': 'performance', 'label': f"P{k}"} for k in range(2)] + \
+            [{'id': f"a{k}", 'layer': 2, 'type': 'attribute', 'label': f"A{k}"} for k in range(3)] + \
+            [{'id': f"v{k}", 'layer': 3, 'type': 'variable', 'label': f"V{k}"} for k in range(2)]
+    edges = []
+    for a in range(3):
+        edges.append({'id': f"e{a}p", 'source_id': f"a{a}", 'target_id': f"p{rng.integers(2)}",
+                      'weight': int(rng.choice([-3, -1, 1, 3]))})
+        edges.append({'id': f"e{a}v", 'source_id': f"v{rng.integers(2)}", 'target_id': f"a{a}",
+                      'weight': int(rng.choice([-3, -1, 1, 3]))})
+    return {'nodes': nodes, 'edges': edges}
+
+
+def _case(k, seed, position=None):
+    return DesignCaseModel(
+        id=f"case-{k}", project_id='proj', name=f"case{k}",
+        performance_values_json='{}',
+        network_json=json.dumps(_network(seed)),
+        performance_snapshot_json='[]',
+        mountain_position_json=json.dumps(position) if position is not None else None,
+    )
+
+
+class TestStoredLayout:
+    """保存済みの角度・基準ストレスの読み出しのテスト"""
+
+    def test_theta_and_coordinates(self):
+        """theta を優先し、なければ (x, z) の偏角、頂点の案は不明"""
+        cases = [
+            _case(0, 0, {'x': 0.0, 'z': 1.0, 'theta': 7.0, 'layout_stress': 0.3}),
+            _case(1, 1, {'x': -2.0, 'z': 0.0, 'layout_stress': 0.2}),
+            _case(2, 2, {'x': 0.0, 'z': 0.0}),
+            _case(3, 3),
+        ]
+        thetas, stress = stored_layout(cases)
+
+        assert thetas[0] == pytest.approx(7.0 - 2 * np.pi)
+        assert thetas[1] == pytest.approx(np.pi)
+        assert np.isnan(thetas[2]) and np.isnan(thetas[3])
+        assert stress == pytest.approx(0.2)
+
+    def test_without_stress(self):
+        """layout_stress が保存されていなければ基準ストレスは None"""
+        _, stress = stored_layout([_case(0, 0, {'x': 1.0, 'z': 0.0})])
+        assert stress is None
+
+
+class TestIncrementalLayout:
+    """calculate_mountain_positions の差分配置・全体最適化の切り替えのテスト"""
+
+    @pytest.fixture
+    def db(self):
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.models.database import Base
+
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(bind=engine)
+        session = sessionmaker(bind=engine)()
+        yield session
+        session.close()
+
+    @pytest.fixture
+    def solvers(self, monkeypatch):
+        """円環MDSを、呼び出しを記録する代替に置き換える"""
+        calls = {'global': 0, 'incremental': [], 'incremental_stress': None}
+
+        def fake_global(distance_matrix, info=None, **kwargs):
+            calls['global'] += 1
+            info.update(n_restarts=1, n_seeded=0, stop_reason='max_restarts')
+            n = distance_matrix.shape[0]
+            return np.linspace(0.5, 5.5, n), 0.1
+
+        def fake_incremental(distance_matrix, initial_thetas, free, **kwargs):
+            calls['incremental'].append(list(free))
+            thetas = np.array(initial_thetas, dtype=float)
+            thetas[free] = 3.0
+            stress = calls['incremental_stress']
+            return thetas, (0.1 if stress is None else stress)
+
+        monkeypatch.setattr(mountain_calculator, 'circular_mds_parallel', fake_global)
+        monkeypatch.setattr(mountain_calculator, 'incremental_circular_mds', fake_incremental)
+        return calls
+
+    def _project(self, db, n_cases):
+        project = ProjectModel(id='proj', name='mountain')
+        db.add(project)
+        db.add(PerformanceModel(id='perf-0', project_id='proj', name='P0'))
+        for k in range(n_cases):
+            db.add(_case(k, k))
+        db.commit()
+        return project
+
+    def _calculate(self, project, db, layout_mode='incremental'):
+        networks = [case.network for case in project.design_cases]
+        return calculate_mountain_positions(project, db, networks=networks, layout_mode=layout_mode)
+
+    def _edit(self, project, db, indices):
+        for k in indices:
+            project.design_cases[k].network_json = json.dumps(_network(100 + k))
+        db.commit()
+
+    def _thetas(self, project):
+        return np.array([case.mountain_position['theta'] for case in project.design_cases])
+
+    def test_changed_cases_detected(self, db):
+        """保存済みの特徴ベクトルとハッシュが一致しない案だけを計算し直す"""
+        project = self._project(db, 4)
+        networks = [case.network for case in project.design_cases]
+        first, second = [], []
+        collect_wl_features(project.design_cases, networks, iterations=1, recomputed=first)
+        collect_wl_features(project.design_cases, networks, iterations=1, recomputed=second)
+        networks[2] = _network(200)
+        edited = []
+        collect_wl_features(project.design_cases, networks, iterations=1, recomputed=edited)
+
+        assert first == [0, 1, 2, 3]
+        assert second == []
+        assert edited == [2]
+
+    def test_layout_roundtrip(self, db, solvers):
+        """全体最適化の角度と基準ストレスを保存し、stored_layout で読み戻せる"""
+        project = self._project(db, 4)
+        result = self._calculate(project, db)
+
+        assert result['layout']['mode'] == 'global'
+        assert solvers['global'] == 1 and solvers['incremental'] == []
+        thetas, stress = stored_layout(project.design_cases)
+        np.testing.assert_allclose(thetas, self._thetas(project))
+        assert stress == pytest.approx(0.1)
+        # 最高標高の案（全て同じ標高なら先頭）を角度0に回転する
+        assert thetas[0] == pytest.approx(0.0)
+        for position, theta in zip(result['positions'], thetas):
+            r = np.hypot(position['x'], position['z'])
+            assert position['x'] == pytest.approx(r * np.cos(theta))
+            assert position['z'] == pytest.approx(r * np.sin(theta))
+
+    def test_incremental_keeps_unchanged_angles(self, db, solvers):
+        """変わった案だけを配置し直し、他の案の角度は回転させずに保つ"""
+        project = self._project(db, 4)
+        self._calculate(project, db)
+        before = self._thetas(project)
+        # 角度0の案を変えても、その案を正面に戻す回転はしない
+        self._edit(project, db, [0])
+        result = self._calculate(project, db)
+        after = self._thetas(project)
+
+        assert result['layout']['mode'] == 'incremental'
+        assert result['layout']['n_changed'] == 1
+        assert solvers['incremental'] == [[0]]
+        assert solvers['global'] == 1
+        np.testing.assert_allclose(after[1:], before[1:])
+        assert after[0] == pytest.approx(3.0)
+
+    def test_too_many_changes_fall_back(self, db, solvers):
+        """変わった案が半数を超えると全体最適化する"""
+        project = self._project(db, 4)
+        self._calculate(project, db)
+        self._edit(project, db, [0, 1, 2])
+        result = self._calculate(project, db)
+
+        assert result['layout']['mode'] == 'global'
+        assert solvers['incremental'] == []
+        assert solvers['global'] == 2
+
+    def test_too_few_unchanged_fall_back(self, db, solvers):
+        """変わっていない案が2未満なら全体最適化する"""
+        project = self._project(db, 2)
+        self._calculate(project, db)
+        self._edit(project, db, [1])
+        result = self._calculate(project, db)
+
+        assert result['layout']['mode'] == 'global'
+        assert solvers['incremental'] == []
+
+    def test_stress_tolerance_fall_back(self, db, solvers):
+        """ストレスが基準から許容以上に悪化したら全体最適化する"""
+        project = self._project(db, 4)
+        self._calculate(project, db)
+        self._edit(project, db, [3])
+        solvers['incremental_stress'] = 0.1 + mountain_calculator.INCREMENTAL_STRESS_MIN_MARGIN + 0.01
+        result = self._calculate(project, db)
+
+        assert solvers['incremental'] == [[3]]
+        assert result['layout']['mode'] == 'global'
+        assert result['layout']['fallback']
+        assert self._thetas(project)[0] == pytest.approx(0.0)
+
+    def test_global_mode_ignores_stored_layout(self, db, solvers):
+        """layout_mode='global' なら保存済みの角度があっても全体最適化する"""
+        project = self._project(db, 4)
+        self._calculate(project, db)
+        result = self._calculate(project, db, layout_mode='global')
+
+        assert result['layout']['mode'] == 'global'
+        assert solvers['incremental'] == []
+        assert solvers['global'] == 2
@@ -5,6 +5,9 @@ SCC分解とShapley値計算のテスト
 
 import pytest
 import numpy as np
+import time
+from concurrent.futures import wait
+from multiprocessing import shared_memory
 from app.services.scc_analyzer import (
     TarjanSCC,
     analyze_scc,
@@ -12,15 +15,62 @@ from app.services.scc_analyzer import (
     compute_local_spectral_radius,
     scc_result_to_dict
 )
+from app.services.spectral_radius import (
+    compute_spectral_radius,
+    check_spectral_convergence,
+    spectral_radius_upper_bound,
+)
 from app.services.shapley_calculator import (
     compute_partial_tradeoff,
     compute_shapley_values_exact,
+    compute_shapley_values_analytic,
+    compute_shapley_matrix_analytic,
     compute_shapley_values_monte_carlo,
     compute_shapley_for_performance_pair,
     shapley_result_to_dict,
     estimate_computation_cost,
-    compute_all_pairwise_shapley
+    compute_all_pairwise_shapley,
+    NodeInfo,
+    EdgeInfo,
+    compute_tradeoff_with_node_subset,
+    compute_tradeoff_with_edge_subset,
+    compute_node_shapley_values_exact,
+    compute_edge_shapley_values_exact,
+    compute_node_shapley_all_pairs,
+    compute_node_shapley_values_monte_carlo,
+    compute_edge_shapley_values_monte_carlo,
+    compute_node_shapley_for_performance_pair,
+    compute_node_owen_for_performance_pair,
+    node_shapley_result_to_dict,
+    compute_node_interactions_for_performance_pair,
+    node_interaction_result_to_dict,
+)
+from app.services.shapley_subset_table import (
+    shapley_from_value_table,
+    build_node_game,
+    build_edge_game,
+    compute_exact_shapley_all_pairs,
+    compute_monte_carlo_shapley_all_pairs,
+    compute_adaptive_monte_carlo_shapley,
+    compute_kernel_shapley,
+)
+from app.services.shapley_path_decomposition import compute_path_shapley
+from app.services.shapley_pruning import reduce_game, compute_reduced_exact_shapley
+from app.services.shapley_owen import (
+    PlayerGroup,
+    build_node_groups,
+    compute_owen_values,
+    compute_owen_values_exact,
+    compute_monte_carlo_owen_values,
+)
+from app.services.shapley_interaction import (
+    compute_exact_interactions,
+    compute_sampled_interactions,
 )
+from app.services.shapley_parallel import collect_pair_results
+from app.services.worker_pool import SharedArrays, attach_shared_arrays, submit_shared
+from app.services import shapley_store, worker_pool
+from app.services import shapley_calculator
 
 
 class TestTarjanSCC:
@@ -146,6 +196,40 @@ class TestSCCAnalysis:
         assert result.components[0].spectral_radius < 1.0
 
 
+class TestSpectralRadius:
+    """スペクトル半径サービスのテスト"""
+
+    def test_matches_eigvals(self):
+        """小さい行列・大きい行列（SCC分解 + eigs）とも eigvals と一致"""
+        rng = np.random.default_rng(3)
+        for n, density in [(10, 0.3), (200, 0.02), (150, 0.2)]:
+            A = rng.uniform(-0.8, 0.8, (n, n)) * (rng.random((n, n)) < density)
+            expected = np.max(np.abs(np.linalg.eigvals(A)))
+            assert compute_spectral_radius(A) == pytest.approx(expected, rel=1e-8)
+
+    def test_dag_is_zero(self):
+        """非巡回（上三角）の行列は ρ = 0"""
+        A = np.triu(np.full((100, 100), 0.9), k=1)
+        assert compute_spectral_radius(A) == pytest.approx(0.0)
+
+    def test_norm_bound_short_circuit(self):
+        """上界 < 1 なら固有値計算なしで収束と判定"""
+        A = np.array([[0.0, 0.4], [0.3, 0.0]])
+        converges, value = check_spectral_convergence(A)
+
+        assert converges is True
+        assert value == pytest.approx(spectral_radius_upper_bound(A))
+        assert value >= compute_spectral_radius(A)
+
+    def test_divergent(self):
+        """ρ ≥ 1 は上界ではなく実際の ρ で判定"""
+        A = np.array([[0.0, 1.2], [1.2, 0.0]])
+        converges, value = check_spectral_convergence(A)
+
+        assert converges is False
+        assert value == pytest.approx(1.2)
+
+
 class TestShapleyPartialTradeoff:
     """部分トレードオフ計算のテスト"""
 
@@ -207,6 +291,40 @@ class TestShapleyExact:
                 assert abs(sum_shapley - C_ij) < 1e-10
 
 
+class TestShapleyAnalytic:
+    """Shapley値解析解（加法的ゲーム）のテスト"""
+
+    def test_matches_enumeration(self):
+        """列挙による厳密計算と一致"""
+        rng = np.random.default_rng(0)
+        T = rng.standard_normal((3, 7))
+
+        for i in range(3):
+            for j in range(i + 1, 3):
+                analytic = compute_shapley_values_analytic(T, i, j)
+                exact = compute_shapley_values_exact(T, i, j)
+                for k in range(7):
+                    assert analytic[k] == pytest.approx(exact[k], abs=1e-12)
+
+    def test_matrix_form(self):
+        """一括計算 Φ[i, j, k] = T_ik × T_jk"""
+        T = np.array([[1.0, 2.0], [3.0, -4.0]])
+        Phi = compute_shapley_matrix_analytic(T)
+
+        assert Phi.shape == (2, 2, 2)
+        np.testing.assert_allclose(Phi[0, 1], [3.0, -8.0])
+        np.testing.assert_allclose(Phi.sum(axis=2), T @ T.T)
+
+    def test_auto_uses_analytic_for_large_n(self):
+        """変数数が多くても auto は解析解で厳密に計算"""
+        rng = np.random.default_rng(1)
+        T = rng.standard_normal((2, 40))
+        result = compute_shapley_for_performance_pair(T, 0, 1)
+
+        assert result.computation_method == 'analytic'
+        assert result.sum_check == pytest.approx(result.C_ij)
+
+
 class TestShapleyMonteCarlo:
     """Shapley値Monte Carlo近似のテスト"""
 
@@ -234,7 +352,7 @@ class TestShapleyResult:
         assert result.perf_i_idx == 0
         assert result.perf_j_idx == 1
         assert result.n_properties == 2
-        assert result.computation_method in ['exact', 'monte_carlo']
+        assert result.computation_method == 'analytic'
 
     def test_result_to_dict(self):
         """辞書変換のテスト"""
@@ -315,6 +433,872 @@ class TestAllPairwiseShapley:
         for r in results:
             assert r['cos_theta'] < 0
 
+    def test_analytic_matches_exact(self):
+        """一括の解析解と列挙の結果が一致"""
+        rng = np.random.default_rng(2)
+        T = rng.standard_normal((4, 6))
+
+        analytic = compute_all_pairwise_shapley(T, method='analytic', only_tradeoffs=False)
+        exact = compute_all_pairwise_shapley(T, method='exact', only_tradeoffs=False)
+
+        assert len(analytic) == len(exact) == 6
+        for a, e in zip(analytic, exact):
+            assert a['C_ij'] == pytest.approx(e['C_ij'])
+            phi_a = {v['property_idx']: v['phi'] for v in a['shapley_values']}
+            phi_e = {v['property_idx']: v['phi'] for v in e['shapley_values']}
+            for k in phi_a:
+                assert phi_a[k] == pytest.approx(phi_e[k], abs=1e-12)
+
+
+def _slow_pair_chunk(arrays, chunk, seconds):
+    """時間のかかるチャンクのタスク（スケジューラのテスト用）"""
+    time.sleep(seconds)
+    return [float(arrays['T'][i] * arrays['T'][j]) for i, j in chunk]
+
+
+def _enumerate_shapley(players, value):
+    """全部分集合の列挙による Shapley 値（検証用の参照実装）"""
+    from itertools import combinations
+    import math
+
+    n = len(players)
+    phi = {}
+    for k in players:
+        others = [p for p in players if p != k]
+        total = 0.0
+        for size in range(n):
+            coeff = math.factorial(size) * math.factorial(n - size - 1) / math.factorial(n)
+            for S in combinations(others, size):
+                total += coeff * (value(set(S) | {k}) - value(set(S)))
+        phi[k] = total
+    return phi
+
+
+class TestSubsetValueTable:
+    """部分集合価値テーブル（ビットマスクDP）による厳密計算のテスト"""
+
+    def _matrices(self):
+        rng = np.random.default_rng(5)
+        B_PA = rng.uniform(-1, 1, (3, 4)) * (rng.random((3, 4)) < 0.7)
+        B_AA = rng.uniform(-0.4, 0.4, (4, 4)) * (rng.random((4, 4)) < 0.4)
+        np.fill_diagonal(B_AA, 0)
+        B_AV = rng.uniform(-1, 1, (4, 3)) * (rng.random((4, 3)) < 0.7)
+        return B_PA, B_AA, B_AV
+
+    def test_sweep_additive_game(self):
+        """加法的ゲームでは φ_k = v({k})"""
+        singles = np.array([1.0, -2.0, 0.5])
+        masks = np.arange(8)
+        values = np.array([sum(singles[b] for b in range(3) if m >> b & 1) for m in masks])
+
+        np.testing.assert_allclose(shapley_from_value_table(values, 3), singles)
+
+    def test_node_matches_enumeration(self):
+        """ノードShapley値が列挙の結果と一致"""
+        B_PA, B_AA, B_AV = self._matrices()
+        infos = [NodeInfo(f"v{i}", f"v{i}", 'V', 3, i) for i in range(3)] + \
+                [NodeInfo(f"a{i}", f"a{i}", 'A', 2, i) for i in range(4)]
+
+        expected = _enumerate_shapley(
+            [n.node_id for n in infos],
+            lambda S: compute_tradeoff_with_node_subset(B_PA, B_AA, B_AV, infos, S, 0, 2)
+        )
+        actual = compute_node_shapley_values_exact(B_PA, B_AA, B_AV, infos, 0, 2)
+
+        for node_id, phi in expected.items():
+            assert actual[node_id] == pytest.approx(phi, abs=1e-10)
+
+    def test_edge_matches_enumeration(self):
+        """エッジShapley値が列挙の結果と一致（同じ位置のエッジは後勝ち）"""
+        B_PA, B_AA, B_AV = self._matrices()
+        edges = [
+            EdgeInfo('e0', 'v0', 'a0', 'v0', 'a0', 0.8, 'AV', (0, 0)),
+            EdgeInfo('e1', 'v1', 'a1', 'v1', 'a1', -0.5, 'AV', (1, 1)),
+            EdgeInfo('e2', 'a0', 'a1', 'a0', 'a1', 0.6, 'AA', (1, 0)),
+            EdgeInfo('e3', 'a1', 'p0', 'a1', 'p0', 1.0, 'PA', (0, 1)),
+            EdgeInfo('e4', 'a0', 'p1', 'a0', 'p1', -0.7, 'PA', (1, 0)),
+            EdgeInfo('e5', 'a1', 'p1', 'a1', 'p1', 0.4, 'PA', (1, 1)),
+            EdgeInfo('e6', 'a1', 'p1', 'a1', 'p1', 0.9, 'PA', (1, 1)),
+        ]
+
+        expected = _enumerate_shapley(
+            [e.edge_id for e in edges],
+            lambda S: compute_tradeoff_with_edge_subset(B_PA, B_AA, B_AV, edges, S, 0, 1)
+        )
+        actual = compute_edge_shapley_values_exact(B_PA, B_AA, B_AV, edges, 0, 1)
+
+        for edge_id, phi in expected.items():
+            assert actual[edge_id] == pytest.approx(phi, abs=1e-10)
+
+    def test_all_pairs_matches_per_pair(self):
+        """全ペア一括計算がペアごとの厳密計算と一致"""
+        B_PA, B_AA, B_AV = self._matrices()
+        infos = [NodeInfo(f"v{i}", f"v{i}", 'V', 3, i) for i in range(3)] + \
+                [NodeInfo(f"a{i}", f"a{i}", 'A', 2, i) for i in range(4)]
+        game = build_node_game(B_PA, B_AA, B_AV, infos)
+        pairs = [(0, 1), (0, 2), (1, 2)]
+
+        phi = compute_exact_shapley_all_pairs(game, pairs)
+
+        assert phi.shape == (7, 3)
+        for p, (i, j) in enumerate(pairs):
+            single = compute_node_shapley_values_exact(B_PA, B_AA, B_AV, infos, i, j)
+            for k, node in enumerate(infos):
+                assert phi[k, p] == pytest.approx(single[node.node_id], abs=1e-12)
+
+    def test_monte_carlo_all_pairs_efficiency(self):
+        """順列サンプリングでも各ペアで Σφ = C_ij(N) が成り立つ"""
+        B_PA, B_AA, B_AV = self._matrices()
+        infos = [NodeInfo(f"v{i}", f"v{i}", 'V', 3, i) for i in range(3)] + \
+                [NodeInfo(f"a{i}", f"a{i}", 'A', 2, i) for i in range(4)]
+        game = build_node_game(B_PA, B_AA, B_AV, infos)
+        pairs = [(0, 1), (1, 2)]
+
+        phi = compute_monte_carlo_shapley_all_pairs(game, pairs, n_samples=20, seed=0)
+        exact = compute_exact_shapley_all_pairs(game, pairs)
+
+        np.testing.assert_allclose(phi.sum(axis=0), exact.sum(axis=0), atol=1e-10)
+
+    def test_node_shapley_all_pairs_results(self):
+        """compute_node_shapley_all_pairs の結果構造"""
+        B_PA, B_AA, B_AV = self._matrices()
+        matrices = {
+            'B_PA': B_PA, 'B_AA': B_AA, 'B_AV': B_AV,
+            'node_ids': {'V': ['v0', 'v1', 'v2'], 'A': ['a0', 'a1', 'a2', 'a3']},
+            'node_labels': {'V': ['v0', 'v1', 'v2'], 'A': ['a0', 'a1', 'a2', 'a3']},
+        }
+
+        results = compute_node_shapley_all_pairs({'nodes': []}, matrices)
+
+        assert set(results) == {(0, 1), (0, 2), (1, 2)}
+        for result in results.values():
+            assert result.computation_method == 'exact'
+            assert result.sum_check == pytest.approx(result.C_ij, abs=1e-10)
+
+
+class TestVectorizedMonteCarlo:
+    """ベクトル化した Monte Carlo ノード/エッジShapley値のテスト"""
+
+    def _node_case(self):
+        rng = np.random.default_rng(11)
+        B_PA = rng.uniform(-1, 1, (3, 5))
+        B_AA = rng.uniform(-0.15, 0.15, (5, 5))
+        B_AV = rng.uniform(-1, 1, (5, 4))
+        infos = [NodeInfo(f"v{i}", f"v{i}", 'V', 3, i) for i in range(4)] + \
+                [NodeInfo(f"a{i}", f"a{i}", 'A', 2, i) for i in range(5)]
+        return B_PA, B_AA, B_AV, infos
+
+    def test_seed_reproducible(self):
+        """同じシードなら同じ結果"""
+        B_PA, B_AA, B_AV, infos = self._node_case()
+        a = compute_node_shapley_values_monte_carlo(B_PA, B_AA, B_AV, infos, 0, 1, 50, seed=3)
+        b = compute_node_shapley_values_monte_carlo(B_PA, B_AA, B_AV, infos, 0, 1, 50, seed=3)
+        assert a == b
+
+    def test_converges_to_exact(self):
+        """サンプル数を増やすと厳密値に近づく"""
+        B_PA, B_AA, B_AV, infos = self._node_case()
+        exact = compute_node_shapley_values_exact(B_PA, B_AA, B_AV, infos, 0, 2)
+        approx = compute_node_shapley_values_monte_carlo(
+            B_PA, B_AA, B_AV, infos, 0, 2, n_samples=4000, seed=0
+        )
+
+        scale = max(abs(v) for v in exact.values())
+        for node_id, phi in exact.items():
+            assert approx[node_id] == pytest.approx(phi, abs=0.1 * scale)
+
+    def test_edge_efficiency_with_duplicates(self):
+        """同じ位置のエッジ（後勝ち）を含んでも Σφ = C_ij(E)"""
+        B_PA = np.zeros((2, 2))
+        B_AA = np.zeros((2, 2))
+        B_AV = np.zeros((2, 1))
+        edges = [
+            EdgeInfo('e0', 'v0', 'a0', 'v0', 'a0', 0.8, 'AV', (0, 0)),
+            EdgeInfo('e1', 'a0', 'a1', 'a0', 'a1', 0.5, 'AA', (1, 0)),
+            EdgeInfo('e2', 'a0', 'p0', 'a0', 'p0', 1.0, 'PA', (0, 0)),
+            EdgeInfo('e3', 'a1', 'p1', 'a1', 'p1', -0.6, 'PA', (1, 1)),
+            EdgeInfo('e4', 'a1', 'p1', 'a1', 'p1', 0.3, 'PA', (1, 1)),
+        ]
+
+        approx = compute_edge_shapley_values_monte_carlo(
+            B_PA, B_AA, B_AV, edges, 0, 1, n_samples=30, seed=1
+        )
+        exact = compute_edge_shapley_values_exact(B_PA, B_AA, B_AV, edges, 0, 1)
+
+        # C_ij(E) = (1.0 × 0.8) × (0.3 × 0.5 × 0.8)
+        assert sum(exact.values()) == pytest.approx(0.8 * 0.12)
+        assert sum(approx.values()) == pytest.approx(sum(exact.values()))
+
+
+class TestAdaptiveMonteCarlo:
+    """適応的 Monte Carlo（標準誤差による早期停止）のテスト"""
+
+    def _game(self):
+        rng = np.random.default_rng(11)
+        B_PA = rng.uniform(-1, 1, (3, 5))
+        B_AA = rng.uniform(-0.15, 0.15, (5, 5))
+        B_AV = rng.uniform(-1, 1, (5, 4))
+        infos = [NodeInfo(f"v{i}", f"v{i}", 'V', 3, i) for i in range(4)] + \
+                [NodeInfo(f"a{i}", f"a{i}", 'A', 2, i) for i in range(5)]
+        return build_node_game(B_PA, B_AA, B_AV, infos), (B_PA, B_AA, B_AV, infos)
+
+    @pytest.mark.parametrize('sampling', ['random', 'antithetic', 'stratified'])
+    def test_stops_at_tolerance(self, sampling):
+        """許容値で停止し、厳密値との誤差が標準誤差相応に収まる"""
+        game, (B_PA, B_AA, B_AV, infos) = self._game()
+        exact = compute_exact_shapley_all_pairs(game, [(0, 1)])
+
+        estimate = compute_adaptive_monte_carlo_shapley(
+            game, [(0, 1)], tolerance=0.02, sampling=sampling, seed=0
+        )
+
+        assert estimate.stop_reason == 'tolerance'
+        assert estimate.std_error.max() <= 0.02
+        assert np.all(np.abs(estimate.phi - exact) <= 5 * estimate.std_error + 1e-12)
+        # どの方式でも各順列で効率性が成り立つ
+        assert estimate.phi.sum() == pytest.approx(exact.sum())
+
+    def test_max_samples(self):
+        """許容値・時間予算がなければ上限まで評価"""
+        game, _ = self._game()
+        estimate = compute_adaptive_monte_carlo_shapley(
+            game, [(0, 1)], max_samples=40, sampling='antithetic', seed=0
+        )
+
+        assert estimate.stop_reason == 'max_samples'
+        assert estimate.n_samples == 40
+
+    def test_invalid_sampling(self):
+        """未知のサンプリング方式はエラー"""
+        game, _ = self._game()
+        with pytest.raises(ValueError):
+            compute_adaptive_monte_carlo_shapley(game, [(0, 1)], sampling='sobol')
+
+    def test_result_dict_confidence_intervals(self):
+        """辞書変換で信頼区間と停止情報を返す"""
+        _, (B_PA, B_AA, B_AV, infos) = self._game()
+        matrices = {
+            'B_PA': B_PA, 'B_AA': B_AA, 'B_AV': B_AV,
+            'node_ids': {'V': [f"v{i}" for i in range(4)], 'A': [f"a{i}" for i in range(5)]},
+            'node_labels': {'V': [f"v{i}" for i in range(4)], 'A': [f"a{i}" for i in range(5)]},
+        }
+
+        result = compute_node_shapley_for_performance_pair(
+            {'nodes': []}, matrices, 0, 1, method='adaptive', tolerance=0.05
+        )
+        result_dict = node_shapley_result_to_dict(result, infos)
+
+        assert result_dict['computation']['method'] == 'adaptive'
+        assert result_dict['computation']['stop_reason'] == 'tolerance'
+        for entry in result_dict['node_shapley_values']:
+            assert entry['ci_lower'] <= entry['phi'] <= entry['ci_upper']
+
+
+class TestKernelShap:
+    """KernelSHAP（ペアサンプリングの重み付き最小二乗）のテスト"""
+
+    def _game(self):
+        return TestAdaptiveMonteCarlo()._game()
+
+    def test_converges_with_exact_efficiency(self):
+        """効率性は厳密に成り立ち、厳密値との誤差が標準誤差相応に収まる"""
+        game, _ = self._game()
+        pairs = [(0, 1), (0, 2), (1, 2)]
+        exact = compute_exact_shapley_all_pairs(game, pairs)
+
+        estimate = compute_kernel_shapley(game, pairs, n_samples=4000, seed=0)
+
+        np.testing.assert_allclose(estimate.phi.sum(axis=0), exact.sum(axis=0), atol=1e-12)
+        assert np.all(np.abs(estimate.phi - exact) <= 5 * estimate.std_error + 1e-12)
+        assert estimate.n_samples == 2 * 4000 + 2
+
+    def test_method_kernel_and_auto(self, monkeypatch):
+        """method='kernel' で選択でき、'auto' はプレイヤー数が閾値以上なら KernelSHAP"""
+        from app.services import shapley_calculator
+        _, (B_PA, B_AA, B_AV, infos) = self._game()
+        matrices = {
+            'B_PA': B_PA, 'B_AA': B_AA, 'B_AV': B_AV,
+            'node_ids': {'V': [f"v{i}" for i in range(4)], 'A': [f"a{i}" for i in range(5)]},
+            'node_labels': {'V': [f"v{i}" for i in range(4)], 'A': [f"a{i}" for i in range(5)]},
+        }
+
+        result = compute_node_shapley_for_performance_pair({'nodes': []}, matrices, 0, 1, method='kernel')
+        result_dict = node_shapley_result_to_dict(result, infos)
+        assert result_dict['computation']['method'] == 'kernel'
+        assert result.sum_check == pytest.approx(result.C_ij, abs=1e-10)
+        assert all(entry['std_error'] is not None for entry in result_dict['node_shapley_values'])
+
+        monkeypatch.setattr(shapley_calculator, 'EXACT_AUTO_MAX_PLAYERS', 2)
+        monkeypatch.setattr(shapley_calculator, 'KERNEL_AUTO_MIN_PLAYERS', 4)
+        result = compute_node_shapley_for_performance_pair({'nodes': []}, matrices, 0, 1, method='auto')
+        assert result.computation_method == 'kernel'
+
+
+class TestShapleyInteraction:
+    """ノードペアのShapley相互作用指数のテスト"""
+
+    def _game(self):
+        return TestAdaptiveMonteCarlo()._game()
+
+    def test_exact_matches_definition(self):
+        """価値テーブルからの計算が定義式の直接評価と一致する"""
+        from itertools import combinations
+        import math
+        from app.services.shapley_subset_table import coalition_total_effect
+
+        game, _ = self._game()
+        n = game.n_players
+        interactions = compute_exact_interactions(game, [(0, 1)])
+
+        def v(players):
+            active = np.zeros(n, dtype=bool)
+            active[list(players)] = True
+            T = coalition_total_effect(game, active)
+            return float(T[0] @ T[1])
+
+        k, l = 1, 6
+        others = [p for p in range(n) if p not in (k, l)]
+        expected = 0.0
+        for size in range(len(others) + 1):
+            weight = math.factorial(size) * math.factorial(n - size - 2) / math.factorial(n - 1)
+            for S in combinations(others, size):
+                expected += weight * (v(S + (k, l)) - v(S + (k,)) - v(S + (l,)) + v(S))
+
+        assert interactions[k, l, 0] == pytest.approx(expected, abs=1e-12)
+        np.testing.assert_allclose(interactions[:, :, 0], interactions[:, :, 0].T)
+        assert np.all(np.diag(interactions[:, :, 0]) == 0)
+
+    def test_sampled_estimate(self):
+        """予算が全提携数以上なら厳密値、少なければ標準誤差相応の誤差"""
+        game, _ = self._game()
+        pairs = [(0, 1), (1, 2)]
+        exact = compute_exact_interactions(game, pairs)
+
+        full, full_se = compute_sampled_interactions(game, pairs, n_samples=1 << game.n_players)
+        np.testing.assert_allclose(full, exact, atol=1e-12)
+        assert np.all(full_se == 0)
+
+        estimate, std_error = compute_sampled_interactions(game, pairs, n_samples=300, seed=0)
+        assert np.all(np.abs(estimate - exact) <= 5 * std_error + 1e-12)
+
+    def test_result_dict(self):
+        """上位ペアは絶対値の降順で、行列と一致する"""
+        _, (B_PA, B_AA, B_AV, infos) = self._game()
+        matrices = {
+            'B_PA': B_PA, 'B_AA': B_AA, 'B_AV': B_AV,
+            'node_ids': {'V': [f"v{i}" for i in range(4)], 'A': [f"a{i}" for i in range(5)]},
+            'node_labels': {'V': [f"v{i}" for i in range(4)], 'A': [f"a{i}" for i in range(5)]},
+        }
+
+        result = compute_node_interactions_for_performance_pair({'nodes': []}, matrices, 0, 1)
+        result_dict = node_interaction_result_to_dict(result, infos, top_k=5)
+
+        assert result_dict['computation']['method'] == 'exact'
+        top = result_dict['top_interactions']
+        assert len(top) == 5
+        assert [t['abs_interaction'] for t in top] == sorted((t['abs_interaction'] for t in top), reverse=True)
+        ids = [node['node_id'] for node in result_dict['nodes']]
+        first = top[0]
+        a, b = ids.index(first['node_a']['node_id']), ids.index(first['node_b']['node_id'])
+        assert result_dict['interaction_matrix'][a][b] == first['interaction']
+
+
+class TestPathDecomposition:
+    """経路単項式分解（非巡回ネットワーク）による厳密計算のテスト"""
+
+    def _dag(self):
+        rng = np.random.default_rng(21)
+        B_PA = rng.uniform(-1, 1, (3, 5)) * (rng.random((3, 5)) < 0.7)
+        B_AA = np.tril(rng.uniform(-0.8, 0.8, (5, 5)) * (rng.random((5, 5)) < 0.5), k=-1)
+        B_AV = rng.uniform(-1, 1, (5, 3)) * (rng.random((5, 3)) < 0.7)
+        infos = [NodeInfo(f"v{i}", f"v{i}", 'V', 3, i) for i in range(3)] + \
+                [NodeInfo(f"a{i}", f"a{i}", 'A', 2, i) for i in range(5)]
+        return B_PA, B_AA, B_AV, infos
+
+    def test_node_matches_exact(self):
+        """非巡回ノードゲームで価値テーブルの厳密計算と一致"""
+        B_PA, B_AA, B_AV, infos = self._dag()
+        game = build_node_game(B_PA, B_AA, B_AV, infos)
+        pairs = [(0, 1), (0, 2), (1, 2)]
+
+        np.testing.assert_allclose(
+            compute_path_shapley(game, pairs), compute_exact_shapley_all_pairs(game, pairs), atol=1e-12
+        )
+
+    def test_edge_matches_exact(self):
+        """非巡回エッジゲームで価値テーブルの厳密計算と一致"""
+        B_PA, B_AA, B_AV, _ = self._dag()
+        B_PA, B_AA, B_AV = B_PA[:, :3], B_AA[:3, :3], B_AV[:3, :2]
+        edges = []
+        for edge_type, matrix in (('AV', B_AV), ('AA', B_AA), ('PA', B_PA)):
+            for row, col in zip(*np.nonzero(matrix)):
+                edges.append(EdgeInfo(
+                    f"e{len(edges)}", f"s{col}", f"t{row}", f"s{col}", f"t{row}",
+                    float(matrix[row, col]), edge_type, (int(row), int(col))
+                ))
+        game = build_edge_game(B_PA, B_AA, B_AV, edges)
+        pairs = [(0, 1), (1, 2)]
+
+        assert 0 < game.n_players <= 20
+        np.testing.assert_allclose(
+            compute_path_shapley(game, pairs), compute_exact_shapley_all_pairs(game, pairs), atol=1e-12
+        )
+
+    def test_cyclic_returns_none(self):
+        """Attribute 間にループがあれば適用しない"""
+        B_PA, B_AA, B_AV, infos = self._dag()
+        B_AA = B_AA.copy()
+        B_AA[0, 4] = 0.3
+        B_AA[4, 0] = 0.3
+
+        assert compute_path_shapley(build_node_game(B_PA, B_AA, B_AV, infos), [(0, 1)]) is None
+
+    def test_duplicate_edges_return_none(self):
+        """同じ行列位置のエッジが重複すれば適用しない"""
+        B_PA, B_AA, B_AV, _ = self._dag()
+        edges = [
+            EdgeInfo('e0', 'v0', 'a0', 'v0', 'a0', 0.5, 'AV', (0, 0)),
+            EdgeInfo('e1', 'a0', 'p0', 'a0', 'p0', 0.5, 'PA', (0, 0)),
+            EdgeInfo('e2', 'a0', 'p0', 'a0', 'p0', 0.7, 'PA', (0, 0)),
+        ]
+
+        assert compute_path_shapley(build_edge_game(B_PA, B_AA, B_AV, edges), [(0, 1)]) is None
+
+    def _layered_edge_game(self, width=8, depth=6, reach_second=False):
+        """幅 width・深さ depth の層状エッジゲーム（性能0へは width^depth 本の経路）"""
+        n_attrs = width * depth
+        B_PA = np.zeros((2, n_attrs))
+        B_AA = np.zeros((n_attrs, n_attrs))
+        B_AV = np.zeros((n_attrs, 2))
+        B_AV[:width, 0] = 0.5
+        for layer in range(depth - 1):
+            rows = slice((layer + 1) * width, (layer + 2) * width)
+            cols = slice(layer * width, (layer + 1) * width)
+            B_AA[rows, cols] = 0.5
+        B_PA[0, -width:] = 0.5
+        if reach_second:
+            B_PA[1, 0] = 0.5
+        edges = []
+        for edge_type, matrix in (('AV', B_AV), ('AA', B_AA), ('PA', B_PA)):
+            for row, col in zip(*np.nonzero(matrix)):
+                edges.append(EdgeInfo(
+                    f"e{len(edges)}", f"s{col}", f"t{row}", f"s{col}", f"t{row}",
+                    float(matrix[row, col]), edge_type, (int(row), int(col))
+                ))
+        return build_edge_game(B_PA, B_AA, B_AV, edges)
+
+    def test_unpaired_paths_not_enumerated(self, monkeypatch):
+        """相手の性能に到達しない変数の経路は列挙しない（広く深い非巡回ネットワーク）"""
+        from app.services import shapley_path_decomposition
+        game = self._layered_edge_game()
+
+        def fail(*args, **kwargs):
+            raise AssertionError("paths enumerated for a variable without path pairs")
+
+        monkeypatch.setattr(shapley_path_decomposition, '_enumerate_paths', fail)
+        phi = compute_path_shapley(game, [(0, 1)])
+
+        assert game.n_players > 300
+        np.testing.assert_array_equal(phi, np.zeros((game.n_players, 1)))
+
+    def test_path_count_limit(self):
+        """経路ペア数・経路数が上限を超えれば列挙せずに None を返す"""
+        game = self._layered_edge_game(reach_second=True)
+
+        assert compute_path_shapley(game, [(0, 1)]) is None
+        # 性能0へ8本・性能1へ1本: 経路ペア数8は上限内でも、経路数9が上限を超える
+        small = self._layered_edge_game(width=2, depth=3, reach_second=True)
+        assert compute_path_shapley(small, [(0, 1)], max_path_pairs=9) is not None
+        assert compute_path_shapley(small, [(0, 1)], max_path_pairs=8) is None
+
+    def test_auto_uses_path(self):
+        """auto は非巡回ネットワークで 'path' を選ぶ"""
+        B_PA, B_AA, B_AV, infos = self._dag()
+        matrices = {
+            'B_PA': B_PA, 'B_AA': B_AA, 'B_AV': B_AV,
+            'node_ids': {'V': [f"v{i}" for i in range(3)], 'A': [f"a{i}" for i in range(5)]},
+            'node_labels': {'V': [f"v{i}" for i in range(3)], 'A': [f"a{i}" for i in range(5)]},
+        }
+
+        result = compute_node_shapley_for_performance_pair({'nodes': []}, matrices, 0, 1)
+
+        assert result.computation_method == 'path'
+        assert result.sum_check == pytest.approx(result.C_ij, abs=1e-10)
+
+
+class TestShapleyPruning:
+    """ナルプレイヤー・対称プレイヤーの縮約のテスト"""
+
+    def _cyclic(self):
+        # a0 ⇄ a1 のループ、v2 は P0 にしか到達しない、a3 はどの性能にも到達しない
+        B_PA = np.array([[0.8, 0.0, 0.5, 0.0],
+                         [0.0, 0.6, 0.0, 0.0]])
+        B_AA = np.array([[0.0, 0.3, 0.0, 0.0],
+                         [0.2, 0.0, 0.0, 0.0],
+                         [0.0, 0.0, 0.0, 0.0],
+                         [0.4, 0.0, 0.0, 0.0]])
+        B_AV = np.array([[0.7, 0.7, 0.0],
+                         [0.0, 0.0, 0.0],
+                         [0.0, 0.0, 0.9],
+                         [0.5, 0.5, 0.0]])
+        infos = [NodeInfo(f"v{i}", f"v{i}", 'V', 3, i) for i in range(3)] + \
+                [NodeInfo(f"a{i}", f"a{i}", 'A', 2, i) for i in range(4)]
+        return B_PA, B_AA, B_AV, infos
+
+    def test_null_and_symmetric_players(self):
+        """ナルプレイヤーは φ = 0、対称な変数は同じクラスにまとまる"""
+        B_PA, B_AA, B_AV, infos = self._cyclic()
+        game = build_node_game(B_PA, B_AA, B_AV, infos)
+
+        reduction = reduce_game(game, [(0, 1)])
+        stats = reduction.to_dict()
+
+        core_ids = {game.player_ids[k] for k in reduction.core_players}
+        assert core_ids == {'v0', 'v1', 'a0', 'a1'}
+        assert stats['n_null_players'] == 3
+        assert stats['n_symmetric_players'] == 2
+        assert stats['table_size'] == 3 * 2 * 2
+
+        phi = compute_reduced_exact_shapley(reduction, [(0, 1)])
+        np.testing.assert_allclose(phi, compute_exact_shapley_all_pairs(game, [(0, 1)]), atol=1e-12)
+        assert phi[0, 0] == pytest.approx(phi[1, 0])
+
+    def test_edge_duplicates_with_different_weights_not_grouped(self):
+        """重みの異なる重複エッジは後勝ちの順序に依存するため対称としない"""
+        B_PA, B_AA, B_AV, _ = self._cyclic()
+        edges = [
+            EdgeInfo('e0', 'v0', 'a0', 'v0', 'a0', 0.7, 'AV', (0, 0)),
+            EdgeInfo('e1', 'v1', 'a0', 'v1', 'a0', 0.7, 'AV', (0, 1)),
+            EdgeInfo('e2', 'a0', 'p0', 'a0', 'p0', 0.8, 'PA', (0, 0)),
+            EdgeInfo('e3', 'a0', 'a1', 'a0', 'a1', 0.2, 'AA', (1, 0)),
+            EdgeInfo('e4', 'a1', 'p1', 'a1', 'p1', 0.6, 'PA', (1, 1)),
+            EdgeInfo('e5', 'a1', 'p1', 'a1', 'p1', 0.9, 'PA', (1, 1)),
+            EdgeInfo('e6', 'a1', 'p1', 'a1', 'p1', 0.6, 'PA', (1, 1)),
+        ]
+        game = build_edge_game(B_PA, B_AA, B_AV, edges)
+
+        reduction = reduce_game(game, [(0, 1)])
+
+        assert sorted(len(c) for c in reduction.classes) == [1, 1, 1, 1, 1, 2]
+        np.testing.assert_allclose(
+            compute_reduced_exact_shapley(reduction, [(0, 1)]),
+            compute_exact_shapley_all_pairs(game, [(0, 1)]),
+            atol=1e-12
+        )
+
+    def test_divergent_skips_null_pruning(self):
+        """ρ(|B_AA|) ≥ 1 ではナルプレイヤーを除かない"""
+        B_PA, B_AA, B_AV, infos = self._cyclic()
+        B_AA = B_AA * 5
+        reduction = reduce_game(build_node_game(B_PA, B_AA, B_AV, infos), [(0, 1)])
+
+        assert not reduction.null_pruning
+        assert reduction.n_null_players == 0
+
+    def test_result_dict_reports_pruning(self):
+        """computation ブロックに縮約統計を返す"""
+        B_PA, B_AA, B_AV, infos = self._cyclic()
+        matrices = {
+            'B_PA': B_PA, 'B_AA': B_AA, 'B_AV': B_AV,
+            'node_ids': {'V': [f"v{i}" for i in range(3)], 'A': [f"a{i}" for i in range(4)]},
+            'node_labels': {'V': [f"v{i}" for i in range(3)], 'A': [f"a{i}" for i in range(4)]},
+        }
+
+        result = compute_node_shapley_for_performance_pair({'nodes': []}, matrices, 0, 1)
+        result_dict = node_shapley_result_to_dict(result, infos)
+
+        assert result_dict['computation']['method'] == 'exact'
+        assert result_dict['computation']['pruning']['n_core_players'] == 4
+        assert result.sum_check == pytest.approx(result.C_ij, abs=1e-10)
+
+
+class TestOwenValue:
+    """グループ構造付きShapley値（Owen値）のテスト"""
+
+    def _game(self):
+        rng = np.random.default_rng(17)
+        B_PA = rng.uniform(-1, 1, (3, 5))
+        B_AA = rng.uniform(-0.2, 0.2, (5, 5))
+        B_AV = rng.uniform(-1, 1, (5, 4))
+        infos = [NodeInfo(f"v{i}", f"v{i}", 'V', 3, i) for i in range(4)] + \
+                [NodeInfo(f"a{i}", f"a{i}", 'A', 2, i) for i in range(5)]
+        return build_node_game(B_PA, B_AA, B_AV, infos), (B_PA, B_AA, B_AV, infos)
+
+    def test_trivial_structures_equal_shapley(self):
+        """単独グループのみ、または全員1グループなら Shapley値と一致"""
+        game, _ = self._game()
+        pairs = [(0, 1), (1, 2)]
+        expected = compute_exact_shapley_all_pairs(game, pairs)
+        n = game.n_players
+
+        singletons = [PlayerGroup(str(k), str(k), [k]) for k in range(n)]
+        everyone = [PlayerGroup('all', 'all', list(range(n)))]
+
+        np.testing.assert_allclose(compute_owen_values_exact(game, singletons, pairs), expected, atol=1e-12)
+        np.testing.assert_allclose(compute_owen_values_exact(game, everyone, pairs), expected, atol=1e-12)
+
+    def test_efficiency_and_quotient_game(self):
+        """Σφ = C_ij、グループ内の和は商ゲームのShapley値"""
+        game, (B_PA, B_AA, B_AV, infos) = self._game()
+        groups = [PlayerGroup('x', 'x', [0, 4, 5]), PlayerGroup('y', 'y', [1, 2, 6]),
+                  PlayerGroup('z', 'z', [3, 7, 8])]
+
+        phi = compute_owen_values_exact(game, groups, [(0, 1)])[:, 0]
+
+        def value(groups_in):
+            members = [k for g in groups_in for k in g.members]
+            return compute_tradeoff_with_node_subset(
+                B_PA, B_AA, B_AV, infos, [infos[k].node_id for k in members], 0, 1
+            )
+        quotient = _enumerate_shapley(
+            list(range(3)), lambda S: value([groups[h] for h in S])
+        )
+
+        assert phi.sum() == pytest.approx(value(groups), abs=1e-10)
+        for h, group in enumerate(groups):
+            assert phi[group.members].sum() == pytest.approx(quotient[h], abs=1e-10)
+
+    def test_monte_carlo_converges(self):
+        """グループ単位で連続する順列のサンプリングが厳密値に近づく"""
+        game, _ = self._game()
+        groups = [PlayerGroup('x', 'x', [0, 1, 4, 5]), PlayerGroup('y', 'y', [2, 3, 6, 7, 8])]
+
+        exact = compute_owen_values_exact(game, groups, [(0, 2)])
+        estimate = compute_monte_carlo_owen_values(game, groups, [(0, 2)], n_samples=3000, seed=0)
+
+        np.testing.assert_allclose(estimate, exact, atol=0.05 * np.abs(exact).max())
+
+    def test_entity_groups(self):
+        """変数は接続する実体へ、属性は流入の強い実体へ割り当てる"""
+        network = {
+            'nodes': [
+                {'id': 'e0', 'layer': 4, 'type': 'object', 'label': 'E0'},
+                {'id': 'e1', 'layer': 4, 'type': 'environment', 'label': 'E1'},
+            ],
+            'edges': [
+                {'source_id': 'e0', 'target_id': 'v0'},
+                {'source_id': 'v1', 'target_id': 'e1'},
+            ],
+        }
+        infos = [NodeInfo(f"v{i}", f"v{i}", 'V', 3, i) for i in range(3)] + \
+                [NodeInfo(f"a{i}", f"a{i}", 'A', 2, i) for i in range(2)]
+        B_AV = np.array([[1.0, 0.5, 0.0],
+                         [0.2, -0.9, 0.0]])
+
+        groups = {g.group_id: [infos[k].node_id for k in g.members]
+                  for g in build_node_groups(network, infos, B_AV, 'entity')}
+        assert groups == {'e0': ['v0', 'a0'], 'e1': ['v1', 'a1'], 'v2': ['v2']}
+
+        categories = {g.group_id: [infos[k].node_id for k in g.members]
+                      for g in build_node_groups(network, infos, B_AV, 'category')}
+        assert categories == {'object': ['v0', 'a0'], 'environment': ['v1', 'a1'], 'variable': ['v2']}
+
+    def test_result_dict_groups(self):
+        """Owen値の結果にグループごとの寄与を返す"""
+        _, (B_PA, B_AA, B_AV, infos) = self._game()
+        network = {
+            'nodes': [{'id': 'e0', 'layer': 4, 'type': 'object', 'label': 'E0'}],
+            'edges': [{'source_id': 'e0', 'target_id': 'v0'}, {'source_id': 'e0', 'target_id': 'v1'}],
+        }
+        matrices = {
+            'B_PA': B_PA, 'B_AA': B_AA, 'B_AV': B_AV,
+            'node_ids': {'V': [f"v{i}" for i in range(4)], 'A': [f"a{i}" for i in range(5)]},
+            'node_labels': {'V': [f"v{i}" for i in range(4)], 'A': [f"a{i}" for i in range(5)]},
+        }
+
+        result = compute_node_owen_for_performance_pair(network, matrices, 0, 1, grouping='entity')
+        result_dict = node_shapley_result_to_dict(result, infos)
+
+        assert result_dict['computation']['method'] == 'owen'
+        assert result.sum_check == pytest.approx(result.C_ij, abs=1e-10)
+        group_sum = sum(g['phi'] for g in result_dict['groups'])
+        assert group_sum == pytest.approx(result.C_ij, abs=1e-10)
+
+    def test_rejects_unknown_method(self):
+        """Owen値で扱わない計算方法は Monte Carlo に回さずエラーにする"""
+        game, _ = self._game()
+        groups = [PlayerGroup('g0', 'g0', list(range(game.n_players)))]
+        with pytest.raises(ValueError):
+            compute_owen_values(game, groups, [(0, 1)], method='adaptive')
+
+
+class TestShapleyStore:
+    """Shapley値・カップリング結果の永続ストアのテスト"""
+
+    @pytest.fixture
+    def db(self):
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.models.database import Base
+
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(bind=engine)
+        session = sessionmaker(bind=engine)()
+        yield session
+        session.close()
+
+    def test_roundtrip(self, db):
+        """保存した結果を同じキーで取得でき、パラメータが違えば取得しない"""
+        params = {'perf_i': 0, 'perf_j': 1, 'method': 'auto'}
+        result = {'C_ij': np.float64(-0.5), 'values': np.array([0.25, -0.75])}
+        shapley_store.store_result(db, 'hash-a', 'node', params, result, case_id='case-1')
+
+        stored = shapley_store.get_stored_result(db, 'hash-a', 'node', params)
+        assert stored == {'C_ij': -0.5, 'values': [0.25, -0.75]}
+        assert shapley_store.get_stored_result(db, 'hash-a', 'edge', params) is None
+        assert shapley_store.get_stored_result(db, 'hash-a', 'node', {**params, 'method': 'exact'}) is None
+
+    def test_network_change_invalidates(self, db):
+        """network_json が変わると古いハッシュの結果は参照されず、保存時に削除される"""
+        params = {'tradeoff_threshold': 0.0}
+        shapley_store.store_result(db, 'hash-old', 'coupling', params, {'n': 1}, case_id='case-1')
+        shapley_store.store_result(db, 'hash-other', 'coupling', params, {'n': 2}, case_id='case-2')
+
+        assert shapley_store.get_stored_result(db, 'hash-new', 'coupling', params) is None
+        shapley_store.store_result(db, 'hash-new', 'coupling', params, {'n': 3}, case_id='case-1')
+
+        assert shapley_store.get_stored_result(db, 'hash-old', 'coupling', params) is None
+        assert shapley_store.get_stored_result(db, 'hash-other', 'coupling', params) == {'n': 2}
+        assert shapley_store.get_shapley_store_stats(db)['entries'] == 2
+
+        assert shapley_store.invalidate_case_results(db, 'case-1') == 1
+
+    def test_eviction_bound(self, db, monkeypatch):
+        """件数上限を超えると最終参照の古い結果から削除する"""
+        monkeypatch.setattr(shapley_store, 'MAX_STORED_RESULTS', 3)
+        for k in range(5):
+            shapley_store.store_result(db, f"hash-{k}", 'node', {'k': k}, {'k': k})
+
+        stats = shapley_store.get_shapley_store_stats(db)
+        assert stats['entries'] == 3
+        assert shapley_store.get_stored_result(db, 'hash-0', 'node', {'k': 0}) is None
+        assert shapley_store.get_stored_result(db, 'hash-4', 'node', {'k': 4}) == {'k': 4}
+
+    def test_in_memory_cache_bounded(self, monkeypatch):
+        """get_cached_shapley のキャッシュは LRU で件数を制限する"""
+        monkeypatch.setattr(shapley_calculator, 'MAX_SHAPLEY_CACHE_ENTRIES', 2)
+        shapley_calculator.clear_shapley_cache()
+        T = np.array([[1.0, 0.5], [-0.5, 1.0], [0.3, 0.3]])
+
+        for perf_j in (1, 2):
+            shapley_calculator.get_cached_shapley(T, 0, perf_j, cache_key=1)
+        shapley_calculator.get_cached_shapley(T, 0, 1, cache_key=1)
+        shapley_calculator.get_cached_shapley(T, 1, 2, cache_key=1)
+
+        keys = [key[:3] for key in shapley_calculator._shapley_cache]
+        assert keys == [(1, 0, 1), (1, 1, 2)]
+        shapley_calculator.clear_shapley_cache()
+
+    def test_in_memory_cache_with_property_ids(self):
+        """リストの引数（property_ids）もキーに含めてキャッシュできる"""
+        shapley_calculator.clear_shapley_cache()
+        T = np.array([[1.0, 0.5], [-0.5, 1.0], [0.3, 0.3]])
+
+        first = shapley_calculator.get_cached_shapley(T, 0, 1, cache_key=1, property_ids=['x', 'y'])
+        again = shapley_calculator.get_cached_shapley(T, 0, 1, cache_key=1, property_ids=['x', 'y'])
+        renamed = shapley_calculator.get_cached_shapley(T, 0, 1, cache_key=1, property_ids=['u', 'w'])
+
+        assert again is first
+        assert renamed is not first
+        assert len(shapley_calculator._shapley_cache) == 2
+        shapley_calculator.clear_shapley_cache()
+
+
+class TestPairScheduler:
+    """性能ペア単位のプロセス並列スケジューラのテスト"""
+
+    def _node_case(self):
+        rng = np.random.default_rng(17)
+        B_PA = rng.uniform(-1, 1, (5, 4))
+        B_AA = rng.uniform(-0.2, 0.2, (4, 4))
+        B_AV = rng.uniform(-1, 1, (4, 3))
+        infos = [NodeInfo(f"v{i}", f"v{i}", 'V', 3, i) for i in range(3)] + \
+                [NodeInfo(f"a{i}", f"a{i}", 'A', 2, i) for i in range(4)]
+        return B_PA, B_AA, B_AV, infos
+
+    def test_shared_arrays_roundtrip(self):
+        """共有メモリ経由で同じ値を読み取り専用で参照できる"""
+        arrays = {'T': np.arange(6.0).reshape(2, 3), 'mask': np.array([True, False])}
+        with SharedArrays(arrays) as shared:
+            attached = attach_shared_arrays(shared.spec)
+            np.testing.assert_array_equal(attached['T'], arrays['T'])
+            np.testing.assert_array_equal(attached['mask'], arrays['mask'])
+            assert not attached['T'].flags.writeable
+
+    def test_parallel_matches_sequential(self):
+        """プロセス並列でも逐次（全ペアで提携を共有）と同じノードShapley値"""
+        B_PA, B_AA, B_AV, infos = self._node_case()
+        arrays = {'B_PA': B_PA, 'B_AA': B_AA, 'B_AV': B_AV}
+        pairs = [(i, j) for i in range(5) for j in range(i + 1, 5)]
+        payload = (infos, 'exact', 100, 1)
+
+        sequential, _ = collect_pair_results(
+            shapley_calculator._node_shapley_chunk, arrays, pairs, payload, n_workers=1
+        )
+        parallel, stats = collect_pair_results(
+            shapley_calculator._node_shapley_chunk, arrays, pairs, payload, n_workers=2
+        )
+
+        assert stats.n_workers == 2 and stats.n_completed == len(pairs)
+        assert set(parallel) == set(pairs)
+        for pair in pairs:
+            np.testing.assert_allclose(parallel[pair].phi, sequential[pair].phi, atol=1e-12)
+
+    def test_deadline_leaves_no_failing_chunks(self, monkeypatch):
+        """期限切れ後も実行中のチャンクは共有メモリを参照でき、終わってから削除される"""
+        from app.services import shapley_parallel
+        submitted, specs = [], []
+
+        def recording_submit(task, spec, *args):
+            future = submit_shared(task, spec, *args)
+            submitted.append(future)
+            specs.append(spec)
+            return future
+
+        monkeypatch.setattr(shapley_parallel, 'submit_shared', recording_submit)
+        arrays = {'T': np.arange(1.0, 9.0)}
+        pairs = [(i, j) for i in range(8) for j in range(i + 1, 8)][:16]
+        # 2ワーカーを塞いでおき、期限0で打ち切る（キューに渡ったチャンクは取り消せず、
+        # ワーカーが空いてから共有メモリにアタッチする）
+        worker_pool.shutdown_worker_pool(wait=True)
+        pool = worker_pool.start_worker_pool(2)
+        blockers = [pool.submit(time.sleep, 0.5) for _ in range(2)]
+        time.sleep(0.1)
+        results, stats = collect_pair_results(
+            _slow_pair_chunk, arrays, pairs, 0.05, n_workers=2, time_budget_ms=0
+        )
+        wait(blockers)
+
+        assert stats.timed_out and stats.n_chunks == 8
+        assert len(results) == stats.n_completed < len(pairs)
+        assert not all(future.cancelled() for future in submitted)
+        wait(submitted, timeout=30)
+        for future in submitted:
+            assert future.cancelled() or future.exception() is None
+        # 最後のチャンクの完了後に共有メモリが削除される
+        name = next(iter(specs[0].values()))[0]
+        for _ in range(100):
+            try:
+                shared_memory.SharedMemory(name=name).close()
+            except FileNotFoundError:
+                break
+            time.sleep(0.05)
+        else:
+            pytest.fail("shared memory was not unlinked")
+
+    def test_deadline_returns_completed_pairs(self):
+        """期限切れでは完了したペアだけを返し、timed_out を立てる"""
+        T = np.random.default_rng(3).uniform(-1, 1, (6, 4))
+        stats = shapley_calculator.PairScheduleStats()
+        results = compute_all_pairwise_shapley(
+            T, [f"p{i}" for i in range(6)], [f"v{k}" for k in range(4)],
+            method='exact', only_tradeoffs=False, time_budget_ms=0, schedule=stats
+        )
+
+        assert stats.timed_out
+        assert stats.n_pairs == 15
+        assert len(results) == stats.n_completed < 15
+
 
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
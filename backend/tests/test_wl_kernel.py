@@ -0,0 +1,201 @@
+# backend/tests/test_wl_kernel.py
+"""
+WLカーネル（wl_kernel.py）のユニットテスト
+"""
+
+import pytest
+import numpy as np
+import sys
+import os
+
+# パスを追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.wl_kernel import (
+    WLLabelDictionary,
+    extract_wl_labels,
+    wl_feature_matrix,
+    compute_classic_wl_kernel,
+    kernel_to_distance,
+    WLFeatureVector,
+    IncrementalWLKernel,
+    compute_wl_features,
+    feature_vectors_to_matrix,
+    normalize_kernel,
+    wl_network_hash,
+)
+from app.services import weighted_wl_kernel
+from app.services.weighted_wl_kernel import WeightedWLKernel
+
+
+def _network(n_nodes, seed):
+    rng = np.random.default_rng(seed)
+    types = ['performance', 'attribute', 'variable', 'object']
+    nodes = [
+        {'id': f"n{k}", 'layer': int(rng.integers(1, 5)), 'type': types[int(rng.integers(0, 4))]}
+        for k in range(n_nodes)
+    ]
+    edges = []
+    for _ in range(2 * n_nodes):
+        a, b = rng.choice(n_nodes, 2, replace=False)
+        weight = [None, -1, -0.33, 0, 0.33, 1][int(rng.integers(0, 6))]
+        edges.append({'source_id': f"n{a}", 'target_id': f"n{b}", 'weight': weight})
+    return {'nodes': nodes, 'edges': edges}
+
+
+def _string_wl_kernel(networks, iterations):
+    """ラベル文字列を比較する従来の WL カーネル（比較用）"""
+    histories = []
+    for net in networks:
+        labels = []
+        for node in net['nodes']:
+            degree = sum(e['target_id'] == node['id'] for e in net['edges']) + \
+                sum(e['source_id'] == node['id'] for e in net['edges'])
+            labels.append(f"L{node['layer']}-{node['type'][0].upper()}-D{degree}")
+        histories.append([labels])
+
+    ids = [{n['id']: k for k, n in enumerate(net['nodes'])} for net in networks]
+    n = len(networks)
+    kernel = np.zeros((n, n))
+    for it in range(iterations + 1):
+        if it > 0:
+            for g, net in enumerate(networks):
+                prev = histories[g][-1]
+                new = []
+                for k, node in enumerate(net['nodes']):
+                    neighbors = []
+                    for e in net['edges']:
+                        w = e.get('weight') or 0
+                        if e['source_id'] == node['id']:
+                            neighbors.append(f"{prev[ids[g][e['target_id']]]}@{round(w * 100) / 100}")
+                        elif e['target_id'] == node['id']:
+                            neighbors.append(f"{prev[ids[g][e['source_id']]]}@{round(w * 100) / 100}")
+                    new.append(f"{prev[k]}|[{','.join(sorted(neighbors))}]")
+                histories[g].append(new)
+        for i in range(n):
+            for j in range(n):
+                li, lj = histories[i][it], histories[j][it]
+                kernel[i, j] += sum(li.count(label) * lj.count(label) for label in set(li))
+
+    diag = np.sqrt(np.diag(kernel))
+    return kernel / np.outer(diag, diag)
+
+
+class TestClassicWLKernel:
+    """整数ラベル圧縮・疎行列による従来の WL カーネルのテスト"""
+
+    @pytest.mark.parametrize("iterations", [0, 1, 2])
+    def test_matches_string_labels(self, iterations):
+        """ラベル文字列を比較する実装と同じカーネル値"""
+        networks = [_network(n, seed) for seed, n in enumerate([4, 6, 6, 8, 5])]
+        np.testing.assert_allclose(
+            compute_classic_wl_kernel(networks, iterations),
+            _string_wl_kernel(networks, iterations),
+            atol=1e-12
+        )
+
+    def test_shared_dictionary(self):
+        """同じ構造のグラフは同じラベルIDになり、特徴行列の行が一致する"""
+        net = _network(6, 1)
+        relabeled = {
+            'nodes': [{**node, 'id': f"x-{node['id']}"} for node in net['nodes']],
+            'edges': [
+                {**e, 'source_id': f"x-{e['source_id']}", 'target_id': f"x-{e['target_id']}"}
+                for e in net['edges']
+            ],
+        }
+        labels = WLLabelDictionary()
+        assert sorted(extract_wl_labels(net, 2, labels)) == sorted(extract_wl_labels(relabeled, 2, labels))
+
+        X = wl_feature_matrix([net, relabeled, _network(5, 2)], 1)
+        assert X.shape[0] == 3
+        assert (X[0] != X[1]).nnz == 0
+        assert X[0].sum() == 2 * len(net['nodes'])
+
+    def test_distance(self):
+        """正規化カーネルの自己距離は0、空のグラフは0行"""
+        networks = [_network(5, 3), _network(7, 4), {'nodes': [], 'edges': []}]
+        K = compute_classic_wl_kernel(networks, 1)
+        assert K[2].tolist() == [0.0, 0.0, 0.0]
+
+        D = kernel_to_distance(K)
+        np.testing.assert_allclose(np.diag(D)[:2], 0.0, atol=1e-7)
+        assert D[0, 1] == pytest.approx(np.sqrt(2 - 2 * K[0, 1]))
+
+
+class TestIncrementalWLKernel:
+    """設計案ごとの WL 特徴ベクトルと差分更新のテスト"""
+
+    def test_hashed_features_match_classic(self):
+        """ラベルハッシュの特徴ベクトルから従来と同じカーネル値"""
+        networks = [_network(n, seed) for seed, n in enumerate([5, 7, 6, 4])]
+        X = feature_vectors_to_matrix([compute_wl_features(net, 2) for net in networks])
+        np.testing.assert_allclose(
+            normalize_kernel((X @ X.T).toarray()),
+            compute_classic_wl_kernel(networks, 2),
+            atol=1e-12
+        )
+
+    def test_feature_roundtrip_and_hash(self):
+        """保存形式の往復、レイアウトの変更ではハッシュが変わらない"""
+        net = _network(6, 5)
+        feature = compute_wl_features(net, 1)
+        restored = WLFeatureVector.from_dict(feature.to_dict())
+        assert restored.network_hash == feature.network_hash
+        np.testing.assert_array_equal(restored.labels, feature.labels)
+        np.testing.assert_array_equal(restored.counts, feature.counts)
+
+        moved = {**net, 'nodes': [{**node, 'x': 10.0} for node in net['nodes']]}
+        assert wl_network_hash(moved) == feature.network_hash
+        edited = {**net, 'edges': net['edges'][1:]}
+        assert wl_network_hash(edited) != feature.network_hash
+
+    def test_update_recomputes_changed_rows(self):
+        """1案の変更・追加・削除では変わった案の行だけを再計算し、一括計算と一致する"""
+        networks = [_network(n, seed) for seed, n in enumerate([5, 6, 7, 5, 6])]
+        kernel = IncrementalWLKernel(iterations=1)
+        kernel.update([compute_wl_features(net, 1) for net in networks])
+        assert kernel.n_recomputed == 5
+
+        networks[2] = _network(7, 99)
+        networks = networks[1:] + [_network(4, 100)]
+        K = kernel.update([compute_wl_features(net, 1) for net in networks])
+
+        assert kernel.n_recomputed == 2
+        np.testing.assert_allclose(K, compute_classic_wl_kernel(networks, 1), atol=1e-12)
+
+
+class TestWeightedWLKernelMatrix:
+    """Weighted WL カーネルの行列演算版のテスト"""
+
+    @pytest.mark.parametrize("aggregation", ['weighted_mean', 'weighted_sum', 'attention'])
+    def test_matches_pairwise(self, aggregation, monkeypatch):
+        """ブロックに分けても全ペアの _graph_kernel と一致し、空のグラフは0"""
+        monkeypatch.setattr(weighted_wl_kernel, 'NODE_KERNEL_BLOCK_ELEMENTS', 60)
+        networks = [_network(n, seed) for seed, n in enumerate([5, 7, 4, 6])] + [{'nodes': [], 'edges': []}]
+        kernel = WeightedWLKernel(n_iterations=2, aggregation=aggregation, sigma=0.8)
+        features = [kernel._extract_features(net) for net in networks]
+
+        expected = np.array([[kernel._graph_kernel(a, b) for b in features] for a in features])
+        np.testing.assert_allclose(kernel._kernel_matrix(features), expected, atol=1e-12)
+
+        K = kernel.fit_transform(networks)
+        np.testing.assert_allclose(np.diag(K)[:4], 1.0)
+        assert not K[4].any()
+
+    def test_approximate_mode(self):
+        """ランダムフーリエ特徴の近似は次元を増やすと厳密値に近づき、誤差を報告する"""
+        networks = [_network(n, seed) for seed, n in enumerate([5, 7, 4, 6, 8, 5])] + [{'nodes': [], 'edges': []}]
+        exact = WeightedWLKernel(n_iterations=1).fit_transform(networks)
+
+        kernel = WeightedWLKernel(n_iterations=1, approximate=True, n_components=4096, random_state=3)
+        K = kernel.fit_transform(networks)
+        np.testing.assert_allclose(K, exact, atol=0.1)
+        assert not K[6].any()
+
+        error = kernel.approximation_error_
+        assert error['n_sample_graphs'] == 6
+        assert error['max_abs_error'] == pytest.approx(np.abs(K - exact).max())
+
+        again = WeightedWLKernel(n_iterations=1, approximate=True, n_components=4096, random_state=3)
+        np.testing.assert_array_equal(again.fit_transform(networks), K)
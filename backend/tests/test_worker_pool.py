@@ -0,0 +1,151 @@
+# backend/tests/test_worker_pool.py
+"""
+共有プロセスプール（worker_pool.py）のユニットテスト
+"""
+
+import pytest
+import numpy as np
+import subprocess
+import sys
+import os
+import textwrap
+import time
+
+# パスを追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services import shapley_subset_table, structural_energy, worker_pool
+from app.services.shapley_calculator import NodeInfo
+from app.services.shapley_subset_table import (
+    build_node_game,
+    compute_exact_shapley_by_classes,
+    compute_subset_gram_table,
+)
+from app.services.structural_energy import compute_structural_energy_batch
+from app.services.worker_pool import SharedArrays, cancel_and_wait, map_shared, submit_shared
+
+
+def _weighted_row_sum(arrays, row, factor):
+    """共有メモリの行列の1行の和（テスト用のタスク）"""
+    return float(arrays['X'][row].sum() * factor)
+
+
+def _slow_row_sum(arrays, row, seconds):
+    """時間のかかるタスク（テスト用）"""
+    time.sleep(seconds)
+    return float(arrays['X'][row].sum())
+
+
+def _energy_network(seed):
+    rng = np.random.default_rng(seed)
+    nodes = [{'id': f"p{k}", 'layer': 1} for k in range(3)] + \
+            [{'id': f"a{k}", 'layer': 2} for k in range(3)] + \
+            [{'id': f"v{k}", 'layer': 3} for k in range(2)]
+    edges = [
+        {'id': f"e{k}", 'source_id': src, 'target_id': tgt, 'weight': int(rng.choice([-3, -1, 1, 3, 5]))}
+        for k, (src, tgt) in enumerate([
+            ('a0', 'p0'), ('a1', 'p1'), ('a2', 'p2'), ('a1', 'p0'),
+            ('a0', 'a1'), ('v0', 'a0'), ('v1', 'a2'), ('v0', 'a1'),
+        ])
+    ]
+    return {'nodes': nodes, 'edges': edges}
+
+
+class TestWorkerPool:
+    """共有プールと共有メモリのタスクAPIのテスト"""
+
+    def test_map_shared_matches_inline(self):
+        """共有メモリ経由でも同じプロセスで実行した結果と一致する"""
+        arrays = {'X': np.arange(12.0).reshape(4, 3)}
+        args_list = [(row, 2.0) for row in range(4)]
+        expected = map_shared(_weighted_row_sum, arrays, args_list, n_workers=1)
+        assert map_shared(_weighted_row_sum, arrays, args_list, n_workers=2) == expected
+        assert worker_pool.worker_pool_status()['running']
+
+    def test_alternating_jobs(self):
+        """ワーカーが別のジョブの共有メモリを交互に参照しても正しく読める"""
+        worker_pool.get_worker_pool(2)
+        with SharedArrays({'X': np.ones((2, 3))}) as first, SharedArrays({'X': np.full((2, 3), 2.0)}) as second:
+            futures = [
+                submit_shared(_weighted_row_sum, spec, 0, 1.0)
+                for _ in range(3) for spec in (first.spec, second.spec)
+            ]
+            assert [future.result() for future in futures] == [3.0, 6.0] * 3
+
+    def test_cancel_and_wait(self):
+        """未着手のタスクは取り消し、実行中のタスクは共有メモリを閉じる前に終わらせる"""
+        worker_pool.get_worker_pool(2)
+        with SharedArrays({'X': np.ones((2, 3))}) as shared:
+            futures = [submit_shared(_slow_row_sum, shared.spec, 0, 0.2) for _ in range(6)]
+            time.sleep(0.05)
+            cancel_and_wait(futures)
+            assert all(future.done() for future in futures)
+            assert any(future.cancelled() for future in futures)
+            finished = [future for future in futures if not future.cancelled()]
+            assert finished and all(future.result() == 3.0 for future in finished)
+
+    def test_resource_tracker_stays_clean(self):
+        """ワーカーがアタッチした共有メモリを親が削除しても、トラッカーがエラー・リーク警告を出さない"""
+        script = textwrap.dedent("""
+            import numpy as np
+            from app.api.mds import _optimize_shared_trial
+            from app.services.worker_pool import map_shared, shutdown_worker_pool
+
+            D = np.abs(np.subtract.outer(np.arange(6.0), np.arange(6.0)))
+            for _ in range(2):
+                map_shared(_optimize_shared_trial, {'D': D}, [(seed, None) for seed in range(4)], n_workers=2)
+            shutdown_worker_pool(wait=True)
+        """)
+        # トラッカーはインタプリタの終了時に出力するため別プロセスで実行する
+        result = subprocess.run(
+            [sys.executable, '-c', script],
+            cwd=os.path.join(os.path.dirname(__file__), '..'),
+            capture_output=True, text=True, timeout=120
+        )
+        assert result.returncode == 0, result.stderr
+        assert 'KeyError' not in result.stderr
+        assert 'resource_tracker' not in result.stderr
+
+    def test_subset_tables(self, monkeypatch):
+        """提携テーブルの並列評価（行列は共有メモリ）が逐次と一致する"""
+        monkeypatch.setattr(shapley_subset_table, 'PARALLEL_MIN_PLAYERS', 2)
+        monkeypatch.setattr(shapley_subset_table, 'PARALLEL_CHUNK_SIZE', 16)
+        rng = np.random.default_rng(4)
+        B_PA = rng.uniform(-1, 1, (3, 4))
+        B_AA = rng.uniform(-0.2, 0.2, (4, 4))
+        B_AV = rng.uniform(-1, 1, (4, 3))
+        infos = [NodeInfo(f"v{i}", f"v{i}", 'V', 3, i) for i in range(3)] + \
+                [NodeInfo(f"a{i}", f"a{i}", 'A', 2, i) for i in range(4)]
+        game = build_node_game(B_PA, B_AA, B_AV, infos)
+        pairs = [(0, 1), (0, 2), (1, 2)]
+
+        np.testing.assert_allclose(
+            compute_subset_gram_table(game, pairs, n_workers=2),
+            compute_subset_gram_table(game, pairs, n_workers=1),
+            atol=1e-12
+        )
+        classes = [[0, 1, 2], [3, 4], [5], [6]]
+        np.testing.assert_allclose(
+            compute_exact_shapley_by_classes(game, classes, pairs, n_workers=2),
+            compute_exact_shapley_by_classes(game, classes, pairs, n_workers=1),
+            atol=1e-12
+        )
+
+    def test_energy_batch(self, monkeypatch):
+        """設計案をワーカーに分けても一括計算と同じエネルギー"""
+        monkeypatch.setattr(structural_energy, 'PARALLEL_MIN_CASES', 2)
+        cases = [
+            {
+                'network': _energy_network(seed),
+                'performance_weights': {'p0': 0.5, 'p1': 0.3, 'p2': 0.2},
+                'case_id': f"case-{seed}",
+            }
+            for seed in range(5)
+        ]
+        sequential = compute_structural_energy_batch(cases, n_workers=1)
+        parallel = compute_structural_energy_batch(cases, n_workers=2)
+
+        assert len(parallel) == len(cases)
+        for expected, result in zip(sequential, parallel):
+            assert result['E'] == pytest.approx(expected['E'])
+            np.testing.assert_allclose(result['inner_product_matrix'], expected['inner_product_matrix'])